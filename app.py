@@ -1,9 +1,12 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
+import io
 import sqlite3
 import os
+import json
 from datetime import datetime, timezone
 import pytz
 import re
+import time
 from urllib.parse import urlparse, parse_qs
 
 # ================== CONFIG CHUNG ==================
@@ -226,72 +229,20 @@ def manual_classify_movie(title, description, tags=None):
 
 # =========================================
 # Auto-update system imports
+import config
 from services.auto_update_fixed import get_auto_update
 from services.youtube_url_parser import YouTubeURLParser
-
-# Hàm phân tích tự động phim
-def analyze_country_info(title, movie_title):
-    """Phân tích thông tin phim từ tiêu đề để tự động phân loại"""
-    title_lower = title.lower()
-    movie_title_lower = movie_title.lower()
-    combined_text = f"{title_lower} {movie_title_lower}"
-    # Phân tích quốc gia - Improved
-    country = "Unknown"
-    if any(keyword in combined_text for keyword in ['deadpool', 'avatar', 'spider-man', 'spiderman', 'marvel', 'dc', 'disney', 'hollywood', 'america', 'american']):
-        country = "Mỹ"
-    elif any(keyword in combined_text for keyword in ['trung quốc', 'china', 'hongkong', 'hong kong', 'chinese']):
-        country = "Trung Quốc"
-    elif any(keyword in combined_text for keyword in ['hàn quốc', 'korea', 'korean', 'k-drama', 'kdrama']):
-        country = "Hàn Quốc"
-    elif any(keyword in combined_text for keyword in ['nhật bản', 'japan', 'japanese', 'anime', 'manga']):
-        country = "Nhật Bản"
-    elif any(keyword in combined_text for keyword in ['việt nam', 'vietnam', 'vietnamese', 'việt']):
-        country = "Việt Nam"
-    elif any(keyword in combined_text for keyword in ['thái lan', 'thailand', 'thai']):
-        country = "Thái Lan"
-    # Phân tích thể loại - Improved with better priority
-    genre = "Unknown"
-    if any(keyword in combined_text for keyword in ['khoa học viễn tưởng', 'sci-fi', 'science fiction', 'siêu anh hùng', 'marvel', 'avengers', 'spider-man', 'spiderman', 'superman', 'batman']):
-        genre = "Khoa học viễn tưởng"
-    elif any(keyword in combined_text for keyword in ['anime', 'hoạt hình', 'animation', 'cartoon']):
-        genre = "Hoạt hình"
-    elif any(keyword in combined_text for keyword in ['hành động', 'action', 'fast', 'furious', 'fight', 'chiến đấu']):
-        genre = "Hành động"
-    elif any(keyword in combined_text for keyword in ['kinh dị', 'horror', 'ma', 'quỷ', 'zombie', 'sợ hãi']):
-        genre = "Kinh dị"
-    elif any(keyword in combined_text for keyword in ['tình cảm', 'romantic', 'romance', 'love', 'yêu', 'lãng mạn']):
-        genre = "Tình cảm"
-    elif any(keyword in combined_text for keyword in ['hài', 'comedy', 'funny', 'vui nhộn']):
-        genre = "Hài"
-    # Phân tích loại phim (single hay series)
-    movie_type = "single"
-    series_name = None
-    episode_number = None
-    # Tìm kiếm pattern cho phim bộ
-    episode_patterns = [
-        r'tập\s*(\d+)', r'episode\s*(\d+)', r'ep\s*(\d+)',
-        r'phần\s*(\d+)', r'season\s*(\d+)', r'part\s*(\d+)'
-    ]
-    for pattern in episode_patterns:
-        match = re.search(pattern, combined_text)
-        if match:
-            movie_type = "series"
-            episode_number = int(match.group(1))
-            # Lấy tên bộ phim (loại bỏ phần tập)
-            series_name = re.sub(pattern, '', movie_title, flags=re.IGNORECASE).strip()
-            break
-    # Các từ khóa cho phim bộ
-    series_keywords = ['phần', 'season', 'series', 'bộ', 'saga']
-    if any(keyword in combined_text for keyword in series_keywords) and movie_type == "single":
-        movie_type = "series"
-        series_name = movie_title
-    return {
-        'country': country,
-        'genre': genre,
-        'movie_type': movie_type,
-        'series_name': series_name,
-        'episode_number': episode_number
-    }
+from services import (backups, catalog_counters, catalog_maintenance, catalog_transfer, dedupe_index, schema,
+                      stats_refresh, text_normalizer, title_classifier, update_logs, video_grid, video_repository,
+                      video_store, write_queue)
+from services.title_classifier import analyze_country_info
+from services.video_repository import ApiRow, VideoReviewRepository
+from services.url_import import BulkURLImporter, parse_import_rows
+from services.leases import lease_holders
+from services.scheduler import get_scheduler
+from services.crawl_schedule import CrawlSchedule, configured_sources
+from services.jobs import (JOBS, get_job_manager, job_events_since, job_overview, recent_job_runs, trigger_job,
+                          trigger_task)
 
 # Khởi tạo database
 def init_db():
@@ -337,17 +288,18 @@ def init_db():
         c.execute('ALTER TABLE video_reviews ADD COLUMN movie_type TEXT DEFAULT "single"')
     except:
         pass
-    # Cập nhật phân loại tự động cho các video hiện có
-    c.execute('SELECT id, title, movie_title FROM video_reviews WHERE country = "Unknown" OR country IS NULL')
-    existing_videos = c.fetchall()
-    for video in existing_videos:
-        video_id, title, movie_title = video
-        analysis = analyze_country_info(title, movie_title)
-        c.execute('''UPDATE video_reviews 
-                    SET country=?, genre=?, movie_type=?, series_name=?, episode_number=?
-                    WHERE id=?''',
-                    (analysis['country'], analysis['genre'], analysis['movie_type'], 
-                     analysis['series_name'], analysis['episode_number'], video_id))
+    # Cột chuẩn hóa (title_norm, movie_norm, desc_norm, *_fold) + index
+    text_normalizer.ensure_normalized_columns(conn)
+    text_normalizer.backfill_normalized_columns(conn)
+    # Cột thống kê + UNIQUE(video_id) cho ghi hàng loạt, popularity + lịch sử stats
+    video_store.ensure_video_store_schema(conn)
+    stats_refresh.ensure_stats_schema(conn)
+    video_grid.ensure_grid_indexes(conn)
+    # Số đếm theo kênh / thể loại / ngày do trigger giữ (trang admin không COUNT(*) cả catalog)
+    catalog_counters.ensure_catalog_counters(conn)
+    # Phân loại lại video 'Unknown' không chạy ở đây (tăng theo catalog mỗi lần khởi động):
+    # chỉ thêm cột classifier_version, job nền 'classify_backfill' làm phần còn lại theo lô
+    title_classifier.ensure_classifier_schema(conn)
 
     # Kiểm tra xem đã có dữ liệu chưa (chỉ thêm nếu ít hơn 5 video)
     c.execute('SELECT COUNT(*) FROM video_reviews')
@@ -358,6 +310,22 @@ def init_db():
     conn.commit()
     conn.close()
 
+def migrate_schema():
+    """Migration nhẹ khi khởi động (gunicorn không chạy init_db trong __main__)"""
+    conn = get_conn()
+    try:
+        schema.ensure_schema(conn)
+    except Exception as e:
+        print(f"⚠️ Schema migration skipped: {e}")
+    finally:
+        conn.close()
+
+migrate_schema()
+
+# Mỗi worker đều start scheduler; lease SQLite chọn ra một leader chạy job
+if config.SCHEDULER_AUTOSTART:
+    get_scheduler().start_scheduler()
+
 # Hàm trích xuất video ID từ URL
 def extract_video_info(url):
     """Trích xuất thông tin video từ URL YouTube hoặc Facebook"""
@@ -386,25 +354,17 @@ def extract_video_info(url):
 
 @app.route('/')
 def index():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('''SELECT * FROM video_reviews ORDER BY created_at DESC''')
-    reviews = c.fetchall()
-    conn.close()
+    reviews = VideoReviewRepository().latest_cards()
     return render_template('index.html', reviews=reviews)
 
 @app.route('/review/<int:review_id>')
 def review_detail(review_id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('SELECT * FROM video_reviews WHERE id = ?', (review_id,))
-    review = c.fetchone()
-    conn.close()
+    review = VideoReviewRepository().get(review_id)
     if not review:
         flash('Không tìm thấy review!', 'error')
         return redirect(url_for('index'))
     # Tạo embed URL (Render-safe)
-    video_url = review[4]
+    video_url = review.video_url
     embed_url = None
     if "youtube.com" in video_url or "youtu.be" in video_url:
         if "watch?v=" in video_url:
@@ -430,31 +390,11 @@ def search():
     genre = request.args.get('genre', '')
     if not query and not country and not genre:
         return redirect(url_for('index'))
-    conn = get_conn()
-    c = conn.cursor()
-    # Xây dựng câu truy vấn động
-    where_conditions = []
-    params = []
-    if query:
-        where_conditions.append('(title LIKE ? OR movie_title LIKE ? OR reviewer_name LIKE ?)')
-        params.extend([f'%{query}%', f'%{query}%', f'%{query}%'])
-    if country and country != 'all':
-        where_conditions.append('country = ?')
-        params.append(country)
-    if genre and genre != 'all':
-        where_conditions.append('genre = ?')
-        params.append(genre)
-    where_clause = ' AND '.join(where_conditions) if where_conditions else '1=1'
-    c.execute(f'''SELECT * FROM video_reviews 
-                WHERE {where_clause}
-                ORDER BY created_at DESC''', params)
-    reviews = c.fetchall()
-    # Lấy danh sách quốc gia và thể loại để hiển thị filter
-    c.execute('SELECT DISTINCT country FROM video_reviews WHERE country IS NOT NULL ORDER BY country')
-    countries = [row[0] for row in c.fetchall()]
-    c.execute('SELECT DISTINCT genre FROM video_reviews WHERE genre IS NOT NULL ORDER BY genre')
-    genres = [row[0] for row in c.fetchall()]
-    conn.close()
+    repo = VideoReviewRepository()
+    reviews = repo.search_cards(query, country, genre)
+    # Danh sách quốc gia và thể loại để hiển thị filter
+    countries = repo.distinct_values('country')
+    genres = repo.distinct_values('genre')
     return render_template('search.html', reviews=reviews, query=query, 
                          countries=countries, genres=genres, 
                          selected_country=country, selected_genre=genre)
@@ -465,31 +405,11 @@ def filter_movies():
     country = request.args.get('country', 'all')
     genre = request.args.get('genre', 'all')
     movie_type = request.args.get('type', 'all')
-    conn = get_conn()
-    c = conn.cursor()
-    # Xây dựng câu truy vấn
-    where_conditions = ['1=1']
-    params = []
-    if country != 'all':
-        where_conditions.append('country = ?')
-        params.append(country)
-    if genre != 'all':
-        where_conditions.append('genre = ?')
-        params.append(genre)
-    if movie_type != 'all':
-        where_conditions.append('movie_type = ?')
-        params.append(movie_type)
-    where_clause = ' AND '.join(where_conditions)
-    c.execute(f'''SELECT * FROM video_reviews 
-                WHERE {where_clause}
-                ORDER BY rating DESC, created_at DESC''', params)
-    reviews = c.fetchall()
-    # Lấy thống kê
-    c.execute('SELECT DISTINCT country FROM video_reviews WHERE country IS NOT NULL ORDER BY country')
-    countries = [row[0] for row in c.fetchall()]
-    c.execute('SELECT DISTINCT genre FROM video_reviews WHERE genre IS NOT NULL ORDER BY genre')
-    genres = [row[0] for row in c.fetchall()]
-    conn.close()
+    repo = VideoReviewRepository()
+    reviews = repo.filter_cards(country, genre, movie_type)
+    # Danh sách quốc gia và thể loại để hiển thị filter
+    countries = repo.distinct_values('country')
+    genres = repo.distinct_values('genre')
     return render_template('filter.html', reviews=reviews, 
                          countries=countries, genres=genres,
                          selected_country=country, selected_genre=genre, selected_type=movie_type)
@@ -497,13 +417,7 @@ def filter_movies():
 @app.route('/series/<series_name>')
 def series_detail(series_name):
     """Hiển thị tất cả tập của một bộ phim"""
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('''SELECT * FROM video_reviews 
-                WHERE series_name = ? 
-                ORDER BY episode_number ASC, created_at ASC''', (series_name,))
-    episodes = c.fetchall()
-    conn.close()
+    episodes = VideoReviewRepository().series_episodes(series_name)
     if not episodes:
         flash(f'Không tìm thấy bộ phim "{series_name}"!', 'error')
         return redirect(url_for('index'))
@@ -512,12 +426,17 @@ def series_detail(series_name):
 # Admin routes (bảo vệ bởi session)
 @app.route('/admin')
 def admin_dashboard():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('SELECT * FROM video_reviews ORDER BY created_at DESC')
-    reviews = c.fetchall()
-    conn.close()
-    return render_template('admin/dashboard.html', reviews=reviews)
+    """Một trang của catalog (lọc / sắp xếp / phân trang phía server qua video_grid)"""
+    try:
+        grid = video_grid_page(request.args)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_dashboard'))
+    args = {key: value for key, value in request.args.items() if key not in ('cursor', 'page') and value}
+    next_url = url_for('admin_dashboard', cursor=grid['next_cursor'], **args) if grid['next_cursor'] else None
+    first_url = url_for('admin_dashboard', **args) if request.args.get('cursor') else None
+    return render_template('admin/dashboard.html', reviews=grid['videos'], grid=grid, next_url=next_url,
+                           first_url=first_url, facets=video_grid.facets(), sorts=list(video_grid.SORTS))
 
 @app.route('/admin/new')
 def admin_new_review():
@@ -539,27 +458,26 @@ def admin_add_review():
         return redirect(url_for('admin_new_review'))
     # Tự động phân tích thông tin phim
     analysis = analyze_country_info(title, movie_title)
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('''INSERT INTO video_reviews 
-                (title, movie_title, reviewer_name, video_url, video_type, video_id, description, rating, movie_link, country, genre, series_name, episode_number, movie_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (title, movie_title, reviewer_name, video_url, video_info['type'], 
-                 video_info['id'], description, rating, movie_link,
-                 analysis['country'], analysis['genre'], analysis['series_name'], 
-                 analysis['episode_number'], analysis['movie_type']))
-    conn.commit()
-    conn.close()
+    # Ghi qua writer thread của process: gộp commit với crawler / request khác, không lỗi "database is locked"
+    try:
+        write_queue.get_write_queue().execute('''INSERT INTO video_reviews 
+                    (title, movie_title, reviewer_name, video_url, video_type, video_id, description, rating, movie_link, country, genre, series_name, episode_number, movie_type,
+                     classifier_version, title_norm, movie_norm, desc_norm, title_fold, movie_fold)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                    (title, movie_title, reviewer_name, video_url, video_info['type'], 
+                     video_info['id'], description, rating, movie_link,
+                     analysis['country'], analysis['genre'], analysis['series_name'], 
+                     analysis['episode_number'], analysis['movie_type'], title_classifier.CLASSIFIER_VERSION)
+                    + text_normalizer.normalized_values(title, description)).result()
+    except sqlite3.IntegrityError:
+        flash('Video này đã có trong database!', 'error')
+        return redirect(url_for('admin_new_review'))
     flash(f'Thêm video review thành công! Phân loại: {analysis["country"]} - {analysis["genre"]}', 'success')
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/edit/<int:review_id>')
 def admin_edit_review(review_id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('SELECT * FROM video_reviews WHERE id = ?', (review_id,))
-    review = c.fetchone()
-    conn.close()
+    review = VideoReviewRepository().get(review_id)
     if not review:
         flash('Không tìm thấy review!', 'error')
         return redirect(url_for('admin_dashboard'))
@@ -579,26 +497,31 @@ def admin_update_review(review_id):
     if not video_info:
         flash('URL video không hợp lệ! Hỗ trợ YouTube và Facebook.', 'error')
         return redirect(url_for('admin_edit_review', review_id=review_id))
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('''UPDATE video_reviews 
-                SET title=?, movie_title=?, reviewer_name=?, video_url=?, video_type=?, video_id=?, 
-                    description=?, rating=?, movie_link=?
-                WHERE id=?''',
-                (title, movie_title, reviewer_name, video_url, video_info['type'], 
-                 video_info['id'], description, rating, movie_link, review_id))
-    conn.commit()
-    conn.close()
+    def update(conn):
+        # Cập nhật và tính lại khóa LSH (tiêu đề / mô tả / kênh / video_id có thể đã đổi) trong cùng thao tác ghi
+        row = conn.execute('SELECT video_id FROM video_reviews WHERE id = ?', (review_id,)).fetchone()
+        video_ids = [video_info['id']] + ([row[0]] if row else [])
+        before = dedupe_index.indexed_state(conn, video_ids)
+        conn.execute('''UPDATE video_reviews 
+                    SET title=?, movie_title=?, reviewer_name=?, video_url=?, video_type=?, video_id=?, 
+                        description=?, rating=?, movie_link=?,
+                        title_norm=?, movie_norm=?, desc_norm=?, title_fold=?, movie_fold=?
+                    WHERE id=?''',
+                    (title, movie_title, reviewer_name, video_url, video_info['type'], 
+                     video_info['id'], description, rating, movie_link)
+                    + text_normalizer.normalized_values(title, description) + (review_id,))
+        dedupe_index.rekey_documents(conn, video_ids, before)
+    try:
+        write_queue.write(update)
+    except sqlite3.IntegrityError:
+        flash('Video này đã có trong database!', 'error')
+        return redirect(url_for('admin_edit_review', review_id=review_id))
     flash('Cập nhật video review thành công!', 'success')
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/delete/<int:review_id>')
 def admin_delete_review(review_id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('DELETE FROM video_reviews WHERE id = ?', (review_id,))
-    conn.commit()
-    conn.close()
+    write_queue.get_write_queue().execute('DELETE FROM video_reviews WHERE id = ?', (review_id,)).result()
     flash('Xóa video review thành công!', 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -630,22 +553,23 @@ def admin_auto_update():
 def admin_auto_update_stats():
     try:
         auto_update = get_auto_update(app)
-        # Get total videos count
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute('SELECT COUNT(*) FROM video_reviews')
-        total_videos = c.fetchone()[0]
-        conn.close()
-        # Get auto-update stats
+        # Tổng số video (catalog_counters) + lần cập nhật thành công gần nhất (index update_logs)
         stats = auto_update.get_stats()
-        stats['total_videos_added'] = total_videos
-        # Chuyển đổi last_successful_update nếu có
-        if 'last_successful_update' in stats and stats['last_successful_update']:
-            value = stats['last_successful_update']
-            # Kiểm tra nếu value là dict thì lấy trường bên trong (thường là 'date' hoặc 'datetime')
-            if isinstance(value, dict):
-                value = value.get('date') or value.get('datetime') or str(value)
-            stats['last_successful_update'] = convert_to_vietnam_time(value)
+        # Process nào đang giữ lease scheduler / crawl (multi-worker)
+        stats['leases'] = lease_holders()
+        # Writer thread của worker này: độ sâu hàng đợi, kích thước lô, thời gian commit / chờ
+        stats['write_queue'] = write_queue.queue_metrics()
+        # Giờ Việt Nam của lần cập nhật thành công gần nhất
+        last_success = stats.get('last_successful_update')
+        if last_success and last_success.get('timestamp'):
+            last_success['timestamp_vn'] = convert_to_vietnam_time(last_success['timestamp'])
+        # ?breakdown=1: số video theo thể loại / kênh / ngày (đọc từ catalog_counters)
+        if request.args.get('breakdown'):
+            conn = get_conn()
+            try:
+                stats['breakdown'] = catalog_counters.summary(conn)
+            finally:
+                conn.close()
         return jsonify(stats)
 
     except Exception as e:
@@ -681,72 +605,189 @@ def admin_auto_update_toggle():
             'error': str(e)
         })
 
+def enqueue_job_response(job_id, message):
+    """Chạy job trên thread nền, trả về ngay id lần chạy và URL stream tiến độ"""
+    try:
+        run_id = trigger_job(job_id)
+        return jsonify({
+            'success': True,
+            'message': message,
+            'job_id': run_id,
+            'events_url': url_for('admin_job_events', run_id=run_id)
+        }), 202
+    except Exception as e:
+        print(f"Error starting job {job_id}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
 @app.route('/admin/auto-update/run', methods=['POST'])
 def admin_auto_update_run():
+    return enqueue_job_response('crawl', 'Đã bắt đầu cập nhật, theo dõi tiến độ bên dưới')
+
+@app.route('/admin/auto-update/refresh-stats', methods=['POST'])
+def admin_auto_update_refresh_stats():
+    """Cập nhật lượt xem / thích / bình luận cho video đã có (trong phần quota dành cho refresh)"""
+    data = request.get_json(silent=True) or {}
     try:
-        auto_update = get_auto_update(app)
-        result = auto_update.run_update()
+        batches = int(data.get('batches') or config.STATS_REFRESH_MAX_BATCHES)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'batches phải là số nguyên'}), 400
+    batches = max(1, min(batches, config.STATS_REFRESH_MAX_BATCHES))
+    try:
+        # Chạy nền (gọi YouTube API theo lô), cùng lease 'job:stats_refresh' với job định kỳ
+        run_id = trigger_task('stats_refresh',
+                              lambda progress: stats_refresh.StatsRefresher().run(max_batches=batches))
         return jsonify({
             'success': True,
-            'message': f'Cập nhật thành công! Tìm thấy {result.get("found", 0)} video, thêm mới {result.get("added", 0)} video',
-            'result': result
-        })
+            'message': f'Đang cập nhật thống kê (tối đa {batches} lô), theo dõi tiến độ bên dưới',
+            'job_id': run_id,
+            'events_url': url_for('admin_job_events', run_id=run_id)
+        }), 202
     except Exception as e:
-        print(f"Error running manual update: {e}")
+        print(f"Error refreshing stats: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
-@app.route('/admin/auto-update/videos')
-def admin_auto_update_videos():
+@app.route('/admin/crawl-schedule')
+def admin_crawl_schedule():
+    """Lịch crawl thích nghi của từng nguồn và hiệu quả theo kênh"""
     try:
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute('''SELECT id, title, movie_title, reviewer_name, created_at 
-                    FROM video_reviews ORDER BY created_at DESC''')
-        videos = c.fetchall()
-        conn.close()
-        video_list = []
-        for video in videos:
-            video_list.append({
-                'id': video[0],
-                'title': video[1],
-                'movie_title': video[2],
-                'channel': video[3],  # reviewer_name as channel
-                'created_at': convert_to_vietnam_time(video[4]) if video[4] else 'Không xác định'
-            })
+        schedule = CrawlSchedule()
+        schedule.sync(configured_sources())
         return jsonify({
             'success': True,
-            'videos': video_list,
-            'total': len(video_list)
+            'now': time.time(),
+            'sources': schedule.schedule_rows(),
+            'channels': schedule.top_channels(limit=int(request.args.get('channels', 15)))
         })
     except Exception as e:
-        print(f"Error getting videos list: {e}")
+        print(f"Error loading crawl schedule: {e}")
         return jsonify({
             'success': False,
-            'error': str(e),
-            'videos': [],
-            'total': 0
+            'error': str(e)
         })
 
-@app.route('/admin/auto-update/run-manual', methods=['POST'])
-def admin_auto_update_run_manual():
+@app.route('/admin/jobs')
+def admin_jobs():
+    """Danh sách job định kỳ (lịch chạy, trạng thái) và lịch sử chạy gần đây"""
     try:
-        auto_update = get_auto_update(app)
-        result = auto_update.run_update()
+        overview = job_overview()
+        overview['runs'] = recent_job_runs(limit=int(request.args.get('limit', 30)),
+                                           job_id=request.args.get('job_id'))
+        overview['success'] = True
+        return jsonify(overview)
+    except Exception as e:
+        print(f"Error listing jobs: {e}")
         return jsonify({
-            'success': True,
-            'message': f'Cập nhật thành công! Tìm thấy {result.get("found", 0)} video, thêm mới {result.get("added", 0)} video',
-            'result': result
+            'success': False,
+            'error': str(e)
         })
+
+@app.route('/admin/jobs/<int:run_id>/events')
+def admin_job_events(run_id):
+    """Server-Sent Events: tiến độ (query, stage) của một lần chạy job, kết thúc bằng sự kiện 'done'
+
+    Sự kiện được đọc từ job_events nên stream hoạt động ở mọi worker; stream tự đóng sau
+    JOB_EVENTS_STREAM_SECONDS và EventSource kết nối lại với Last-Event-ID.
+    """
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        last_id = 0
+
+    def stream():
+        nonlocal last_id
+        deadline = time.monotonic() + config.JOB_EVENTS_STREAM_SECONDS
+        yield 'retry: 2000\n\n'
+        while time.monotonic() < deadline:
+            events, status = job_events_since(run_id, last_id)
+            if status is None:
+                yield 'event: error\ndata: {"error": "Không tìm thấy job"}\n\n'
+                return
+            for event_id, event, data in events:
+                last_id = event_id
+                yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                if event == 'done':
+                    return
+            if not events:
+                yield ': keep-alive\n\n'
+            time.sleep(config.JOB_EVENTS_POLL_SECONDS)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/admin/jobs/<job_id>/<action>', methods=['POST'])
+def admin_job_action(job_id, action):
+    """Chạy ngay / tạm dừng / tiếp tục một job"""
+    if job_id not in JOBS or action not in ('run', 'pause', 'resume'):
+        return jsonify({'success': False, 'error': 'Job hoặc thao tác không hợp lệ'}), 404
+    if action == 'run':
+        return enqueue_job_response(job_id, f'Đã bắt đầu chạy job "{JOBS[job_id][0]}"')
+    try:
+        manager = get_job_manager()
+        if action == 'pause':
+            manager.pause(job_id)
+            message = f'Đã tạm dừng job "{JOBS[job_id][0]}"'
+        else:
+            manager.resume(job_id)
+            message = f'Đã tiếp tục job "{JOBS[job_id][0]}"'
+        return jsonify({'success': True, 'message': message})
+    except ImportError:
+        return jsonify({'success': False, 'error': 'Chưa cài APScheduler, không thể đổi lịch job'})
     except Exception as e:
-        print(f"Error running manual update: {e}")
+        print(f"Error running job action {action} on {job_id}: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+def video_grid_page(args):
+    """video_grid.query_page với tham số từ query string; ValueError nếu tham số sai"""
+    try:
+        page = int(args.get('page') or 1)
+        per_page = int(args.get('per_page') or config.ADMIN_GRID_PAGE_SIZE)
+    except ValueError:
+        raise ValueError('page / per_page phải là số nguyên')
+    return video_grid.query_page(
+        video_grid.parse_filters(args),
+        sort=args.get('sort') or 'created_at',
+        order=args.get('order') or 'desc',
+        cursor=args.get('cursor') or None,
+        page=page,
+        per_page=per_page,
+    )
+
+@app.route('/admin/auto-update/videos')
+def admin_auto_update_videos():
+    """Danh sách video phân trang: page / cursor, sort, order, channel, genre, country, date_from, date_to, status, q"""
+    try:
+        grid = video_grid_page(request.args)
+        for video in grid['videos']:
+            video['channel'] = video['reviewer_name']  # reviewer_name as channel
+            video['created_at'] = (convert_to_vietnam_time(video['created_at'])
+                                   if video['created_at'] else 'Không xác định')
+        if request.args.get('facets'):
+            grid['facets'] = video_grid.facets()
+        return jsonify({'success': True, **grid})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e), 'videos': [], 'total': 0}), 400
+    except Exception as e:
+        print(f"Error getting videos list: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'videos': [],
+            'total': 0
+        })
+
+@app.route('/admin/auto-update/run-manual', methods=['POST'])
+def admin_auto_update_run_manual():
+    return enqueue_job_response('crawl', 'Đã bắt đầu cập nhật thủ công!')
+
 @app.route('/admin/auto-update/get-videos')
 def admin_auto_update_get_videos():
     """Alias for videos endpoint to match JavaScript calls"""
@@ -757,20 +798,26 @@ def admin_auto_update_logs():
     try:
         conn = get_conn()
         c = conn.cursor()
-        c.execute('''SELECT timestamp, status, message, videos_found, videos_added 
+        c.execute('''SELECT timestamp, status, message, videos_found, videos_added, stage_metrics 
                     FROM update_logs ORDER BY timestamp DESC LIMIT 20''')
         logs = c.fetchall()
-        conn.close()
         # Chuyển đổi thời gian cho mỗi log
         converted_logs = []
         for log in logs:
             converted_log = list(log)
             converted_log[0] = convert_to_vietnam_time(converted_log[0])  # timestamp
+            converted_log[5] = json.loads(converted_log[5]) if converted_log[5] else None  # stage_metrics
             converted_logs.append(tuple(converted_log))
-        return jsonify({
+        response = {
             'success': True,
             'logs': converted_logs
-        })
+        }
+        # ?daily=N: số liệu N ngày gần nhất (cộng dồn từ update_log_daily + dòng chi tiết)
+        days = request.args.get('daily', type=int)
+        if days:
+            response['daily'] = update_logs.daily_rollup(conn, min(days, 365))
+        conn.close()
+        return jsonify(response)
     except Exception as e:
         print(f"Error getting logs: {e}")
         return jsonify({
@@ -781,71 +828,43 @@ def admin_auto_update_logs():
 
 @app.route('/admin/auto-update/bulk-operations', methods=['POST'])
 def admin_auto_update_bulk_operations():
+    """Xóa / reset ID hàng loạt, chạy nền; tiến độ qua /admin/jobs/<id>/events"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         operation = data.get('operation')
-        conn = get_conn()
-        c = conn.cursor()
         if operation == 'delete_selected':
-            video_ids = data.get('video_ids', [])
+            video_ids = [int(i) for i in data.get('video_ids', [])]
             if not video_ids:
                 return jsonify({'success': False, 'error': 'Không có video nào được chọn'})
-            # Delete selected videos
-            placeholders = ','.join(['?' for _ in video_ids])
-            c.execute(f'DELETE FROM video_reviews WHERE id IN ({placeholders})', video_ids)
-            deleted_count = c.rowcount
-            conn.commit()
-            conn.close()
-            return jsonify({
-                'success': True,
-                'message': f'Đã xóa {deleted_count} video thành công'
-            })
+            task = lambda progress: {'deleted': catalog_maintenance.delete_videos(video_ids, progress=progress)}
+            message = f'Đang xóa {len(video_ids)} video...'
+        elif operation == 'delete_filtered':
+            # Chọn theo bộ lọc của grid (không cần gửi danh sách id); bộ lọc rỗng phải dùng delete_all
+            filters = video_grid.parse_filters(data.get('filters') or {})
+            if not filters:
+                return jsonify({'success': False, 'error': 'Bộ lọc trống, hãy dùng "Xóa tất cả"'})
+            where, params = video_grid.where_clause(filters)
+            task = lambda progress: {'deleted': catalog_maintenance.delete_matching(where, params, progress=progress)}
+            message = 'Đang xóa các video khớp bộ lọc...'
         elif operation == 'delete_all':
-            # Delete all videos
-            c.execute('DELETE FROM video_reviews')
-            deleted_count = c.rowcount
-            # Reset auto-increment counter
-            c.execute("DELETE FROM sqlite_sequence WHERE name='video_reviews'")
-            conn.commit()
-            conn.close()
-            return jsonify({
-                'success': True,
-                'message': f'Đã xóa tất cả {deleted_count} video và reset ID thành công'
-            })
+            task = lambda progress: {'deleted': catalog_maintenance.delete_all_videos(progress=progress)}
+            message = 'Đang xóa tất cả video...'
         elif operation == 'reset_ids':
-            # Get all videos ordered by creation date
-            c.execute('SELECT * FROM video_reviews ORDER BY created_at ASC')
-            videos = c.fetchall()
-            if not videos:
-                conn.close()
-                return jsonify({
-                    'success': True,
-                    'message': 'Không có video nào để reset ID'
-                })
-            # Delete all videos
-            c.execute('DELETE FROM video_reviews')
-            # Reset auto-increment counter
-            c.execute("DELETE FROM sqlite_sequence WHERE name='video_reviews'")
-            # Re-insert videos with new sequential IDs (skip ID column)
-            for video in videos:
-                c.execute('''INSERT INTO video_reviews 
-                            (title, movie_title, reviewer_name, video_url, video_type, video_id, 
-                             description, rating, movie_link, created_at, channel_name, 
-                             thumbnail_url, published_at, updated_at)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                            video[1:])  # Skip the old ID (video[0])
-            conn.commit()
-            conn.close()
-            return jsonify({
-                'success': True,
-                'message': f'Đã reset ID cho {len(videos)} video thành công'
-            })
+            task = lambda progress: {'renumbered': catalog_maintenance.renumber_video_ids(progress=progress)}
+            message = 'Đang reset ID theo thứ tự tạo...'
         else:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': f'Thao tác không hợp lệ: {operation}'
             })
+        # Cùng lease 'job:catalog_maintenance': không chạy hai thao tác hàng loạt cùng lúc
+        run_id = trigger_task('catalog_maintenance', task)
+        return jsonify({
+            'success': True,
+            'message': message,
+            'job_id': run_id,
+            'events_url': url_for('admin_job_events', run_id=run_id)
+        }), 202
     except Exception as e:
         print(f"Error in bulk operations: {e}")
         return jsonify({
@@ -856,25 +875,102 @@ def admin_auto_update_bulk_operations():
 # API endpoints
 @app.route('/api/reviews')
 def api_reviews():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute('SELECT * FROM video_reviews ORDER BY created_at DESC')
-    reviews = c.fetchall()
-    conn.close()
-    return jsonify([{
-        'id': r[0],
-        'title': r[1],
-        'movie_title': r[2],
-        'reviewer_name': r[3],
-        'video_url': r[4],
-        'video_type': r[5],
-        'video_id': r[6],
-        'description': r[7],
-        'rating': r[8],
-        'movie_link': r[9],
-        'created_at': r[10],
-        'created_at_vn': convert_to_vietnam_time(r[10]) if r[10] else 'Không xác định'
-    } for r in reviews])
+    """Toàn bộ review dạng mảng JSON, stream theo lô (không nạp cả catalog vào bộ nhớ)"""
+    def stream():
+        yield '['
+        separator = ''
+        for rows in catalog_transfer.iter_batches(video_repository.statement(ApiRow, order_by='created_at DESC')):
+            yield separator + ','.join(json.dumps(dict(
+                r.as_dict(),
+                created_at_vn=convert_to_vietnam_time(r.created_at) if r.created_at else 'Không xác định'
+            ), ensure_ascii=False) for r in map(ApiRow, rows))
+            separator = ','
+        yield ']'
+
+    return Response(stream_with_context(stream()), mimetype='application/json')
+
+@app.route('/admin/export')
+def admin_export():
+    """Tải toàn bộ catalog dạng CSV / JSONL (?format=csv|jsonl), stream theo lô"""
+    try:
+        fmt = catalog_transfer.detect_format(fmt=request.args.get('format', 'jsonl'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    filename = f"reviewphim-catalog-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(catalog_transfer.iter_export(fmt)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Accel-Buffering': 'no'})
+
+@app.route('/admin/import', methods=['POST'])
+def admin_import():
+    """Nhập catalog từ file CSV / JSONL ('file'), mỗi lô một transaction; tiến độ trả về dạng NDJSON"""
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'error': 'Chưa chọn file'}), 400
+    mode = request.form.get('mode', 'upsert')
+    try:
+        fmt = catalog_transfer.detect_format(upload.filename, request.form.get('format') or None)
+        if mode not in catalog_transfer.MODES:
+            raise ValueError(f"mode phải là một trong: {', '.join(catalog_transfer.MODES)}")
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    def events():
+        # Upload lớn được werkzeug ghi ra file tạm: đọc từng dòng, không nạp cả file vào bộ nhớ
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        try:
+            for event in catalog_transfer.iter_import(stream, fmt, mode):
+                yield json.dumps(event, ensure_ascii=False) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': f'Lỗi nhập: {str(e)}'}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(events()), mimetype='application/x-ndjson')
+
+@app.route('/admin/backups')
+def admin_backups():
+    """Danh sách bản sao lưu database (mới nhất trước)"""
+    try:
+        return jsonify({
+            'success': True,
+            'backups': backups.list_snapshots()
+        })
+    except Exception as e:
+        print(f"Error listing backups: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/admin/backups', methods=['POST'])
+def admin_backup_create():
+    """Sao lưu ngay (job 'backup'), tiến độ qua /admin/jobs/<id>/events"""
+    return enqueue_job_response('backup', 'Đã bắt đầu sao lưu database, theo dõi tiến độ bên dưới')
+
+@app.route('/admin/backups/<name>/restore', methods=['POST'])
+def admin_backup_restore(name):
+    """Khôi phục database từ một bản sao lưu, chạy nền; database hiện tại được sao lưu trước (pre-restore)"""
+    try:
+        backups.snapshot_path(name)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    try:
+        # Cùng lease 'job:backup' với job sao lưu định kỳ: không sao lưu / khôi phục chồng lên nhau
+        run_id = trigger_task('backup', lambda progress: backups.restore_snapshot(name, progress=progress))
+        return jsonify({
+            'success': True,
+            'message': f'Đang khôi phục từ {name}, theo dõi tiến độ bên dưới',
+            'job_id': run_id,
+            'events_url': url_for('admin_job_events', run_id=run_id)
+        }), 202
+    except Exception as e:
+        print(f"Error restoring backup {name}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
 
 @app.route('/admin/preview-youtube', methods=['POST'])
 def preview_youtube():
@@ -926,6 +1022,28 @@ def add_manual_video():
     except Exception as e:
         return jsonify({'success': False, 'error': f'Lỗi server: {str(e)}'})
 
+@app.route('/admin/bulk-import-urls', methods=['POST'])
+def bulk_import_urls():
+    """Thêm hàng loạt video từ textarea (JSON 'urls') hoặc file CSV ('file'), trả về tiến độ dạng NDJSON"""
+    upload = request.files.get('file')
+    if upload:
+        text = upload.read().decode('utf-8-sig', errors='replace')
+    else:
+        data = request.get_json(silent=True) or {}
+        text = data.get('urls') or request.form.get('urls', '')
+    rows = parse_import_rows(text)
+    if not rows:
+        return jsonify({'success': False, 'error': 'Không tìm thấy URL nào'})
+
+    def events():
+        try:
+            for event in BulkURLImporter().iter_import(rows):
+                yield json.dumps(event, ensure_ascii=False) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': f'Lỗi server: {str(e)}'}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(events()), mimetype='application/x-ndjson')
+
 @app.route('/admin/check-api-status')
 def check_api_status():
     """Check YouTube API status"""
@@ -968,113 +1086,25 @@ def check_api_status():
 def get_related_videos(current_video_id):
     """API để lấy video đề xuất liên quan với ưu tiên phim cùng bộ"""
     try:
-        conn = get_conn()
-        c = conn.cursor()
-        # Lấy thông tin video hiện tại
-        c.execute('''SELECT movie_title, reviewer_name, series_name, movie_type, country, genre 
-                     FROM video_reviews WHERE id = ?''', (current_video_id,))
-        current_video = c.fetchone()
-        if not current_video:
+        current, related_videos = VideoReviewRepository().related(current_video_id)
+        if current is None:
             return jsonify({'success': False, 'error': 'Video không tồn tại'})
-        current_movie, current_reviewer, current_series, current_type, current_country, current_genre = current_video
-        related_videos = []
-        # Ưu tiên 1: Video cùng bộ phim (nếu là phim bộ)
-        if current_type == 'series' and current_series:
-            c.execute('''
-                SELECT id, title, movie_title, reviewer_name, video_id, video_type, rating, country, genre, series_name, episode_number, created_at
-                FROM video_reviews 
-                WHERE id != ? AND series_name = ? AND movie_type = 'series'
-                ORDER BY episode_number ASC, rating DESC
-                LIMIT 2
-            ''', (current_video_id, current_series))
-            series_videos = c.fetchall()
-            related_videos.extend(series_videos)
-        # Ưu tiên 2: Video cùng reviewer và cùng thể loại
-        if len(related_videos) < 3:
-            c.execute('''
-                SELECT id, title, movie_title, reviewer_name, video_id, video_type, rating, country, genre, series_name, episode_number, created_at
-                FROM video_reviews 
-                WHERE id != ? AND reviewer_name = ? AND genre = ? 
-                AND (series_name != ? OR series_name IS NULL)
-                ORDER BY rating DESC, created_at DESC
-                LIMIT ?
-            ''', (current_video_id, current_reviewer, current_genre, current_series, 3 - len(related_videos)))
-            reviewer_videos = c.fetchall()
-            related_videos.extend(reviewer_videos)
-        # Ưu tiên 3: Video cùng quốc gia và thể loại
-        if len(related_videos) < 3:
-            c.execute('''
-                SELECT id, title, movie_title, reviewer_name, video_id, video_type, rating, country, genre, series_name, episode_number, created_at
-                FROM video_reviews 
-                WHERE id != ? AND country = ? AND genre = ?
-                AND reviewer_name != ?
-                AND (series_name != ? OR series_name IS NULL)
-                ORDER BY rating DESC, created_at DESC
-                LIMIT ?
-            ''', (current_video_id, current_country, current_genre, current_reviewer, current_series, 3 - len(related_videos)))
-            country_videos = c.fetchall()
-            related_videos.extend(country_videos)
-        # Ưu tiên 4: Video cùng thể loại (nếu vẫn chưa đủ)
-        if len(related_videos) < 3:
-            c.execute('''
-                SELECT id, title, movie_title, reviewer_name, video_id, video_type, rating, country, genre, series_name, episode_number, created_at
-                FROM video_reviews 
-                WHERE id != ? AND genre = ?
-                AND reviewer_name != ? AND country != ?
-                AND (series_name != ? OR series_name IS NULL)
-                ORDER BY rating DESC, created_at DESC
-                LIMIT ?
-            ''', (current_video_id, current_genre, current_reviewer, current_country, current_series, 3 - len(related_videos)))
-            genre_videos = c.fetchall()
-            related_videos.extend(genre_videos)
-        # Ưu tiên 5: Video ngẫu nhiên (nếu vẫn chưa đủ)
-        if len(related_videos) < 3:
-            c.execute('''
-                SELECT id, title, movie_title, reviewer_name, video_id, video_type, rating, country, genre, series_name, episode_number, created_at
-                FROM video_reviews 
-                WHERE id != ? 
-                AND (series_name != ? OR series_name IS NULL)
-                ORDER BY rating DESC, created_at DESC
-                LIMIT ?
-            ''', (current_video_id, current_series, 3 - len(related_videos)))
-            random_videos = c.fetchall()
-            related_videos.extend(random_videos)
-        conn.close()
-        # Loại bỏ trùng lặp và format dữ liệu trả về
-        seen_ids = set()
-        unique_videos = []
-        for video in related_videos:
-            if video[0] not in seen_ids:
-                seen_ids.add(video[0])
-                unique_videos.append(video)
-                if len(unique_videos) >= 3:
-                    break
         videos = []
-        for video in unique_videos:
-            video_data = {
-                'id': video[0],
-                'title': video[1],
-                'movie_title': video[2],
-                'reviewer_name': video[3],
-                'video_id': video[4],
-                'video_type': video[5],
-                'rating': video[6],
-                'country': video[7] if len(video) > 7 else 'Unknown',
-                'genre': video[8] if len(video) > 8 else 'Unknown',
-                'series_name': video[9] if len(video) > 9 else None,
-                'episode_number': video[10] if len(video) > 10 else None,
-                'created_at_vn': convert_to_vietnam_time(video[11]) if len(video) > 11 and video[11] else 'Không xác định',
-                'thumbnail_url': f'https://img.youtube.com/vi/{video[4]}/hqdefault.jpg' if video[5] == 'youtube' else None
-            }
-            videos.append(video_data)
+        for video in related_videos:
+            videos.append(dict(
+                video.as_dict(),
+                created_at_vn=convert_to_vietnam_time(video.created_at) if video.created_at else 'Không xác định',
+                thumbnail_url=(f'https://img.youtube.com/vi/{video.video_id}/hqdefault.jpg'
+                               if video.video_type == 'youtube' else None),
+            ))
         return jsonify({
             'success': True,
             'videos': videos,
             'current_info': {
-                'series': current_series,
-                'type': current_type,
-                'country': current_country,
-                'genre': current_genre
+                'series': current.series_name,
+                'type': current.movie_type,
+                'country': current.country,
+                'genre': current.genre
             }
         })
     except Exception as e:
@@ -0,0 +1,252 @@
+"""
+Tiện ích dùng chung cho các script benchmark / kiểm tra parity
+Tạo database tạm và corpus video review tổng hợp (có seed, tái lập được)
+"""
+
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+MOVIES = [
+    'Deadpool & Wolverine', 'Inside Out 2', 'Dune: Part Two', 'Gladiator II',
+    'Bad Boys: Ride or Die', 'Avatar: Fire and Ash', 'Mai', 'Lật Mặt 7',
+    'Tiệc Trăng Máu', 'Cua Lại Vợ Bầu', 'Nhà Bà Nữ', 'Bố Già', 'Train to Busan',
+    'Parasite', 'Spirited Away', 'Your Name', 'Oppenheimer', 'Barbie',
+    'John Wick 4', 'The Batman', 'Joker', 'Interstellar', 'Inception',
+    'Squid Game', 'Exhuma', 'The Roundup', 'Godzilla x Kong', 'Kung Fu Panda 4',
+    'Venom: The Last Dance', 'Moana 2', 'Wicked', 'Alien: Romulus',
+]
+CHANNELS = [
+    'Chơi Phim Review', 'NiNi Mê Phim', 'Mèo Mê Phim', 'PIKACHU Review Phim',
+    'Ớt Review Phim', 'FC Review', 'Vus Review', 'Chú Cuội Review Phim',
+]
+TITLE_TEMPLATES = [
+    'Review phim {movie} - {hook}',
+    'REVIEW PHIM: {movie} - {hook}',
+    'Đánh giá {movie}: {hook}',
+    'Tóm tắt phim {movie} | {hook}',
+    '{movie} - {hook} | Review phim',
+    'Phân tích {movie} - {hook}',
+]
+HOOKS = [
+    'Phim hành động đỉnh cao', 'Cái kết không ai ngờ', 'Siêu phẩm viễn tưởng',
+    'Phim kinh dị Mỹ hay nhất', 'Phim chiếu rạp Việt Nam', 'Giải thích cái kết',
+    'Tập {ep}', 'Phần {ep}', 'Bí mật phía sau', 'Phim tình cảm cảm động',
+]
+DESC_TEMPLATES = [
+    'Review chi tiết phim {movie}. {plot}. Cảm ơn các bạn đã xem video.',
+    'Trong video này chúng ta cùng tìm hiểu {movie} - {plot}. Đăng ký kênh {channel} để xem thêm.',
+    '{movie} là câu chuyện về {plot}. Nhưng đời không như là mơ...',
+    'Tóm tắt {movie}: {plot}. #review #phim',
+]
+PLOT_WORDS = [
+    'cô gái', 'chàng trai', 'gia đình', 'ngôi làng', 'thành phố', 'bí ẩn', 'tội phạm', 'cảnh sát',
+    'người mẹ', 'đứa trẻ', 'hòn đảo', 'con quái vật', 'kho báu', 'vụ án', 'tình bạn', 'phản bội',
+    'trả thù', 'chạy trốn', 'phát hiện', 'biến mất', 'sống sót', 'chiến đấu', 'yêu', 'lừa dối',
+    'quá khứ', 'tương lai', 'ngôi nhà', 'khu rừng', 'đại dương', 'vũ trụ', 'ông trùm', 'sát thủ',
+]
+
+
+def quiet():
+    """Ẩn log print của service khi chạy benchmark"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+MOVIE_WORDS = [
+    'Bóng', 'Đêm', 'Máu', 'Lửa', 'Quỷ', 'Rừng', 'Biển', 'Gió', 'Sát', 'Thủ', 'Ma', 'Vương',
+    'Dark', 'Night', 'Shadow', 'Storm', 'Iron', 'Ghost', 'Silent', 'Last', 'Red', 'City',
+    'Hunter', 'Kingdom', 'Blade', 'Echo', 'Frozen', 'Wild', 'Lost', 'Star', 'Code', 'Zero',
+]
+
+
+def movie_name(rng):
+    """Tên phim: lấy từ danh sách phim thật hoặc ghép ngẫu nhiên"""
+    if rng.random() < 0.2:
+        return rng.choice(MOVIES)
+    return ' '.join(rng.sample(MOVIE_WORDS, rng.randint(2, 3))) + rng.choice(['', ' 2', ' 3', ': Hồi Kết'])
+
+
+def near_duplicate(rng, video, index):
+    """Bản re-upload / đổi tiêu đề nhẹ của một video đã có"""
+    dup = dict(video)
+    dup['video_id'] = f"SYN{index:08d}"
+    dup['video_url'] = f"https://www.youtube.com/watch?v={dup['video_id']}"
+    variant = rng.randint(0, 2)
+    if variant == 0:
+        dup['title'] = video['title'].upper()
+    elif variant == 1:
+        dup['title'] = video['title'] + ' | Full'
+    else:
+        dup['channel'] = dup['channel_title'] = rng.choice(CHANNELS)
+        dup['title'] = video['title'].replace('Review phim', 'Đánh giá phim')
+    return dup
+
+
+def channel_name(rng):
+    """Kênh: một trong các kênh quen thuộc hoặc kênh nhỏ sinh ngẫu nhiên"""
+    if rng.random() < 0.3:
+        return rng.choice(CHANNELS)
+    return f"{rng.choice(MOVIE_WORDS)} {rng.choice(['Review', 'Mê Phim', 'Cinema', 'TV'])} {rng.randint(1, 400)}"
+
+
+def synthetic_video(rng, index):
+    """Sinh một video review giả lập"""
+    movie = movie_name(rng)
+    channel = channel_name(rng)
+    hook = rng.choice(HOOKS).format(ep=rng.randint(1, 12))
+    title = rng.choice(TITLE_TEMPLATES).format(movie=movie, hook=hook)
+    plot = ' '.join(rng.choice(PLOT_WORDS) for _ in range(rng.randint(6, 14)))
+    description = rng.choice(DESC_TEMPLATES).format(movie=movie, plot=plot, channel=channel)
+    video_id = f"SYN{index:08d}"
+    return {
+        'video_id': video_id,
+        'title': title,
+        'channel': channel,
+        'channel_title': channel,
+        'description': description,
+        'thumbnail': f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+        'published_at': '2025-01-01T00:00:00Z',
+        'video_url': f"https://www.youtube.com/watch?v={video_id}",
+        'view_count': rng.randint(50, 500000),
+        'like_count': rng.randint(0, 20000),
+        'comment_count': rng.randint(0, 3000),
+        'duration': rng.randint(300, 3600),
+    }
+
+
+def synthetic_corpus(count, seed=2024, duplicate_rate=0.1):
+    """Corpus có seed; khoảng duplicate_rate video là bản trùng của video trước đó"""
+    rng = random.Random(seed)
+    videos = []
+    for i in range(count):
+        if videos and rng.random() < duplicate_rate:
+            videos.append(near_duplicate(rng, rng.choice(videos), i))
+        else:
+            videos.append(synthetic_video(rng, i))
+    return videos
+
+
+def create_catalog_db(path=None):
+    """Tạo database tạm với schema video_reviews như production"""
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.sqlite', prefix='reviewphim_bench_')
+        os.close(fd)
+        os.unlink(path)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''CREATE TABLE IF NOT EXISTS video_reviews (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    movie_title TEXT NOT NULL,
+                    reviewer_name TEXT NOT NULL,
+                    video_url TEXT NOT NULL,
+                    video_type TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    description TEXT,
+                    rating INTEGER,
+                    movie_link TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                , channel_name TEXT, thumbnail_url TEXT DEFAULT "", published_at TIMESTAMP, updated_at TIMESTAMP,
+                  country TEXT DEFAULT "Unknown", genre TEXT DEFAULT "Unknown", series_name TEXT,
+                  episode_number INTEGER, movie_type TEXT DEFAULT "single")''')
+    conn.commit()
+    conn.close()
+    config.DATABASE_PATH = path
+    return path
+
+
+def insert_rows(path, videos):
+    """Chèn trực tiếp các video giả lập vào catalog (không qua service)"""
+    conn = sqlite3.connect(path)
+    conn.executemany('''
+        INSERT INTO video_reviews (title, movie_title, reviewer_name, video_url, video_type,
+                                   video_id, description, rating, movie_link)
+        VALUES (?, ?, ?, ?, 'youtube', ?, ?, 7, '')
+    ''', [(v['title'], v['title'], v['channel'], v['video_url'], v['video_id'], v['description'])
+          for v in videos])
+    conn.commit()
+    conn.close()
+
+
+# Cụm từ dễ gây nhầm cho bộ lọc từ khóa (ranh giới từ, trùng lặp giữa các nhóm, từ loại trừ)
+KEYWORD_TRAPS = [
+    'game', 'games', 'gameplay', 'endgame', 'game:', 'gamer', 'walkthrough', 'speedrun', 'mv', 'news',
+    'daily', 'dc', 'tập 5', 'official trailer', 'teaser', 'vlog', 'vus', 'music video', 'phim',
+    'review', 'reaction only', 'phim hay', 'ending explained', 'making of', 'thảm đỏ', 'anime',
+    'sci-fi', 'interview', 'live stream', 'unboxing', 'netflix', 'gala', 'critique', 'tin tức',
+]
+NEUTRAL_WORDS = ['hôm nay', 'siêu hay', 'cực đỉnh', 'top 10', 'mới nhất', 'xem ngay', 'bất ngờ', 'kỷ lục']
+
+
+def keyword_samples(count, seed=2024):
+    """Tiêu đề / mô tả tổng hợp cho bộ lọc từ khóa: trộn corpus review với từ gây nhầm và từ trung tính"""
+    rng = random.Random(seed)
+    samples = []
+    for i in range(count):
+        video = synthetic_video(rng, i)
+        title, description = video['title'], video['description']
+        roll = rng.random()
+        if roll < 0.3:
+            title = f"{title} {rng.choice(KEYWORD_TRAPS)}"
+        elif roll < 0.45:
+            title = f"{rng.choice(NEUTRAL_WORDS)} {rng.choice(MOVIE_WORDS)} {rng.choice(KEYWORD_TRAPS)}"
+            description = ' '.join(rng.sample(NEUTRAL_WORDS, 3))
+        elif roll < 0.55:
+            title = ' '.join(rng.sample(NEUTRAL_WORDS, 2) + [rng.choice(MOVIE_WORDS)])
+            description = rng.choice(['', ' '.join(rng.sample(NEUTRAL_WORDS, 2))])
+        if rng.random() < 0.2:
+            description = f"{description} {rng.choice(KEYWORD_TRAPS)}"
+        samples.append({'title': title.upper() if rng.random() < 0.1 else title, 'description': description})
+    return samples
+
+
+def legacy_is_movie_review(video):
+    """Bản sao logic cũ của ContentFilter.is_movie_review_video (tham chiếu cho kiểm tra parity)"""
+    import re
+    combined_text = f"{video.get('title', '').lower()} {video.get('description', '').lower()}"
+    review_keywords = [
+        'review', 'đánh giá', 'nhận xét', 'phân tích', 'critique',
+        'review phim', 'đánh giá phim', 'phim hay', 'phim mới',
+        'spoiler', 'trailer reaction', 'breakdown', 'ending explained',
+        'tóm tắt phim', 'giải thích phim', 'kết thúc phim',
+        'vus', 'vus review', 'vus đánh giá', 'vus phim', 'vus cinema',
+        'vus trailer', 'vus movie', 'vus film', 'vus spoiler',
+        'vus breakdown', 'vus ending', 'vus reaction'
+    ]
+    movie_keywords = [
+        'phim', 'movie', 'film', 'cinema', 'tập', 'episode', 'season',
+        'marvel', 'dc', 'disney', 'netflix', 'hollywood', 'bollywood',
+        'anime', 'drama', 'series', 'thriller', 'horror', 'comedy',
+        'action', 'romance', 'sci-fi'
+    ]
+    excluded_keywords = [
+        'trailer chính thức', 'official trailer', 'teaser',
+        'behind the scene', 'making of', 'gala', 'thảm đỏ',
+        'interview', 'hậu trường', 'news', 'tin tức',
+        r'\bgame\b', r'\bgameplay\b', r'\bwalkthrough\b', r'\bspeedrun\b',
+        'music video', 'mv', 'live stream',
+        'unboxing', 'vlog', 'daily',
+        'reaction only'
+    ]
+    has_review_keyword = any(keyword in combined_text for keyword in review_keywords)
+    has_movie_keyword = any(keyword in combined_text for keyword in movie_keywords)
+    has_excluded = False
+    for keyword in excluded_keywords:
+        if keyword.startswith(r'\b') and keyword.endswith(r'\b'):
+            if re.search(keyword, combined_text):
+                has_excluded = True
+                break
+        elif keyword in combined_text:
+            has_excluded = True
+            break
+    return has_review_keyword, has_movie_keyword, has_excluded
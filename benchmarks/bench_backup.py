@@ -0,0 +1,206 @@
+"""
+Benchmark + kiểm tra đúng đắn cho sao lưu / khôi phục (services.backups)
+- Sao lưu trong lúc một writer (như crawler) và một reader chạy song song: thời gian chờ lâu nhất của writer /
+  reader, số lần backup bị chạy lại; so với copy một bước và với database không dùng WAL
+- Bản sao lưu khớp snapshot lúc bắt đầu, integrity_check ok, khôi phục ra đúng dữ liệu
+  và giữ nguyên bảng vận hành (job_runs)
+- Quy tắc giữ bản sao lưu (7 bản mới nhất + mỗi ngày 14 ngày + mỗi tuần 8 tuần) trên 120 ngày sao lưu giả lập
+Chạy: python benchmarks/bench_backup.py [--rows 200000]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_video  # noqa: E402
+
+from services import backups, stats_refresh  # noqa: E402
+from services.jobs import init_job_tables, start_run  # noqa: E402
+
+
+def prepare(rows):
+    path = create_catalog_db()
+    rng = random.Random(5)
+    for start in range(0, rows, 50000):
+        insert_rows(path, [synthetic_video(rng, i) for i in range(start, min(rows, start + 50000))])
+    conn = sqlite3.connect(path)
+    with quiet():
+        stats_refresh.ensure_stats_schema(conn)
+    init_job_tables(conn)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def fingerprint(path, where='1=1', columns=None):
+    digest = hashlib.sha1()
+    conn = sqlite3.connect(path)
+    count = 0
+    for row in conn.execute(f"SELECT {', '.join(columns or ['*'])} FROM video_reviews WHERE {where} ORDER BY id"):
+        digest.update(repr(row).encode('utf-8'))
+        count += 1
+    conn.close()
+    return count, digest.hexdigest()
+
+
+def watch_writer(path, stop, result):
+    """Writer như crawler: mỗi 20ms một transaction ngắn"""
+    conn = sqlite3.connect(path, timeout=60)
+    waits = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        with conn:
+            conn.execute('''INSERT INTO video_reviews (title, movie_title, reviewer_name, video_url, video_type, video_id)
+                            VALUES ('w', 'w', 'w', 'w', 'youtube', ?)''', (f"WRITER{time.time_ns()}",))
+        waits.append(time.perf_counter() - started)
+        time.sleep(0.02)
+    conn.close()
+    waits.sort()
+    result.update(worst=waits[-1], median=waits[len(waits) // 2], writes=len(waits))
+
+
+def watch_reader(path, stop, result):
+    conn = sqlite3.connect(path, timeout=60)
+    worst, reads = 0.0, 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.execute('SELECT id, title FROM video_reviews ORDER BY id DESC LIMIT 24').fetchall()
+        worst = max(worst, time.perf_counter() - started)
+        reads += 1
+        time.sleep(0.005)
+    conn.close()
+    result.update(worst=worst, reads=reads)
+
+
+def bench_idle(path, seconds=1.0):
+    """Writer + reader khi không có backup (mốc so sánh)"""
+    stop, writer, reader = threading.Event(), {}, {}
+    threads = [threading.Thread(target=watch_writer, args=(path, stop, writer)),
+               threading.Thread(target=watch_reader, args=(path, stop, reader))]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(f"{'no backup (baseline)':<34} {seconds:6.2f}s  {'':<36}writer {writer['writes']:>3} inserts, median "
+          f"{writer['median'] * 1000:4.1f} ms, longest {writer['worst'] * 1000:6.1f} ms  "
+          f"reader longest {reader['worst'] * 1000:6.1f} ms")
+
+
+def bench_copy(path, label, **kwargs):
+    """online_copy với writer + reader song song; kiểm tra bản copy = snapshot lúc bắt đầu"""
+    stop, writer, reader = threading.Event(), {}, {}
+    threads = [threading.Thread(target=watch_writer, args=(path, stop, writer)),
+               threading.Thread(target=watch_reader, args=(path, stop, reader))]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    dest = tempfile.mktemp(suffix='.sqlite', prefix='reviewphim_backup_')
+    started = time.perf_counter()
+    with quiet():
+        copy = backups.online_copy(path, dest, **kwargs)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    count, _ = fingerprint(dest)
+    integrity = backups.integrity_check(dest)[0]
+    # Bản copy phải đúng bằng một snapshot: mọi video gốc + một phần đầu liên tục các dòng của writer
+    original = fingerprint(dest, "video_id NOT LIKE 'WRITER%'") == fingerprint(path, "video_id NOT LIKE 'WRITER%'")
+    os.unlink(dest)
+    print(f"{label:<34} {elapsed:6.2f}s  restarts {copy['restarts']}, single step {copy['single_step']!s:<5}  "
+          f"writer {writer['writes']:>3} inserts, median {writer['median'] * 1000:4.1f} ms, "
+          f"longest {writer['worst'] * 1000:6.1f} ms  "
+          f"reader longest {reader['worst'] * 1000:6.1f} ms  | {count} rows, integrity {integrity}, "
+          f"catalog intact {original}")
+
+
+def check_snapshot_and_restore(path, workdir):
+    with quiet():
+        info = backups.create_snapshot(path, workdir)
+    print(f"Snapshot {info['name']}: {info['videos']} videos, {info['db_bytes'] / 1e6:.0f} MB -> "
+          f"{info['bytes'] / 1e6:.0f} MB gzip in {info['seconds']}s, integrity {info['integrity']}")
+    # Khôi phục chạy migration trên bản sao lưu (thêm cột): so sánh trên các cột của bản sao lưu
+    conn = sqlite3.connect(path)
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(video_reviews)')]
+    conn.close()
+    expected = fingerprint(path, columns=columns)
+
+    # Thay đổi database sau khi sao lưu, kèm một lần chạy job (phải còn sau khi khôi phục)
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM video_reviews WHERE id % 3 = 0")
+    conn.execute("UPDATE video_reviews SET title = 'changed' WHERE id % 5 = 0")
+    conn.commit()
+    conn.close()
+    run_id = start_run('bench_restore', 'manual')
+    events = []
+    with quiet():
+        result = backups.restore_snapshot(info['name'], path, workdir,
+                                          progress=lambda event, data: events.append(data['phase']))
+    conn = sqlite3.connect(path)
+    kept_run = conn.execute('SELECT COUNT(*) FROM job_runs WHERE id = ?', (run_id,)).fetchone()[0] == 1
+    journal = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    integrity = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    conn.close()
+    names = [snapshot['name'] for snapshot in backups.list_snapshots(workdir)]
+    print(f"Restore in {result['seconds']}s: data matches snapshot {fingerprint(path, columns=columns) == expected}, "
+          f"job_runs kept {kept_run}, journal_mode {journal}, integrity {integrity}, "
+          f"pre-restore backup listed {result['pre_restore_backup'] in names}, phases {events[-4:]}")
+
+
+def check_retention():
+    now = backups.datetime.now(backups.TIMEZONE)
+    snapshots = []
+    for hours in range(0, 120 * 24, 6):  # 4 bản / ngày trong 120 ngày
+        created = now - timedelta(hours=hours)
+        snapshots.append({'name': f"reviewphim-{created.strftime('%Y%m%d-%H%M%S')}",
+                          'created_at': created.isoformat()})
+    expired = set(backups.select_expired(snapshots, now))
+    kept = [s for s in snapshots if s['name'] not in expired]
+    oldest = (now - backups.datetime.fromisoformat(kept[-1]['created_at'])).days
+    print(f"Retention: {len(snapshots)} snapshots -> keep {len(kept)} (newest 7 kept "
+          f"{all(s['name'] not in expired for s in snapshots[:7])}, oldest kept {oldest} days old)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='reviewphim_backups_')
+    path = prepare(args.rows)
+    rollback = path + '.delete'
+    shutil.copy(path, rollback)
+    conn = sqlite3.connect(rollback)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+
+    print(f"{args.rows} rows, {os.path.getsize(path) / 1e6:.0f} MB")
+    bench_idle(path)
+    bench_copy(path, 'WAL, steps (default)')
+    bench_copy(path, 'WAL, single step', pages=-1)
+    bench_copy(rollback, 'rollback journal, steps', max_restarts=3)
+    bench_copy(rollback, 'rollback journal, single step', pages=-1)
+    check_snapshot_and_restore(path, workdir)
+    check_retention()
+
+    shutil.rmtree(workdir)
+    for p in (path, rollback):
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(p + suffix):
+                os.unlink(p + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark ghi video vào video_reviews
+So sánh: SELECT + INSERT từng video (trước) vs video_store.bulk_upsert_videos (sau)
+Chạy: python benchmarks/bench_bulk_persist.py [--records 50000] [--legacy 5000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, synthetic_corpus  # noqa: E402
+
+from services import text_normalizer, video_store  # noqa: E402
+
+
+def legacy_save(path, videos):
+    """Hành vi cũ của save_videos_to_db: kiểm tra theo video_url rồi INSERT từng dòng"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    added = 0
+    for video in videos:
+        cursor.execute('SELECT id FROM video_reviews WHERE video_url = ?', (video['video_url'],))
+        if cursor.fetchone() is None:
+            cursor.execute('''
+                INSERT INTO video_reviews
+                (title, movie_title, reviewer_name, video_url, video_type, video_id,
+                 description, rating, movie_link, created_at,
+                 title_norm, movie_norm, desc_norm, title_fold, movie_fold)
+                VALUES (?, ?, ?, ?, 'youtube', ?, ?, 7, '', CURRENT_TIMESTAMP, ?, ?, ?, ?, ?)
+            ''', (video['title'], video['title'], video['channel'], video['video_url'], video['video_id'],
+                  video['description']) + text_normalizer.normalized_values(video['title'], video['description']))
+            added += 1
+    conn.commit()
+    conn.close()
+    return added
+
+
+def fresh_db():
+    path = create_catalog_db()
+    conn = sqlite3.connect(path)
+    video_store.ensure_video_store_schema(conn)
+    conn.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--legacy', type=int, default=5000,
+                        help='số video cho đường cũ (O(n^2) do quét video_url không có index)')
+    args = parser.parse_args()
+
+    videos = synthetic_corpus(args.records, duplicate_rate=0)
+    print(f"Records: {args.records}")
+
+    legacy_count = min(args.legacy, args.records)
+    path = fresh_db()
+    start = time.perf_counter()
+    legacy_save(path, videos[:legacy_count])
+    legacy_time = time.perf_counter() - start
+    print(f"Per-row SELECT + INSERT ({legacy_count}): {legacy_time:.2f}s "
+          f"({legacy_count / legacy_time:,.0f} rows/s)")
+    os.unlink(path)
+
+    path = fresh_db()
+    start = time.perf_counter()
+    result = video_store.bulk_upsert_videos(videos, db_path=path)
+    insert_time = time.perf_counter() - start
+    print(f"Bulk upsert, empty catalog: {insert_time:.2f}s ({args.records / insert_time:,.0f} rows/s) {result}")
+
+    # Crawl lại: ~1/3 video có view_count mới, còn lại không đổi
+    rng = random.Random(7)
+    recrawl = [dict(v, view_count=v['view_count'] + 1) if rng.random() < 0.33 else v for v in videos]
+    start = time.perf_counter()
+    result = video_store.bulk_upsert_videos(recrawl, db_path=path)
+    update_time = time.perf_counter() - start
+    print(f"Bulk upsert, re-crawl:      {update_time:.2f}s ({args.records / update_time:,.0f} rows/s) {result}")
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
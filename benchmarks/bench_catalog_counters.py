@@ -0,0 +1,186 @@
+"""
+Benchmark + kiểm tra đúng đắn cho catalog_counters (services.catalog_counters) và index update_logs(status, timestamp)
+- Endpoint stats: cách cũ (COUNT(*) hai lần + ORDER BY timestamp không index trên update_logs) so với counter + index
+- Đếm của grid (không lọc / một kênh / khoảng ngày) so với COUNT(*) có giới hạn
+- Chi phí trigger khi ghi: chèn / xóa theo lô có và không có trigger
+- Counter khớp đếm lại sau chuỗi thao tác hỗn hợp: insert, upsert, đổi thể loại / kênh, xóa, renumber, xóa theo bộ lọc
+Chạy: python benchmarks/bench_catalog_counters.py [--rows 1000000] [--logs 200000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_video  # noqa: E402
+
+from services import catalog_counters, catalog_maintenance, stats_refresh, update_logs, video_grid  # noqa: E402
+
+
+def prepare(rows, logs):
+    path = create_catalog_db()
+    rng = random.Random(17)
+    for start in range(0, rows, 50000):
+        insert_rows(path, [synthetic_video(rng, i) for i in range(start, min(rows, start + 50000))])
+    conn = sqlite3.connect(path)
+    with quiet():
+        stats_refresh.ensure_stats_schema(conn)
+    conn.execute('''UPDATE video_reviews SET genre = CASE id % 5 WHEN 0 THEN 'Hành động' WHEN 1 THEN 'Kinh dị'
+                                                   WHEN 2 THEN NULL ELSE 'Unknown' END,
+                                            created_at = datetime('2024-01-01', '+' || (id % 600) || ' hours')''')
+    conn.execute('''CREATE TABLE update_logs (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, status TEXT NOT NULL, message TEXT,
+                    videos_found INTEGER DEFAULT 0, videos_added INTEGER DEFAULT 0, stage_metrics TEXT)''')
+    conn.executemany('INSERT INTO update_logs (timestamp, status, message, videos_found, videos_added) '
+                     'VALUES (datetime(\'2023-01-01\', ?), ?, \'log\', 10, 2)',
+                     [(f'+{i * 5} minutes', 'SUCCESS' if i % 7 == 0 else 'INFO') for i in range(logs)])
+    video_grid.ensure_grid_indexes(conn)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def old_stats(path):
+    """Cách cũ của /admin/auto-update/stats: COUNT(*) ở app + COUNT(*) và ORDER BY trong get_stats()"""
+    conn = sqlite3.connect(path)
+    conn.execute('SELECT COUNT(*) FROM video_reviews').fetchone()
+    conn.close()
+    conn = sqlite3.connect(path)
+    conn.execute('SELECT COUNT(*) FROM video_reviews').fetchone()
+    conn.execute('''SELECT timestamp, videos_found, videos_added FROM update_logs WHERE status = 'SUCCESS'
+                    ORDER BY timestamp DESC LIMIT 1''').fetchone()
+    conn.close()
+
+
+def new_stats(path):
+    conn = sqlite3.connect(path)
+    catalog_counters.total_videos(conn)
+    update_logs.last_successful_update(conn)
+    conn.close()
+
+
+def bench_reads(path):
+    old = timed(lambda: old_stats(path))
+    started = time.perf_counter()
+    conn = sqlite3.connect(path)
+    with quiet():
+        catalog_counters.ensure_catalog_counters(conn)
+        update_logs.ensure_update_logs_schema(conn)
+    conn.close()
+    print(f"Migration (triggers + backfill + update_logs index): {time.perf_counter() - started:.2f}s")
+    new = timed(lambda: new_stats(path))
+    print(f"Stats endpoint queries: old {old:8.1f} ms, counters + index {new:6.2f} ms")
+    conn = sqlite3.connect(path)
+    plan = conn.execute('''EXPLAIN QUERY PLAN SELECT timestamp FROM update_logs WHERE status = 'SUCCESS'
+                           ORDER BY timestamp DESC LIMIT 1''').fetchall()
+    conn.close()
+    print(f"   last success plan: {plan[-1][-1]}")
+    print(f"   summary (genre / top channels / 14 days): "
+          f"{timed(lambda: catalog_counters.summary(sqlite3.connect(path))):6.2f} ms")
+
+    for label, args in (('no filter', {}), ('channel', {'channel': 'Chơi Phim Review'}),
+                        ('date range', {'date_from': '2024-01-05', 'date_to': '2024-01-12'})):
+        filters = video_grid.parse_filters(args)
+        where, params = video_grid.where_clause(filters)
+        conn = sqlite3.connect(path)
+        exact = conn.execute(f'SELECT COUNT(*) FROM video_reviews WHERE {where}', params).fetchone()[0]
+        counted = catalog_counters.count_for_filters(conn, filters)
+        capped = timed(lambda: video_grid.count_matches(conn, where, params))
+        counter = timed(lambda: catalog_counters.count_for_filters(conn, filters))
+        conn.close()
+        print(f"Grid count {label:<11}: counters {counted} (exact {exact}, match {counted == exact}) "
+              f"{counter:6.2f} ms vs capped COUNT {capped:6.1f} ms")
+
+
+def bench_writes(path, rows=20000):
+    """Chèn rồi xóa theo lô (500 / transaction) trên bản copy có và không có trigger"""
+    plain = path + '.plain'
+    shutil.copy(path, plain)
+    conn = sqlite3.connect(plain)
+    for name in catalog_counters.TRIGGERS:
+        conn.execute(f'DROP TRIGGER {name}')
+    conn.commit()
+    conn.close()
+    rng = random.Random(99)
+    videos = [synthetic_video(rng, 10 ** 7 + i) for i in range(rows)]
+    for label, target in (('without triggers', plain), ('with triggers', path)):
+        started = time.perf_counter()
+        for start in range(0, rows, 500):
+            insert_rows(target, videos[start:start + 500])
+        inserted = time.perf_counter() - started
+        conn = sqlite3.connect(target)
+        ids = [row[0] for row in conn.execute('SELECT id FROM video_reviews ORDER BY id DESC LIMIT ?', (rows,))]
+        conn.close()
+        started = time.perf_counter()
+        catalog_maintenance.delete_videos(ids, target)
+        deleted = time.perf_counter() - started
+        print(f"{rows} inserts / deletes in 500-row transactions {label:<17}: insert {inserted:5.2f}s, "
+              f"delete {deleted:5.2f}s")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(plain + suffix):
+            os.unlink(plain + suffix)
+
+
+def check_consistency(path):
+    rng = random.Random(5)
+    insert_rows(path, [synthetic_video(rng, 2 * 10 ** 7 + i) for i in range(3000)])
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("UPDATE video_reviews SET genre = 'Kinh dị' WHERE id % 11 = 0")
+        conn.execute("UPDATE video_reviews SET reviewer_name = 'Kênh mới' WHERE id % 13 = 0")
+        conn.execute("UPDATE video_reviews SET created_at = NULL WHERE id % 17 = 0")
+        conn.execute("UPDATE video_reviews SET view_count = 5 WHERE id % 3 = 0")  # cột không theo dõi
+        # upsert: trùng video_id -> nhánh UPDATE (đổi thể loại), video_id mới -> INSERT
+        conn.execute('''INSERT INTO video_reviews (title, movie_title, reviewer_name, video_url, video_type,
+                                                   video_id, genre)
+                        SELECT title, movie_title, reviewer_name, video_url, video_type, video_id, 'Hài'
+                        FROM video_reviews WHERE id % 19 = 0
+                        UNION ALL SELECT 'n', 'n', 'n', 'n', 'youtube', 'NEW' || id, 'Hài'
+                        FROM video_reviews WHERE id % 23 = 0
+                        ON CONFLICT(video_id) DO UPDATE SET genre = excluded.genre''')
+        conn.execute('DELETE FROM video_reviews WHERE id % 29 = 0')
+    conn.close()
+    with quiet():
+        catalog_maintenance.renumber_video_ids(path)
+        catalog_maintenance.delete_matching("genre = 'Hài'", db_path=path)
+    conn = sqlite3.connect(path)
+    mismatches = catalog_counters.verify_counters(conn)
+    total = catalog_counters.total_videos(conn)
+    triggers = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE "
+                            "'trg_catalog_counters_%'").fetchone()[0]
+    conn.close()
+    print(f"Consistency after mixed writes + renumber + filtered delete: {total} videos, "
+          f"{len(mismatches)} mismatched keys, triggers kept after renumber {triggers == 3}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--logs', type=int, default=200000)
+    args = parser.parse_args()
+
+    path = prepare(args.rows, args.logs)
+    bench_reads(path)
+    bench_writes(path)
+    check_consistency(path)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark + kiểm tra đúng đắn cho reset ID / xóa hàng loạt (services.catalog_maintenance)
+- renumber: mọi cột được giữ nguyên, id liên tục 1..n theo created_at, index / trigger còn đủ;
+  reader chạy song song (WAL) luôn thấy đủ số dòng
+- delete: xóa theo lô so với một câu DELETE lớn, đo thời gian chờ lâu nhất của một writer chạy song song
+Chạy: python benchmarks/bench_catalog_maintenance.py [--rows 200000]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_corpus  # noqa: E402
+
+from services import catalog_maintenance, stats_refresh  # noqa: E402
+
+
+def prepare(rows):
+    path = create_catalog_db()
+    insert_rows(path, synthetic_corpus(rows, duplicate_rate=0))
+    conn = sqlite3.connect(path)
+    with quiet():
+        stats_refresh.ensure_stats_schema(conn)
+    rng = random.Random(1)
+    conn.executemany('''UPDATE video_reviews SET created_at = datetime('2024-01-01', ?), genre = ?, country = ?,
+                               series_name = ?, popularity = ? WHERE id = ?''',
+                     [(f"+{rng.randint(0, 500 * 86400)} seconds", rng.choice(['Hành động', 'Kinh dị', 'Unknown']),
+                       rng.choice(['Mỹ', 'Hàn Quốc', 'Việt Nam']), f"S{i % 97}", rng.random(), i)
+                      for i in range(1, rows + 1)])
+    # Tạo khoảng trống trong id như catalog thật
+    conn.execute('DELETE FROM video_reviews WHERE id % 10 = 3')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_bench_touch AFTER UPDATE OF title ON video_reviews
+                    BEGIN UPDATE video_reviews SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END''')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def fingerprint(path):
+    """Băm toàn bộ dữ liệu (trừ id) theo thứ tự created_at + danh sách index / trigger"""
+    conn = sqlite3.connect(path)
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(video_reviews)') if row[1] != 'id']
+    digest = hashlib.sha1()
+    for row in conn.execute(f"SELECT {', '.join(columns)} FROM video_reviews ORDER BY created_at, id"):
+        digest.update(repr(row).encode('utf-8'))
+    schema = sorted(conn.execute("SELECT type, name, sql FROM sqlite_master WHERE tbl_name = 'video_reviews' "
+                                 "AND type IN ('index', 'trigger')").fetchall())
+    conn.close()
+    return digest.hexdigest(), schema
+
+
+def watch_readers(path, expected, stop, result):
+    conn = sqlite3.connect(path, timeout=30)
+    worst, reads, wrong = 0.0, 0, 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        count = conn.execute('SELECT COUNT(*) FROM video_reviews').fetchone()[0]
+        conn.execute('SELECT id FROM video_reviews ORDER BY popularity DESC LIMIT 24').fetchall()
+        worst = max(worst, time.perf_counter() - started)
+        reads += 1
+        wrong += count != expected
+        time.sleep(0.001)
+    conn.close()
+    result.update(worst=worst, reads=reads, wrong=wrong)
+
+
+def bench_renumber(path):
+    before, schema_before = fingerprint(path)
+    conn = sqlite3.connect(path)
+    total = conn.execute('SELECT COUNT(*) FROM video_reviews').fetchone()[0]
+    conn.close()
+
+    stop, reader = threading.Event(), {}
+    thread = threading.Thread(target=watch_readers, args=(path, total, stop, reader))
+    thread.start()
+    started = time.perf_counter()
+    with quiet():
+        catalog_maintenance.renumber_video_ids(path)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    thread.join()
+
+    after, schema_after = fingerprint(path)
+    conn = sqlite3.connect(path)
+    ids = conn.execute('SELECT MIN(id), MAX(id), COUNT(*) FROM video_reviews').fetchone()
+    ordered = conn.execute('''SELECT COUNT(*) FROM video_reviews a JOIN video_reviews b ON b.id = a.id + 1
+                              WHERE b.created_at < a.created_at''').fetchone()[0] == 0
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'video_reviews'").fetchone()[0]
+    integrity = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    conn.close()
+    print(f"Renumber {total} rows: {elapsed:.2f}s")
+    print(f"   data preserved: {before == after}, indexes/triggers preserved: {schema_before == schema_after}, "
+          f"ids {ids[0]}..{ids[1]} ({ids[2]} rows), ordered by created_at: {ordered}, sqlite_sequence {seq}, "
+          f"integrity {integrity}")
+    print(f"   concurrent reader: {reader['reads']} reads, wrong counts {reader['wrong']}, "
+          f"slowest read {reader['worst'] * 1000:.1f} ms")
+
+
+def watch_writer(path, stop, result):
+    conn = sqlite3.connect(path, timeout=60)
+    worst, writes, n = 0.0, 0, 0
+    while not stop.is_set():
+        n += 1
+        started = time.perf_counter()
+        with conn:
+            conn.execute('''INSERT INTO video_reviews (title, movie_title, reviewer_name, video_url, video_type, video_id)
+                            VALUES ('w', 'w', 'w', 'w', 'youtube', ?)''', (f"WRITER{n:08d}",))
+        worst = max(worst, time.perf_counter() - started)
+        writes += 1
+        time.sleep(0.005)
+    conn.close()
+    result.update(worst=worst, writes=writes)
+
+
+def bench_delete(path, chunked):
+    conn = sqlite3.connect(path)
+    ids = [row[0] for row in conn.execute('SELECT id FROM video_reviews WHERE id % 2 = 0')]
+    conn.close()
+    stop, writer = threading.Event(), {}
+    thread = threading.Thread(target=watch_writer, args=(path, stop, writer))
+    thread.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    if chunked:
+        deleted = catalog_maintenance.delete_videos(ids, path)
+    else:
+        conn = sqlite3.connect(path, timeout=60)
+        conn.execute('CREATE TEMP TABLE ids (id INTEGER PRIMARY KEY)')
+        conn.executemany('INSERT INTO temp.ids VALUES (?)', [(i,) for i in ids])
+        with conn:
+            deleted = conn.execute('DELETE FROM video_reviews WHERE id IN (SELECT id FROM temp.ids)').rowcount
+        conn.close()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    thread.join()
+    label = f"chunked ({catalog_maintenance.DELETE_CHUNK_SIZE}/txn)" if chunked else 'single DELETE'
+    print(f"Delete {deleted} rows, {label:>18}: {elapsed:.2f}s, concurrent writer: {writer['writes']} inserts, "
+          f"longest wait {writer['worst'] * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    path = prepare(args.rows)
+    copies = [path + '.single', path + '.chunked']
+    for copy in copies:
+        shutil.copy(path, copy)
+
+    bench_renumber(path)
+    bench_delete(copies[0], chunked=False)
+    bench_delete(copies[1], chunked=True)
+
+    for p in [path] + copies:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(p + suffix):
+                os.unlink(p + suffix)
+
+
+if __name__ == '__main__':
+    main()
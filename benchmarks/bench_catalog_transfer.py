@@ -0,0 +1,161 @@
+"""
+Benchmark xuất / nhập catalog (services.catalog_transfer): thời gian và bộ nhớ đỉnh (peak RSS)
+Mỗi bước chạy trong process con riêng để đo bộ nhớ đỉnh độc lập:
+- export CSV / JSONL bằng cursor (fetchmany) so với cách cũ của /api/reviews (fetchall + một mảng JSON)
+- import file vừa xuất vào catalog trống (mỗi lô một transaction), rồi import lại lần hai (không có gì thay đổi)
+- kiểm tra catalog đích khớp catalog nguồn (mọi cột xuất ra, ghép theo video_id)
+Chạy: python benchmarks/bench_catalog_transfer.py [--rows 1000000]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_video  # noqa: E402
+
+from services import catalog_transfer, stats_refresh  # noqa: E402
+
+
+def prepare(rows):
+    path = create_catalog_db()
+    rng = random.Random(11)
+    for start in range(0, rows, 50000):
+        insert_rows(path, [synthetic_video(rng, i) for i in range(start, min(rows, start + 50000))])
+    conn = sqlite3.connect(path)
+    with quiet():
+        stats_refresh.ensure_stats_schema(conn)
+    conn.execute('''UPDATE video_reviews SET view_count = abs(random()) % 500000, like_count = abs(random()) % 20000,
+                           popularity = (abs(random()) % 100000) / 1000.0,
+                           genre = CASE id % 4 WHEN 0 THEN 'Hành động' WHEN 1 THEN 'Kinh dị' ELSE 'Unknown' END,
+                           series_name = CASE WHEN id % 9 = 0 THEN 'Series ' || (id % 50) END,
+                           published_at = datetime('2024-01-01', '+' || (id % 400) || ' days')''')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def fingerprint(path, columns, text_null_as_empty=False):
+    """Băm mọi cột theo thứ tự video_id; CSV không phân biệt NULL / '' nên cột TEXT NULL được so như ''"""
+    digest = hashlib.sha1()
+    conn = sqlite3.connect(path)
+    types = catalog_transfer.table_columns(conn)
+    selected = [f"COALESCE({c}, '')" if text_null_as_empty and types[c] == 'TEXT' else c for c in columns]
+    cursor = conn.execute(f"SELECT {', '.join(selected)} FROM video_reviews ORDER BY video_id")
+    count = 0
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        count += len(rows)
+        for row in rows:
+            digest.update(repr(row).encode('utf-8'))
+    conn.close()
+    return count, digest.hexdigest()
+
+
+def peak_rss_mb():
+    """VmHWM của process hiện tại; ru_maxrss trên Linux giữ cả đỉnh của process cha trước exec nên chỉ dùng dự phòng"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def child(operation, args):
+    """Chạy một bước trong process con, in kết quả JSON"""
+    started = time.perf_counter()
+    result = {}
+    if operation == 'export':
+        path, fmt, out = args
+        size = 0
+        with open(out, 'w', encoding='utf-8', newline='') as f:
+            for chunk in catalog_transfer.iter_export(fmt, db_path=path):
+                size += f.write(chunk)
+        result['bytes'] = size
+    elif operation == 'materialize':
+        # Cách cũ của /api/reviews: nạp mọi dòng rồi dựng một mảng JSON
+        path, out = args
+        conn = sqlite3.connect(path)
+        rows = conn.execute('SELECT * FROM video_reviews ORDER BY created_at DESC').fetchall()
+        conn.close()
+        body = json.dumps([{'id': r[0], 'title': r[1], 'movie_title': r[2], 'reviewer_name': r[3],
+                            'video_url': r[4], 'video_type': r[5], 'video_id': r[6], 'description': r[7],
+                            'rating': r[8], 'movie_link': r[9], 'created_at': r[10]} for r in rows])
+        with open(out, 'w', encoding='utf-8') as f:
+            result['bytes'] = f.write(body)
+    elif operation == 'import':
+        path, fmt, source = args
+        with open(source, encoding='utf-8-sig', newline='') as f, quiet():
+            summary = catalog_transfer.import_file(f, fmt, db_path=path)
+        result.update({key: summary[key] for key in ('rows', 'inserted', 'updated', 'unchanged', 'invalid')})
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    result['peak_rss_mb'] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def run_child(*args):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', *args],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1:])
+        return
+
+    workdir = tempfile.mkdtemp(prefix='reviewphim_transfer_')
+    print(f"Preparing {args.rows} rows...")
+    source = prepare(args.rows)
+    files = {fmt: os.path.join(workdir, f'catalog.{fmt}') for fmt in catalog_transfer.FORMATS}
+
+    legacy = run_child('materialize', source, os.path.join(workdir, 'legacy.json'))
+    print(f"{'legacy /api/reviews':<24} {legacy['seconds']:>7.2f}s  peak RSS {legacy['peak_rss_mb']:>7.1f} MB  "
+          f"({legacy['bytes'] / 1e6:.0f} MB)")
+    for fmt, out in files.items():
+        result = run_child('export', source, fmt, out)
+        print(f"{'export ' + fmt:<24} {result['seconds']:>7.2f}s  peak RSS {result['peak_rss_mb']:>7.1f} MB  "
+              f"({result['bytes'] / 1e6:.0f} MB)")
+
+    conn = sqlite3.connect(source)
+    columns = [c for c in catalog_transfer.export_columns(conn) if c != 'id']
+    conn.close()
+    for fmt, out in files.items():
+        expected = fingerprint(source, columns, text_null_as_empty=fmt == 'csv')
+        target = create_catalog_db(os.path.join(workdir, f'import-{fmt}.sqlite'))
+        for attempt in ('first', 'again'):
+            result = run_child('import', target, fmt, out)
+            print(f"{'import ' + fmt + ' (' + attempt + ')':<24} {result['seconds']:>7.2f}s  "
+                  f"peak RSS {result['peak_rss_mb']:>7.1f} MB  inserted {result['inserted']}, "
+                  f"updated {result['updated']}, unchanged {result['unchanged']}, invalid {result['invalid']}")
+        matches = fingerprint(target, columns, text_null_as_empty=fmt == 'csv') == expected
+        print(f"   {fmt} round trip matches source{' (NULL text = empty)' if fmt == 'csv' else ''}: {matches}")
+
+    for name in os.listdir(workdir):
+        os.unlink(os.path.join(workdir, name))
+    os.rmdir(workdir)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(source + suffix):
+            os.unlink(source + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark + kiểm tra đúng đắn cho phân loại nền theo tiêu đề (services.title_classifier)
+- Khởi động: vòng lặp phân loại lại trong init_db (cách cũ, lần boot đầu và lần boot sau) so với chỉ kiểm tra
+  schema (ensure_classifier_schema)
+- Phân loại khi crawler đang ghi: một transaction lớn (cách cũ) so với backfill theo lô; thời gian chờ lâu nhất
+  của writer
+- Bị ngắt giữa chừng rồi chạy tiếp: không thử lại dòng đã thử; kết quả giống hệt cách cũ; lần chạy sau không
+  đọc dòng nào
+Chạy: python benchmarks/bench_classify_backfill.py [--rows 200000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_video  # noqa: E402
+
+from services import title_classifier  # noqa: E402
+from services.title_classifier import analyze_country_info  # noqa: E402
+
+COMPARED = 'SELECT id, country, genre, movie_type, series_name, episode_number FROM video_reviews ORDER BY id'
+
+
+class Interrupted(Exception):
+    pass
+
+
+def prepare(rows):
+    path = create_catalog_db()
+    rng = random.Random(49)
+    for start in range(0, rows, 50000):
+        insert_rows(path, [synthetic_video(rng, i) for i in range(start, min(rows, start + 50000))])
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE video_reviews SET movie_title = substr(title, 1, 40), country = CASE WHEN id % 4 = 0 "
+                 "THEN 'Việt Nam' WHEN id % 4 = 1 THEN NULL ELSE 'Unknown' END")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def old_startup_pass(path):
+    """Vòng lặp cũ trong init_db: phân loại lại mọi dòng 'Unknown', một UPDATE mỗi dòng, một transaction"""
+    conn = sqlite3.connect(path, timeout=60)
+    c = conn.cursor()
+    c.execute("SELECT id, title, movie_title FROM video_reviews WHERE country = 'Unknown' OR country IS NULL")
+    for video_id, title, movie_title in c.fetchall():
+        analysis = analyze_country_info(title, movie_title)
+        c.execute('''UPDATE video_reviews SET country=?, genre=?, movie_type=?, series_name=?, episode_number=?
+                     WHERE id=?''', (analysis['country'], analysis['genre'], analysis['movie_type'],
+                                     analysis['series_name'], analysis['episode_number'], video_id))
+    conn.commit()
+    conn.close()
+
+
+def timed(func):
+    started = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - started
+
+
+def watch_writer(path, stop, result):
+    """Writer như crawler: mỗi 20ms cập nhật một video"""
+    conn = sqlite3.connect(path, timeout=60)
+    waits = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        with conn:
+            conn.execute('UPDATE video_reviews SET view_count = COALESCE(view_count, 0) + 1 WHERE id = ?',
+                         (len(waits) % 1000 * 4 + 4,))
+        waits.append(time.perf_counter() - started)
+        time.sleep(0.02)
+    conn.close()
+    waits.sort()
+    result.update(worst=waits[-1], median=waits[len(waits) // 2], writes=len(waits))
+
+
+def with_writer(path, func):
+    stop, writer = threading.Event(), {}
+    thread = threading.Thread(target=watch_writer, args=(path, stop, writer))
+    thread.start()
+    time.sleep(0.1)
+    value, elapsed = timed(func)
+    time.sleep(0.1)
+    stop.set()
+    thread.join()
+    return value, elapsed, writer
+
+
+def new_backfill(path, max_rows, progress=None):
+    conn = sqlite3.connect(path, timeout=60)
+    try:
+        return title_classifier.backfill(conn, max_rows=max_rows, progress=progress)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    path = prepare(args.rows)
+    conn = sqlite3.connect(path)
+    conn.execute('ALTER TABLE video_reviews ADD COLUMN view_count INTEGER')
+    conn.commit()
+    conn.close()
+    old = path + '.old'
+    shutil.copy(path, old)
+
+    _, elapsed, writer = with_writer(old, lambda: old_startup_pass(old))
+    conn = sqlite3.connect(old)
+    still_unknown = conn.execute("SELECT COUNT(*) FROM video_reviews WHERE country = 'Unknown'").fetchone()[0]
+    conn.close()
+    print(f"{args.rows} videos, {still_unknown} stay 'Unknown' after classification")
+    print(f"Old init_db pass, first boot : {elapsed:6.2f}s (writer median {writer['median'] * 1000:5.1f} ms, "
+          f"longest {writer['worst'] * 1000:7.1f} ms)")
+    _, again = timed(lambda: old_startup_pass(old))
+    print(f"Old init_db pass, every boot : {again:6.2f}s (re-runs the {still_unknown} rows it cannot place)")
+
+    conn = sqlite3.connect(path)
+    with quiet():
+        _, first = timed(lambda: title_classifier.ensure_classifier_schema(conn))
+        _, later = timed(lambda: title_classifier.ensure_classifier_schema(conn))
+    pending = title_classifier.pending_count(conn)
+    conn.close()
+    print(f"New startup schema check     : first {first * 1000:6.1f} ms (column + partial index), "
+          f"later boots {later * 1000:5.2f} ms; {pending} rows pending")
+
+    # Ngắt sau 3 lô, chạy tiếp với writer đang ghi
+    batches = []
+
+    def interrupt(event, data):
+        batches.append(data['done'])
+        if len(batches) == 3:
+            raise Interrupted()
+
+    try:
+        new_backfill(path, args.rows, progress=interrupt)
+    except Interrupted:
+        pass
+    result, elapsed, writer = with_writer(path, lambda: new_backfill(path, args.rows))
+    print(f"Backfill interrupted after {batches[-1]} rows, resumed: checked {result['checked']} more in "
+          f"{elapsed:5.2f}s (writer median {writer['median'] * 1000:5.1f} ms, "
+          f"longest {writer['worst'] * 1000:7.1f} ms)")
+    print(f"   each row attempted once: {batches[-1] + result['checked'] == pending}")
+    second, elapsed = timed(lambda: new_backfill(path, args.rows))
+    print(f"Second run: checked {second['checked']} rows in {elapsed * 1000:5.2f} ms")
+
+    old_conn, new_conn = sqlite3.connect(old), sqlite3.connect(path)
+    same = old_conn.execute(COMPARED).fetchall() == new_conn.execute(COMPARED).fetchall()
+    plan = new_conn.execute(f'''EXPLAIN QUERY PLAN SELECT id FROM video_reviews
+                                WHERE {title_classifier.UNCLASSIFIED} AND classifier_version < 1 LIMIT 200''')
+    print(f"Same classification as old pass: {same}; pending plan: {plan.fetchall()[-1][-1]}")
+    old_conn.close()
+    new_conn.close()
+
+    for p in (path, old):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(p + suffix):
+                os.unlink(p + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Mô phỏng lịch crawl thích nghi (services.crawl_schedule) so với crawl mọi query mỗi UPDATE_INTERVAL_HOURS
+Mỗi nguồn có tốc độ ra video mới riêng (nguồn "chết" không có video mới); đồng hồ giả lập, không gọi API.
+Đo quota search đã dùng, số video mới nhận được và độ trễ trung bình từ lúc video xuất hiện tới lúc được crawl.
+Chạy: python benchmarks/bench_crawl_schedule.py [--days 30] [--sources 12]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db  # noqa: E402
+
+import config  # noqa: E402
+from services.crawl_schedule import SEARCH_QUOTA_COST, CrawlSchedule, CrawlYield  # noqa: E402
+
+HOUR = 3600
+
+
+def make_sources(count):
+    """Nguồn -> số video mới mỗi ngày: 1/4 hiệu quả, 1/4 chậm, còn lại không còn video mới"""
+    rates = {}
+    for i in range(count):
+        kind = i % 4
+        rates[f"query-{i:02d}"] = 6.0 if kind == 0 else (0.3 if kind == 1 else 0.0)
+    return rates
+
+
+class World:
+    """Video mới xuất hiện theo Poisson; mỗi lần crawl một nguồn lấy tối đa một trang kết quả"""
+
+    def __init__(self, rates, seed):
+        self.rates = rates
+        self.rng = random.Random(seed)
+        self.pending = {source: [] for source in rates}  # thời điểm xuất hiện các video chưa crawl
+
+    def advance(self, now, hours):
+        for source, per_day in self.rates.items():
+            expected = per_day * hours / 24
+            count = int(expected) + (self.rng.random() < expected - int(expected))
+            self.pending[source].extend(now + self.rng.uniform(0, hours * HOUR) for _ in range(count))
+
+    def crawl(self, source, now):
+        page = [t for t in self.pending[source] if t <= now][:config.INGEST_RESULTS_PER_QUERY]
+        self.pending[source] = [t for t in self.pending[source] if t not in page]
+        return page
+
+
+def simulate(rates, days, adaptive, seed):
+    world = World(rates, seed)
+    clock = [0.0]
+    schedule = CrawlSchedule(db_path=create_catalog_db(), clock=lambda: clock[0])
+    sources = list(rates)
+    schedule.sync(sources)
+    quota = added = 0
+    delays = []
+    last_fixed = -config.UPDATE_INTERVAL_HOURS * HOUR
+    for hour in range(days * 24):
+        clock[0] = hour * HOUR
+        world.advance(clock[0], 1)
+        if adaptive:
+            due = schedule.due_sources(sources)
+        else:
+            due = sources if clock[0] - last_fixed >= config.UPDATE_INTERVAL_HOURS * HOUR else []
+            last_fixed = clock[0] if due else last_fixed
+        if not due:
+            continue
+        crawl_yield = CrawlYield()
+        for source in due:
+            page = world.crawl(source, clock[0])
+            videos = [{'crawl_source': source, 'channel': source} for _ in page]
+            crawl_yield.record_fetch(source, videos, 1)
+            crawl_yield.record_added(videos)
+            quota += SEARCH_QUOTA_COST
+            added += len(page)
+            delays.extend(clock[0] - t for t in page)
+        schedule.record(crawl_yield)
+    os.unlink(schedule.db_path)
+    return {
+        'quota': quota,
+        'added': added,
+        'per_100_units': added * 100 / max(1, quota),
+        'delay_hours': sum(delays) / max(1, len(delays)) / HOUR,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--sources', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rates = make_sources(args.sources)
+    print(f"{args.sources} sources over {args.days} days "
+          f"({sum(1 for r in rates.values() if r == 0)} dead, base interval {config.UPDATE_INTERVAL_HOURS}h)")
+    for name, adaptive in (('fixed', False), ('adaptive', True)):
+        result = simulate(rates, args.days, adaptive, args.seed)
+        print(f"{name:>9}: quota {result['quota']:>6} units  new videos {result['added']:>4}  "
+              f"({result['per_100_units']:.2f} / 100 units)  mean delay {result['delay_hours']:.1f}h")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark CPU time của bước dedupe cho một lần crawl
+So sánh: chuẩn hóa lại mỗi lần so sánh (trước) vs đọc cột *_norm đã lưu (sau)
+Chạy: python benchmarks/bench_dedupe_cpu.py [--catalog 1000] [--batch 112]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_corpus  # noqa: E402
+
+import config  # noqa: E402
+from services import text_normalizer  # noqa: E402
+from services.content_filter import ContentFilter  # noqa: E402
+
+
+class RecomputingContentFilter(ContentFilter):
+    """Hành vi cũ: chuẩn hóa title / tên phim / mô tả ở mỗi lần so sánh"""
+
+    def video_norms(self, video):
+        columns = text_normalizer.normalized_columns(video.get('title', ''), video.get('description', ''))
+        return columns['title_norm'], columns['movie_norm'], columns['desc_norm']
+
+
+def crawl_cpu(filter_class, batch, use_index):
+    config.DEDUPE_USE_LSH_INDEX = use_index
+    with quiet():
+        content_filter = filter_class()
+        if use_index:
+            content_filter.get_duplicate_index().sync()
+        # Bản sao để cột *_norm tính ở lần chạy trước không được dùng lại
+        content_filter.filter_duplicates([dict(v) for v in batch])
+    return content_filter.last_dedupe_cpu_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--catalog', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=112, help='14 query x 8 kết quả = 112')
+    args = parser.parse_args()
+
+    path = create_catalog_db()
+    corpus = synthetic_corpus(args.catalog + args.batch, duplicate_rate=0.05)
+    insert_rows(path, corpus[:args.catalog])
+    batch = corpus[args.catalog:]
+
+    print(f"Catalog: {args.catalog} rows, crawl batch: {args.batch} videos")
+    for use_index in (False, True):
+        mode = 'LSH index' if use_index else 'scan 1000'
+        before = crawl_cpu(RecomputingContentFilter, batch, use_index)
+        after = crawl_cpu(ContentFilter, batch, use_index)
+        print(f"{mode:>10}: recompute {before:.3f}s CPU -> stored columns {after:.3f}s CPU "
+              f"({before / max(after, 1e-9):.1f}x)")
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark toàn bộ đường ingest (pipeline + URL parser) với server YouTube giả lập, không cần mạng
+Đo throughput, số liệu từng stage và khả năng chịu lỗi (độ trễ, lỗi 5xx, hết quota)
+Chạy: python benchmarks/bench_ingest_offline.py [--queries 40] [--latency 0.02] [--error-rate 0.05] [--quota 3000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, quiet  # noqa: E402
+from fake_youtube_server import FakeYouTubeServer  # noqa: E402
+
+import config  # noqa: E402
+from services.ingest_pipeline import build_ingest_pipeline  # noqa: E402
+from services.smart_youtube_service import SmartYouTubeService  # noqa: E402
+from services.url_import import BulkURLImporter  # noqa: E402
+from services.youtube_url_parser import YouTubeURLParser  # noqa: E402
+
+
+def offline_classify(video):
+    """Phân loại rẻ thay cho mô hình AI (không thuộc phạm vi đo của benchmark này)"""
+    video.update({'movie_title': video['title'][:60], 'country': 'Unknown', 'genre': 'Unknown',
+                  'movie_type': 'single', 'series_name': '', 'episode_number': 0, 'rating': 7})
+    return video
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--queries', type=int, default=40)
+    parser.add_argument('--per-query', type=int, default=25)
+    parser.add_argument('--corpus', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--quota', type=int, default=None, help='quota (unit) mỗi API key, search = 100')
+    parser.add_argument('--keys', type=int, default=2, help='số API key để xoay vòng')
+    parser.add_argument('--fetch-workers', type=int, default=config.INGEST_STAGE_WORKERS['fetch'])
+    parser.add_argument('--urls', type=int, default=100, help='số URL cho YouTubeURLParser')
+    args = parser.parse_args()
+
+    server = FakeYouTubeServer(size=args.corpus, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, quota_limit=args.quota)
+    base_url = server.start()
+    config.YOUTUBE_API_BASE_URL = config.YOUTUBE_WEB_BASE_URL = base_url
+    config.YOUTUBE_API_RETRY_DELAY = 0.05
+    config.INGEST_FETCH_DELAY = 0
+    config.INGEST_RESULTS_PER_QUERY = args.per_query
+    path = create_catalog_db()
+
+    queries = (config.SEARCH_QUERIES + [f"review phim {i}" for i in range(args.queries)])[:args.queries]
+    with quiet():
+        service = SmartYouTubeService()
+        service.api_keys = [f"offline-key-{i}" for i in range(args.keys)]
+        pipeline = build_ingest_pipeline(service, workers={'fetch': args.fetch_workers},
+                                         classifier=offline_classify)
+        added = pipeline.run(queries)
+    report = pipeline.report()
+    found = report['stages'][0]['out']
+
+    print(f"Server: {base_url}, latency {args.latency}s±{args.jitter}, error rate {args.error_rate}, "
+          f"quota {args.quota or 'unlimited'} x {args.keys} keys")
+    print(f"Ingest: {len(queries)} queries -> {found} found, {len(added)} added in {pipeline.total_seconds:.2f}s "
+          f"({found / max(pipeline.total_seconds, 1e-9):.0f} videos/s)")
+    print(f"Fallback (demo) mode triggered: {service.fallback_mode}")
+    pipeline.print_report()
+
+    parser_ = YouTubeURLParser()
+    # URL ngoài phạm vi search ở trên (không có sẵn trong metadata cache)
+    urls = [f"https://youtu.be/{video['video_id']}" for video in server.corpus[-args.urls:]]
+    start = time.perf_counter()
+    with quiet():
+        resolved = sum(1 for url in urls if parser_.get_video_info(url, use_cache=False))
+    elapsed = time.perf_counter() - start
+    print(f"\nURL parser: {resolved}/{len(urls)} resolved in {elapsed:.2f}s ({len(urls) / max(elapsed, 1e-9):.0f} urls/s)")
+
+    with quiet():
+        summary = BulkURLImporter().import_urls([{'url': url, 'title': '', 'description': ''} for url in urls])
+    print(f"Bulk import x{config.URL_IMPORT_WORKERS}: {summary['resolved']}/{len(urls)} resolved, "
+          f"{summary['inserted']} inserted in {summary['seconds']:.2f}s "
+          f"({len(urls) / max(summary['seconds'], 1e-9):.0f} urls/s)")
+
+    web_requests = server.requests['embed'] + server.requests['oembed']
+    start = time.perf_counter()
+    with quiet():
+        resolved = sum(1 for url in urls if parser_.get_video_info(url))
+    elapsed = time.perf_counter() - start
+    print(f"Repeat lookups (metadata cache): {resolved}/{len(urls)} in {elapsed:.3f}s, "
+          f"{server.requests['embed'] + server.requests['oembed'] - web_requests} network requests")
+    print(f"Server requests: {dict(server.requests)}  simulated errors: {dict(server.errors)}")
+
+    server.stop()
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Microbenchmark bộ lọc từ khóa review phim trên 100k tiêu đề
+So sánh: dựng lại ~60 từ khóa + re.search mỗi video (trước) vs KeywordMatcher biên dịch sẵn (sau)
+Chạy: python benchmarks/bench_keyword_matcher.py [--titles 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import keyword_samples, legacy_is_movie_review, quiet  # noqa: E402
+
+from services.content_filter import ContentFilter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100000)
+    args = parser.parse_args()
+
+    samples = keyword_samples(args.titles)
+    with quiet():
+        content_filter = ContentFilter()
+
+    start = time.perf_counter()
+    for video in samples:
+        legacy_is_movie_review(video)
+    legacy_time = time.perf_counter() - start
+
+    matcher = content_filter.keyword_matcher
+    start = time.perf_counter()
+    for video in samples:
+        matcher.flags(f"{video['title'].lower()} {video['description'].lower()}")
+    matcher_time = time.perf_counter() - start
+
+    with quiet():
+        start = time.perf_counter()
+        for video in samples:
+            content_filter.is_movie_review_video(video)
+        method_time = time.perf_counter() - start
+
+    print(f"Titles: {len(samples)}")
+    print(f"Legacy keyword scans:   {legacy_time:.2f}s ({len(samples) / legacy_time:,.0f}/s)")
+    print(f"KeywordMatcher.flags:   {matcher_time:.2f}s ({len(samples) / matcher_time:,.0f}/s, "
+          f"{legacy_time / matcher_time:.1f}x)")
+    print(f"is_movie_review_video:  {method_time:.2f}s (gồm log lý do bị loại)")
+
+
+if __name__ == '__main__':
+    main()
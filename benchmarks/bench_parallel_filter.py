@@ -0,0 +1,128 @@
+"""
+Benchmark ContentFilter.process_videos cho batch lớn (backfill) và ingest pipeline (đường crawl thật)
+So sánh: tuần tự vs process pool (CONTENT_FILTER_PARALLEL) với 1, 2, 4... worker, kiểm tra kết quả giống hệt
+Pipeline: video đưa vào như dict đã checkpoint (bỏ qua search), enrich / classify giả lập, persist ghi thật
+Chạy: python benchmarks/bench_parallel_filter.py [--catalog 5000] [--batch 3000] [--scan] [--no-pipeline]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_corpus  # noqa: E402
+
+import config  # noqa: E402
+from services.content_filter import ContentFilter  # noqa: E402
+from services import write_queue  # noqa: E402
+from services.ingest_pipeline import build_ingest_pipeline  # noqa: E402
+
+
+class OfflineService:
+    """enrich / classify không gọi API (không thuộc phạm vi đo)"""
+
+    def enrich_videos(self, videos):
+        for video in videos:
+            video.setdefault('channel_title', video.get('channel', ''))
+        return videos
+
+    def classify_video(self, video):
+        video.update({'movie_title': video['title'][:60], 'country': 'Unknown', 'genre': 'Unknown',
+                      'movie_type': 'single', 'series_name': '', 'episode_number': 0, 'rating': 7})
+        return video
+
+
+def run(batch, parallel, workers=None):
+    config.CONTENT_FILTER_PARALLEL = parallel
+    config.CONTENT_FILTER_WORKERS = workers or 0
+    config.CONTENT_FILTER_PARALLEL_MIN_BATCH = 1
+    with quiet():
+        content_filter = ContentFilter()
+        start = time.perf_counter()
+        # Bản sao để cột *_norm của lần chạy trước không được dùng lại
+        result = content_filter.process_videos([dict(v) for v in batch])
+        elapsed = time.perf_counter() - start
+    return [v['video_id'] for v in result], elapsed
+
+
+def run_pipeline(catalog_path, batch, parallel, workers=None):
+    """Một lần crawl trên bản sao catalog -> (video_id đã lưu, thời gian, thời gian bận của quality + dedupe)"""
+    # Mỗi lần một file mới: write queue của process giữ connection theo đường dẫn
+    path = f"{catalog_path}.run{parallel}{workers or 0}"
+    shutil.copy(catalog_path, path)
+    config.DATABASE_PATH = path
+    config.CONTENT_FILTER_PARALLEL = parallel
+    config.CONTENT_FILTER_WORKERS = workers or 0
+    with quiet():
+        start = time.perf_counter()
+        # fetch / enrich một worker: thứ tự vào dedupe cố định, kết quả so sánh được giữa các lần chạy
+        pipeline = build_ingest_pipeline(OfflineService(), workers={'fetch': 1, 'enrich': 1})
+        added = pipeline.run([dict(v) for v in batch])
+        elapsed = time.perf_counter() - start
+    busy = sum(row['busy_seconds'] for row in pipeline.report()['stages'] if row['stage'] in ('quality', 'dedupe'))
+    write_queue.get_write_queue(path).close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+    config.DATABASE_PATH = catalog_path
+    return sorted(v['video_id'] for v in added), elapsed, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--catalog', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=3000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--scan', action='store_true', help='so sánh tuần tự với 1000 video (DEDUPE_USE_LSH_INDEX=False)')
+    parser.add_argument('--no-pipeline', action='store_true', help='chỉ đo process_videos')
+    args = parser.parse_args()
+
+    config.DEDUPE_USE_LSH_INDEX = not args.scan
+    path = create_catalog_db()
+    corpus = synthetic_corpus(args.catalog + args.batch, duplicate_rate=0.1)
+    insert_rows(path, corpus[:args.catalog])
+    batch = corpus[args.catalog:]
+    with quiet():
+        if not args.scan:
+            ContentFilter().get_duplicate_index().sync()  # không tính thời gian lập chỉ mục lần đầu
+
+    print(f"Catalog: {args.catalog} rows, batch: {args.batch} videos, "
+          f"dedupe: {'scan' if args.scan else 'LSH index'}, CPU cores: {os.cpu_count()}")
+    expected, serial_seconds = run(batch, parallel=False)
+    print(f"   serial      : {serial_seconds:7.2f}s  ({len(expected)} accepted)")
+
+    workers = 1
+    mismatches = 0
+    while workers <= args.max_workers:
+        accepted, seconds = run(batch, parallel=True, workers=workers)
+        same = accepted == expected
+        mismatches += not same
+        print(f"   parallel x{workers:<2}: {seconds:7.2f}s  speedup {serial_seconds / seconds:4.2f}x  "
+              f"identical: {same}")
+        workers *= 2
+
+    if not args.no_pipeline:
+        print("Ingest pipeline (quality + catalog dedupe on the pool, persist included):")
+        expected, serial_seconds, serial_busy = run_pipeline(path, batch, parallel=False)
+        print(f"   serial      : {serial_seconds:7.2f}s  quality + dedupe busy {serial_busy:6.2f}s  "
+              f"({len(expected)} saved)")
+        workers = 1
+        while workers <= args.max_workers:
+            saved, seconds, busy = run_pipeline(path, batch, parallel=True, workers=workers)
+            same = saved == expected
+            mismatches += not same
+            print(f"   parallel x{workers:<2}: {seconds:7.2f}s  quality + dedupe busy {busy:6.2f}s  "
+                  f"speedup {serial_seconds / seconds:4.2f}x  identical: {same}")
+            workers *= 2
+
+    if (os.cpu_count() or 1) < 2:
+        print("⚠️ Only one CPU core available: parallel mode can only add overhead here")
+    os.unlink(path)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark cho VideoReviewRepository (services.video_repository)
+- Trang chủ: SELECT * + tuple (cách cũ) so với projection CardRow (__slots__, mô tả 100 ký tự):
+  bộ nhớ cấp phát lớn nhất mỗi request (tracemalloc), số byte lấy ra, thời gian
+- Trang chi tiết: connection mới + SELECT * mỗi request (cách cũ) so với connection đọc dùng lại của thread
+  (statement đã prepare được dùng lại)
+- Row object: kích thước một dòng (tuple đủ cột / CardRow)
+Chạy: python benchmarks/bench_repository.py [--rows 20000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_video  # noqa: E402
+
+import config  # noqa: E402
+from services import stats_refresh, text_normalizer, video_repository  # noqa: E402
+from services.video_repository import CardRow, VideoReviewRepository  # noqa: E402
+
+
+def prepare(rows):
+    """Catalog với mô tả dài như dữ liệu crawler (tới 500 ký tự) và cột chuẩn hóa đã điền"""
+    path = create_catalog_db()
+    rng = random.Random(23)
+    for start in range(0, rows, 50000):
+        videos = [synthetic_video(rng, i) for i in range(start, min(rows, start + 50000))]
+        for video in videos:
+            video['description'] = (video['description'] + ' ') * 8
+            video['description'] = video['description'][:500]
+        insert_rows(path, videos)
+    conn = sqlite3.connect(path)
+    with quiet():
+        stats_refresh.ensure_stats_schema(conn)
+        text_normalizer.backfill_normalized_columns(conn)
+    conn.execute("UPDATE video_reviews SET country = 'Việt Nam', genre = 'Hành động', movie_type = 'single', "
+                 "thumbnail_url = 'https://i.ytimg.com/vi/' || video_id || '/hqdefault.jpg'")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def fetched_bytes(rows):
+    total = 0
+    for row in rows:
+        values = row if isinstance(row, tuple) else [getattr(row, name) for name in row.COLUMNS]
+        for value in values:
+            total += len(value.encode('utf-8')) if isinstance(value, str) else 8 if value is not None else 0
+    return total
+
+
+def measure(func, repeat=3):
+    """(kết quả, peak bytes cấp phát, giây tốt nhất khi không bật tracemalloc)"""
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return result, peak, best
+
+
+def old_index(path):
+    conn = sqlite3.connect(path, timeout=30)
+    rows = conn.execute('SELECT * FROM video_reviews ORDER BY created_at DESC').fetchall()
+    conn.close()
+    return rows
+
+
+def old_detail(path, review_id):
+    conn = sqlite3.connect(path, timeout=30)
+    row = conn.execute('SELECT * FROM video_reviews WHERE id = ?', (review_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def bench_index(path):
+    old_index(path), VideoReviewRepository().latest_cards()  # làm nóng page cache
+    old_rows, old_peak, old_time = measure(lambda: old_index(path))
+    new_rows, new_peak, new_time = measure(lambda: VideoReviewRepository().latest_cards())
+    print(f"Index page ({len(old_rows)} videos):")
+    print(f"   SELECT * tuples : peak alloc {old_peak / 1e6:7.1f} MB, fetched {fetched_bytes(old_rows) / 1e6:6.1f} MB, "
+          f"{old_time * 1000:6.0f} ms")
+    print(f"   CardRow         : peak alloc {new_peak / 1e6:7.1f} MB, fetched {fetched_bytes(new_rows) / 1e6:6.1f} MB, "
+          f"{new_time * 1000:6.0f} ms")
+    tuple_size = sys.getsizeof(old_rows[0]) + sum(sys.getsizeof(v) for v in old_rows[0])
+    card_size = sys.getsizeof(new_rows[0]) + sum(sys.getsizeof(getattr(new_rows[0], c)) for c in CardRow.COLUMNS)
+    print(f"   one row: tuple {len(old_rows[0])} columns {tuple_size} B, CardRow {len(CardRow.COLUMNS)} columns "
+          f"{card_size} B (has __dict__: {hasattr(new_rows[0], '__dict__')})")
+    same = [row[0] for row in old_rows] == [row.id for row in new_rows]
+    print(f"   same videos / order: {same}")
+
+
+def bench_detail(path, requests=2000):
+    rng = random.Random(1)
+    ids = [rng.randint(1, 1000) for _ in range(requests)]
+    started = time.perf_counter()
+    for review_id in ids:
+        old_detail(path, review_id)
+    old = (time.perf_counter() - started) / requests
+    started = time.perf_counter()
+    for review_id in ids:
+        VideoReviewRepository().get(review_id)
+    new = (time.perf_counter() - started) / requests
+    print(f"Detail lookup: new connection + SELECT * {old * 1e6:6.0f} µs/request, "
+          f"repository (reused connection, cached statement) {new * 1e6:6.0f} µs/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    path = prepare(args.rows)
+    config.DATABASE_PATH = path
+    bench_index(path)
+    bench_detail(path)
+    video_repository.close_read_connection()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
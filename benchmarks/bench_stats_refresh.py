@@ -0,0 +1,81 @@
+"""
+Benchmark refresh thống kê cho catalog có sẵn với server YouTube giả lập
+Đo throughput refresh (lô 50 id / quota) và truy vấn "top" (ORDER BY popularity) có / không có index
+Chạy: python benchmarks/bench_stats_refresh.py [--catalog 20000] [--batches 100] [--latency 0.02]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet  # noqa: E402
+from fake_youtube_server import FakeYouTubeServer  # noqa: E402
+
+import config  # noqa: E402
+from services.smart_youtube_service import SmartYouTubeService  # noqa: E402
+from services.stats_refresh import StatsRefresher  # noqa: E402
+
+TOP_QUERY = '''SELECT * FROM video_reviews WHERE 1=1
+               ORDER BY popularity DESC, rating DESC, created_at DESC LIMIT 24'''
+
+
+def time_query(path, runs=20):
+    conn = sqlite3.connect(path)
+    plan = ' / '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + TOP_QUERY))
+    start = time.perf_counter()
+    for _ in range(runs):
+        conn.execute(TOP_QUERY).fetchall()
+    elapsed = (time.perf_counter() - start) / runs
+    conn.close()
+    return plan, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--catalog', type=int, default=20000)
+    parser.add_argument('--batches', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = FakeYouTubeServer(size=args.catalog, latency=args.latency)
+    config.YOUTUBE_API_BASE_URL = server.start()
+    path = create_catalog_db()
+    insert_rows(path, server.corpus)
+
+    service = SmartYouTubeService()
+    service.api_keys = ['offline-key']
+    config.STATS_REFRESH_DAILY_QUOTA = args.batches
+    with quiet():
+        refresher = StatsRefresher(youtube_service=service)
+        start = time.perf_counter()
+        result = refresher.run(max_batches=args.batches)
+        elapsed = time.perf_counter() - start
+        again = refresher.run(max_batches=args.batches)
+    print(f"Catalog: {args.catalog} rows, server latency {args.latency}s")
+    print(f"Refresh: {result['refreshed']} videos in {result['batches']} videos.list calls, {elapsed:.2f}s "
+          f"({result['refreshed'] / max(elapsed, 1e-9):.0f} videos/s), quota left {result['quota_left']}")
+    print(f"Second run same day: {again['batches']} calls (quota slice respected)")
+
+    conn = sqlite3.connect(path)
+    history = conn.execute('SELECT COUNT(*) FROM video_stats_history').fetchone()[0]
+    conn.close()
+    print(f"History rows: {history}")
+
+    plan, seconds = time_query(path)
+    print(f"Top query with index   : {seconds * 1000:.2f} ms  [{plan}]")
+    conn = sqlite3.connect(path)
+    conn.execute('DROP INDEX idx_video_reviews_popularity')
+    conn.close()
+    plan, seconds = time_query(path)
+    print(f"Top query without index: {seconds * 1000:.2f} ms  [{plan}]")
+
+    server.stop()
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark + kiểm tra đúng đắn cho giữ / cộng dồn update_logs (services.update_logs)
+- Truy vấn của trang admin (nhật ký mới nhất, lần thành công gần nhất) trước / sau khi có index
+- Dọn log cũ khi crawler đang ghi: một DELETE lớn (cách cũ) so với cộng dồn + xóa theo lô;
+  thời gian chờ lâu nhất của writer
+- Tổng (số lần chạy, tìm thấy, đã thêm, lỗi, thời gian) không đổi sau khi cộng dồn; chạy lại không đếm trùng
+Chạy: python benchmarks/bench_update_logs.py [--logs 500000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import quiet  # noqa: E402
+
+from services import update_logs  # noqa: E402
+
+RECENT_SQL = '''SELECT timestamp, status, message, videos_found, videos_added, stage_metrics
+                FROM update_logs ORDER BY timestamp DESC LIMIT 20'''
+SUCCESS_SQL = '''SELECT timestamp, videos_found, videos_added FROM update_logs WHERE status = 'SUCCESS'
+                 ORDER BY timestamp DESC LIMIT 1'''
+
+
+def prepare(logs):
+    """update_logs kiểu cũ (không index), một dòng mỗi ~2 phút trải đến hiện tại"""
+    path = tempfile.mktemp(suffix='.sqlite', prefix='reviewphim_logs_')
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''CREATE TABLE update_logs (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, status TEXT NOT NULL, message TEXT,
+                    videos_found INTEGER DEFAULT 0, videos_added INTEGER DEFAULT 0, stage_metrics TEXT)''')
+    metrics = json.dumps({'total_seconds': 12.5, 'stages': [{'name': 'fetch', 'items_in': 50}]})
+    rows = []
+    for i in range(logs):
+        status = 'ERROR' if i % 10 == 0 else 'SUCCESS' if i % 3 == 0 else 'INFO'
+        rows.append((f'-{(logs - i) * 2} minutes', status, f'Crawl run #{i}: tìm thấy {i % 50} videos',
+                     i % 50, i % 5, metrics if status == 'SUCCESS' else None))
+    conn.executemany('''INSERT INTO update_logs (timestamp, status, message, videos_found, videos_added,
+                                                 stage_metrics)
+                        VALUES (datetime('now', ?), ?, ?, ?, ?, ?)''', rows)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def totals(conn):
+    raw = conn.execute('''SELECT COUNT(*), SUM(status = 'SUCCESS'), SUM(status = 'ERROR'), SUM(videos_found),
+                                 SUM(videos_added),
+                                 ROUND(COALESCE(SUM(json_extract(stage_metrics, '$.total_seconds')), 0), 3)
+                          FROM update_logs''').fetchone()
+    rolled = conn.execute(f'''SELECT COALESCE(SUM(runs), 0), COALESCE(SUM(successes), 0), COALESCE(SUM(errors), 0),
+                                     COALESCE(SUM(videos_found), 0), COALESCE(SUM(videos_added), 0),
+                                     ROUND(COALESCE(SUM(duration_seconds), 0), 3)
+                              FROM {update_logs.DAILY_TABLE}''').fetchone()
+    return tuple(round((a or 0) + (b or 0), 3) for a, b in zip(raw, rolled))
+
+
+def watch_writer(path, stop, result):
+    """Writer như crawler: mỗi 20ms ghi một dòng log"""
+    conn = sqlite3.connect(path, timeout=60)
+    waits = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        with conn:
+            conn.execute("INSERT INTO update_logs (status, message) VALUES ('INFO', 'writer')")
+        waits.append(time.perf_counter() - started)
+        time.sleep(0.02)
+    conn.close()
+    waits.sort()
+    result.update(worst=waits[-1], median=waits[len(waits) // 2], writes=len(waits))
+
+
+def with_writer(path, func):
+    stop, writer = threading.Event(), {}
+    thread = threading.Thread(target=watch_writer, args=(path, stop, writer))
+    thread.start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    value = func()
+    elapsed = time.perf_counter() - started
+    time.sleep(0.1)
+    stop.set()
+    thread.join()
+    return value, elapsed, writer
+
+
+def old_prune(path, days):
+    conn = sqlite3.connect(path, timeout=60)
+    with conn:
+        count = conn.execute("DELETE FROM update_logs WHERE timestamp < datetime('now', ?)",
+                             (f'-{days} days',)).rowcount
+    conn.close()
+    return count
+
+
+def new_prune(path, days):
+    conn = sqlite3.connect(path, timeout=60)
+    count = update_logs.rollup_and_prune(conn, retention_days=days)
+    conn.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logs', type=int, default=500000)
+    parser.add_argument('--days', type=int, default=90)
+    args = parser.parse_args()
+
+    path = prepare(args.logs)
+    copy = path + '.old'
+    shutil.copy(path, copy)
+    print(f"{args.logs} update_logs rows, {os.path.getsize(path) / 1e6:.0f} MB")
+
+    conn = sqlite3.connect(path)
+    before = (timed(lambda: conn.execute(RECENT_SQL).fetchall()), timed(lambda: conn.execute(SUCCESS_SQL).fetchone()))
+    with quiet():
+        update_logs.ensure_update_logs_schema(conn)
+    after = (timed(lambda: conn.execute(RECENT_SQL).fetchall()), timed(lambda: conn.execute(SUCCESS_SQL).fetchone()))
+    print(f"Recent logs   : {before[0]:7.2f} ms -> {after[0]:5.2f} ms")
+    print(f"Last success  : {before[1]:7.2f} ms -> {after[1]:5.2f} ms")
+    expected = totals(conn)
+    conn.close()
+
+    deleted, elapsed, writer = with_writer(copy, lambda: old_prune(copy, args.days))
+    print(f"One DELETE (old job)       : {deleted} rows in {elapsed:5.2f}s, writer median "
+          f"{writer['median'] * 1000:5.1f} ms, longest {writer['worst'] * 1000:7.1f} ms")
+    pruned, elapsed, writer = with_writer(path, lambda: new_prune(path, args.days))
+    print(f"Roll up + prune in batches : {pruned} rows in {elapsed:5.2f}s, writer median "
+          f"{writer['median'] * 1000:5.1f} ms, longest {writer['worst'] * 1000:7.1f} ms")
+
+    conn = sqlite3.connect(path)
+    # Trừ các dòng writer đã thêm (status INFO, không found / added)
+    writer_rows = conn.execute("SELECT COUNT(*) FROM update_logs WHERE message = 'writer'").fetchone()[0]
+    conn.execute("DELETE FROM update_logs WHERE message = 'writer'")
+    conn.commit()
+    got = totals(conn)
+    again = update_logs.rollup_and_prune(conn, retention_days=args.days)
+    oldest = conn.execute('SELECT MIN(timestamp) FROM update_logs').fetchone()[0]
+    days = conn.execute(f'SELECT COUNT(*) FROM {update_logs.DAILY_TABLE}').fetchone()[0]
+    recent = update_logs.daily_rollup(conn, 3)
+    conn.close()
+    print(f"Totals (runs, success, errors, found, added, seconds) preserved {got == expected}: {got}")
+    print(f"Writer rows during prune {writer_rows}; second run pruned {again}; oldest raw row {oldest}; "
+          f"{days} daily rows; last days {[(row['day'], row['runs']) for row in recent]}")
+
+    for p in (path, copy):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(p + suffix):
+                os.unlink(p + suffix)
+
+
+if __name__ == '__main__':
+    main()
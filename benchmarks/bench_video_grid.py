@@ -0,0 +1,149 @@
+"""
+Benchmark + kiểm tra đúng đắn cho grid admin phía server (services.video_grid)
+- Duyệt hết catalog bằng cursor với mọi kiểu sort: mỗi video xuất hiện đúng một lần, đúng thứ tự (kể cả giá trị NULL)
+- Thời gian một trang (đầu / sâu, cursor so với OFFSET, có lọc) so với cách cũ: đọc cả catalog cho mỗi lần tải
+Chạy: python benchmarks/bench_video_grid.py [--rows 500000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_corpus  # noqa: E402
+
+import config  # noqa: E402
+from services import stats_refresh, video_grid  # noqa: E402
+
+
+def prepare(rows):
+    path = create_catalog_db()
+    insert_rows(path, synthetic_corpus(rows, duplicate_rate=0))
+    conn = sqlite3.connect(path)
+    with quiet():
+        stats_refresh.ensure_stats_schema(conn)
+    rng = random.Random(3)
+    conn.executemany('''UPDATE video_reviews SET created_at = datetime('2024-01-01', ?), genre = ?, country = ?,
+                               reviewer_name = ?, popularity = ?, view_count = ? WHERE id = ?''',
+                     [(f"+{rng.randint(0, 500 * 86400)} seconds", rng.choice(['Hành động', 'Kinh dị', 'Unknown']),
+                       rng.choice(['Mỹ', 'Hàn Quốc', 'Việt Nam', 'Unknown']), f"Kênh {rng.randint(1, 300)}",
+                       rng.random() if rng.random() < 0.7 else None,
+                       rng.randint(0, 10 ** 6) if rng.random() < 0.7 else None, i)
+                      for i in range(1, rows + 1)])
+    video_grid.ensure_grid_indexes(conn)
+    conn.execute('PRAGMA optimize')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def walk(path, sort, order, filters=None, per_page=500):
+    """Duyệt mọi trang bằng cursor, trả về [(giá trị sort, id)]"""
+    seen, cursor = [], None
+    expression = video_grid.SORTS[sort]
+    conn = sqlite3.connect(path)
+    while True:
+        page = video_grid.query_page(filters, sort, order, cursor, per_page=per_page, with_total=False, db_path=path)
+        ids = [video['id'] for video in page['videos']]
+        if ids:
+            values = dict(conn.execute(f"SELECT id, {expression} FROM video_reviews WHERE id IN "
+                                       f"({','.join('?' * len(ids))})", ids).fetchall())
+            seen.extend((values[i], i) for i in ids)
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    conn.close()
+    return seen
+
+
+def check_walks(path):
+    conn = sqlite3.connect(path)
+    total = conn.execute('SELECT COUNT(*) FROM video_reviews').fetchone()[0]
+    conn.close()
+    for sort in video_grid.SORTS:
+        for order in ('desc', 'asc'):
+            seen = walk(path, sort, order)
+            expected = sorted(seen, reverse=order == 'desc')
+            ok = len(seen) == total and len({i for _, i in seen}) == total and seen == expected
+            print(f"   walk sort={sort:<12} {order:<4}: {len(seen)} rows, complete and ordered: {ok}")
+    filters = video_grid.parse_filters({'genre': 'Kinh dị', 'status': 'classified', 'date_from': '2024-03-01'})
+    where, params = video_grid.where_clause(filters)
+    conn = sqlite3.connect(path)
+    expected = conn.execute(f'SELECT COUNT(*) FROM video_reviews WHERE {where}', params).fetchone()[0]
+    conn.close()
+    seen = walk(path, 'popularity', 'desc', filters)
+    print(f"   walk filtered (genre + status + date): {len(seen)} rows, expected {expected}: {len(seen) == expected}")
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def old_list(path):
+    """Cách cũ của /admin/auto-update/videos: đọc cả catalog rồi dựng list dict"""
+    conn = sqlite3.connect(path)
+    rows = conn.execute('''SELECT id, title, movie_title, reviewer_name, created_at
+                           FROM video_reviews ORDER BY created_at DESC''').fetchall()
+    conn.close()
+    return [{'id': r[0], 'title': r[1], 'movie_title': r[2], 'channel': r[3], 'created_at': r[4]} for r in rows]
+
+
+def deep_cursor(path, sort, depth_pages, per_page):
+    cursor = None
+    for _ in range(depth_pages):
+        cursor = video_grid.query_page(None, sort, 'desc', cursor, per_page=per_page, with_total=False,
+                                       db_path=path)['next_cursor']
+    return cursor
+
+
+def bench_pages(path, rows):
+    per_page = config.ADMIN_GRID_PAGE_SIZE
+    depth = rows // per_page // 2  # giữa catalog
+    print(f"Old full list ({rows} rows):               {timed(lambda: old_list(path), 2):8.1f} ms")
+    for sort in ('created_at', 'popularity'):
+        cursor = deep_cursor(path, sort, min(depth, 40), per_page) if depth > 40 else None
+        print(f"Grid first page, sort={sort:<11} + count: "
+              f"{timed(lambda: video_grid.query_page(None, sort, db_path=path)):8.1f} ms")
+        if cursor:
+            print(f"Grid cursor page 41, sort={sort:<11}:     "
+                  f"{timed(lambda: video_grid.query_page(None, sort, cursor=cursor, with_total=False, db_path=path)):8.1f} ms")
+        print(f"Grid OFFSET page {depth}, sort={sort:<11}: "
+              f"{timed(lambda: video_grid.query_page(None, sort, page=depth, with_total=False, db_path=path)):8.1f} ms")
+    for label, args in (('genre', {'genre': 'Kinh dị'}),
+                        ('channel', {'channel': 'Kênh 17'}),
+                        ('date range', {'date_from': '2024-06-01', 'date_to': '2024-06-30'}),
+                        ('unclassified', {'status': 'unclassified'}),
+                        ('search', {'q': 'review'})):
+        filters = video_grid.parse_filters(args)
+        result = video_grid.query_page(filters, db_path=path)
+        total = result['total'] if result['total_exact'] else f"{result['total']}+"
+        print(f"Grid filter {label:<12} ({str(total):>6} rows) + count:  "
+              f"{timed(lambda: video_grid.query_page(filters, db_path=path)):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--skip-walk', action='store_true', help='bỏ qua bước duyệt hết catalog')
+    args = parser.parse_args()
+
+    path = prepare(args.rows)
+    if not args.skip_walk:
+        check_walks(path)
+    bench_pages(path, args.rows)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Benchmark cho write queue (services.write_queue): crawl + thao tác admin ghi đồng thời trong một process
+- Cách cũ: mỗi thao tác mở connection riêng (busy timeout) và commit riêng
+- Cách mới: mọi thao tác gửi vào writer thread, group commit
+Đo: thời gian, số lỗi "database is locked", độ trễ mỗi thao tác (p50 / p95 / max), số transaction,
+độ sâu hàng đợi và thời gian commit (metrics của WriteQueue); dữ liệu cuối cùng của hai cách phải giống nhau
+Chạy: python benchmarks/bench_write_queue.py [--rows 20000] [--admin-threads 8] [--timeout 2]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_video  # noqa: E402
+
+from services import catalog_counters, stats_refresh, text_normalizer, video_store, write_queue  # noqa: E402
+
+
+def prepare(rows):
+    path = create_catalog_db()
+    rng = random.Random(50)
+    for start in range(0, rows, 50000):
+        insert_rows(path, [synthetic_video(rng, i) for i in range(start, min(rows, start + 50000))])
+    conn = sqlite3.connect(path)
+    with quiet():
+        text_normalizer.ensure_normalized_columns(conn)
+        video_store.ensure_video_store_schema(conn)
+        stats_refresh.ensure_stats_schema(conn)
+        catalog_counters.ensure_catalog_counters(conn)
+    conn.execute('''CREATE TABLE update_logs (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, status TEXT NOT NULL, message TEXT,
+                    videos_found INTEGER DEFAULT 0, videos_added INTEGER DEFAULT 0, stage_metrics TEXT)''')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def workload(rows, admin_threads, admin_ops, crawl_batches, batch_size):
+    """(lô crawler, [thao tác của mỗi admin thread]) cố định theo seed, giống nhau cho hai cách"""
+    rng = random.Random(7)
+    batches = [[synthetic_video(rng, 10 ** 7 + b * batch_size + i) for i in range(batch_size)]
+               for b in range(crawl_batches)]
+    admin = []
+    for n in range(admin_threads):
+        ops = []
+        for i in range(admin_ops):
+            kind = i % 3
+            if kind == 0:
+                ops.append(('UPDATE video_reviews SET rating = ?, genre = ? WHERE id = ?',
+                            (rng.randint(1, 10), rng.choice(['Hành động', 'Kinh dị', 'Hài']), rng.randint(1, rows))))
+            elif kind == 1:
+                ops.append(("INSERT INTO update_logs (status, message) VALUES ('INFO', ?)", (f'admin {n}-{i}',)))
+            else:
+                ops.append(('UPDATE video_reviews SET description = description || ? WHERE id = ?',
+                            ('.', rng.randint(1, rows))))
+        admin.append(ops)
+    return batches, admin
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies, self.errors, self.transactions = [], 0, 0
+        self.lock = threading.Lock()
+
+    def add(self, started, error=False, transactions=1):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies.append(elapsed)
+            self.errors += error
+            self.transactions += 0 if error else transactions
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        pick = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000  # noqa: E731
+        return (f"ops {len(ordered)}, locked errors {self.errors}, transactions {self.transactions}, "
+                f"latency p50 {pick(0.5):6.1f} ms, p95 {pick(0.95):7.1f} ms, max {ordered[-1] * 1000:7.1f} ms")
+
+
+def run_old(path, batches, admin, timeout):
+    recorder = Recorder()
+
+    def crawler():
+        for batch in batches:
+            started = time.perf_counter()
+            try:
+                conn = sqlite3.connect(path, timeout=timeout)
+                try:
+                    video_store.bulk_upsert_videos(batch, conn=conn)
+                finally:
+                    conn.close()
+                recorder.add(started)
+            except sqlite3.OperationalError:
+                recorder.add(started, error=True)
+
+    def admin_thread(ops):
+        for sql, params in ops:
+            started = time.perf_counter()
+            try:
+                conn = sqlite3.connect(path, timeout=timeout)
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                finally:
+                    conn.close()
+                recorder.add(started)
+            except sqlite3.OperationalError:
+                recorder.add(started, error=True)
+
+    return recorder, run_threads(crawler, admin_thread, admin)
+
+
+def run_queue(path, batches, admin):
+    recorder = Recorder()
+    queue = write_queue.WriteQueue(path)
+
+    def crawler():
+        for batch in batches:
+            started = time.perf_counter()
+            try:
+                queue.write(video_store.upsert_records, batch)
+                recorder.add(started, transactions=0)
+            except sqlite3.OperationalError:
+                recorder.add(started, error=True)
+
+    def admin_thread(ops):
+        for sql, params in ops:
+            started = time.perf_counter()
+            try:
+                queue.execute(sql, params).result()
+                recorder.add(started, transactions=0)
+            except sqlite3.OperationalError:
+                recorder.add(started, error=True)
+
+    elapsed = run_threads(crawler, admin_thread, admin)
+    metrics = queue.metrics()
+    queue.close()
+    recorder.transactions = metrics['commits']
+    return recorder, elapsed, metrics
+
+
+def run_threads(crawler, admin_thread, admin):
+    threads = [threading.Thread(target=crawler)] + [threading.Thread(target=admin_thread, args=(ops,))
+                                                    for ops in admin]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def snapshot(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT video_id, rating, genre, length(description) FROM video_reviews ORDER BY video_id')
+    data = (rows.fetchall(), conn.execute('SELECT COUNT(*) FROM update_logs').fetchone()[0],
+            len(catalog_counters.verify_counters(conn)))
+    conn.close()
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--admin-threads', type=int, default=8)
+    parser.add_argument('--admin-ops', type=int, default=300)
+    parser.add_argument('--crawl-batches', type=int, default=40)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=2, help='busy timeout (giây) của cách cũ')
+    args = parser.parse_args()
+
+    path = prepare(args.rows)
+    copy = path + '.queue'
+    shutil.copy(path, copy)
+    batches, admin = workload(args.rows, args.admin_threads, args.admin_ops, args.crawl_batches, args.batch_size)
+    print(f"{args.rows} videos; crawler {args.crawl_batches} batches x {args.batch_size}, "
+          f"{args.admin_threads} admin threads x {args.admin_ops} writes")
+
+    with quiet():
+        old, old_elapsed = run_old(path, batches, admin, args.timeout)
+        new, new_elapsed, metrics = run_queue(copy, batches, admin)
+    print(f"Connection per write (timeout {args.timeout:g}s): {old_elapsed:5.2f}s  {old.summary()}")
+    print(f"Write queue                       : {new_elapsed:5.2f}s  {new.summary()}")
+    print(f"   queue metrics: max depth {metrics['max_depth']}, avg batch {metrics['avg_batch']}, "
+          f"max batch {metrics['max_batch']}, commit p50 {metrics['commit_ms_p50']} ms / "
+          f"p95 {metrics['commit_ms_p95']} ms, wait p50 {metrics['wait_ms_p50']} ms / p95 {metrics['wait_ms_p95']} ms")
+    if not old.errors:
+        old_data, new_data = snapshot(path), snapshot(copy)
+        # Thứ tự ghi giữa các thread khác nhau nên chỉ so phần không phụ thuộc thứ tự
+        print(f"   same videos / log count: {[r[0] for r in old_data[0]] == [r[0] for r in new_data[0]]} / "
+              f"{old_data[1] == new_data[1]}; counter mismatches old {old_data[2]}, queue {new_data[2]}")
+    else:
+        new_data = snapshot(copy)
+        print(f"   queue: {new_data[1]} log rows, counter mismatches {new_data[2]}")
+
+    for p in (path, copy):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(p + suffix):
+                os.unlink(p + suffix)
+
+
+if __name__ == '__main__':
+    main()
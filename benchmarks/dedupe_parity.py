@@ -0,0 +1,92 @@
+"""
+Kiểm tra parity: chỉ mục MinHash/LSH vs so sánh tuần tự (SequenceMatcher)
+Chạy: python benchmarks/dedupe_parity.py [--catalog 800] [--new 300] [--from-db db.sqlite]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet, synthetic_corpus  # noqa: E402
+
+from services.content_filter import ContentFilter  # noqa: E402
+
+
+def load_real_catalog(path):
+    """Đọc catalog thật (chỉ đọc) để dùng làm corpus"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    rows = conn.execute('SELECT title, video_id, reviewer_name, description FROM video_reviews ORDER BY id').fetchall()
+    conn.close()
+    return [{
+        'title': title, 'video_id': video_id, 'channel': channel, 'channel_title': channel,
+        'description': description or '', 'video_url': f"https://www.youtube.com/watch?v={video_id}",
+    } for title, video_id, channel, description in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--catalog', type=int, default=800, help='số video trong catalog giả lập')
+    parser.add_argument('--new', type=int, default=300, help='số video mới cần kiểm tra')
+    parser.add_argument('--from-db', help='dùng catalog thật: 2/3 làm catalog, 1/3 làm video mới')
+    parser.add_argument('--max-mismatch-rate', type=float, default=0.0,
+                        help='tỉ lệ quyết định lệch tối đa (mặc định 0: phải khớp hoàn toàn)')
+    args = parser.parse_args()
+
+    if args.from_db:
+        corpus = load_real_catalog(args.from_db)
+        split = len(corpus) * 2 // 3
+        # Đổi video_id để không trùng ID chính xác với catalog
+        catalog = corpus[:split]
+        incoming = [dict(v, video_id=v['video_id'] + '_new') for v in corpus[split:]]
+    else:
+        corpus = synthetic_corpus(args.catalog + args.new)
+        catalog, incoming = corpus[:args.catalog], corpus[args.catalog:]
+
+    path = create_catalog_db()
+    insert_rows(path, catalog)
+
+    with quiet():
+        content_filter = ContentFilter()
+        existing = content_filter.get_existing_videos_from_db()
+        index = content_filter.get_duplicate_index()
+        start = time.perf_counter()
+        index.sync()
+        sync_time = time.perf_counter() - start
+
+    mismatches = []
+    legacy_time = indexed_time = 0.0
+    candidate_total = legacy_duplicates = 0
+    for video in incoming:
+        with quiet():
+            start = time.perf_counter()
+            legacy = content_filter.is_duplicate_video(video, existing)
+            legacy_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            indexed = content_filter.is_duplicate_in_catalog(video, index)
+            indexed_time += time.perf_counter() - start
+            candidate_total += len(index.candidates(content_filter.index_fields(video), video['video_id']))
+        legacy_duplicates += legacy
+        if legacy != indexed:
+            mismatches.append((video['title'], legacy, indexed))
+
+    count = max(len(incoming), 1)
+    print(f"Catalog: {len(catalog)} rows (index build {sync_time:.2f}s), new videos: {len(incoming)}")
+    print(f"Legacy duplicates: {legacy_duplicates}")
+    print(f"Legacy scan:  {legacy_time:.2f}s")
+    print(f"LSH index:    {indexed_time:.2f}s "
+          f"(avg {candidate_total / count:.1f} candidates/video, "
+          f"{100 * candidate_total / count / max(len(catalog), 1):.1f}% of catalog)")
+    print(f"Decision mismatches: {len(mismatches)}/{len(incoming)}")
+    for title, legacy, indexed in mismatches[:20]:
+        print(f"   legacy={legacy} indexed={indexed}: {title[:70]}")
+    os.unlink(path)
+    return 1 if len(mismatches) / count > args.max_mismatch_rate else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
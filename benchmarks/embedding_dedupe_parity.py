@@ -0,0 +1,73 @@
+"""
+Kiểm tra parity: so sánh trong cùng batch vs so sánh với catalog của EmbeddingDuplicateDetector
+Cùng một cặp video phải cho cùng quyết định dù video cũ nằm trong catalog hay vừa được nhận trong batch,
+kể cả khi láng giềng gần nhất là video khác kênh dưới ngưỡng khác kênh.
+Dùng mô hình giả (vector cố định), không cần sentence_transformers.
+Chạy: python benchmarks/embedding_dedupe_parity.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import create_catalog_db, insert_rows, quiet  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+from services import write_queue  # noqa: E402
+from services.embedding_dedupe import EmbeddingDuplicateDetector  # noqa: E402
+
+# Video mới C: gần nhất là B (khác kênh, 0.88 < 0.92), sau đó là A (cùng kênh, 0.86 >= 0.85) => trùng với A
+VECTORS = {
+    'Review phim Bóng Đêm - Phần A': [0.86, -0.2, (1 - 0.86 ** 2 - 0.2 ** 2) ** 0.5],
+    'Review phim Bóng Đêm - Phần B': [0.88, (1 - 0.88 ** 2) ** 0.5, 0.0],
+    'Review phim Bóng Đêm - Phần C': [1.0, 0.0, 0.0],
+}
+CHANNELS = {'A': 'Mèo Mê Phim', 'B': 'NiNi Mê Phim', 'C': 'Mèo Mê Phim'}
+
+
+class FixedVectorModel:
+    """Mô hình giả: tra vector theo tiêu đề (phần trước dấu '. ' của embedding_text)"""
+
+    def encode(self, texts, **kwargs):
+        return np.asarray([VECTORS[text.split('. ')[0]] for text in texts], dtype=np.float32)
+
+
+def video(name):
+    title = f'Review phim Bóng Đêm - Phần {name}'
+    return {'title': title, 'video_id': f'vid_{name}', 'channel': CHANNELS[name], 'channel_title': CHANNELS[name],
+            'description': '', 'video_url': f'https://www.youtube.com/watch?v=vid_{name}'}
+
+
+def run(catalog, batch):
+    """Trả về video_id được giữ lại khi lọc batch trên catalog cho trước"""
+    path = create_catalog_db()
+    insert_rows(path, catalog)
+    try:
+        with quiet():
+            detector = EmbeddingDuplicateDetector(model=FixedVectorModel(), db_path=path)
+            kept = detector.filter_duplicates(batch, time_budget=30)
+        return [v['video_id'] for v in kept]
+    finally:
+        write_queue.close_all()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    a, b, c = video('A'), video('B'), video('C')
+    results = {
+        'catalog': run([a, b], [c]),
+        'same batch': run([], [a, b, c]),
+    }
+    for mode, kept in results.items():
+        print(f"{mode:>10}: kept {kept}")
+    failed = 'vid_C' in results['catalog'] or 'vid_C' in results['same batch']
+    print("❌ Mismatch: C should be a same-channel duplicate of A" if failed else "✅ Decisions match")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Server giả lập YouTube Data API v3 + oEmbed + trang embed (chạy offline, tái lập được)
+Phục vụ search.list, videos.list, playlistItems.list từ corpus tổng hợp có seed
+Hỗ trợ độ trễ, tỉ lệ lỗi 5xx và giới hạn quota (403 quotaExceeded) để đo throughput / khả năng chịu lỗi
+
+Chạy độc lập: python benchmarks/fake_youtube_server.py --port 8765 --latency 0.05
+rồi đặt YOUTUBE_API_BASE_URL=http://127.0.0.1:8765 và YOUTUBE_WEB_BASE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import synthetic_corpus  # noqa: E402
+
+# Chi phí quota theo tài liệu YouTube Data API
+QUOTA_COST = {'search': 100, 'videos': 1, 'playlistItems': 1}
+
+
+def iso_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"PT{hours}H{minutes}M{seconds}S" if hours else f"PT{minutes}M{seconds}S"
+
+
+class FakeYouTubeServer:
+    """Server HTTP chạy trên thread nền; base_url dùng cho YOUTUBE_API_BASE_URL / YOUTUBE_WEB_BASE_URL"""
+
+    def __init__(self, size=2000, seed=2024, latency=0.0, jitter=0.0, error_rate=0.0,
+                 quota_limit=None, results_per_query=200, host='127.0.0.1', port=0):
+        self.corpus = synthetic_corpus(size, seed=seed, duplicate_rate=0.05)
+        self.by_id = {video['video_id']: video for video in self.corpus}
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_limit = quota_limit
+        self.results_per_query = results_per_query
+        self.requests = Counter()
+        self.errors = Counter()
+        self.quota_used = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-youtube', daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- dữ liệu ----
+
+    def query_results(self, query):
+        """Kết quả cố định cho mỗi query: một đoạn corpus bắt đầu từ vị trí theo crc32(query)"""
+        start = zlib.crc32(query.encode('utf-8')) % len(self.corpus)
+        count = min(self.results_per_query, len(self.corpus))
+        return [self.corpus[(start + i) % len(self.corpus)] for i in range(count)]
+
+    def page(self, videos, params, default_size=5):
+        size = min(int(params.get('maxResults', default_size)), 50)
+        offset = int(params.get('pageToken') or 0)
+        items = videos[offset:offset + size]
+        next_token = str(offset + size) if offset + size < len(videos) else None
+        return items, next_token
+
+    def snippet(self, video):
+        return {
+            'title': video['title'],
+            'description': video['description'],
+            'channelTitle': video['channel'],
+            'channelId': f"UC{zlib.crc32(video['channel'].encode('utf-8')):010d}",
+            'publishedAt': video['published_at'],
+            'thumbnails': {'high': {'url': video['thumbnail']}, 'default': {'url': video['thumbnail']}},
+        }
+
+    def search(self, params):
+        items, next_token = self.page(self.query_results(params.get('q', '')), params)
+        body = {
+            'kind': 'youtube#searchListResponse',
+            'items': [{'id': {'kind': 'youtube#video', 'videoId': v['video_id']}, 'snippet': self.snippet(v)}
+                      for v in items],
+            'pageInfo': {'totalResults': self.results_per_query, 'resultsPerPage': len(items)},
+        }
+        if next_token:
+            body['nextPageToken'] = next_token
+        return body
+
+    def videos(self, params):
+        ids = [i for i in params.get('id', '').split(',') if i][:50]
+        items = []
+        for video_id in ids:
+            video = self.by_id.get(video_id)
+            if not video:
+                continue
+            items.append({
+                'id': video_id,
+                'snippet': self.snippet(video),
+                'contentDetails': {'duration': iso_duration(video['duration'])},
+                'statistics': {
+                    'viewCount': str(video['view_count']),
+                    'likeCount': str(video['like_count']),
+                    'commentCount': str(video['comment_count']),
+                },
+            })
+        return {'kind': 'youtube#videoListResponse', 'items': items}
+
+    def playlist_items(self, params):
+        videos = self.query_results('playlist:' + params.get('playlistId', ''))
+        items, next_token = self.page(videos, params)
+        body = {
+            'kind': 'youtube#playlistItemListResponse',
+            'items': [{'snippet': dict(self.snippet(v), resourceId={'kind': 'youtube#video', 'videoId': v['video_id']}),
+                       'contentDetails': {'videoId': v['video_id']}} for v in items],
+        }
+        if next_token:
+            body['nextPageToken'] = next_token
+        return body
+
+    def oembed(self, params):
+        video_id = parse_qs(urlparse(params.get('url', '')).query).get('v', [''])[0]
+        video = self.by_id.get(video_id)
+        if not video:
+            return None
+        return {'title': video['title'], 'author_name': video['channel'], 'type': 'video',
+                'thumbnail_url': video['thumbnail'], 'thumbnail_width': 480, 'thumbnail_height': 360}
+
+    # ---- mô phỏng lỗi ----
+
+    def simulate(self, endpoint, params):
+        """Trả về (status, body) nếu request bị lỗi giả lập, None nếu tiếp tục xử lý"""
+        with self._lock:
+            self.requests[endpoint] += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            failed = self.error_rate and self._rng.random() < self.error_rate
+            quota_exceeded = False
+            if endpoint in QUOTA_COST and self.quota_limit is not None:
+                key = params.get('key', '')
+                if self.quota_used[key] + QUOTA_COST[endpoint] > self.quota_limit:
+                    quota_exceeded = True
+                else:
+                    self.quota_used[key] += QUOTA_COST[endpoint]
+        if delay:
+            time.sleep(delay)
+        if quota_exceeded:
+            self.errors['quotaExceeded'] += 1
+            return 403, {'error': {'code': 403, 'message': 'The request cannot be completed because you have exceeded your quota.',
+                                   'errors': [{'reason': 'quotaExceeded', 'domain': 'youtube.quota'}]}}
+        if failed:
+            self.errors['backendError'] += 1
+            return 503, {'error': {'code': 503, 'message': 'Backend Error',
+                                   'errors': [{'reason': 'backendError', 'domain': 'global'}]}}
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, status, body, content_type='application/json; charset=UTF-8'):
+                data = body.encode('utf-8') if isinstance(body, str) else json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                path = parsed.path.rstrip('/')
+                api = {'/youtube/v3/search': ('search', server.search),
+                       '/youtube/v3/videos': ('videos', server.videos),
+                       '/youtube/v3/playlistItems': ('playlistItems', server.playlist_items)}
+
+                if path in api:
+                    endpoint, handler = api[path]
+                    failure = server.simulate(endpoint, params)
+                    if failure:
+                        return self.send_body(*failure)
+                    return self.send_body(200, handler(params))
+
+                if path == '/oembed':
+                    failure = server.simulate('oembed', params)
+                    if failure:
+                        return self.send_body(*failure)
+                    body = server.oembed(params)
+                    return self.send_body(200, body) if body else self.send_body(404, 'Not Found', 'text/plain')
+
+                if path.startswith('/embed/'):
+                    failure = server.simulate('embed', params)
+                    if failure:
+                        return self.send_body(failure[0], 'Error', 'text/html')
+                    video = server.by_id.get(path.split('/')[-1])
+                    if not video:
+                        return self.send_body(404, 'Not Found', 'text/html')
+                    page = f"<html><head><title>{html.escape(video['title'])} - YouTube</title></head><body></body></html>"
+                    return self.send_body(200, page, 'text/html; charset=utf-8')
+
+                self.send_body(404, {'error': {'code': 404, 'message': 'Not Found'}})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--size', type=int, default=2000, help='số video trong corpus')
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--latency', type=float, default=0.0, help='độ trễ mỗi request (giây)')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='tỉ lệ trả về 503')
+    parser.add_argument('--quota', type=int, default=None, help='quota (unit) cho mỗi API key')
+    args = parser.parse_args()
+
+    server = FakeYouTubeServer(size=args.size, seed=args.seed, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, quota_limit=args.quota, port=args.port)
+    print(f"🎭 Fake YouTube server on {server.base_url} ({len(server.corpus)} videos)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(f"Requests: {dict(server.requests)}  errors: {dict(server.errors)}")
+
+
+if __name__ == '__main__':
+    main()
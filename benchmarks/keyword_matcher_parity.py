@@ -0,0 +1,52 @@
+"""
+Kiểm tra parity: KeywordMatcher (từ khóa biên dịch sẵn) vs các phép 'in' / re.search tuần tự trước đây
+So sánh cả 3 cờ (review / movie / excluded) và lý do ghi log trên tập mẫu tổng hợp đã gán nhãn bằng logic cũ
+Chạy: python benchmarks/keyword_matcher_parity.py [--samples 50000]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import keyword_samples, legacy_is_movie_review, quiet  # noqa: E402
+
+from services.content_filter import ContentFilter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args()
+
+    with quiet():
+        content_filter = ContentFilter()
+    samples = keyword_samples(args.samples, seed=args.seed)
+
+    mismatches = []
+    positives = 0
+    for video in samples:
+        expected = legacy_is_movie_review(video)
+        text = f"{video['title'].lower()} {video['description'].lower()}"
+        actual = content_filter.keyword_matcher.flags(text)
+        # Từ khóa ghi trong lý do phải khớp với cờ tương ứng
+        matches = content_filter.keyword_matcher.match(text)
+        reasons = tuple(bool(matches[name]) for name in ('review', 'movie', 'excluded'))
+        with quiet():
+            decision = content_filter.is_movie_review_video(video)
+        label = expected[0] and expected[1] and not expected[2]
+        positives += label
+        if actual != expected or reasons != expected or decision != label:
+            mismatches.append((video['title'], expected, actual))
+
+    print(f"Samples: {len(samples)} ({positives} labelled movie reviews, {len(samples) - positives} rejected)")
+    print(f"Mismatches: {len(mismatches)}")
+    for title, expected, actual in mismatches[:20]:
+        print(f"   legacy={expected} matcher={actual}: {title[:70]}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
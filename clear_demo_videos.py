@@ -1,13 +1,8 @@
-import sqlite3
+from services import write_queue
 
-# Kết nối DB
-conn = sqlite3.connect("db.sqlite")
-cursor = conn.cursor()
-
-# Xóa video demo (video_url bắt đầu bằng VN là video fake demo)
-cursor.execute("DELETE FROM video_reviews WHERE video_url LIKE 'https://www.youtube.com/watch?v=VN%'")
-
-conn.commit()
-conn.close()
+# Xóa video demo (video_url bắt đầu bằng VN là video fake demo), ghi qua writer thread
+# (chờ write lock theo busy timeout nếu app đang ghi, không lỗi "database is locked")
+write_queue.get_write_queue().execute(
+    "DELETE FROM video_reviews WHERE video_url LIKE 'https://www.youtube.com/watch?v=VN%'").result()
 
 print("✅ Đã xóa tất cả video demo cũ.")
@@ -3,9 +3,11 @@ Auto-Update Service - Fixed Version
 Hệ thống cập nhật tự động video review
 """
 
+import json
 import sqlite3
 from datetime import datetime
 import config
+from services import catalog_counters, update_logs, write_queue
 
 class AutoUpdateService:
     def __init__(self):
@@ -17,17 +19,8 @@ class AutoUpdateService:
             conn = sqlite3.connect('db.sqlite')
             cursor = conn.cursor()
 
-            # Create update logs table if not exists
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS update_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT NOT NULL,
-                    message TEXT,
-                    videos_found INTEGER DEFAULT 0,
-                    videos_added INTEGER DEFAULT 0
-                )
-            ''')
+            # update_logs + index (status, timestamp)
+            update_logs.ensure_update_logs_schema(conn)
 
             # Create auto-update settings table if not exists
             cursor.execute('''
@@ -67,19 +60,11 @@ class AutoUpdateService:
             cursor.execute('SELECT * FROM auto_update_settings WHERE id = 1')
             settings = cursor.fetchone()
 
-            # Get total videos
-            cursor.execute('SELECT COUNT(*) FROM video_reviews')
-            total_videos = cursor.fetchone()[0]
+            # Tổng số video từ catalog_counters (không COUNT(*) cả bảng)
+            total_videos = catalog_counters.total_videos(conn)
 
-            # Get last successful update
-            cursor.execute('''
-                SELECT timestamp, videos_found, videos_added
-                FROM update_logs 
-                WHERE status = 'SUCCESS'
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ''')
-            last_success = cursor.fetchone()
+            # Lần cập nhật thành công gần nhất (index update_logs(status, timestamp))
+            last_success = update_logs.last_successful_update(conn)
 
             conn.close()
 
@@ -87,11 +72,7 @@ class AutoUpdateService:
                 'enabled': bool(settings[1]) if settings else True,
                 'last_update': settings[2] if settings else None,
                 'total_videos_added': total_videos,
-                'last_successful_update': {
-                    'timestamp': last_success[0] if last_success else None,
-                    'videos_found': last_success[1] if last_success else 0,
-                    'videos_added': last_success[2] if last_success else 0
-                } if last_success else None
+                'last_successful_update': last_success
             }
 
         except Exception as e:
@@ -105,11 +86,7 @@ class AutoUpdateService:
     def enable(self):
         """Enable auto-update"""
         try:
-            conn = sqlite3.connect('db.sqlite')
-            cursor = conn.cursor()
-            cursor.execute('UPDATE auto_update_settings SET enabled = 1 WHERE id = 1')
-            conn.commit()
-            conn.close()
+            write_queue.get_write_queue().execute('UPDATE auto_update_settings SET enabled = 1 WHERE id = 1').result()
             return True
         except Exception as e:
             print(f"❌ Error enabling auto-update: {e}")
@@ -118,11 +95,7 @@ class AutoUpdateService:
     def disable(self):
         """Disable auto-update"""
         try:
-            conn = sqlite3.connect('db.sqlite')
-            cursor = conn.cursor()
-            cursor.execute('UPDATE auto_update_settings SET enabled = 0 WHERE id = 1')
-            conn.commit()
-            conn.close()
+            write_queue.get_write_queue().execute('UPDATE auto_update_settings SET enabled = 0 WHERE id = 1').result()
             return True
         except Exception as e:
             print(f"❌ Error disabling auto-update: {e}")
@@ -135,10 +108,12 @@ class AutoUpdateService:
             from services.smart_youtube_service import SmartYouTubeService
             
             smart_service = SmartYouTubeService()
-            result = smart_service.fetch_and_add_videos()
+            result = smart_service.fetch_and_add_videos(force=True)
             
             # Log the update
-            self.log_update('SUCCESS', f'Manual update completed', result.get('found', 0), result.get('added', 0))
+            self.log_update('SUCCESS', f'Manual update completed (crawl run #{result.get("run_id")})',
+                            result.get('found', 0), result.get('added', 0),
+                            result.get('stage_metrics'))
             
             return result
             
@@ -147,20 +122,15 @@ class AutoUpdateService:
             self.log_update('ERROR', f'Manual update failed: {str(e)}', 0, 0)
             return {'found': 0, 'added': 0, 'error': str(e)}
 
-    def log_update(self, status, message, videos_found, videos_added):
-        """Log update activity"""
+    def log_update(self, status, message, videos_found, videos_added, stage_metrics=None):
+        """Log update activity (kèm số liệu từng stage nếu có), ghi qua writer thread của process"""
         try:
-            conn = sqlite3.connect('db.sqlite')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO update_logs (status, message, videos_found, videos_added)
-                VALUES (?, ?, ?, ?)
-            ''', (status, message, videos_found, videos_added))
-            
-            conn.commit()
-            conn.close()
-            
+            write_queue.get_write_queue().execute('''
+                INSERT INTO update_logs (status, message, videos_found, videos_added, stage_metrics)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (status, message, videos_found, videos_added,
+                  json.dumps(stage_metrics) if stage_metrics else None)).result()
+
         except Exception as e:
             print(f"❌ Error logging update: {e}")
 
@@ -0,0 +1,349 @@
+"""
+Backups - Sao lưu db.sqlite trực tuyến bằng SQLite backup API, nén gzip, giữ theo lịch và khôi phục
+- create_snapshot(): Connection.backup() từng BACKUP_PAGES_PER_STEP trang trên một read snapshot của WAL,
+  nghỉ giữa các bước nên crawler / request vẫn đọc ghi bình thường; bản copy được PRAGMA integrity_check
+  trước khi nén thành <BACKUP_DIR>/reviewphim-YYYYmmdd-HHMMSS.sqlite.gz (+ file .json mô tả)
+- prune_snapshots(): giữ BACKUP_KEEP_LAST bản mới nhất + bản mới nhất của mỗi ngày / tuần gần đây
+- restore_snapshot(): chụp bản 'pre-restore' của database hiện tại, giải nén + kiểm tra bản được chọn,
+  rồi ghi đè database đang chạy bằng backup API trên connection của writer thread (thao tác exclusive của
+  services.write_queue, một transaction, reader WAL vẫn đọc bản cũ tới khi commit).
+  Bảng vận hành (lịch sử job, lease, lịch APScheduler) được giữ nguyên theo database hiện tại; migration
+  (services.schema) chạy trên bản giải nén trước khi ghi đè.
+
+CLI: python -m services.backups create | list | prune | restore <name>
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+import config
+from services import schema, write_queue
+
+TIMEZONE = pytz.timezone('Asia/Ho_Chi_Minh')
+PREFIX = 'reviewphim'
+EXTENSION = '.sqlite.gz'
+NAME_PATTERN = re.compile(r'^reviewphim-\d{8}-\d{6}(-[a-z0-9-]+)?$')
+# Không khôi phục từ bản sao lưu: lịch sử / tiến độ job đang chạy, lease và lịch của scheduler
+OPERATIONAL_TABLES = ('job_runs', 'job_events', 'scheduler_leases', 'apscheduler_jobs')
+
+
+class BackupRestarted(Exception):
+    """Database nguồn bị ghi quá nhiều lần trong lúc backup từng bước"""
+
+
+def snapshot_dir(directory=None):
+    directory = directory or config.BACKUP_DIR
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def snapshot_path(name, directory=None):
+    if not NAME_PATTERN.match(name or ''):
+        raise ValueError(f"Tên bản sao lưu không hợp lệ: {name}")
+    path = os.path.join(snapshot_dir(directory), name + EXTENSION)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Không tìm thấy bản sao lưu: {name}")
+    return path
+
+
+def _report(progress, phase, done=0, total=0):
+    if progress is not None:
+        progress('progress', {'phase': phase, 'done': done, 'total': total})
+
+
+def _remove(*paths):
+    for path in paths:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def online_copy(source_path, dest_path, pages=None, sleep=None, max_restarts=None, progress=None):
+    """Copy database đang chạy sang dest_path bằng backup API, từng bước nhỏ
+
+    WAL (như app): connection nguồn giữ một read transaction suốt quá trình nên mọi bước đọc cùng một
+    snapshot - writer / reader khác không bị chặn và backup không bị chạy lại khi có người ghi.
+    Rollback journal: giữa các bước không giữ lock; nguồn bị ghi thì backup chạy lại từ đầu, quá
+    max_restarts lần thì copy một lần (chặn writer trong lúc copy).
+    Trả về {'pages', 'restarts', 'single_step'}.
+    """
+    pages = pages or config.BACKUP_PAGES_PER_STEP
+    sleep = config.BACKUP_STEP_SLEEP if sleep is None else sleep
+    max_restarts = config.BACKUP_MAX_RESTARTS if max_restarts is None else max_restarts
+    state = {'remaining': None, 'restarts': 0, 'reported': 0}
+
+    def step(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise BackupRestarted(f"database bị ghi {state['restarts']} lần trong lúc backup")
+        state['remaining'] = remaining
+        done = total - remaining
+        if progress is not None and total and (done - state['reported'] >= total / 10 or remaining == 0):
+            state['reported'] = done
+            _report(progress, 'backup', done, total)
+        if remaining and sleep:
+            time.sleep(sleep)  # tham số sleep của Connection.backup chỉ áp dụng khi bước bị BUSY / LOCKED
+
+    source = sqlite3.connect(source_path, timeout=30, isolation_level=None)
+    try:
+        pinned = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+        if pinned:
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()  # mở read snapshot
+        single_step = False
+        dest = sqlite3.connect(dest_path)
+        try:
+            try:
+                source.backup(dest, pages=pages, progress=step)
+            except BackupRestarted as e:
+                print(f"⚠️ {e}, copy một lần")
+                single_step = True
+                source.backup(dest, pages=-1)
+            page_count = dest.execute('PRAGMA page_count').fetchone()[0]
+            # Bản copy giữ cờ WAL của nguồn: chuyển về rollback journal để file .sqlite tự đủ
+            dest.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dest.close()
+        if pinned:
+            source.execute('COMMIT')
+    finally:
+        source.close()
+    return {'pages': page_count, 'restarts': state['restarts'], 'single_step': single_step}
+
+
+def integrity_check(path):
+    """Kết quả PRAGMA integrity_check của file database: ['ok'] nếu không có lỗi"""
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    finally:
+        conn.close()
+
+
+def _video_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM video_reviews').fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def create_snapshot(db_path=None, directory=None, label=None, progress=None):
+    """Sao lưu + kiểm tra + nén database, trả về thông tin bản sao lưu (cũng được ghi vào <name>.json)"""
+    db_path = db_path or config.DATABASE_PATH
+    directory = snapshot_dir(directory)
+    started = time.perf_counter()
+    now = datetime.now(TIMEZONE)
+    name = f"{PREFIX}-{now.strftime('%Y%m%d-%H%M%S')}" + (f"-{label}" if label else '')
+    raw_path = os.path.join(directory, name + '.sqlite.partial')
+    gz_path = os.path.join(directory, name + EXTENSION)
+    try:
+        copy = online_copy(db_path, raw_path, progress=progress)
+        _report(progress, 'verify')
+        problems = integrity_check(raw_path)
+        if problems != ['ok']:
+            raise RuntimeError(f"integrity_check lỗi trên bản sao lưu: {'; '.join(problems[:5])}")
+        videos = _video_count(raw_path)
+        db_bytes = os.path.getsize(raw_path)
+
+        _report(progress, 'compress')
+        with open(raw_path, 'rb') as src, gzip.open(gz_path + '.partial', 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(gz_path + '.partial', gz_path)
+    finally:
+        _remove(raw_path, gz_path + '.partial')
+
+    info = {
+        'name': name,
+        'created_at': now.isoformat(),
+        'label': label,
+        'videos': videos,
+        'db_bytes': db_bytes,
+        'bytes': os.path.getsize(gz_path),
+        'pages': copy['pages'],
+        'restarts': copy['restarts'],
+        'single_step': copy['single_step'],
+        'integrity': 'ok',
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    with open(os.path.join(directory, name + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    print(f"💾 Backup {name}: {videos} videos, {info['bytes'] / 1e6:.1f} MB in {info['seconds']}s")
+    return info
+
+
+def list_snapshots(directory=None):
+    """Các bản sao lưu, mới nhất trước (thông tin từ file .json, hoặc từ file .gz nếu thiếu)"""
+    directory = snapshot_dir(directory)
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(EXTENSION):
+            continue
+        name = filename[:-len(EXTENSION)]
+        if not NAME_PATTERN.match(name):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            with open(os.path.join(directory, name + '.json'), encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            stamp = datetime.strptime(name[len(PREFIX) + 1:len(PREFIX) + 16], '%Y%m%d-%H%M%S')
+            info = {'name': name, 'created_at': TIMEZONE.localize(stamp).isoformat(), 'integrity': None}
+        info['bytes'] = os.path.getsize(path)
+        snapshots.append(info)
+    snapshots.sort(key=lambda info: info['name'][:len(PREFIX) + 16], reverse=True)
+    return snapshots
+
+
+def select_expired(snapshots, now=None, keep_last=None, keep_daily=None, keep_weekly=None):
+    """Tên các bản sao lưu nằm ngoài quy tắc giữ lại (snapshots: mới nhất trước, như list_snapshots)"""
+    keep_last = config.BACKUP_KEEP_LAST if keep_last is None else keep_last
+    keep_daily = config.BACKUP_KEEP_DAILY if keep_daily is None else keep_daily
+    keep_weekly = config.BACKUP_KEEP_WEEKLY if keep_weekly is None else keep_weekly
+    now = now or datetime.now(TIMEZONE)
+    kept = {info['name'] for info in snapshots[:keep_last]}
+    days, weeks = set(), set()
+    for info in snapshots:
+        created = datetime.fromisoformat(info['created_at'])
+        day, week = created.date(), created.isocalendar()[:2]
+        if now - created <= timedelta(days=keep_daily) and day not in days:
+            days.add(day)
+            kept.add(info['name'])
+        if now - created <= timedelta(weeks=keep_weekly) and week not in weeks:
+            weeks.add(week)
+            kept.add(info['name'])
+    return [info['name'] for info in snapshots if info['name'] not in kept]
+
+
+def prune_snapshots(directory=None, now=None):
+    """Xóa các bản sao lưu hết hạn giữ, trả về danh sách tên đã xóa"""
+    directory = snapshot_dir(directory)
+    expired = select_expired(list_snapshots(directory), now)
+    for name in expired:
+        for extension in (EXTENSION, '.json'):
+            path = os.path.join(directory, name + extension)
+            if os.path.exists(path):
+                os.unlink(path)
+    return expired
+
+
+def _carry_over_operational_tables(restored_path, live_path):
+    """Thay bảng vận hành trong bản giải nén bằng dữ liệu hiện tại của database đang chạy"""
+    conn = sqlite3.connect(restored_path, isolation_level=None)
+    try:
+        conn.execute('ATTACH DATABASE ? AS live', (live_path,))
+        conn.execute('BEGIN')
+        for table in OPERATIONAL_TABLES:
+            row = conn.execute("SELECT sql FROM live.sqlite_master WHERE type = 'table' AND name = ?",
+                               (table,)).fetchone()
+            if row is None:
+                continue
+            extras = [sql for (sql,) in conn.execute('''
+                SELECT sql FROM live.sqlite_master
+                WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+            ''', (table,))]
+            conn.execute(f'DROP TABLE IF EXISTS main."{table}"')
+            conn.execute(row[0])
+            conn.execute(f'INSERT INTO main."{table}" SELECT * FROM live."{table}"')
+            for sql in extras:
+                conn.execute(sql)
+        conn.execute('COMMIT')
+        conn.execute('DETACH DATABASE live')
+    finally:
+        conn.close()
+
+
+def restore_snapshot(name, db_path=None, directory=None, progress=None):
+    """Khôi phục database từ bản sao lưu name; luôn sao lưu database hiện tại trước (nhãn pre-restore)
+
+    Tiến độ chỉ được báo trước bước ghi đè vì progress cũng ghi vào cùng database.
+    """
+    db_path = db_path or config.DATABASE_PATH
+    directory = snapshot_dir(directory)
+    gz_path = snapshot_path(name, directory)
+    started = time.perf_counter()
+
+    safety = create_snapshot(db_path, directory, label='pre-restore', progress=progress)
+
+    _report(progress, 'decompress')
+    raw_path = os.path.join(directory, name + '.restore.partial')
+    try:
+        with gzip.open(gz_path, 'rb') as src, open(raw_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        _report(progress, 'verify')
+        problems = integrity_check(raw_path)
+        if problems != ['ok']:
+            raise RuntimeError(f"Bản sao lưu {name} bị lỗi: {'; '.join(problems[:5])}")
+        videos = _video_count(raw_path)
+        # Bản sao lưu cũ có thể thiếu cột / trigger counters / UNIQUE(video_id)...: migrate trước khi ghi đè
+        # để mọi process (đã nhớ là schema đủ) dùng được ngay database khôi phục
+        _report(progress, 'migrate')
+        conn = sqlite3.connect(raw_path)
+        try:
+            schema.ensure_schema(conn)
+        finally:
+            conn.close()
+        _report(progress, 'restore')
+
+        def overwrite(conn):
+            # Chép bảng vận hành rồi ghi đè trong một thao tác exclusive của writer: thao tác ghi khác của process
+            # (kể cả sự kiện tiến độ) chờ tới sau khi ghi đè nên không bị mất giữa hai bước
+            _carry_over_operational_tables(raw_path, db_path)
+            source = sqlite3.connect(raw_path)
+            try:
+                source.backup(conn)  # một bước: database đích bị khóa ghi trong lúc copy
+            finally:
+                source.close()
+
+        write_queue.write(overwrite, db_path=db_path, exclusive=True)
+        schema.reset_schema_caches()
+    finally:
+        _remove(raw_path)
+
+    result = {'restored': name, 'videos': videos, 'pre_restore_backup': safety['name'],
+              'seconds': round(time.perf_counter() - started, 2)}
+    print(f"♻️ Restored {name}: {videos} videos (bản trước khi khôi phục: {safety['name']})")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sao lưu / khôi phục database (SQLite backup API)')
+    parser.add_argument('operation', choices=['create', 'list', 'prune', 'restore'])
+    parser.add_argument('name', nargs='?', help='tên bản sao lưu cần khôi phục')
+    parser.add_argument('--db', default=None, help='mặc định config.DATABASE_PATH')
+    parser.add_argument('--dir', default=None, help='mặc định config.BACKUP_DIR')
+    args = parser.parse_args()
+
+    if args.operation == 'create':
+        create_snapshot(args.db, args.dir)
+        expired = prune_snapshots(args.dir)
+        if expired:
+            print(f"🧹 Removed {len(expired)} expired backups")
+    elif args.operation == 'list':
+        for info in list_snapshots(args.dir):
+            print(f"{info['name']:<45} {info['bytes'] / 1e6:>8.1f} MB  {info.get('videos')} videos  "
+                  f"integrity={info.get('integrity')}")
+    elif args.operation == 'prune':
+        print(f"🧹 Removed: {', '.join(prune_snapshots(args.dir)) or 'none'}")
+    else:
+        if not args.name:
+            parser.error('restore cần tên bản sao lưu (xem: list)')
+        restore_snapshot(args.name, args.db, args.dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
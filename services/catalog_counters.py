@@ -0,0 +1,220 @@
+"""
+Catalog Counters - Bảng catalog_counters (scope, key, count) được trigger trên video_reviews giữ đúng
+- scope 'total' (key ''), 'channel' (reviewer_name), 'genre', 'day' (ngày tạo theo giờ Việt Nam, YYYY-MM-DD)
+- INSERT / DELETE: +1 / -1 cho từng scope; UPDATE đổi kênh / thể loại / created_at: chuyển sang key mới
+- Trang admin / grid đọc số đếm bằng tra cứu khóa chính thay cho COUNT(*) trên cả catalog
+Giá trị NULL được đếm dưới key ''. Key có count 0 được giữ lại (summary() bỏ qua).
+
+CLI: python -m services.catalog_counters [summary | check | rebuild]
+"""
+
+import argparse
+import sqlite3
+import sys
+
+import config
+from services import write_queue
+
+TABLE = 'video_reviews'
+COUNTERS_TABLE = 'catalog_counters'
+
+# scope -> biểu thức key trên một dòng video_reviews ({row} = NEW / OLD / tên bảng)
+SCOPES = {
+    'total': "''",
+    'channel': "COALESCE({row}.reviewer_name, '')",
+    'genre': "COALESCE({row}.genre, '')",
+    'day': "COALESCE(date({row}.created_at, '+7 hours'), '')",
+}
+TRACKED_COLUMNS = ('reviewer_name', 'genre', 'created_at')
+TRIGGERS = ('trg_catalog_counters_insert', 'trg_catalog_counters_delete', 'trg_catalog_counters_update')
+
+
+def _key(scope, row):
+    return SCOPES[scope].format(row=row)
+
+
+def _increment(row, scopes):
+    values = ', '.join(f"('{scope}', {_key(scope, row)}, 1)" for scope in scopes)
+    return (f'INSERT INTO {COUNTERS_TABLE} (scope, key, count) VALUES {values} '
+            'ON CONFLICT(scope, key) DO UPDATE SET count = count + 1;')
+
+
+def _decrement(row, scopes):
+    return ' '.join(f"UPDATE {COUNTERS_TABLE} SET count = count - 1 WHERE scope = '{scope}' "
+                    f"AND key = {_key(scope, row)};" for scope in scopes)
+
+
+def trigger_sql():
+    """[CREATE TRIGGER] giữ catalog_counters khớp video_reviews"""
+    moved = [scope for scope in SCOPES if scope != 'total']
+    changed = ' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in TRACKED_COLUMNS)
+    return [
+        f'''CREATE TRIGGER {TRIGGERS[0]} AFTER INSERT ON {TABLE}
+            BEGIN {_increment('NEW', SCOPES)} END''',
+        f'''CREATE TRIGGER {TRIGGERS[1]} AFTER DELETE ON {TABLE}
+            BEGIN {_decrement('OLD', SCOPES)} END''',
+        f'''CREATE TRIGGER {TRIGGERS[2]} AFTER UPDATE OF {', '.join(TRACKED_COLUMNS)} ON {TABLE}
+            WHEN {changed}
+            BEGIN {_decrement('OLD', moved)} {_increment('NEW', moved)} END''',
+    ]
+
+
+def rebuild_counters(conn):
+    """Đếm lại toàn bộ từ video_reviews (trong transaction hiện tại của conn)"""
+    conn.execute(f'DELETE FROM {COUNTERS_TABLE}')
+    for scope in SCOPES:
+        conn.execute(f'''
+            INSERT INTO {COUNTERS_TABLE} (scope, key, count)
+            SELECT '{scope}', {_key(scope, TABLE)}, COUNT(*) FROM {TABLE} GROUP BY 2
+        ''')
+    conn.execute(f"INSERT OR IGNORE INTO {COUNTERS_TABLE} (scope, key, count) VALUES ('total', '', 0)")
+
+
+def ensure_catalog_counters(conn):
+    """Migration: bảng + trigger; lần đầu (hoặc khi thiếu trigger) đếm lại trong cùng transaction"""
+    existing = {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (?, ?, ?, ?)",
+        (COUNTERS_TABLE,) + TRIGGERS)}
+    if existing == {COUNTERS_TABLE, *TRIGGERS}:
+        return False
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Kiểm tra lại sau khi có write lock: worker khác có thể vừa tạo xong
+        existing = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (?, ?, ?, ?)",
+            (COUNTERS_TABLE,) + TRIGGERS)}
+        if existing == {COUNTERS_TABLE, *TRIGGERS}:
+            conn.commit()
+            return False
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {COUNTERS_TABLE} (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope, key)
+            ) WITHOUT ROWID
+        ''')
+        for name in TRIGGERS:
+            conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        for sql in trigger_sql():
+            conn.execute(sql)
+        rebuild_counters(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print("🔢 Catalog counters initialized")
+    return True
+
+
+def get_count(conn, scope, key=''):
+    """Số đếm của (scope, key); None nếu chưa có bảng counters (gọi COUNT(*) thay thế)"""
+    try:
+        row = conn.execute(f'SELECT count FROM {COUNTERS_TABLE} WHERE scope = ? AND key = ?',
+                           (scope, key)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None:
+        return 0 if scope != 'total' else None
+    return row[0]
+
+
+def total_videos(conn):
+    """Tổng số video: đọc counter, COUNT(*) nếu chưa có bảng counters"""
+    total = get_count(conn, 'total')
+    if total is None:
+        total = conn.execute(f'SELECT COUNT(*) FROM {TABLE}').fetchone()[0]
+    return total
+
+
+def count_for_filters(conn, filters):
+    """Số video khớp bộ lọc grid nếu trả lời được từ counters (không lọc / một kênh / một thể loại /
+    khoảng ngày), ngược lại None"""
+    keys = set(filters or {})
+    if not keys:
+        return get_count(conn, 'total')
+    if keys == {'channel'}:
+        return get_count(conn, 'channel', filters['channel'])
+    if keys == {'genre'}:
+        return get_count(conn, 'genre', filters['genre'])
+    if keys <= {'date_from', 'date_to'}:
+        try:
+            row = conn.execute(f'''
+                SELECT COALESCE(SUM(count), 0) FROM {COUNTERS_TABLE}
+                WHERE scope = 'day' AND key != '' AND key >= ? AND key <= ?
+            ''', (filters.get('date_from', '0000-00-00'), filters.get('date_to', '9999-99-99'))).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0]
+    return None
+
+
+def counts(conn, scope, limit=None, order='count'):
+    """[(key, count)] của một scope (count > 0); order='count' (giảm dần) hoặc 'key' (mới nhất trước)"""
+    order_by = 'count DESC, key' if order == 'count' else 'key DESC'
+    sql = f'SELECT key, count FROM {COUNTERS_TABLE} WHERE scope = ? AND count > 0 ORDER BY {order_by}'
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    return conn.execute(sql, (scope,)).fetchall()
+
+
+def summary(conn, channels=10, days=14):
+    """Số liệu cho trang admin: tổng, theo thể loại, top kênh, số video thêm mỗi ngày gần đây"""
+    return {
+        'total': total_videos(conn),
+        'by_genre': [{'genre': key or 'Unknown', 'count': count} for key, count in counts(conn, 'genre')],
+        'top_channels': [{'channel': key, 'count': count} for key, count in counts(conn, 'channel', channels)],
+        'by_day': [{'day': key, 'count': count}
+                   for key, count in counts(conn, 'day', days, order='key') if key],
+    }
+
+
+def verify_counters(conn):
+    """[(scope, key, counter, thực tế)] các key lệch so với đếm lại từ video_reviews"""
+    mismatches = []
+    for scope in SCOPES:
+        actual = dict(conn.execute(f'SELECT {_key(scope, TABLE)}, COUNT(*) FROM {TABLE} GROUP BY 1').fetchall())
+        stored = dict(conn.execute(f'SELECT key, count FROM {COUNTERS_TABLE} WHERE scope = ? AND count != 0',
+                                   (scope,)).fetchall())
+        if scope == 'total':
+            actual.setdefault('', 0)
+            stored.setdefault('', 0)
+        for key in set(actual) | set(stored):
+            if actual.get(key, 0) != stored.get(key, 0):
+                mismatches.append((scope, key, stored.get(key, 0), actual.get(key, 0)))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Counters của catalog video_reviews')
+    parser.add_argument('operation', nargs='?', choices=['summary', 'check', 'rebuild'], default='summary')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        ensure_catalog_counters(conn)
+        if args.operation == 'rebuild':
+            write_queue.write(rebuild_counters)
+            print(f"🔢 Rebuilt counters: {total_videos(conn)} videos")
+        elif args.operation == 'check':
+            mismatches = verify_counters(conn)
+            for scope, key, stored, actual in mismatches[:50]:
+                print(f"   ❌ {scope}/{key!r}: counter {stored}, thực tế {actual}")
+            print(f"{'✅ Counters khớp catalog' if not mismatches else f'❌ {len(mismatches)} key lệch'}")
+            return 1 if mismatches else 0
+        else:
+            data = summary(conn)
+            print(f"Tổng: {data['total']} video")
+            for row in data['by_genre']:
+                print(f"   {row['genre']:<24} {row['count']:>8}")
+            for row in data['by_day']:
+                print(f"   {row['day']}  +{row['count']}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
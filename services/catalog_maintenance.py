@@ -0,0 +1,189 @@
+"""
+Catalog Maintenance - Đánh lại ID và xóa hàng loạt video_reviews bằng câu lệnh SQL theo tập hợp
+- renumber_video_ids: INSERT ... SELECT vào bảng tạm theo thứ tự created_at, rồi đổi tên trong một transaction;
+  index / trigger được tạo lại từ sqlite_master nên luôn khớp schema hiện tại
+- delete_videos / delete_matching / delete_all_videos: xóa theo lô nhỏ, mỗi lô một thao tác ngắn của writer
+  để thao tác ghi khác không phải chờ lâu
+Mọi phần ghi chạy trên writer thread của process (services.write_queue); đánh lại id là thao tác exclusive.
+Với WAL, reader khác vẫn đọc bản cũ cho tới khi transaction commit.
+
+CLI: python -m services.catalog_maintenance renumber | delete-all
+"""
+
+import argparse
+import sqlite3
+
+import config
+from services import write_queue
+
+TABLE = 'video_reviews'
+SHADOW_TABLE = 'video_reviews_renumber'
+DELETE_CHUNK_SIZE = 500
+
+
+def _connect(db_path=None):
+    conn = sqlite3.connect(db_path or config.DATABASE_PATH, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def _report(progress, phase, done, total):
+    if progress is not None:
+        progress('progress', {'phase': phase, 'done': done, 'total': total})
+
+
+def table_schema(conn, table=TABLE):
+    """(CREATE TABLE sql, [sql của index / trigger]) lấy từ sqlite_master"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    if row is None:
+        raise ValueError(f"Table {table} does not exist")
+    extras = [sql for (sql,) in conn.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+        ORDER BY type = 'trigger', name
+    ''', (table,))]
+    return row[0], extras
+
+
+def _referencing_columns(conn):
+    """[(bảng, cột)] có FOREIGN KEY trỏ tới video_reviews.id"""
+    refs = []
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+        for fk in conn.execute(f'PRAGMA foreign_key_list("{name}")'):
+            if fk[2] == TABLE and fk[4] in (None, 'id'):
+                refs.append((name, fk[3]))
+    return refs
+
+
+def renumber_video_ids(db_path=None, progress=None):
+    """Đánh lại id 1..n theo created_at (rồi id cũ), giữ nguyên mọi cột; trả về số video
+
+    Toàn bộ chạy trong một transaction IMMEDIATE, là thao tác exclusive của writer: thao tác ghi khác chờ,
+    reader không bị ảnh hưởng. Tiến độ chỉ được báo trước / sau vì progress cũng ghi qua writer.
+    """
+    conn = _connect(db_path)
+    try:
+        _report(progress, 'renumber', 0, conn.execute(f'SELECT COUNT(*) FROM {TABLE}').fetchone()[0])
+    finally:
+        conn.close()
+    total = write_queue.write(_renumber, db_path=db_path, exclusive=True)
+    _report(progress, 'done', total, total)
+    print(f"🔢 Renumbered {total} videos")
+    return total
+
+
+def _renumber(conn):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        create_sql, extras = table_schema(conn)
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({TABLE})')]
+        data_columns = ', '.join(column for column in columns if column != 'id')
+        total = conn.execute(f'SELECT COUNT(*) FROM {TABLE}').fetchone()[0]
+
+        # Bảng ánh xạ id cũ -> id mới (cũng dùng để cập nhật các bảng có khóa ngoại tới video_reviews)
+        conn.execute('DROP TABLE IF EXISTS temp.renumber_map')
+        conn.execute('CREATE TEMP TABLE renumber_map (new_id INTEGER PRIMARY KEY, old_id INTEGER UNIQUE)')
+        conn.execute(f'''
+            INSERT INTO temp.renumber_map (new_id, old_id)
+            SELECT ROW_NUMBER() OVER (ORDER BY created_at, id), id FROM {TABLE}
+        ''')
+
+        conn.execute(f'DROP TABLE IF EXISTS {SHADOW_TABLE}')
+        conn.execute(create_sql.replace(TABLE, SHADOW_TABLE, 1))
+        conn.execute(f'''
+            INSERT INTO {SHADOW_TABLE} (id, {data_columns})
+            SELECT m.new_id, {', '.join(f'v.{column}' for column in columns if column != 'id')}
+            FROM temp.renumber_map m JOIN {TABLE} v ON v.id = m.old_id
+            ORDER BY m.new_id
+        ''')
+
+        for table, column in _referencing_columns(conn):
+            conn.execute(f'''
+                UPDATE "{table}" SET "{column}" = (SELECT new_id FROM temp.renumber_map WHERE old_id = "{column}")
+                WHERE "{column}" IN (SELECT old_id FROM temp.renumber_map)
+            ''')
+
+        # Đổi bảng: index / trigger của bảng cũ bị xóa cùng bảng, tạo lại trên bảng mới (đã có dữ liệu)
+        conn.execute('PRAGMA legacy_alter_table = ON')  # không kiểm tra lại view / trigger của bảng khác
+        conn.execute(f'DROP TABLE {TABLE}')
+        conn.execute(f'ALTER TABLE {SHADOW_TABLE} RENAME TO {TABLE}')
+        conn.execute('PRAGMA legacy_alter_table = OFF')
+        for sql in extras:
+            conn.execute(sql)
+        conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (total, TABLE))
+        conn.execute('DROP TABLE temp.renumber_map')
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        conn.execute('PRAGMA legacy_alter_table = OFF')
+        raise
+    return total
+
+
+def _delete_ids(conn, chunk):
+    return conn.execute(f'DELETE FROM {TABLE} WHERE id IN ({",".join("?" * len(chunk))})', chunk).rowcount
+
+
+def delete_videos(ids, db_path=None, progress=None, chunk_size=DELETE_CHUNK_SIZE):
+    """Xóa các video theo id, mỗi lô chunk_size id một thao tác của writer; trả về số dòng đã xóa"""
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    deleted = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        deleted += write_queue.write(_delete_ids, chunk, db_path=db_path)
+        _report(progress, 'delete', start + len(chunk), len(ids))
+    return deleted
+
+
+def _delete_chunk(conn, where, params, chunk_size, reset_sequence):
+    count = conn.execute(f'''
+        DELETE FROM {TABLE} WHERE id IN (SELECT id FROM {TABLE} WHERE {where} ORDER BY id LIMIT ?)
+    ''', params + [chunk_size]).rowcount
+    if count == 0 and reset_sequence and conn.execute(f'SELECT 1 FROM {TABLE} LIMIT 1').fetchone() is None:
+        # Chỉ reset khi bảng đã trống (không có video mới được thêm trong lúc xóa)
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (TABLE,))
+    return count
+
+
+def delete_matching(where, params=(), db_path=None, progress=None, chunk_size=DELETE_CHUNK_SIZE, reset_sequence=False):
+    """Xóa các video khớp điều kiện where theo lô (mỗi lô một thao tác của writer); trả về số dòng đã xóa
+
+    reset_sequence: reset bộ đếm AUTOINCREMENT nếu bảng trống sau khi xóa (xóa toàn bộ).
+    """
+    params = list(params)
+    conn = _connect(db_path)
+    try:
+        total = conn.execute(f'SELECT COUNT(*) FROM {TABLE} WHERE {where}', params).fetchone()[0]
+    finally:
+        conn.close()
+    deleted = 0
+    while True:
+        count = write_queue.write(_delete_chunk, where, params, chunk_size, reset_sequence, db_path=db_path)
+        if count == 0:
+            break
+        deleted += count
+        _report(progress, 'delete', deleted, max(total, deleted))
+    return deleted
+
+
+def delete_all_videos(db_path=None, progress=None, chunk_size=DELETE_CHUNK_SIZE):
+    """Xóa toàn bộ video theo lô và reset bộ đếm AUTOINCREMENT; trả về số dòng đã xóa"""
+    return delete_matching('1=1', db_path=db_path, progress=progress, chunk_size=chunk_size, reset_sequence=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Đánh lại ID / xóa toàn bộ video_reviews')
+    parser.add_argument('operation', choices=['renumber', 'delete-all'])
+    args = parser.parse_args()
+
+    def progress(event, data):
+        print(f"   {data['phase']}: {data['done']}/{data['total']}")
+
+    if args.operation == 'renumber':
+        renumber_video_ids(progress=progress)
+    else:
+        print(f"🗑️ Deleted {delete_all_videos(progress=progress)} videos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""
+Catalog Transfer - Xuất / nhập toàn bộ catalog video_reviews dạng CSV hoặc JSONL
+- iter_export(): generator đọc bằng cursor (fetchmany) -> bộ nhớ không phụ thuộc kích thước catalog
+- iter_import(): đọc file theo lô IMPORT_CHUNK_SIZE dòng, mỗi lô một transaction riêng (thao tác exclusive của
+  writer thread, services.write_queue) INSERT ... ON CONFLICT(video_id) DO UPDATE (chỉ ghi khi có cột thay đổi)
+Cột chuẩn hóa (title_norm, ...) không được xuất; khi nhập được tính lại từ title / description.
+classifier_version (sổ sách của job phân loại nền) không được xuất / nhập: dòng mới nhập bắt đầu ở 0.
+id không được nhập (catalog đích tự đánh id), video_id là khóa để ghép bản ghi.
+CSV không phân biệt NULL và chuỗi rỗng (cột TEXT NULL nhập lại thành ''); JSONL giữ nguyên kiểu dữ liệu.
+
+CLI: python -m services.catalog_transfer export catalog.jsonl | import catalog.csv [--mode insert]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import config
+from services import dedupe_index, stats_refresh, text_normalizer, title_classifier, video_store, write_queue
+
+TABLE = 'video_reviews'
+FORMATS = ('csv', 'jsonl')
+MODES = ('upsert', 'insert')        # insert: bỏ qua video đã có
+EXPORT_BATCH_SIZE = 1000            # số dòng mỗi lần fetchmany / mỗi khối gửi đi
+IMPORT_CHUNK_SIZE = 2000            # số dòng mỗi transaction khi nhập
+MAX_REPORTED_ERRORS = 20
+REQUIRED_COLUMNS = ('video_id', 'title', 'video_url')
+SKIPPED_COLUMNS = ('id', title_classifier.VERSION_COLUMN) + tuple(text_normalizer.NORMALIZED_COLUMNS)
+
+csv.field_size_limit(10 * 1024 * 1024)  # description dài
+
+
+def _connect(db_path=None):
+    return sqlite3.connect(db_path or config.DATABASE_PATH, timeout=30)
+
+
+def table_columns(conn):
+    """{tên cột: kiểu khai báo} của video_reviews theo thứ tự trong bảng"""
+    return {row[1]: (row[2] or '').upper() for row in conn.execute(f'PRAGMA table_info({TABLE})')}
+
+
+def export_columns(conn):
+    return [column for column in table_columns(conn)
+            if column not in text_normalizer.NORMALIZED_COLUMNS and column != title_classifier.VERSION_COLUMN]
+
+
+def detect_format(filename=None, fmt=None):
+    """'csv' / 'jsonl' theo tham số hoặc phần mở rộng file; ValueError nếu không xác định được"""
+    if not fmt and filename:
+        extension = os.path.splitext(filename)[1].lower()
+        fmt = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl'}.get(extension)
+    if fmt not in FORMATS:
+        raise ValueError(f"Định dạng phải là một trong: {', '.join(FORMATS)}")
+    return fmt
+
+
+def iter_batches(sql, params=(), db_path=None, batch_size=EXPORT_BATCH_SIZE):
+    """Generator các lô dòng của một truy vấn (fetchmany); connection đóng khi generator kết thúc / bị đóng"""
+    conn = _connect(db_path)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        conn.close()
+
+
+def iter_export(fmt='jsonl', db_path=None, batch_size=EXPORT_BATCH_SIZE):
+    """Generator các khối text (mỗi khối batch_size dòng) của toàn bộ catalog theo thứ tự id"""
+    fmt = detect_format(fmt=fmt)
+    conn = _connect(db_path)
+    try:
+        columns = export_columns(conn)
+    finally:
+        conn.close()
+    return _export_chunks(fmt, columns, db_path, batch_size)
+
+
+def _export_chunks(fmt, columns, db_path, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if fmt == 'csv':
+        writer.writerow(columns)
+        yield buffer.getvalue()
+    for rows in iter_batches(f"SELECT {', '.join(columns)} FROM {TABLE} ORDER BY id", db_path=db_path,
+                             batch_size=batch_size):
+        if fmt == 'csv':
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+def iter_records(stream, fmt):
+    """(số dòng, record dict hoặc None, lỗi) cho mỗi dòng của file text"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"JSON lỗi: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Mỗi dòng phải là một object JSON'
+            continue
+        yield line_number, record, None
+
+
+def _convert(value, column_type, from_csv):
+    """Giá trị từ file -> giá trị ghi vào cột: CSV không phân biệt NULL / chuỗi rỗng nên '' -> NULL trừ cột TEXT"""
+    if not from_csv or value is None:
+        return value
+    if value == '':
+        return '' if column_type == 'TEXT' else None
+    try:
+        if column_type == 'INTEGER':
+            return int(value)
+        if column_type == 'REAL':
+            return float(value)
+    except ValueError:
+        pass
+    return value
+
+
+def upsert_sql(columns, mode='upsert'):
+    """INSERT cho các cột đã nhập + cột chuẩn hóa; upsert chỉ ghi đè khi có cột thay đổi"""
+    insert_columns = list(columns) + text_normalizer.NORMALIZED_COLUMNS
+    sql = f"INSERT INTO {TABLE} ({', '.join(insert_columns)}) VALUES ({', '.join('?' * len(insert_columns))})"
+    if mode == 'insert':
+        return sql + ' ON CONFLICT(video_id) DO NOTHING'
+    updatable = [column for column in insert_columns if column != 'video_id']
+    return sql + f'''
+        ON CONFLICT(video_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updatable)}
+        WHERE {' OR '.join(f'excluded.{c} IS NOT {TABLE}.{c}' for c in updatable)}
+    '''
+
+
+def _row(record, columns, types, from_csv):
+    """Tuple theo columns + cột chuẩn hóa; cột NOT NULL của bảng gốc lấy giá trị thay thế nếu trống"""
+    values = {column: _convert(record.get(column), types[column], from_csv) for column in columns}
+    values['movie_title'] = values.get('movie_title') or values['title']
+    values['reviewer_name'] = values.get('reviewer_name') or values.get('channel_name') or ''
+    values['video_type'] = values.get('video_type') or 'youtube'
+    return tuple(values[column] for column in columns) \
+        + text_normalizer.normalized_values(values['title'], values.get('description') or '')
+
+
+def iter_import(stream, fmt, mode='upsert', db_path=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Generator sự kiện tiến độ: {'type': 'start'|'progress'|'done', ...}
+
+    stream: file text (CSV có header hoặc JSONL). Dòng thiếu video_id / title / video_url bị bỏ qua
+    và được báo trong 'errors' (tối đa MAX_REPORTED_ERRORS).
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode phải là một trong: {', '.join(MODES)}")
+    start = time.perf_counter()
+    conn = _connect(db_path)
+    try:
+        stats_refresh.ensure_stats_schema(conn)
+        types = table_columns(conn)
+        records = iter_records(stream, fmt)
+        columns = sql = key = None
+        totals = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'invalid': 0}
+        errors = []
+        chunk = []
+
+        def flush():
+            inserted, changed = write_queue.write(_import_chunk, sql, chunk, key, db_path=db_path, exclusive=True)
+            totals['inserted'] += inserted
+            totals['updated'] += changed - inserted
+            totals['unchanged'] += len(chunk) - changed
+            chunk.clear()
+
+        for line_number, record, error in records:
+            totals['rows'] += 1
+            if columns is None and record is not None:
+                # Cột lấy từ header CSV / record JSONL đầu tiên, chỉ giữ cột có trong bảng
+                present = list(record)
+                columns = [c for c in types if c in present and c not in SKIPPED_COLUMNS]
+                for column in ('movie_title', 'reviewer_name', 'video_type'):
+                    if column not in columns:
+                        columns.append(column)
+                missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+                if missing:
+                    raise ValueError(f"File thiếu cột bắt buộc: {', '.join(missing)}")
+                sql, key = upsert_sql(columns, mode), columns.index('video_id')
+                yield {'type': 'start', 'format': fmt, 'mode': mode, 'columns': columns,
+                       'ignored_columns': [c for c in present if c not in types]}
+            if error is None and not all(record.get(c) not in (None, '') for c in REQUIRED_COLUMNS):
+                error = f"Thiếu {', '.join(c for c in REQUIRED_COLUMNS if record.get(c) in (None, ''))}"
+            if error:
+                totals['invalid'] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"Dòng {line_number}: {error}")
+                continue
+            chunk.append(_row(record, columns, types, fmt == 'csv'))
+            if len(chunk) >= chunk_size:
+                flush()
+                yield {'type': 'progress', **totals}
+        if chunk:
+            flush()
+            yield {'type': 'progress', **totals}
+    finally:
+        conn.close()
+
+    yield {'type': 'done', **totals, 'errors': errors, 'seconds': round(time.perf_counter() - start, 2)}
+
+
+def _import_chunk(conn, sql, chunk, key):
+    """(số video mới, số dòng được ghi) của một lô, trong transaction riêng trên connection của writer
+
+    Đếm bằng rowcount của executemany: total_changes tính cả dòng do trigger catalog counters ghi.
+    Video đã lập chỉ mục LSH mà tiêu đề / mô tả / kênh bị ghi đè được tính lại khóa trong cùng transaction.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        video_ids = {row[key] for row in chunk}
+        existing = video_store.existing_video_ids(conn, video_ids)
+        before = dedupe_index.indexed_state(conn, existing)
+        changed = conn.executemany(sql, chunk).rowcount
+        if before:
+            dedupe_index.rekey_documents(conn, before, before)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return len(video_ids - existing), changed
+
+
+def import_file(stream, fmt, mode='upsert', db_path=None, progress=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Chạy hết iter_import, trả về sự kiện 'done' (progress: callback cho mỗi sự kiện)"""
+    summary = None
+    for event in iter_import(stream, fmt, mode, db_path, chunk_size):
+        if progress:
+            progress(event)
+        summary = event
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Xuất / nhập catalog video_reviews (CSV / JSONL)')
+    parser.add_argument('operation', choices=['export', 'import'])
+    parser.add_argument('file', help="đường dẫn file ('-' = stdout / stdin)")
+    parser.add_argument('--format', choices=FORMATS, help='mặc định theo phần mở rộng file')
+    parser.add_argument('--mode', choices=MODES, default='upsert')
+    args = parser.parse_args()
+
+    fmt = detect_format(None if args.file == '-' else args.file, args.format)
+    if args.operation == 'export':
+        out = sys.stdout if args.file == '-' else open(args.file, 'w', encoding='utf-8', newline='')
+        try:
+            for chunk in iter_export(fmt):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return 0
+
+    def report(event):
+        if event['type'] == 'start' and event['ignored_columns']:
+            print(f"⚠️ Bỏ qua cột không có trong bảng: {', '.join(event['ignored_columns'])}")
+        elif event['type'] == 'progress':
+            print(f"   {event['rows']} dòng: {event['inserted']} mới, {event['updated']} cập nhật")
+
+    stream = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8-sig', newline='')
+    try:
+        summary = import_file(stream, fmt, args.mode, progress=report)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f"🎉 {summary['rows']} dòng: {summary['inserted']} mới, {summary['updated']} cập nhật, "
+          f"{summary['unchanged']} không đổi, {summary['invalid']} lỗi trong {summary['seconds']}s")
+    for error in summary['errors']:
+        print(f"   ❌ {error}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,17 +3,65 @@ Content Filter và Duplicate Detection System
 Hệ thống lọc nội dung và phát hiện trùng lặp video
 """
 
+import math
+import os
 import sqlite3
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from difflib import SequenceMatcher
 import config
+from services import text_normalizer
+from services.dedupe_index import CATALOG_FIELDS, CatalogDuplicateIndex, MinHashLSH, index_fields
+from services.keyword_matcher import KeywordMatcher
+
+
+# Các từ khóa tích cực cho review phim (bao gồm Vus Review)
+REVIEW_KEYWORDS = [
+    'review', 'đánh giá', 'nhận xét', 'phân tích', 'critique',
+    'review phim', 'đánh giá phim', 'phim hay', 'phim mới',
+    'spoiler', 'trailer reaction', 'breakdown', 'ending explained',
+    'tóm tắt phim', 'giải thích phim', 'kết thúc phim',
+    # Thêm Vus Review keywords
+    'vus', 'vus review', 'vus đánh giá', 'vus phim', 'vus cinema',
+    'vus trailer', 'vus movie', 'vus film', 'vus spoiler',
+    'vus breakdown', 'vus ending', 'vus reaction'
+]
+
+# Các từ khóa phim ảnh
+MOVIE_KEYWORDS = [
+    'phim', 'movie', 'film', 'cinema', 'tập', 'episode', 'season',
+    'marvel', 'dc', 'disney', 'netflix', 'hollywood', 'bollywood',
+    'anime', 'drama', 'series', 'thriller', 'horror', 'comedy',
+    'action', 'romance', 'sci-fi'
+]
+
+# Loại trừ các video không phù hợp nhưng điều chỉnh cho Vus
+EXCLUDED_KEYWORDS = [
+    'trailer chính thức', 'official trailer', 'teaser',
+    'behind the scene', 'making of', 'gala', 'thảm đỏ',
+    'interview', 'hậu trường', 'news', 'tin tức',
+    r'\bgame\b', r'\bgameplay\b', r'\bwalkthrough\b', r'\bspeedrun\b',  # Word boundaries để tránh false positive
+    'music video', 'mv', 'live stream',
+    'unboxing', 'vlog', 'daily',
+    'reaction only'
+]
 
 
 class ContentFilter:
     """Hệ thống lọc và kiểm tra trùng lặp video"""
     
     def __init__(self):
+        self._duplicate_index = None
+        # Biên dịch từ khóa một lần cho mọi video
+        self.keyword_matcher = KeywordMatcher({
+            'review': REVIEW_KEYWORDS,
+            'movie': MOVIE_KEYWORDS,
+            'excluded': EXCLUDED_KEYWORDS,
+        })
+        self.last_dedupe_cpu_seconds = 0.0
         print("🔧 Content Filter initialized")
     
     def calculate_text_similarity(self, text1, text2):
@@ -22,123 +70,135 @@ class ContentFilter:
         text1 = self.normalize_text(text1)
         text2 = self.normalize_text(text2)
         
+        return self.calculate_normalized_similarity(text1, text2)
+    
+    def calculate_normalized_similarity(self, norm1, norm2):
+        """Độ tương đồng giữa 2 chuỗi đã chuẩn hóa sẵn (cột *_norm)"""
         # Calculate similarity using SequenceMatcher
-        similarity = SequenceMatcher(None, text1, text2).ratio()
-        return similarity
+        return SequenceMatcher(None, norm1 or '', norm2 or '').ratio()
     
     def normalize_text(self, text):
         """Chuẩn hóa text để so sánh"""
-        if not text:
-            return ""
-        
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove extra spaces and special characters
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return text_normalizer.normalize_text(text)
     
     def extract_movie_name(self, title):
         """Trích xuất tên phim từ tiêu đề review"""
-        title = title.lower()
+        return text_normalizer.extract_movie_name(title)
+    
+    def video_norms(self, video):
+        """(title_norm, movie_norm, desc_norm) của video - tính một lần rồi giữ trong dict"""
+        if video.get('title_norm') is None:
+            video.update(text_normalizer.normalized_columns(video.get('title', ''), video.get('description', '')))
+        return video['title_norm'], video['movie_norm'], video['desc_norm'] or ''
+    
+    def is_duplicate_pair(self, new_video, existing_video):
+        """So sánh một cặp video theo các ngưỡng trùng lặp"""
+        new_title_norm, new_movie_norm, new_desc_norm = self.video_norms(new_video)
+        existing_title_norm, existing_movie_norm, existing_desc_norm = self.video_norms(existing_video)
+        new_channel = new_video.get('channel_title', '')
+        existing_channel = existing_video.get('channel_title', '')
+        
+        # Calculate similarities
+        title_similarity = self.calculate_normalized_similarity(new_title_norm, existing_title_norm)
+        desc_similarity = self.calculate_normalized_similarity(new_desc_norm, existing_desc_norm)
+        movie_similarity = self.calculate_normalized_similarity(new_movie_norm, existing_movie_norm)
         
-        # Remove common prefixes
-        prefixes = ['review', 'đánh giá', 'review phim', 'phim', 'critique', 'vus review', 'vus']
-        for prefix in prefixes:
-            if title.startswith(prefix):
-                title = title[len(prefix):].strip()
+        same_channel = new_channel.lower() == existing_channel.lower() if new_channel and existing_channel else False
         
-        # Extract movie name (before dash or colon)
-        if ':' in title:
-            title = title.split(':')[0].strip()
-        elif '-' in title:
-            title = title.split('-')[0].strip()
+        is_duplicate = False
         
-        # Clean up
-        title = re.sub(r'[^\w\s]', ' ', title)
-        title = re.sub(r'\s+', ' ', title).strip()
+        # Very high title similarity
+        if title_similarity > config.TITLE_SIMILARITY_THRESHOLD:
+            is_duplicate = True
+            print(f"🚫 Duplicate detected - High title similarity: {title_similarity:.2f}")
         
-        return title.title()
+        # Same movie + same channel
+        elif movie_similarity > 0.8 and same_channel:
+            is_duplicate = True
+            print(f"🚫 Duplicate detected - Same movie ({movie_similarity:.2f}) + Same channel")
+        
+        # High description similarity
+        elif desc_similarity > config.SIMILARITY_THRESHOLD:
+            is_duplicate = True
+            print(f"🚫 Duplicate detected - High description similarity: {desc_similarity:.2f}")
+        
+        # Multiple moderate similarities
+        elif (title_similarity > 0.6 and movie_similarity > 0.7) or \
+             (title_similarity > 0.6 and desc_similarity > 0.6):
+            is_duplicate = True
+            print(f"🚫 Duplicate detected - Multiple similarities (T:{title_similarity:.2f}, M:{movie_similarity:.2f}, D:{desc_similarity:.2f})")
+        
+        if is_duplicate:
+            print(f"   New: {new_video.get('title', '')[:50]}...")
+            print(f"   Existing: {existing_video.get('title', '')[:50]}...")
+        
+        return is_duplicate
     
     def is_duplicate_video(self, new_video, existing_videos):
         """Kiểm tra xem video mới có trùng với video đã có không"""
-        new_title = new_video.get('title', '')
         new_video_id = new_video.get('video_id', '')
-        new_channel = new_video.get('channel_title', '')
-        new_desc = new_video.get('description', '')
-        
-        new_movie = self.extract_movie_name(new_title)
         
         for existing in existing_videos:
             # If it's from database (tuple format)
             if isinstance(existing, tuple) and len(existing) >= 7:
-                existing_title = existing[1]  # title
-                existing_video_id = existing[6]  # video_id
-                existing_channel = existing[3]  # reviewer_name
-                existing_desc = existing[7] if len(existing) > 7 else ""  # description
+                existing = {
+                    'title': existing[1],  # title
+                    'video_id': existing[6],  # video_id
+                    'channel_title': existing[3],  # reviewer_name
+                    'description': existing[7] if len(existing) > 7 else "",  # description
+                }
             # If it's from video list (dict format)
-            elif isinstance(existing, dict):
-                existing_title = existing.get('title', '')
-                existing_video_id = existing.get('video_id', '')
-                existing_channel = existing.get('channel_title', '')
-                existing_desc = existing.get('description', '')
-            else:
+            elif not isinstance(existing, dict):
                 continue
+            existing_video_id = existing.get('video_id', '')
             
             # Check exact video ID match first
             if new_video_id and existing_video_id and new_video_id == existing_video_id:
                 print(f"🚫 Duplicate detected - Same video ID: {new_video_id}")
                 return True
             
-            # Calculate similarities
-            title_similarity = self.calculate_text_similarity(new_title, existing_title)
-            desc_similarity = self.calculate_text_similarity(new_desc, existing_desc)
-            
-            existing_movie = self.extract_movie_name(existing_title)
-            movie_similarity = self.calculate_text_similarity(new_movie, existing_movie)
-            
-            same_channel = new_channel.lower() == existing_channel.lower() if new_channel and existing_channel else False
-            
-            is_duplicate = False
-            
-            # Very high title similarity
-            if title_similarity > config.TITLE_SIMILARITY_THRESHOLD:
-                is_duplicate = True
-                print(f"🚫 Duplicate detected - High title similarity: {title_similarity:.2f}")
-            
-            # Same movie + same channel
-            elif movie_similarity > 0.8 and same_channel:
-                is_duplicate = True
-                print(f"🚫 Duplicate detected - Same movie ({movie_similarity:.2f}) + Same channel")
-            
-            # High description similarity
-            elif desc_similarity > config.SIMILARITY_THRESHOLD:
-                is_duplicate = True
-                print(f"🚫 Duplicate detected - High description similarity: {desc_similarity:.2f}")
-            
-            # Multiple moderate similarities
-            elif (title_similarity > 0.6 and movie_similarity > 0.7) or \
-                 (title_similarity > 0.6 and desc_similarity > 0.6):
-                is_duplicate = True
-                print(f"🚫 Duplicate detected - Multiple similarities (T:{title_similarity:.2f}, M:{movie_similarity:.2f}, D:{desc_similarity:.2f})")
-            
-            if is_duplicate:
-                print(f"   New: {new_title[:50]}...")
-                print(f"   Existing: {existing_title[:50]}...")
+            if self.is_duplicate_pair(new_video, existing):
                 return True
         
         return False
     
+    def get_duplicate_index(self):
+        """Chỉ mục LSH của catalog (tạo lười, dùng chung trong instance)"""
+        if self._duplicate_index is None:
+            self._duplicate_index = CatalogDuplicateIndex()
+        return self._duplicate_index
+    
+    def index_fields(self, video):
+        """Các trường (đã chuẩn hóa) dùng để tra chỉ mục LSH"""
+        title_norm, movie_norm, desc_norm = self.video_norms(video)
+        return index_fields(title_norm, movie_norm, desc_norm, video.get('channel_title', ''))
+    
+    def is_duplicate_in_catalog(self, new_video, index):
+        """Kiểm tra trùng lặp với catalog qua chỉ mục LSH (chỉ chấm điểm ứng viên)"""
+        candidates = index.candidates(self.index_fields(new_video), new_video.get('video_id', ''))
+        return self.is_duplicate_video(new_video, candidates)
+    
+    def is_duplicate_in_batch(self, new_video, accepted_videos, batch_index):
+        """Kiểm tra trùng lặp với các video đã nhận trong batch (batch_index: vị trí -> accepted_videos)"""
+        batch_candidates = [accepted_videos[pos] for pos in sorted(batch_index.query(self.index_fields(new_video)))]
+        same_id = [v for v in accepted_videos
+                   if new_video.get('video_id') and v.get('video_id') == new_video.get('video_id')]
+        return self.is_duplicate_video(new_video, same_id + batch_candidates)
+    
     def get_existing_videos_from_db(self):
         """Lấy danh sách video đã có trong database"""
         try:
             conn = sqlite3.connect(config.DATABASE_PATH)
+            text_normalizer.ensure_normalized_columns(conn)
+            text_normalizer.backfill_normalized_columns(db_path=config.DATABASE_PATH)
             cursor = conn.cursor()
             
-            cursor.execute("SELECT * FROM video_reviews ORDER BY created_at DESC LIMIT 1000")
-            videos = cursor.fetchall()
+            # Đọc các cột chuẩn hóa đã lưu thay vì chuẩn hóa lại mỗi lần so sánh
+            cursor.execute("""
+                SELECT title, video_id, reviewer_name, description, title_norm, movie_norm, desc_norm
+                FROM video_reviews ORDER BY created_at DESC LIMIT 1000
+            """)
+            videos = [dict(zip(CATALOG_FIELDS, row)) for row in cursor.fetchall()]
             
             conn.close()
             return videos
@@ -151,6 +211,19 @@ class ContentFilter:
         """Lọc bỏ video trùng lặp từ danh sách videos mới"""
         print(f"🔍 Filtering duplicates from {len(new_videos)} new videos...")
         
+        # Đo CPU time của bước dedupe cho mỗi lần crawl
+        cpu_start = time.process_time()
+        if config.DEDUPE_USE_LSH_INDEX:
+            filtered_videos = self.filter_duplicates_indexed(new_videos)
+        else:
+            filtered_videos = self.filter_duplicates_scan(new_videos)
+        self.last_dedupe_cpu_seconds = time.process_time() - cpu_start
+        print(f"⏱️ Dedupe CPU time: {self.last_dedupe_cpu_seconds:.3f}s")
+        
+        return filtered_videos
+    
+    def filter_duplicates_scan(self, new_videos):
+        """So sánh tuần tự với 1000 video mới nhất trong catalog"""
         # Get existing videos from database
         existing_videos = self.get_existing_videos_from_db()
         print(f"📊 Comparing against {len(existing_videos)} existing videos")
@@ -180,61 +253,47 @@ class ContentFilter:
         
         return filtered_videos
     
+    def filter_duplicates_indexed(self, new_videos):
+        """Lọc trùng lặp qua chỉ mục MinHash/LSH thay vì so sánh từng cặp"""
+        index = self.get_duplicate_index()
+        index.sync()
+        
+        # Chỉ mục tạm trong bộ nhớ cho các video đã nhận trong batch này
+        batch_index = MinHashLSH()
+        filtered_videos = []
+        duplicate_count = 0
+        
+        for i, video in enumerate(new_videos):
+            print(f"\n⚡ Checking video {i+1}/{len(new_videos)}: {video['title'][:50]}...")
+            
+            if self.is_duplicate_in_catalog(video, index):
+                duplicate_count += 1
+                continue
+            
+            if self.is_duplicate_in_batch(video, filtered_videos, batch_index):
+                duplicate_count += 1
+                print(f"🚫 Duplicate within new batch")
+                continue
+            
+            batch_index.add(len(filtered_videos), self.index_fields(video))
+            filtered_videos.append(video)
+            print(f"✅ Video accepted")
+        
+        print(f"\n📊 Filtering results:")
+        print(f"   Original: {len(new_videos)} videos")
+        print(f"   Filtered: {len(filtered_videos)} videos")
+        print(f"   Duplicates removed: {duplicate_count} videos")
+        
+        return filtered_videos
+    
     def is_movie_review_video(self, video):
         """Kiểm tra xem video có phải là review phim (bao gồm Vus Review) không"""
         title = video.get('title', '').lower()
         description = video.get('description', '').lower()
         combined_text = f"{title} {description}"
         
-        # Các từ khóa tích cực cho review phim (bao gồm Vus Review)
-        review_keywords = [
-            'review', 'đánh giá', 'nhận xét', 'phân tích', 'critique',
-            'review phim', 'đánh giá phim', 'phim hay', 'phim mới',
-            'spoiler', 'trailer reaction', 'breakdown', 'ending explained',
-            'tóm tắt phim', 'giải thích phim', 'kết thúc phim',
-            # Thêm Vus Review keywords
-            'vus', 'vus review', 'vus đánh giá', 'vus phim', 'vus cinema',
-            'vus trailer', 'vus movie', 'vus film', 'vus spoiler',
-            'vus breakdown', 'vus ending', 'vus reaction'
-        ]
-        
-        # Các từ khóa phim ảnh
-        movie_keywords = [
-            'phim', 'movie', 'film', 'cinema', 'tập', 'episode', 'season',
-            'marvel', 'dc', 'disney', 'netflix', 'hollywood', 'bollywood',
-            'anime', 'drama', 'series', 'thriller', 'horror', 'comedy',
-            'action', 'romance', 'sci-fi'
-        ]
-        
-        # Kiểm tra có từ khóa review và phim
-        has_review_keyword = any(keyword in combined_text for keyword in review_keywords)
-        has_movie_keyword = any(keyword in combined_text for keyword in movie_keywords)
-        
-        # Vẫn giữ logic loại trừ các video không phù hợp nhưng điều chỉnh cho Vus
-        excluded_keywords = [
-            'trailer chính thức', 'official trailer', 'teaser',
-            'behind the scene', 'making of', 'gala', 'thảm đỏ',
-            'interview', 'hậu trường', 'news', 'tin tức',
-            r'\bgame\b', r'\bgameplay\b', r'\bwalkthrough\b', r'\bspeedrun\b',  # Word boundaries để tránh false positive
-            'music video', 'mv', 'live stream',
-            'unboxing', 'vlog', 'daily',
-            'reaction only'
-        ]
-        
-        # Check excluded keywords with regex for word boundaries
-        has_excluded = False
-        for keyword in excluded_keywords:
-            if keyword.startswith(r'\b') and keyword.endswith(r'\b'):
-                # Use regex for word boundary check
-                import re
-                if re.search(keyword, combined_text):
-                    has_excluded = True
-                    break
-            else:
-                # Normal substring check
-                if keyword in combined_text:
-                    has_excluded = True
-                    break
+        # Từ khóa đã biên dịch sẵn khi khởi tạo (review / movie / excluded)
+        has_review_keyword, has_movie_keyword, has_excluded = self.keyword_matcher.flags(combined_text)
         
         # Kết quả: phải có từ khóa review VÀ phim, và KHÔNG có từ khóa loại trừ
         is_movie_review = has_review_keyword and has_movie_keyword and not has_excluded
@@ -246,7 +305,8 @@ class ContentFilter:
             if not has_movie_keyword:
                 reason.append("no movie keywords")
             if has_excluded:
-                reason.append("has excluded keywords")
+                excluded = self.keyword_matcher.matched('excluded', combined_text)
+                reason.append(f"has excluded keywords ({', '.join(excluded)})")
             print(f"❌ Not a movie review: {' + '.join(reason)}")
         
         return is_movie_review
@@ -294,6 +354,23 @@ class ContentFilter:
         """Main method để xử lý và lọc videos"""
         print(f"\n🎯 Processing {len(videos)} videos...")
         
+        if config.CONTENT_FILTER_PARALLEL and len(videos) >= config.CONTENT_FILTER_PARALLEL_MIN_BATCH:
+            final_videos = self.process_videos_parallel(videos)
+        else:
+            final_videos = self.process_videos_serial(videos)
+        
+        # Step 3 (optional): Semantic duplicates across channels
+        if config.ENABLE_EMBEDDING_DEDUPE:
+            print("\n🧠 Step 3: Embedding duplicate detection...")
+            from services.embedding_dedupe import get_embedding_detector
+            final_videos = get_embedding_detector().filter_duplicates(final_videos)
+        
+        print(f"\n🎉 Final result: {len(final_videos)} unique, high-quality videos ready to add!")
+        
+        return final_videos
+    
+    def process_videos_serial(self, videos):
+        """Kiểm tra chất lượng + lọc trùng lặp tuần tự"""
         # Step 1: Validate quality
         print("\n📋 Step 1: Quality validation...")
         quality_videos = []
@@ -305,11 +382,120 @@ class ContentFilter:
         
         # Step 2: Remove duplicates
         print("\n🔍 Step 2: Duplicate detection...")
-        final_videos = self.filter_duplicates(quality_videos)
-        
-        print(f"\n🎉 Final result: {len(final_videos)} unique, high-quality videos ready to add!")
+        return self.filter_duplicates(quality_videos)
+    
+    def process_videos_parallel(self, videos, workers=None):
+        """Chia batch cho process pool: kiểm tra chất lượng + chấm điểm trùng với catalog song song,
+        sau đó lọc trùng trong batch tuần tự theo thứ tự ban đầu (kết quả giống hệt chế độ tuần tự)"""
+        scorer = ParallelScorer(self, workers)
+        print(f"\n⚙️ Parallel quality + duplicate scoring on {scorer.workers} processes...")
+        try:
+            scorer.start()
+            results = scorer.score(videos)
+        except Exception as e:
+            print(f"⚠️ Process pool unavailable ({e}), falling back to serial mode")
+            return self.process_videos_serial(videos)
+        finally:
+            scorer.close()
+        use_index = scorer.use_index
+        
+        # Lọc trùng trong batch: tuần tự, cùng thứ tự và cùng quy tắc như filter_duplicates
+        batch_index = MinHashLSH()
+        filtered_videos = []
+        quality_count = duplicate_count = 0
+        for video, (passed, catalog_duplicate, norms) in zip(videos, results):
+            if not passed:
+                continue
+            quality_count += 1
+            video.update(norms)
+            if catalog_duplicate:
+                duplicate_count += 1
+                continue
+            if use_index:
+                if self.is_duplicate_in_batch(video, filtered_videos, batch_index):
+                    duplicate_count += 1
+                    continue
+                batch_index.add(len(filtered_videos), self.index_fields(video))
+            elif self.is_duplicate_video(video, filtered_videos):
+                duplicate_count += 1
+                continue
+            filtered_videos.append(video)
         
-        return final_videos
+        print(f"✅ {quality_count} videos passed quality check")
+        print(f"📊 Duplicates removed: {duplicate_count} videos")
+        return filtered_videos
+
+
+class ParallelScorer:
+    """Process pool kiểm tra chất lượng + chấm điểm trùng với catalog, dùng lại cho nhiều lô
+
+    Dùng bởi process_videos_parallel (một batch lớn) và stage 'quality' của ingest pipeline
+    (CONTENT_FILTER_PARALLEL). Catalog được chuẩn bị ở process chính trong start(), worker chỉ đọc.
+    """
+
+    def __init__(self, content_filter, workers=None):
+        self.content_filter = content_filter
+        self.workers = workers or config.CONTENT_FILTER_WORKERS or os.cpu_count() or 1
+        self.use_index = config.DEDUPE_USE_LSH_INDEX
+        self.pool = None
+
+    def start(self):
+        """Đồng bộ chỉ mục catalog rồi tạo đủ worker ngay (trước khi người gọi mở thêm thread)"""
+        if self.pool is not None:
+            return self
+        if self.use_index:
+            self.content_filter.get_duplicate_index().sync()
+            existing_videos = None
+        else:
+            existing_videos = self.content_filter.get_existing_videos_from_db()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_parallel_worker,
+                                        initargs=(config.DATABASE_PATH, self.use_index, existing_videos))
+        list(self.pool.map(_score_chunk, [[]] * self.workers))
+        return self
+
+    def score(self, videos):
+        """[(qua kiểm tra chất lượng, trùng với catalog, các cột *_norm)] theo đúng thứ tự videos"""
+        self.start()
+        chunk_size = max(1, math.ceil(len(videos) / (self.workers * 4)))
+        chunks = [videos[i:i + chunk_size] for i in range(0, len(videos), chunk_size)]
+        return [result for chunk in self.pool.map(_score_chunk, chunks) for result in chunk]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+# Trạng thái của worker process (ParallelScorer)
+_worker_filter = None
+_worker_catalog = None
+_worker_use_index = True
+
+
+def _init_parallel_worker(db_path, use_index, existing_videos):
+    """Khởi tạo worker: ContentFilter riêng + catalog chỉ đọc"""
+    global _worker_filter, _worker_catalog, _worker_use_index
+    sys.stdout = open(os.devnull, 'w')  # log từng video chỉ in ở chế độ tuần tự
+    config.DATABASE_PATH = db_path
+    _worker_use_index = use_index
+    _worker_filter = ContentFilter()
+    _worker_catalog = CatalogDuplicateIndex(db_path, read_only=True) if use_index else existing_videos
+
+
+def _score_chunk(videos):
+    """Một phần batch -> [(qua kiểm tra chất lượng, trùng với catalog, các cột *_norm)]"""
+    results = []
+    for video in videos:
+        if not _worker_filter.validate_video_quality(video):
+            results.append((False, False, {}))
+            continue
+        if _worker_use_index:
+            duplicate = _worker_filter.is_duplicate_in_catalog(video, _worker_catalog)
+        else:
+            duplicate = _worker_filter.is_duplicate_video(video, _worker_catalog)
+        norms = {name: video[name] for name in text_normalizer.NORMALIZED_COLUMNS if name in video}
+        results.append((True, duplicate, norms))
+    return results
 
 
 if __name__ == "__main__":
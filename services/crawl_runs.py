@@ -0,0 +1,212 @@
+"""
+Crawl Runs - Checkpoint bền vững cho mỗi lần crawl
+Lưu tiến độ từng query (page token) và các video đã lấy nhưng chưa lưu vào catalog,
+để lần chạy sau (sau khi worker bị restart) tiếp tục thay vì crawl lại từ đầu
+Tạo / tiếp tục lần crawl và checkpoint trong lúc crawl (save_page / mark_persisted / complete) ghi qua
+writer thread của process (services.write_queue), cùng hàng đợi với lô video của stage persist
+"""
+
+import json
+import os
+import socket
+import sqlite3
+
+import config
+from services import write_queue
+
+
+class CrawlRun:
+    """Một lần crawl đang chạy (mới hoặc được tiếp tục)"""
+
+    def __init__(self, store, run_id, resumed=False):
+        self.store = store
+        self.id = run_id
+        self.resumed = resumed
+
+    def pending_queries(self):
+        """Các query chưa lấy xong: (query, page_token, pages_fetched)"""
+        conn = self.store._connect()
+        try:
+            return conn.execute('''
+                SELECT query, page_token, pages_fetched FROM crawl_run_queries
+                WHERE run_id = ? AND status = 'pending' ORDER BY position
+            ''', (self.id,)).fetchall()
+        finally:
+            conn.close()
+
+    def pending_items(self):
+        """Video đã lấy về nhưng chưa được lưu (checkpoint của lần chạy bị gián đoạn)"""
+        conn = self.store._connect()
+        try:
+            rows = conn.execute('''
+                SELECT payload FROM crawl_run_items WHERE run_id = ? AND status = 'pending'
+            ''', (self.id,)).fetchall()
+            return [json.loads(row[0]) for row in rows]
+        finally:
+            conn.close()
+
+    def save_page(self, query, videos, next_token, done):
+        """Checkpoint một trang kết quả: lưu video + page token trong cùng một transaction"""
+        items = [(self.id, v['video_id'], query, json.dumps(v, ensure_ascii=False)) for v in videos]
+
+        def save(conn):
+            conn.executemany('''
+                INSERT OR IGNORE INTO crawl_run_items (run_id, video_id, query, payload)
+                VALUES (?, ?, ?, ?)
+            ''', items)
+            conn.execute('''
+                UPDATE crawl_run_queries
+                SET page_token = ?, pages_fetched = pages_fetched + 1, videos_found = videos_found + ?,
+                    status = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE run_id = ? AND query = ?
+            ''', (next_token, len(videos), 'done' if done else 'pending', self.id, query))
+            self.store._touch(conn, self.id)
+
+        write_queue.write(save, db_path=self.store.db_path)
+
+    def mark_persisted(self, video_ids, added):
+        """Đánh dấu video đã được ghi vào video_reviews"""
+        def mark(conn):
+            conn.executemany('''
+                UPDATE crawl_run_items SET status = 'persisted' WHERE run_id = ? AND video_id = ?
+            ''', [(self.id, video_id) for video_id in video_ids])
+            conn.execute('UPDATE crawl_runs SET videos_added = videos_added + ? WHERE id = ?', (added, self.id))
+            self.store._touch(conn, self.id)
+
+        write_queue.write(mark, db_path=self.store.db_path)
+
+    def totals(self):
+        """(videos_found, videos_added) cộng dồn của cả lần chạy, kể cả phần trước khi bị gián đoạn"""
+        conn = self.store._connect()
+        try:
+            found = conn.execute('SELECT COALESCE(SUM(videos_found), 0) FROM crawl_run_queries WHERE run_id = ?',
+                                 (self.id,)).fetchone()[0]
+            added = conn.execute('SELECT videos_added FROM crawl_runs WHERE id = ?', (self.id,)).fetchone()[0]
+            return found, added
+        finally:
+            conn.close()
+
+    def complete(self, metrics=None):
+        """Kết thúc lần chạy; payload các video không còn cần giữ lại"""
+        found, added = self.totals()
+
+        def finish(conn):
+            conn.execute('''
+                UPDATE crawl_runs SET status = 'completed', videos_found = ?, finished_at = CURRENT_TIMESTAMP,
+                       updated_at = CURRENT_TIMESTAMP, stage_metrics = ?
+                WHERE id = ?
+            ''', (found, json.dumps(metrics) if metrics else None, self.id))
+            conn.execute('DELETE FROM crawl_run_items WHERE run_id = ?', (self.id,))
+
+        write_queue.write(finish, db_path=self.store.db_path)
+        print(f"🏁 Crawl run #{self.id} completed: {found} found, {added} added")
+        return found, added
+
+
+class CrawlRunStore:
+    """Bảng crawl_runs / crawl_run_queries / crawl_run_items"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.DATABASE_PATH
+        self.init_tables()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _touch(self, conn, run_id):
+        conn.execute('UPDATE crawl_runs SET updated_at = CURRENT_TIMESTAMP WHERE id = ?', (run_id,))
+
+    def init_tables(self):
+        """Tạo bảng checkpoint nếu chưa có"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    owner TEXT,
+                    queries_total INTEGER DEFAULT 0,
+                    videos_found INTEGER DEFAULT 0,
+                    videos_added INTEGER DEFAULT 0,
+                    resume_count INTEGER DEFAULT 0,
+                    stage_metrics TEXT,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_run_queries (
+                    run_id INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    page_token TEXT,
+                    pages_fetched INTEGER DEFAULT 0,
+                    videos_found INTEGER DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (run_id, query)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_run_items (
+                    run_id INTEGER NOT NULL,
+                    video_id TEXT NOT NULL,
+                    query TEXT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    PRIMARY KEY (run_id, video_id)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_runs_status ON crawl_runs(status)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def start_or_resume(self, queries):
+        """Tiếp tục lần crawl dang dở gần nhất, hoặc tạo lần crawl mới cho danh sách query"""
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        def claim(conn):
+            row = conn.execute('''
+                SELECT id FROM crawl_runs WHERE status = 'running' ORDER BY id DESC LIMIT 1
+            ''').fetchone()
+            if row:
+                conn.execute('''
+                    UPDATE crawl_runs SET owner = ?, resume_count = resume_count + 1,
+                           updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (owner, row[0]))
+                return row[0], True
+
+            run_id = conn.execute('INSERT INTO crawl_runs (owner, queries_total) VALUES (?, ?)',
+                                  (owner, len(queries))).lastrowid
+            conn.executemany('''
+                INSERT OR IGNORE INTO crawl_run_queries (run_id, query, position) VALUES (?, ?, ?)
+            ''', [(run_id, query, position) for position, query in enumerate(queries)])
+            return run_id, False
+
+        run_id, resumed = write_queue.write(claim, db_path=self.db_path)
+        if resumed:
+            print(f"♻️ Resuming crawl run #{run_id} from last checkpoint")
+        else:
+            print(f"🆕 Started crawl run #{run_id} ({len(queries)} queries)")
+        return CrawlRun(self, run_id, resumed=resumed)
+
+    def has_running_run(self):
+        """Có lần crawl dang dở (sẽ được tiếp tục) hay không"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM crawl_runs WHERE status = 'running' LIMIT 1").fetchone() is not None
+        finally:
+            conn.close()
+
+    def recent_runs(self, limit=10):
+        conn = self._connect()
+        try:
+            return conn.execute('''
+                SELECT id, status, videos_found, videos_added, resume_count, started_at, finished_at
+                FROM crawl_runs ORDER BY id DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        finally:
+            conn.close()
@@ -0,0 +1,244 @@
+"""
+Crawl Schedule - Lịch crawl riêng cho từng nguồn (query trong SEARCH_QUERIES, kênh trong PREFERRED_CHANNELS)
+Theo dõi hiệu quả (video mới được nhận / 100 unit quota search) của từng nguồn:
+nguồn không còn video mới bị giãn lịch theo cấp số nhân, nguồn hiệu quả được crawl dày hơn.
+Thời điểm chạy có jitter để các nguồn không dồn vào cùng một lần crawl.
+Lịch / số liệu được ghi qua writer thread của process (services.write_queue).
+
+CLI: python -m services.crawl_schedule
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+import config
+from services import write_queue
+
+SEARCH_QUOTA_COST = 100    # unit cho mỗi lần gọi search.list
+CHANNEL_PREFIX = 'channel:'
+
+
+def configured_sources():
+    """Các nguồn crawl theo config: query tìm kiếm và 'channel:<channel id>'"""
+    return list(config.SEARCH_QUERIES) + [CHANNEL_PREFIX + channel_id for channel_id in config.PREFERRED_CHANNELS]
+
+
+def parse_source(source):
+    """(query, channel_id) cho search.list"""
+    if source.startswith(CHANNEL_PREFIX):
+        return None, source[len(CHANNEL_PREFIX):]
+    return source, None
+
+
+def yield_per_quota(added, pages):
+    """Số video mới được nhận trên 100 unit quota"""
+    return added * 100.0 / max(1, pages * SEARCH_QUOTA_COST)
+
+
+def next_interval(interval, added, yield_ewma):
+    """Chu kỳ mới (giờ): không có video mới -> giãn, hiệu quả cao -> rút ngắn, còn lại giữ nguyên"""
+    if added == 0:
+        interval *= config.CRAWL_BACKOFF_FACTOR
+    elif yield_ewma >= config.CRAWL_PRODUCTIVE_YIELD:
+        interval *= config.CRAWL_TIGHTEN_FACTOR
+    return min(config.CRAWL_MAX_INTERVAL_HOURS, max(config.CRAWL_MIN_INTERVAL_HOURS, interval))
+
+
+def jittered(hours):
+    """Số giây tới lần chạy sau, lệch ngẫu nhiên ±CRAWL_JITTER"""
+    return hours * 3600 * (1 + random.uniform(-config.CRAWL_JITTER, config.CRAWL_JITTER))
+
+
+class CrawlYield:
+    """Số liệu của một lần crawl theo nguồn và theo kênh (ghi từ nhiều worker của pipeline)"""
+
+    def __init__(self):
+        self.found = defaultdict(int)
+        self.pages = defaultdict(int)
+        self.added = defaultdict(int)
+        self.channels = {}  # channel id -> [tên kênh, found, added]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _channel_key(video):
+        return video.get('channel_id') or video.get('channel') or video.get('channel_title') or ''
+
+    def record_fetch(self, source, videos, pages):
+        with self._lock:
+            self.found[source] += len(videos)
+            self.pages[source] += pages
+            for video in videos:
+                key = self._channel_key(video)
+                if key:
+                    self.channels.setdefault(key, [video.get('channel', ''), 0, 0])[1] += 1
+
+    def record_added(self, videos):
+        """Video mới đã được lưu vào catalog (nguồn lấy từ video['crawl_source'])"""
+        with self._lock:
+            for video in videos:
+                source = video.get('crawl_source')
+                if source:
+                    self.added[source] += 1
+                key = self._channel_key(video)
+                if key:
+                    self.channels.setdefault(key, [video.get('channel', ''), 0, 0])[2] += 1
+
+    def sources(self):
+        return list(dict.fromkeys(list(self.pages) + list(self.added)))
+
+    def summary(self):
+        return {source: {'found': self.found[source], 'pages': self.pages[source], 'added': self.added[source]}
+                for source in self.sources()}
+
+
+class CrawlSchedule:
+    """Bảng crawl_source_schedule (lịch + hiệu quả từng nguồn) và crawl_channel_stats"""
+
+    def __init__(self, db_path=None, clock=time.time):
+        self.db_path = db_path or config.DATABASE_PATH
+        self.clock = clock  # thay được khi mô phỏng (benchmarks/bench_crawl_schedule.py)
+        conn = self._connect()
+        try:
+            self.init_tables(conn)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def init_tables(conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_source_schedule (
+                source TEXT PRIMARY KEY,
+                interval_hours REAL NOT NULL,
+                next_run_at REAL NOT NULL,
+                last_run_at REAL,
+                runs INTEGER DEFAULT 0,
+                videos_found INTEGER DEFAULT 0,
+                videos_added INTEGER DEFAULT 0,
+                quota_units INTEGER DEFAULT 0,
+                last_found INTEGER DEFAULT 0,
+                last_added INTEGER DEFAULT 0,
+                empty_streak INTEGER DEFAULT 0,
+                yield_ewma REAL DEFAULT 0
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_channel_stats (
+                channel_id TEXT PRIMARY KEY,
+                channel_title TEXT,
+                videos_found INTEGER DEFAULT 0,
+                videos_added INTEGER DEFAULT 0,
+                last_added_at TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+
+    def sync(self, sources):
+        """Thêm nguồn mới với chu kỳ mặc định; lần chạy đầu rải ngẫu nhiên trong CRAWL_JITTER của chu kỳ"""
+        now = self.clock()
+        base = config.UPDATE_INTERVAL_HOURS
+        write_queue.get_write_queue(self.db_path).executemany('''
+            INSERT OR IGNORE INTO crawl_source_schedule (source, interval_hours, next_run_at)
+            VALUES (?, ?, ?)
+        ''', [(source, base, now + random.uniform(0, base * 3600 * config.CRAWL_JITTER))
+              for source in sources]).result()
+
+    def due_sources(self, sources, now=None):
+        """Các nguồn đã đến hạn, theo thứ tự trong config"""
+        now = now or self.clock()
+        conn = self._connect()
+        try:
+            next_run = dict(conn.execute('SELECT source, next_run_at FROM crawl_source_schedule').fetchall())
+        finally:
+            conn.close()
+        return [source for source in sources if next_run.get(source, 0) <= now]
+
+    def record(self, crawl_yield):
+        """Cập nhật hiệu quả và tính lịch tiếp theo cho các nguồn vừa crawl"""
+        summary = crawl_yield.summary()
+        write_queue.write(self._record, summary, crawl_yield.channels, db_path=self.db_path)
+        return summary
+
+    def _record(self, conn, summary, channels):
+        """Đọc lịch hiện tại và ghi lịch mới trong cùng transaction của writer"""
+        now = self.clock()
+        for source, stats in summary.items():
+            row = conn.execute('SELECT interval_hours, yield_ewma, runs FROM crawl_source_schedule '
+                               'WHERE source = ?', (source,)).fetchone()
+            interval, ewma, runs = row or (config.UPDATE_INTERVAL_HOURS, 0.0, 0)
+            current = yield_per_quota(stats['added'], stats['pages'])
+            alpha = config.CRAWL_YIELD_EWMA_ALPHA
+            ewma = current if not runs else alpha * current + (1 - alpha) * ewma
+            interval = next_interval(interval, stats['added'], ewma)
+            conn.execute('''
+                INSERT INTO crawl_source_schedule (source, interval_hours, next_run_at) VALUES (?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET
+                    interval_hours = excluded.interval_hours, next_run_at = excluded.next_run_at,
+                    last_run_at = ?, runs = runs + 1,
+                    videos_found = videos_found + ?, videos_added = videos_added + ?,
+                    quota_units = quota_units + ?, last_found = ?, last_added = ?,
+                    empty_streak = CASE WHEN ? = 0 THEN empty_streak + 1 ELSE 0 END,
+                    yield_ewma = ?
+            ''', (source, interval, now + jittered(interval), now,
+                  stats['found'], stats['added'], stats['pages'] * SEARCH_QUOTA_COST,
+                  stats['found'], stats['added'], stats['added'], round(ewma, 4)))
+        conn.executemany('''
+            INSERT INTO crawl_channel_stats (channel_id, channel_title, videos_found, videos_added, last_added_at)
+            VALUES (?, ?, ?, ?, CASE WHEN ? > 0 THEN CURRENT_TIMESTAMP END)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                channel_title = COALESCE(NULLIF(excluded.channel_title, ''), channel_title),
+                videos_found = videos_found + excluded.videos_found,
+                videos_added = videos_added + excluded.videos_added,
+                last_added_at = COALESCE(excluded.last_added_at, last_added_at),
+                updated_at = CURRENT_TIMESTAMP
+        ''', [(key, title, found, added, added) for key, (title, found, added) in channels.items()])
+
+    def schedule_rows(self):
+        """Lịch của các nguồn đang có trong config (cho trang admin)"""
+        sources = configured_sources()
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT source, interval_hours, next_run_at, last_run_at, runs, videos_found, videos_added,
+                       quota_units, last_added, empty_streak, yield_ewma
+                FROM crawl_source_schedule
+            ''').fetchall()
+        finally:
+            conn.close()
+        keys = ['source', 'interval_hours', 'next_run_at', 'last_run_at', 'runs', 'videos_found', 'videos_added',
+                'quota_units', 'last_added', 'empty_streak', 'yield_ewma']
+        by_source = {row[0]: dict(zip(keys, row)) for row in rows}
+        return sorted((by_source[source] for source in sources if source in by_source),
+                      key=lambda row: row['next_run_at'])
+
+    def top_channels(self, limit=20):
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT channel_id, channel_title, videos_found, videos_added, last_added_at
+                FROM crawl_channel_stats ORDER BY videos_added DESC, videos_found DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(['channel_id', 'channel_title', 'videos_found', 'videos_added', 'last_added_at'], row))
+                for row in rows]
+
+
+def main():
+    schedule = CrawlSchedule()
+    schedule.sync(configured_sources())
+    now = time.time()
+    print(f"{'Nguồn':<40} {'Chu kỳ':>8} {'Lần tới':>10} {'Thêm':>6} {'Yield':>7}")
+    for row in schedule.schedule_rows():
+        print(f"{row['source'][:40]:<40} {row['interval_hours']:>7.1f}h {(row['next_run_at'] - now) / 3600:>9.1f}h "
+              f"{row['videos_added']:>6} {row['yield_ewma']:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+Near-Duplicate Index - MinHash/LSH cho phát hiện video trùng lặp
+Chỉ mục bền vững trong SQLite, tìm ứng viên trùng lặp mà không quét toàn bộ catalog
+Khóa bucket được tính ngoài writer; phần ghi chỉ mục đi qua writer thread của process (services.write_queue)
+"""
+
+import random
+import sqlite3
+import struct
+import zlib
+
+import config
+from services import text_normalizer, write_queue
+
+# Mersenne prime dùng cho họ hàm băm (a * x + b) % P
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Các trường được lập chỉ mục (mã số dùng trong khóa bucket)
+FIELDS = {'title': 1, 'movie': 2, 'desc': 3}
+# Khóa chính xác (kênh, tên phim): quy tắc "cùng phim + cùng kênh" khớp cả tên phim rỗng
+CHANNEL_MOVIE_FIELD = 4
+
+# Số video mỗi thao tác ghi khi lập chỉ mục catalog (sync)
+SYNC_CHUNK_SIZE = 500
+
+# Thứ tự cột ứng viên trả về từ catalog
+CATALOG_FIELDS = ('title', 'video_id', 'channel_title', 'description',
+                  'title_norm', 'movie_norm', 'desc_norm')
+
+
+def shingles(text, size=None):
+    """Tách text đã chuẩn hóa thành tập k-gram ký tự"""
+    size = size or config.LSH_SHINGLE_SIZE
+    if not text:
+        return set()
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHashLSH:
+    """MinHash + LSH banding trong bộ nhớ (dùng cho dedupe trong cùng một batch)"""
+
+    def __init__(self, num_perm=None, bands=None, seed=None):
+        self.num_perm = num_perm or config.LSH_NUM_PERM
+        self.bands = bands or config.LSH_BANDS
+        if self.num_perm % self.bands != 0:
+            raise ValueError(f"num_perm ({self.num_perm}) phải chia hết cho bands ({self.bands})")
+        self.rows = self.num_perm // self.bands
+
+        rng = random.Random(config.LSH_SEED if seed is None else seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(self.num_perm)
+        ]
+        self._buckets = {}
+
+    def signature(self, text):
+        """Tính chữ ký MinHash cho một chuỗi đã chuẩn hóa"""
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles(text)]
+        if not hashes:
+            return None
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def bucket_keys(self, field, text):
+        """Trả về danh sách khóa bucket (mỗi band một khóa) cho một trường"""
+        sig = self.signature(text)
+        if sig is None:
+            return []
+        field_code = FIELDS[field]
+        keys = []
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows]
+            band_hash = zlib.crc32(struct.pack(f'<{self.rows}Q', *chunk))
+            keys.append((field_code << 48) | (band << 32) | band_hash)
+        return keys
+
+    def document_keys(self, fields):
+        """Khóa bucket cho tất cả các trường của một video (dict field -> text)"""
+        keys = []
+        for field, text in fields.items():
+            if field == 'channel':
+                continue
+            keys.extend(self.bucket_keys(field, text))
+        if fields.get('channel'):
+            exact = zlib.crc32(f"{fields['channel']}\x1f{fields.get('movie', '')}".encode('utf-8'))
+            keys.append((CHANNEL_MOVIE_FIELD << 48) | exact)
+        return keys
+
+    # --- Chỉ mục trong bộ nhớ ---
+    def add(self, doc_id, fields):
+        for key in self.document_keys(fields):
+            self._buckets.setdefault(key, []).append(doc_id)
+
+    def query(self, fields):
+        candidates = []
+        seen = set()
+        for key in self.document_keys(fields):
+            for doc_id in self._buckets.get(key, ()):
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    candidates.append(doc_id)
+        return candidates
+
+
+def index_fields(title_norm, movie_norm, desc_norm, channel):
+    """Gom các trường đã chuẩn hóa thành dict dùng cho MinHashLSH"""
+    return {
+        'title': title_norm or '',
+        'movie': movie_norm or '',
+        'desc': desc_norm or '',
+        'channel': (channel or '').lower(),
+    }
+
+
+class CatalogDuplicateIndex:
+    """Chỉ mục LSH bền vững cho toàn bộ video_reviews"""
+
+    def __init__(self, db_path=None, read_only=False):
+        self.db_path = db_path or config.DATABASE_PATH
+        self.read_only = read_only
+        self.lsh = MinHashLSH()
+        if not read_only:
+            self.init_tables()
+
+    def _connect(self):
+        if self.read_only:
+            # Worker process chỉ tra cứu, không ghi (chỉ mục đã được sync ở process chính)
+            return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=30)
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_tables(self):
+        """Tạo bảng chỉ mục nếu chưa có"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS dedupe_lsh_buckets (
+                    bucket INTEGER NOT NULL,
+                    video_id TEXT NOT NULL,
+                    PRIMARY KEY (bucket, video_id)
+                ) WITHOUT ROWID
+            ''')
+            # Xóa / tính lại khóa của một video (rekey_documents, prune) không phải quét cả bảng
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_dedupe_lsh_buckets_video ON dedupe_lsh_buckets(video_id)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS dedupe_lsh_documents (
+                    video_id TEXT PRIMARY KEY,
+                    num_perm INTEGER NOT NULL,
+                    bands INTEGER NOT NULL,
+                    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+            text_normalizer.ensure_normalized_columns(conn)
+        finally:
+            conn.close()
+
+    def sync(self):
+        """Lập chỉ mục các video trong catalog chưa có trong chỉ mục"""
+        text_normalizer.backfill_normalized_columns(db_path=self.db_path)
+        conn = self._connect()
+        try:
+            # Tham số LSH thay đổi -> khóa cũ không còn hợp lệ, xây lại toàn bộ
+            stale = conn.execute('''
+                SELECT COUNT(*) FROM dedupe_lsh_documents WHERE num_perm != ? OR bands != ?
+            ''', (self.lsh.num_perm, self.lsh.bands)).fetchone()[0]
+            if stale:
+                print("♻️ LSH parameters changed, rebuilding duplicate index...")
+                write_queue.write(_clear_index, db_path=self.db_path)
+
+            rows = conn.execute('''
+                SELECT video_id, title_norm, movie_norm, desc_norm, reviewer_name FROM video_reviews
+                WHERE video_id NOT IN (SELECT video_id FROM dedupe_lsh_documents)
+            ''').fetchall()
+        finally:
+            conn.close()
+        for i in range(0, len(rows), SYNC_CHUNK_SIZE):
+            documents = [(video_id, self.lsh.document_keys(index_fields(title_norm, movie_norm, desc_norm, channel)))
+                         for video_id, title_norm, movie_norm, desc_norm, channel in rows[i:i + SYNC_CHUNK_SIZE]]
+            write_queue.write(self._store_documents, documents, db_path=self.db_path)
+        if rows:
+            print(f"📇 Indexed {len(rows)} catalog videos for duplicate detection")
+        return len(rows)
+
+    def _store_documents(self, conn, documents):
+        """Ghi [(video_id, khóa bucket)] vào chỉ mục, thay khóa cũ nếu có (thao tác của writer)"""
+        conn.executemany('DELETE FROM dedupe_lsh_buckets WHERE video_id = ?',
+                         [(video_id,) for video_id, _ in documents])
+        conn.executemany(
+            'INSERT OR IGNORE INTO dedupe_lsh_buckets (bucket, video_id) VALUES (?, ?)',
+            [(key, video_id) for video_id, keys in documents for key in keys]
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO dedupe_lsh_documents (video_id, num_perm, bands) VALUES (?, ?, ?)',
+            [(video_id, self.lsh.num_perm, self.lsh.bands) for video_id, _ in documents]
+        )
+
+    def add(self, video_id, fields):
+        """Thêm một video vào chỉ mục (gọi sau khi video được lưu)"""
+        write_queue.write(self._store_documents, [(video_id, self.lsh.document_keys(fields))], db_path=self.db_path)
+
+    def candidates(self, fields, video_id=None):
+        """Lấy các video trong catalog có khả năng trùng lặp
+
+        Trả về list dict (title, video_id, channel_title, description, *_norm).
+        """
+        keys = self.lsh.document_keys(fields)
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            found = {}
+            columns = '''v.id, v.title, v.video_id, v.reviewer_name, v.description,
+                         v.title_norm, v.movie_norm, v.desc_norm'''
+
+            # Khớp chính xác (có index): cùng video_id hoặc cùng tiêu đề đã chuẩn hóa
+            cursor.execute(f'''
+                SELECT {columns} FROM video_reviews v WHERE v.video_id = ?
+                UNION
+                SELECT {columns} FROM video_reviews v WHERE v.title_norm = ? AND v.title_norm != ''
+            ''', (video_id or '', fields['title']))
+            for row in cursor.fetchall():
+                found[row[0]] = row[1:]
+
+            # SQLite giới hạn số tham số, truy vấn theo từng lô khóa
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' for _ in chunk)
+                cursor.execute(f'''
+                    SELECT {columns} FROM video_reviews v
+                    WHERE v.video_id IN (
+                        SELECT DISTINCT video_id FROM dedupe_lsh_buckets WHERE bucket IN ({placeholders})
+                    )
+                ''', chunk)
+                for row in cursor.fetchall():
+                    found[row[0]] = row[1:]
+            return [dict(zip(CATALOG_FIELDS, row)) for row in found.values()]
+        finally:
+            conn.close()
+
+    def prune(self):
+        """Xóa các mục chỉ mục của video đã bị xóa khỏi catalog"""
+        return write_queue.write(_prune_index, db_path=self.db_path)
+
+
+_lsh = None
+
+
+def _default_lsh():
+    global _lsh
+    if _lsh is None:
+        _lsh = MinHashLSH()
+    return _lsh
+
+
+def _has_index(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dedupe_lsh_documents'"
+    ).fetchone() is not None
+
+
+def indexed_state(conn, video_ids):
+    """{video_id: (title_norm, movie_norm, desc_norm, kênh)} của các video đã có trong chỉ mục
+
+    Video không còn trong catalog (bị xóa / đổi video_id) có giá trị None.
+    """
+    video_ids = [video_id for video_id in set(video_ids) if video_id]
+    if not video_ids or not _has_index(conn):
+        return {}
+    state = {}
+    for i in range(0, len(video_ids), 500):
+        chunk = video_ids[i:i + 500]
+        rows = conn.execute(f'''
+            SELECT d.video_id, v.video_id, v.title_norm, v.movie_norm, v.desc_norm, v.reviewer_name
+            FROM dedupe_lsh_documents d LEFT JOIN video_reviews v ON v.video_id = d.video_id
+            WHERE d.video_id IN ({','.join('?' for _ in chunk)})
+        ''', chunk).fetchall()
+        for video_id, found, *fields in rows:
+            state[video_id] = tuple(fields) if found is not None else None
+    return state
+
+
+def rekey_documents(conn, video_ids, before=None):
+    """Tính lại khóa bucket của các video đã lập chỉ mục khi tiêu đề / mô tả / kênh thay đổi
+
+    Gọi trong cùng thao tác ghi với câu UPDATE; before là indexed_state() đọc trước khi ghi
+    (None = tính lại tất cả). Video chưa có trong chỉ mục được sync() lập chỉ mục sau như trước.
+    Trả về số video đã ghi lại.
+    """
+    lsh = _default_lsh()
+    changed = 0
+    for video_id, fields in indexed_state(conn, video_ids).items():
+        if before is not None and before.get(video_id, fields) == fields:
+            continue
+        conn.execute('DELETE FROM dedupe_lsh_buckets WHERE video_id = ?', (video_id,))
+        if fields is None:
+            conn.execute('DELETE FROM dedupe_lsh_documents WHERE video_id = ?', (video_id,))
+        else:
+            conn.executemany('INSERT OR IGNORE INTO dedupe_lsh_buckets (bucket, video_id) VALUES (?, ?)',
+                             [(key, video_id) for key in lsh.document_keys(index_fields(*fields))])
+            conn.execute('''
+                UPDATE dedupe_lsh_documents SET num_perm = ?, bands = ?, indexed_at = CURRENT_TIMESTAMP
+                WHERE video_id = ?
+            ''', (lsh.num_perm, lsh.bands, video_id))
+        changed += 1
+    return changed
+
+
+def _clear_index(conn):
+    conn.execute('DELETE FROM dedupe_lsh_buckets')
+    conn.execute('DELETE FROM dedupe_lsh_documents')
+
+
+def _prune_index(conn):
+    removed = conn.execute('''
+        DELETE FROM dedupe_lsh_documents
+        WHERE video_id NOT IN (SELECT video_id FROM video_reviews)
+    ''').rowcount
+    conn.execute('''
+        DELETE FROM dedupe_lsh_buckets
+        WHERE video_id NOT IN (SELECT video_id FROM dedupe_lsh_documents)
+    ''')
+    return removed
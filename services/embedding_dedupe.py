@@ -0,0 +1,272 @@
+"""
+Embedding Duplicate Detector - Phát hiện trùng lặp theo ngữ nghĩa
+Bắt các review cùng một phim từ nhiều kênh khác nhau dù cách viết tiêu đề hoàn toàn khác
+"""
+
+import sqlite3
+import time
+
+import config
+from services import write_queue
+
+
+class EmbeddingDuplicateDetector:
+    """So sánh embedding của video mới với ma trận embedding của catalog (cosine top-k)"""
+
+    def __init__(self, model=None, db_path=None):
+        self.db_path = db_path or config.DATABASE_PATH
+        self.model_name = config.EMBEDDING_DEDUPE_MODEL
+        self._model = model
+        self._np = None
+        self._matrix = None
+        self._matrix_meta = []
+        self._matrix_key = None
+        self.init_tables()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_tables(self):
+        """Tạo bảng lưu embedding nếu chưa có"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS video_embeddings (
+                    video_id TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def is_available(self):
+        """Kiểm tra numpy + mô hình embedding có dùng được không"""
+        try:
+            import numpy
+            self._np = numpy
+            self._get_model()
+            return True
+        except Exception as e:
+            print(f"⚠️ Embedding dedupe unavailable: {e}")
+            return False
+
+    def _get_model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            print(f"🔹 Loading embedding model for dedupe: {self.model_name}")
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def embedding_text(self, title, description):
+        """Text đưa vào mô hình: tiêu đề + đầu mô tả"""
+        return f"{title or ''}. {(description or '')[:300]}"
+
+    def encode(self, texts):
+        """Embed một lô text, trả về ma trận float32 đã chuẩn hóa L2"""
+        vectors = self._get_model().encode(
+            texts, batch_size=config.EMBEDDING_DEDUPE_BATCH_SIZE,
+            convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        )
+        return self._np.asarray(vectors, dtype=self._np.float32)
+
+    def store_embeddings(self, video_ids, vectors):
+        """Lưu embedding qua writer thread của process (services.write_queue)"""
+        write_queue.get_write_queue(self.db_path).executemany('''
+            INSERT OR REPLACE INTO video_embeddings (video_id, model, dim, vector)
+            VALUES (?, ?, ?, ?)
+        ''', [(video_id, self.model_name, int(vector.shape[0]), vector.tobytes())
+              for video_id, vector in zip(video_ids, vectors)]).result()
+
+    # Dấu vân tay của tập embedding đang dùng: đổi khi thêm / xóa / đổi id / sửa tiêu đề hoặc kênh,
+    # kể cả khi số dòng không đổi (xóa + thêm, reset_ids, khôi phục backup)
+    _JOIN = '''FROM video_embeddings e JOIN video_reviews v ON v.video_id = e.video_id
+                WHERE e.model = ?'''
+    _KEY_SQL = f'''SELECT COUNT(*), COALESCE(MAX(e.rowid), 0), TOTAL(v.id),
+                     TOTAL(length(COALESCE(v.title, '')) + length(COALESCE(v.reviewer_name, '')))
+                 {_JOIN}'''
+    _ROWS_SQL = f'''SELECT e.rowid, v.id, e.video_id, v.title, v.reviewer_name, e.vector
+                  {_JOIN}'''
+
+    def _read_rows(self, cursor, deadline):
+        """Đọc (key, meta, vectors) theo trang; None nếu hết thời gian giữa chừng"""
+        np = self._np
+        count, max_rowid, id_sum, text_len = 0, 0, 0.0, 0.0
+        meta, vectors = [], []
+        while True:
+            page = cursor.fetchmany(1000)
+            if not page:
+                break
+            for rowid, row_id, video_id, title, channel, blob in page:
+                count += 1
+                max_rowid = max(max_rowid, rowid)
+                id_sum += row_id
+                text_len += len(title or '') + len(channel or '')
+                meta.append({'video_id': video_id, 'title': title or '', 'channel_title': channel or ''})
+                vectors.append(np.frombuffer(blob, dtype=np.float32))
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+        return (count, max_rowid, id_sum, text_len), meta, vectors
+
+    def load_catalog_matrix(self, deadline=None):
+        """Ma trận embedding của catalog
+
+        Dùng lại bản cache khi dấu vân tay không đổi; khi chỉ có embedding mới được thêm thì nạp thêm các
+        dòng đó. Nạp lại toàn bộ theo trang và bỏ dở khi quá deadline (giữ ma trận cũ, lần sau nạp tiếp).
+        """
+        np = self._np
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            key = tuple(cursor.execute(self._KEY_SQL, (self.model_name,)).fetchone())
+            if key == self._matrix_key:
+                return self._matrix, self._matrix_meta
+
+            if self._matrix_key is not None:
+                cursor.execute(f'{self._ROWS_SQL} AND e.rowid > ?', (self.model_name, self._matrix_key[1]))
+                added = self._read_rows(cursor, deadline)
+                if added is not None:
+                    (count, max_rowid, id_sum, text_len), meta, vectors = added
+                    old = self._matrix_key
+                    appended = (old[0] + count, max(old[1], max_rowid), old[2] + id_sum, old[3] + text_len)
+                    if appended == key:
+                        if vectors:
+                            stacked = np.vstack(vectors)
+                            self._matrix = stacked if self._matrix is None else np.vstack([self._matrix, stacked])
+                            self._matrix_meta = self._matrix_meta + meta
+                        self._matrix_key = key
+                        return self._matrix, self._matrix_meta
+
+            cursor.execute(self._ROWS_SQL, (self.model_name,))
+            loaded = self._read_rows(cursor, deadline)
+            if loaded is None:
+                print("⏱️ Embedding budget exhausted while loading catalog matrix, using previous matrix")
+                return self._matrix, self._matrix_meta
+            # Khóa tính từ chính các dòng đã đọc (cùng snapshot)
+            self._matrix_key, self._matrix_meta, vectors = loaded
+            self._matrix = np.vstack(vectors) if vectors else None
+            return self._matrix, self._matrix_meta
+        finally:
+            conn.close()
+
+    def backfill_catalog(self, deadline):
+        """Embed các video trong catalog chưa có embedding theo từng trang, dừng khi hết thời gian"""
+        done = 0
+        chunk_size = config.EMBEDDING_DEDUPE_BATCH_SIZE
+        while time.monotonic() < deadline:
+            conn = self._connect()
+            try:
+                chunk = conn.execute('''
+                    SELECT v.video_id, v.title, v.description FROM video_reviews v
+                    LEFT JOIN video_embeddings e ON e.video_id = v.video_id AND e.model = ?
+                    WHERE e.video_id IS NULL AND v.video_id IS NOT NULL
+                    ORDER BY v.created_at DESC
+                    LIMIT ?
+                ''', (self.model_name, chunk_size)).fetchall()
+            finally:
+                conn.close()
+            if not chunk:
+                break
+            vectors = self.encode([self.embedding_text(title, desc) for _, title, desc in chunk])
+            self.store_embeddings([row[0] for row in chunk], vectors)
+            done += len(chunk)
+            if len(chunk) < chunk_size:
+                break
+        if done:
+            print(f"🧠 Embedded {done} catalog videos")
+        return done
+
+    def _duplicate_reason(self, similarity, channel, other_channel):
+        same_channel = bool(channel) and channel.lower() == (other_channel or '').lower()
+        if similarity >= config.EMBEDDING_DUPLICATE_THRESHOLD:
+            return f"same movie (cosine {similarity:.2f})"
+        if same_channel and similarity >= config.EMBEDDING_SAME_CHANNEL_THRESHOLD:
+            return f"same movie + same channel (cosine {similarity:.2f})"
+        return None
+
+    def _top_k_duplicate(self, scores, channel, others):
+        """Xét top-k láng giềng gần nhất (others[i] = (title, channel)); trả về lý do trùng đầu tiên"""
+        k = min(config.EMBEDDING_DEDUPE_TOP_K, len(scores))
+        for idx in self._np.argpartition(-scores, k - 1)[:k]:
+            title, other_channel = others[idx]
+            reason = self._duplicate_reason(float(scores[idx]), channel, other_channel)
+            if reason:
+                return f"{reason} ~ {title[:50]}"
+        return None
+
+    def filter_duplicates(self, videos, time_budget=None):
+        """Loại video trùng lặp theo embedding trong giới hạn thời gian cho mỗi batch
+
+        Video chưa kịp xử lý khi hết thời gian được giữ lại (đã qua bước so sánh chuỗi).
+        """
+        if not videos:
+            return videos
+        budget = config.EMBEDDING_DEDUPE_TIME_BUDGET if time_budget is None else time_budget
+        deadline = time.monotonic() + budget
+        if not self.is_available():
+            return videos
+        np = self._np
+
+        # Embed mỗi video ứng viên đúng một lần, theo lô
+        vectors = []
+        chunk_size = config.EMBEDDING_DEDUPE_BATCH_SIZE
+        for i in range(0, len(videos), chunk_size):
+            if time.monotonic() >= deadline:
+                print(f"⏱️ Embedding budget ({budget}s) exhausted after {len(vectors)}/{len(videos)} videos")
+                break
+            chunk = videos[i:i + chunk_size]
+            vectors.extend(self.encode([self.embedding_text(v.get('title'), v.get('description')) for v in chunk]))
+        checked = len(vectors)
+
+        # Thời gian còn lại dùng để embed dần catalog cũ trước khi so sánh
+        self.backfill_catalog(deadline)
+        matrix, meta = self.load_catalog_matrix(deadline)
+        catalog = [(m['title'], m['channel_title']) for m in meta]
+        kept, kept_vectors, kept_videos, kept_others, duplicates = [], [], [], [], 0
+        for position, video in enumerate(videos):
+            if position >= checked:
+                kept.append(video)
+                continue
+            vector = vectors[position]
+            channel = video.get('channel_title') or video.get('channel', '')
+            reason = None
+
+            # Top-k láng giềng gần nhất trong catalog
+            if matrix is not None:
+                reason = self._top_k_duplicate(matrix @ vector, channel, catalog)
+
+            # So với top-k video đã nhận trong cùng batch (cùng ngưỡng như catalog)
+            if reason is None and kept_vectors:
+                reason = self._top_k_duplicate(np.vstack(kept_vectors) @ vector, channel, kept_others)
+
+            if reason:
+                duplicates += 1
+                print(f"🚫 Embedding duplicate: {video.get('title', '')[:50]}... ({reason})")
+                continue
+            kept.append(video)
+            kept_vectors.append(vector)
+            kept_videos.append(video)
+            kept_others.append((video.get('title') or '', channel))
+
+        # Lưu embedding của video mới để lần sau không phải tính lại
+        new_ids = [v.get('video_id') for v in kept_videos]
+        if new_ids:
+            self.store_embeddings(new_ids, kept_vectors)
+
+        print(f"🧠 Embedding dedupe: {checked}/{len(videos)} checked, {duplicates} duplicates removed")
+        return kept
+
+
+# Global instance
+_detector_instance = None
+
+
+def get_embedding_detector():
+    """Singleton - mô hình embedding chỉ nạp một lần mỗi process"""
+    global _detector_instance
+    if _detector_instance is None:
+        _detector_instance = EmbeddingDuplicateDetector()
+    return _detector_instance
@@ -0,0 +1,380 @@
+"""
+Ingest Pipeline - Pipeline nhiều stage cho việc lấy video mới
+fetch -> enrich -> quality -> dedupe [-> embed_dedupe] -> classify -> persist, nối bằng hàng đợi giới hạn (backpressure)
+Mỗi stage có số worker riêng và ghi lại số item vào/ra, bị loại, lỗi và thời gian xử lý
+"""
+
+import queue
+import threading
+import time
+
+import config
+
+_DONE = object()
+PROGRESS_INTERVAL = 0.5  # giây tối thiểu giữa hai lần báo tiến độ của cùng một stage
+
+
+class StageMetrics:
+    """Số liệu của một stage (cộng dồn từ mọi worker)"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.rejected = 0
+        self.errors = 0
+        self.busy_seconds = 0.0     # thời gian trong hàm xử lý
+        self.blocked_seconds = 0.0  # thời gian chờ stage sau nhận (hàng đợi đầy)
+        self.started_at = None
+        self.finished_at = None
+        self.reported_at = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items_in, items_out, busy, expand=False, error=False):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy_seconds += busy
+            if error:
+                self.errors += items_in
+            elif not expand:
+                self.rejected += max(0, items_in - items_out)
+
+    def add_blocked(self, seconds):
+        with self._lock:
+            self.blocked_seconds += seconds
+
+    def should_report(self, force=False):
+        """True nếu đã đến lúc báo tiến độ (tối đa một lần mỗi PROGRESS_INTERVAL giây)"""
+        now = time.perf_counter()
+        with self._lock:
+            if not force and now - self.reported_at < PROGRESS_INTERVAL:
+                return False
+            self.reported_at = now
+            return True
+
+    def as_dict(self):
+        wall = (self.finished_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'in': self.items_in,
+            'out': self.items_out,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'wall_seconds': round(max(wall, 0.0), 3),
+        }
+
+
+class Stage:
+    """Một stage: func(list item) -> list item đầu ra
+
+    batch_size > 1: worker gom tối đa batch_size item (chờ batch_wait giây) trước khi gọi func.
+    expand=True: stage sinh nhiều item từ một item (vd. fetch), không tính là loại bỏ.
+    """
+
+    def __init__(self, name, func, workers=1, batch_size=1, batch_wait=0.2, expand=False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.expand = expand
+
+
+def each(func):
+    """Biến hàm xử lý từng item (trả về item, list item hoặc None = loại) thành hàm theo lô"""
+    def run_batch(batch):
+        outputs = []
+        for item in batch:
+            result = func(item)
+            if result is None or result is False:
+                continue
+            if isinstance(result, list):
+                outputs.extend(result)
+            else:
+                outputs.append(item if result is True else result)
+        return outputs
+    return run_batch
+
+
+class Pipeline:
+    """Chạy các stage trên thread, nối nhau bằng queue.Queue(maxsize)
+
+    progress: hàm progress(event, data) nhận số liệu từng stage trong lúc chạy (event 'stage').
+    on_finish: các hàm gọi sau khi mọi stage kết thúc (vd. đóng process pool của stage quality).
+    stop: threading.Event - khi được set, các stage bỏ qua item còn lại (vd. mất lease crawl).
+    """
+
+    def __init__(self, stages, queue_size=None, progress=None, on_finish=(), stop=None):
+        self.stages = stages
+        self.queue_size = queue_size or config.INGEST_QUEUE_SIZE
+        self.metrics = [StageMetrics(stage.name, stage.workers) for stage in stages]
+        self.total_seconds = 0.0
+        self.progress = progress
+        self.on_finish = list(on_finish)
+        self.stop = stop
+
+    def run(self, items):
+        """Đưa items vào stage đầu, trả về list item ra khỏi stage cuối"""
+        start = time.perf_counter()
+        inboxes = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        sink = queue.Queue()
+        outboxes = inboxes[1:] + [sink]
+        next_workers = [stage.workers for stage in self.stages[1:]] + [1]
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def worker(index):
+            stage, metrics = self.stages[index], self.metrics[index]
+            inbox, outbox = inboxes[index], outboxes[index]
+            finished = False
+            while not finished:
+                item = inbox.get()
+                if item is _DONE:
+                    break
+                batch = [item]
+                while len(batch) < stage.batch_size:
+                    try:
+                        item = inbox.get(timeout=stage.batch_wait)
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        finished = True
+                        break
+                    batch.append(item)
+                self._process(stage, metrics, batch, outbox)
+
+            # Worker cuối cùng của stage báo kết thúc cho stage sau
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                metrics.finished_at = time.perf_counter()
+                self._report(metrics, force=True)
+                for _ in range(next_workers[index]):
+                    outbox.put(_DONE)
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            self.metrics[index].started_at = start
+            for n in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(index,), name=f"ingest-{stage.name}-{n}")
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+
+        def feed():
+            for item in items:
+                if self.stop is not None and self.stop.is_set():
+                    break
+                inboxes[0].put(item)
+            for _ in range(self.stages[0].workers):
+                inboxes[0].put(_DONE)
+
+        feeder = threading.Thread(target=feed, name='ingest-feeder')
+        feeder.daemon = True
+        feeder.start()
+
+        results = []
+        while True:
+            item = sink.get()
+            if item is _DONE:
+                break
+            results.append(item)
+        for thread in threads:
+            thread.join()
+        for func in self.on_finish:
+            func()
+        self.total_seconds = time.perf_counter() - start
+        return results
+
+    def _process(self, stage, metrics, batch, outbox):
+        if self.stop is not None and self.stop.is_set():
+            return  # dừng: bỏ qua lô, stage sau vẫn nhận _DONE như bình thường
+        started = time.perf_counter()
+        try:
+            outputs = stage.func(batch) or []
+            error = False
+        except Exception as e:
+            print(f"❌ Stage '{stage.name}' failed on {len(batch)} item(s): {e}")
+            outputs, error = [], True
+        metrics.record(len(batch), len(outputs), time.perf_counter() - started,
+                       expand=stage.expand, error=error)
+        self._report(metrics)
+
+        blocked_from = time.perf_counter()
+        for output in outputs:
+            outbox.put(output)
+        metrics.add_blocked(time.perf_counter() - blocked_from)
+
+    def _report(self, metrics, force=False):
+        if self.progress is None or not metrics.should_report(force):
+            return
+        try:
+            self.progress('stage', dict(metrics.as_dict(), finished=metrics.finished_at is not None))
+        except Exception as e:
+            print(f"⚠️ Progress callback failed: {e}")
+
+    def report(self):
+        """Bảng số liệu theo stage (dùng để lưu kèm update_logs)"""
+        return {
+            'total_seconds': round(self.total_seconds, 3),
+            'stages': [metrics.as_dict() for metrics in self.metrics],
+        }
+
+    def print_report(self):
+        print(f"\n📊 Ingest pipeline: {self.total_seconds:.2f}s")
+        for row in self.report()['stages']:
+            print(f"   {row['stage']:>9} x{row['workers']}: in {row['in']:>4}  out {row['out']:>4}  "
+                  f"rejected {row['rejected']:>4}  errors {row['errors']:>3}  "
+                  f"busy {row['busy_seconds']:.2f}s  blocked {row['blocked_seconds']:.2f}s")
+
+
+class DedupeStage:
+    """Stage dedupe: so với catalog (chỉ mục LSH) và với các video đã nhận trong lần chạy này
+
+    catalog=False: chỉ lọc trùng trong lần chạy (stage quality đã chấm trùng với catalog trên process pool).
+    """
+
+    def __init__(self, content_filter, catalog=True):
+        from services.dedupe_index import MinHashLSH
+
+        self.content_filter = content_filter
+        self.use_index = config.DEDUPE_USE_LSH_INDEX
+        self.catalog = catalog
+        if catalog and self.use_index:
+            self.index = content_filter.get_duplicate_index()
+            self.index.sync()
+        elif catalog:
+            self.existing = content_filter.get_existing_videos_from_db()
+        self.accepted = []
+        self.batch_index = MinHashLSH()
+        self._lock = threading.Lock()
+
+    def __call__(self, video):
+        content_filter = self.content_filter
+        if self.catalog and self.use_index:
+            if content_filter.is_duplicate_in_catalog(video, self.index):
+                return None
+        elif self.catalog and content_filter.is_duplicate_video(video, self.existing):
+            return None
+        with self._lock:
+            if content_filter.is_duplicate_in_batch(video, self.accepted, self.batch_index):
+                print(f"🚫 Duplicate within new batch")
+                return None
+            self.batch_index.add(len(self.accepted), content_filter.index_fields(video))
+            self.accepted.append(video)
+        return video
+
+
+def build_ingest_pipeline(youtube_service, content_filter=None, workers=None, classifier=None, crawl_run=None,
+                          progress=None, crawl_yield=None, lease=None):
+    """Pipeline lấy video: query -> video đã lưu vào video_reviews
+
+    Đầu vào: query (str), (query, page_token, pages_fetched) khi tiếp tục crawl run,
+    hoặc dict video đã checkpoint (bỏ qua bước search).
+    classifier: hàm phân loại thay cho youtube_service.classify_video (vd. benchmark offline).
+    crawl_run: services.crawl_runs.CrawlRun - checkpoint từng trang kết quả và video đã lưu.
+    progress: hàm progress(event, data) - event 'query' sau mỗi query, 'stage' cho số liệu từng stage.
+    crawl_yield: services.crawl_schedule.CrawlYield - ghi số video tìm thấy / được nhận theo nguồn và kênh.
+    lease: services.leases.Lease đang giữ - mất lease thì pipeline dừng (kiểm tra giữa các trang search),
+    mỗi lô persist kiểm tra generation (fencing token) trong chính transaction ghi.
+    """
+    from services.crawl_schedule import parse_source
+    from services.content_filter import ContentFilter
+    from services import video_store
+
+    content_filter = content_filter or ContentFilter()
+    workers = dict(config.INGEST_STAGE_WORKERS, **(workers or {}))
+
+    def fetch(item):
+        if isinstance(item, dict):
+            return [item]  # video từ checkpoint của lần chạy trước
+        query, page_token, pages = (item, None, 0) if isinstance(item, str) else item
+        search_query, channel_id = parse_source(query)
+        found = []
+        fetched = 0
+        while True:
+            if lease is not None:
+                lease.check()
+            videos, next_token = youtube_service.search_videos_page(
+                search_query, max_results=config.INGEST_RESULTS_PER_QUERY, page_token=page_token,
+                channel_id=channel_id)
+            videos = videos or []
+            for video in videos:
+                video['crawl_source'] = query
+            pages += 1
+            fetched += 1
+            done = not next_token or pages >= config.INGEST_PAGES_PER_QUERY
+            if crawl_run is not None:
+                crawl_run.save_page(query, videos, next_token, done)
+            found.extend(videos)
+            if config.INGEST_FETCH_DELAY:
+                time.sleep(config.INGEST_FETCH_DELAY)
+            if done:
+                break
+            page_token = next_token
+        if found:
+            print(f"📺 Found {len(found)} videos for '{query}'")
+        if crawl_yield is not None:
+            crawl_yield.record_fetch(query, found, fetched)
+        if progress is not None:
+            progress('query', {'query': query, 'found': len(found), 'pages': pages})
+        return found
+
+    def persist(videos):
+        # Qua writer thread của process: lô được gộp với ghi của route admin thay vì tranh write lock
+        result = video_store.bulk_upsert_videos(videos, fence=lease.fence if lease is not None else None)
+        if crawl_run is not None:
+            crawl_run.mark_persisted([v['video_id'] for v in videos], result['inserted'])
+        print(f"💾 Saved batch: {result['inserted']} added, {result['updated']} updated")
+        new_ids = set(result['new_video_ids'])
+        added = [v for v in videos if v['video_id'] in new_ids]
+        if crawl_yield is not None:
+            crawl_yield.record_added(added)
+        return added
+
+    scorer = None
+    if config.CONTENT_FILTER_PARALLEL:
+        # Tạo process pool trước khi pipeline mở thread; stage quality chấm cả chất lượng lẫn trùng với
+        # catalog trên pool (video trùng catalog được tính là bị loại ở stage quality)
+        from services.content_filter import ParallelScorer
+        try:
+            scorer = ParallelScorer(content_filter).start()
+        except Exception as e:
+            print(f"⚠️ Process pool unavailable ({e}), quality + dedupe run in-process")
+
+    def score(videos):
+        kept = []
+        for video, (passed, catalog_duplicate, norms) in zip(videos, scorer.score(videos)):
+            if passed and not catalog_duplicate:
+                video.update(norms)
+                kept.append(video)
+        return kept
+
+    if scorer is None:
+        quality = Stage('quality', each(content_filter.validate_video_quality), workers=workers['quality'])
+    else:
+        quality = Stage('quality', score, workers=workers['quality'], batch_size=config.INGEST_QUALITY_BATCH)
+    stages = [
+        Stage('fetch', each(fetch), workers=workers['fetch'], expand=True),
+        Stage('enrich', youtube_service.enrich_videos, workers=workers['enrich'],
+              batch_size=config.INGEST_ENRICH_BATCH),
+        quality,
+        Stage('dedupe', each(DedupeStage(content_filter, catalog=scorer is None)), workers=1),
+    ]
+    if config.ENABLE_EMBEDDING_DEDUPE:
+        # So sánh ngữ nghĩa sau bước so sánh chuỗi, theo lô, trong EMBEDDING_DEDUPE_TIME_BUDGET mỗi lô
+        from services.embedding_dedupe import get_embedding_detector
+        stages.append(Stage('embed_dedupe', get_embedding_detector().filter_duplicates, workers=1,
+                            batch_size=config.INGEST_EMBED_DEDUPE_BATCH))
+    stages += [
+        Stage('classify', each(classifier or youtube_service.classify_video), workers=workers['classify']),
+        Stage('persist', persist, workers=workers['persist'], batch_size=config.INGEST_PERSIST_BATCH),
+    ]
+    return Pipeline(stages, progress=progress, on_finish=[scorer.close] if scorer is not None else (),
+                    stop=lease.lost if lease is not None else None)
@@ -0,0 +1,134 @@
+"""
+Job Store - APScheduler job store trên sqlite3 (không cần SQLAlchemy)
+Lưu job (trạng thái pickle) trong bảng apscheduler_jobs của database chính để lịch chạy còn nguyên sau restart
+Thêm / sửa / xóa job đi qua writer thread của process (services.write_queue)
+"""
+
+import pickle
+import sqlite3
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+import config
+from services import write_queue
+
+
+class SQLiteJobStore(BaseJobStore):
+    """Cùng cách lưu với SQLAlchemyJobStore: id, next_run_time (UTC timestamp, NULL = tạm dừng), job_state"""
+
+    def __init__(self, db_path=None, tablename='apscheduler_jobs', pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.db_path = db_path or config.DATABASE_PATH
+        self.tablename = tablename
+        self.pickle_protocol = pickle_protocol
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        conn = self._connect()
+        try:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.tablename} (
+                    id TEXT PRIMARY KEY,
+                    next_run_time REAL,
+                    job_state BLOB NOT NULL
+                )
+            ''')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.tablename}_next_run_time '
+                         f'ON {self.tablename}(next_run_time)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def lookup_job(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(f'SELECT job_state FROM {self.tablename} WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs('WHERE next_run_time <= ?', (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        conn = self._connect()
+        try:
+            row = conn.execute(f'''
+                SELECT next_run_time FROM {self.tablename}
+                WHERE next_run_time IS NOT NULL ORDER BY next_run_time LIMIT 1
+            ''').fetchone()
+        finally:
+            conn.close()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def _writer(self):
+        return write_queue.get_write_queue(self.db_path)
+
+    def add_job(self, job):
+        try:
+            self._writer().execute(f'INSERT INTO {self.tablename} (id, next_run_time, job_state) VALUES (?, ?, ?)',
+                                   (job.id, datetime_to_utc_timestamp(job.next_run_time),
+                                    self._serialize(job))).result()
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        updated = self._writer().execute(
+            f'UPDATE {self.tablename} SET next_run_time = ?, job_state = ? WHERE id = ?',
+            (datetime_to_utc_timestamp(job.next_run_time), self._serialize(job), job.id)).result()
+        if updated == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        if self._writer().execute(f'DELETE FROM {self.tablename} WHERE id = ?', (job_id,)).result() == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        self._writer().execute(f'DELETE FROM {self.tablename}').result()
+
+    def _serialize(self, job):
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where='', params=()):
+        conn = self._connect()
+        try:
+            rows = conn.execute(f'SELECT id, job_state FROM {self.tablename} {where} ORDER BY next_run_time',
+                                params).fetchall()
+        finally:
+            conn.close()
+
+        jobs, failed_job_ids = [], []
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except BaseException:
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                failed_job_ids.append(job_id)
+
+        # Job không khôi phục được (vd. hàm đã bị đổi tên) bị xóa khỏi store
+        if failed_job_ids:
+            self._writer().executemany(f'DELETE FROM {self.tablename} WHERE id = ?',
+                                       [(i,) for i in failed_job_ids]).result()
+        return jobs
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} (db_path={self.db_path})>'
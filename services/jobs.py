@@ -0,0 +1,422 @@
+"""
+Jobs - Các job định kỳ (crawl, refresh stats, phân loại lại (AI / theo tiêu đề), bảo trì database, dọn log, sao lưu)
+Lịch chạy do APScheduler quản lý với job store SQLite (services.job_store); mỗi lần chạy được ghi vào job_runs
+Tiến độ của mỗi lần chạy được ghi vào job_events để trang admin (ở bất kỳ worker nào) theo dõi qua SSE
+job_runs / job_events được ghi qua writer thread của process (services.write_queue)
+Chỉ leader (lease 'scheduler', xem services.scheduler) thực thi job; các worker khác chỉ đọc / sửa lịch
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+import config
+from services import write_queue
+from services.leases import Lease, LeaseBusy, process_holder_id
+
+TIMEZONE = pytz.timezone('Asia/Ho_Chi_Minh')
+
+
+# ---- Các job ----
+
+# Mỗi job nhận progress(event, data) để báo tiến độ (ghi vào job_events) và manual=True khi admin chạy tay
+
+def crawl_job(progress, manual=False):
+    """Crawl các nguồn đến hạn theo lịch thích nghi; admin chạy tay thì crawl mọi nguồn"""
+    from services.scheduler import get_scheduler
+    return get_scheduler().run_auto_update(progress, force=manual)
+
+
+def stats_refresh_job(progress, manual=False):
+    from services.stats_refresh import StatsRefresher
+    return StatsRefresher().run()
+
+
+def reclassify_job(progress, manual=False, limit=None):
+    """Phân loại lại (AI) thể loại cho các video còn 'Unknown' / trống, theo lô"""
+    limit = limit or config.RECLASSIFY_BATCH_SIZE
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        rows = conn.execute('''
+            SELECT id, title, description FROM video_reviews
+            WHERE genre IS NULL OR genre IN ('', 'Unknown', 'Không xác định')
+            ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+        if not rows:
+            return {'reclassified': 0}
+        from smart_update_videos import analyze_movie_info  # tải mô hình AI khi thật sự cần
+        updates = []
+        for video_id, title, description in rows:
+            genre = analyze_movie_info(title, description).get('genre')
+            if genre and genre != 'Unknown':
+                updates.append((genre, video_id))
+        write_queue.get_write_queue().executemany('UPDATE video_reviews SET genre = ? WHERE id = ?', updates).result()
+        return {'checked': len(rows), 'reclassified': len(updates)}
+    finally:
+        conn.close()
+
+
+def classify_backfill_job(progress, manual=False):
+    """Phân loại theo tiêu đề (quốc gia / thể loại / phim bộ) cho video 'Unknown' chưa được phiên bản bộ phân loại
+    hiện tại thử; theo lô, có giới hạn mỗi lần chạy (thay cho vòng lặp trong init_db lúc khởi động)"""
+    from services import title_classifier
+
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        title_classifier.ensure_classifier_schema(conn)
+        result = title_classifier.backfill(conn, progress=progress)
+        result['pending'] = title_classifier.pending_count(conn)
+        result['classifier_version'] = title_classifier.CLASSIFIER_VERSION
+        return result
+    finally:
+        conn.close()
+
+
+def db_maintenance_job(progress, manual=False):
+    """Tối ưu chỉ mục FTS (nếu có), PRAGMA optimize và VACUUM khi tỉ lệ trang trống đủ lớn
+
+    Chạy là thao tác exclusive của writer (VACUUM không chạy được trong transaction): các ghi khác chờ tới khi xong.
+    """
+    def maintain(conn):
+        fts_tables = [row[0] for row in conn.execute('''
+            SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%USING fts%'
+        ''')]
+        for table in fts_tables:
+            conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+        conn.execute('PRAGMA optimize')
+
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        vacuumed = bool(page_count) and free_pages / page_count >= config.VACUUM_FREE_RATIO
+        if vacuumed:
+            conn.execute('VACUUM')
+        return {'fts_optimized': fts_tables, 'page_count': page_count, 'free_pages': free_pages,
+                'vacuumed': vacuumed}
+
+    return write_queue.write(maintain, exclusive=True)
+
+
+def log_compaction_job(progress, manual=False):
+    """Cộng dồn + dọn update_logs cũ (theo lô), dọn job_runs cũ, cache metadata hết hạn và chỉ mục dedupe
+    của video đã xóa"""
+    from services import update_logs
+    from services.dedupe_index import CatalogDuplicateIndex
+    from services.metadata_cache import get_metadata_cache
+
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        update_logs.ensure_update_logs_schema(conn)
+        logs = update_logs.rollup_and_prune(conn, progress=progress)
+    finally:
+        conn.close()
+    runs = write_queue.write(_prune_job_history)
+    return {
+        'update_logs_rolled_up': logs,
+        'job_runs_deleted': runs,
+        'metadata_cache_purged': get_metadata_cache().purge_expired(),
+        'dedupe_index_pruned': CatalogDuplicateIndex().prune(),
+    }
+
+
+def backup_job(progress, manual=False):
+    """Sao lưu database (backup API từng bước + integrity_check + gzip) rồi xóa bản hết hạn giữ"""
+    from services import backups
+    info = backups.create_snapshot(progress=progress)
+    return {'backup': info['name'], 'videos': info['videos'], 'bytes': info['bytes'],
+            'restarts': info['restarts'], 'expired_removed': backups.prune_snapshots()}
+
+
+def _prune_job_history(conn):
+    runs = conn.execute("DELETE FROM job_runs WHERE started_at < datetime('now', ?)",
+                        (f"-{config.JOB_RUN_HISTORY_DAYS} days",)).rowcount
+    conn.execute('DELETE FROM job_events WHERE run_id NOT IN (SELECT id FROM job_runs)')
+    return runs
+
+
+# id -> (tên hiển thị, hàm, chu kỳ giây)
+JOBS = {
+    'crawl': ('Crawl video mới', crawl_job, lambda: config.CRAWL_CHECK_INTERVAL_HOURS * 3600),
+    'stats_refresh': ('Cập nhật lượt xem / thích', stats_refresh_job,
+                      lambda: config.STATS_REFRESH_INTERVAL_HOURS * 3600),
+    'reclassify': ('Phân loại lại video Unknown', reclassify_job, lambda: config.RECLASSIFY_INTERVAL_HOURS * 3600),
+    'classify_backfill': ('Phân loại video Unknown theo tiêu đề', classify_backfill_job,
+                          lambda: config.CLASSIFY_BACKFILL_INTERVAL_HOURS * 3600),
+    'db_maintenance': ('Tối ưu FTS / VACUUM', db_maintenance_job, lambda: config.DB_MAINTENANCE_INTERVAL_HOURS * 3600),
+    'log_compaction': ('Dọn log cũ', log_compaction_job, lambda: config.LOG_COMPACTION_INTERVAL_HOURS * 3600),
+    'backup': ('Sao lưu database', backup_job, lambda: config.BACKUP_INTERVAL_HOURS * 3600),
+}
+
+
+# ---- Lịch sử chạy ----
+
+def init_job_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            trigger TEXT,
+            holder TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            duration_seconds REAL,
+            result TEXT,
+            error TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs(job_id, started_at)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_job_events_run ON job_events(run_id, id)')
+    conn.commit()
+
+
+def emit_event(run_id, event, data=None):
+    """Ghi một sự kiện tiến độ của lần chạy run_id (đọc lại bởi job_events_since)"""
+    write_queue.get_write_queue().execute('INSERT INTO job_events (run_id, event, data) VALUES (?, ?, ?)',
+                                          (run_id, event, json.dumps(data, ensure_ascii=False, default=str))).result()
+
+
+def job_events_since(run_id, after_id=0):
+    """[(event id, event, data)] của run_id sau after_id, và trạng thái hiện tại của lần chạy"""
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        rows = conn.execute('''
+            SELECT id, event, data FROM job_events WHERE run_id = ? AND id > ? ORDER BY id
+        ''', (run_id, after_id)).fetchall()
+        status = conn.execute('SELECT status FROM job_runs WHERE id = ?', (run_id,)).fetchone()
+    finally:
+        conn.close()
+    return [(event_id, event, json.loads(data) if data else None) for event_id, event, data in rows], \
+        (status[0] if status else None)
+
+
+def start_run(job_id, trigger):
+    """Tạo dòng job_runs (status 'running') và trả về id của lần chạy"""
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        init_job_tables(conn)
+    finally:
+        conn.close()
+
+    def insert(conn):
+        return conn.execute("INSERT INTO job_runs (job_id, status, trigger, holder) VALUES (?, 'running', ?, ?)",
+                            (job_id, trigger, process_holder_id())).lastrowid
+
+    return write_queue.write(insert)
+
+
+def execute_run(run_id, job_id, manual=False, func=None):
+    """Chạy job cho lần chạy run_id đã tạo, ghi kết quả vào job_runs và sự kiện 'done' vào job_events
+
+    func: hàm func(progress) cho tác vụ một lần (không có trong JOBS), xem trigger_task.
+    """
+    def progress(event, data=None):
+        try:
+            emit_event(run_id, event, data)
+        except sqlite3.Error as e:
+            print(f"⚠️ Cannot record job event: {e}")
+
+    started = time.perf_counter()
+    status, result, error = 'success', None, None
+    try:
+        with Lease(f"job:{job_id}", ttl=config.SCHEDULER_LEASE_TTL).hold() as lease:
+            def fenced(event, data=None):
+                # Job báo tiến độ giữa các lô: mất lease -> LeaseLost, dừng trước lô tiếp theo
+                lease.check()
+                progress(event, data)
+
+            fenced('started', {'job_id': job_id})
+            result = func(fenced) if func else JOBS[job_id][1](fenced, manual=manual)
+        if isinstance(result, dict) and result.get('error'):
+            status, error = 'error', result['error']
+    except LeaseBusy as e:
+        status, error = 'skipped', str(e)
+    except Exception as e:
+        status, error = 'error', str(e)
+        print(f"❌ Job '{job_id}' failed: {e}")
+
+    duration = round(time.perf_counter() - started, 3)
+
+    def finish(conn):
+        conn.execute('''
+            UPDATE job_runs SET status = ?, finished_at = CURRENT_TIMESTAMP, duration_seconds = ?,
+                   result = ?, error = ?
+            WHERE id = ?
+        ''', (status, duration,
+              json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+              error, run_id))
+        conn.execute('INSERT INTO job_events (run_id, event, data) VALUES (?, ?, ?)',
+                     (run_id, 'done', json.dumps({'status': status, 'result': result, 'error': error,
+                                                  'duration_seconds': duration},
+                                                 ensure_ascii=False, default=str)))
+
+    write_queue.write(finish)
+    print(f"🗂️ Job '{job_id}' {status} in {duration:.1f}s")
+    return status
+
+
+def run_job(job_id, trigger='schedule'):
+    """Điểm vào của mọi job ('services.jobs:run_job' được lưu trong job store)
+
+    Lease 'job:<id>' giữ max_instances=1 trên mọi process, kể cả khi admin chạy thủ công.
+    """
+    return execute_run(start_run(job_id, trigger), job_id)
+
+
+def recent_job_runs(limit=30, job_id=None):
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        init_job_tables(conn)
+        where, params = ('WHERE job_id = ?', (job_id, limit)) if job_id else ('', (limit,))
+        rows = conn.execute(f'''
+            SELECT id, job_id, status, trigger, holder, started_at, finished_at, duration_seconds, result, error
+            FROM job_runs {where} ORDER BY id DESC LIMIT ?
+        ''', params).fetchall()
+    finally:
+        conn.close()
+    keys = ['id', 'job_id', 'status', 'trigger', 'holder', 'started_at', 'finished_at', 'duration_seconds',
+            'result', 'error']
+    return [dict(zip(keys, row), result=json.loads(row[8]) if row[8] else None) for row in rows]
+
+
+# ---- Scheduler ----
+
+class JobManager:
+    """BackgroundScheduler + SQLiteJobStore; mọi process start ở trạng thái paused, leader gọi activate()"""
+
+    def __init__(self, db_path=None):
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from services.job_store import SQLiteJobStore
+
+        self.scheduler = BackgroundScheduler(
+            jobstores={'default': SQLiteJobStore(db_path)},
+            job_defaults={
+                'coalesce': True,  # lỡ nhiều lần (server tắt) -> chỉ chạy bù một lần
+                'max_instances': 1,
+                'misfire_grace_time': config.JOB_MISFIRE_GRACE_SECONDS,
+            },
+            timezone=TIMEZONE,
+        )
+        self.active = False
+
+    def start(self):
+        self.scheduler.start(paused=True)
+        self.ensure_jobs()
+
+    def ensure_jobs(self):
+        """Thêm job chưa có; job đã có giữ lịch đã lưu, chỉ đổi trigger khi chu kỳ trong config thay đổi"""
+        for job_id, (name, _, interval) in JOBS.items():
+            seconds = interval()
+            job = self.scheduler.get_job(job_id)
+            if job is None:
+                self.scheduler.add_job('services.jobs:run_job', 'interval', args=[job_id], id=job_id, name=name,
+                                       seconds=seconds)
+            elif int(job.trigger.interval.total_seconds()) != seconds:
+                self.scheduler.reschedule_job(job_id, trigger='interval', seconds=seconds)
+
+    def activate(self):
+        """Process này là leader: bắt đầu thực thi job"""
+        if not self.active:
+            self.scheduler.resume()
+            self.active = True
+
+    def deactivate(self):
+        if self.active:
+            self.scheduler.pause()
+            self.active = False
+
+    def wakeup(self):
+        """Đọc lại job store (admin ở worker khác có thể đã đổi lịch / tạm dừng job)"""
+        self.scheduler.wakeup()
+
+    def shutdown(self):
+        self.scheduler.shutdown(wait=False)
+
+    def list_jobs(self):
+        jobs = []
+        for job in self.scheduler.get_jobs():
+            jobs.append({
+                'id': job.id,
+                'name': job.name,
+                'paused': job.next_run_time is None,
+                'next_run_time': job.next_run_time.isoformat() if job.next_run_time else None,
+                'interval_seconds': int(job.trigger.interval.total_seconds()),
+            })
+        return jobs
+
+    def pause(self, job_id):
+        self.scheduler.pause_job(job_id)
+
+    def resume(self, job_id):
+        self.scheduler.resume_job(job_id)
+
+
+def trigger_job(job_id):
+    """Chạy job ngay trên thread nền của process hiện tại, trả về id lần chạy (theo dõi qua job_events)
+
+    Lease job:<id> chặn chạy trùng: nếu job đang chạy ở nơi khác, lần chạy này kết thúc với status 'skipped'.
+    """
+    if job_id not in JOBS:
+        raise KeyError(job_id)
+    run_id = start_run(job_id, 'manual')
+    thread = threading.Thread(target=execute_run, args=(run_id, job_id, True), name=f"job-{job_id}-{run_id}",
+                              daemon=True)
+    thread.start()
+    return run_id
+
+
+def trigger_task(task_id, func):
+    """Chạy tác vụ một lần func(progress) trên thread nền, ghi lịch sử / tiến độ như job; trả về id lần chạy
+
+    Các tác vụ cùng task_id dùng chung lease job:<task_id> nên không chạy chồng lên nhau.
+    """
+    run_id = start_run(task_id, 'manual')
+    thread = threading.Thread(target=execute_run, args=(run_id, task_id, True, func),
+                              name=f"job-{task_id}-{run_id}", daemon=True)
+    thread.start()
+    return run_id
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """JobManager dùng chung trong process (cần APScheduler)"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            manager = JobManager()
+            manager.start()
+            _job_manager = manager
+        return _job_manager
+
+
+def job_overview():
+    """Danh sách job cho trang admin; vẫn trả về định nghĩa job khi thiếu APScheduler"""
+    try:
+        jobs = get_job_manager().list_jobs()
+        available = True
+    except ImportError:
+        jobs = [{'id': job_id, 'name': name, 'paused': None, 'next_run_time': None,
+                 'interval_seconds': interval()} for job_id, (name, _, interval) in JOBS.items()]
+        available = False
+    last_runs = {}
+    for run in recent_job_runs(limit=200):
+        last_runs.setdefault(run['job_id'], run)
+    for job in jobs:
+        job['last_run'] = last_runs.get(job['id'])
+    return {'scheduler_available': available, 'jobs': jobs,
+            'generated_at': datetime.now(TIMEZONE).isoformat()}
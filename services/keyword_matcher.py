@@ -0,0 +1,52 @@
+"""
+Keyword Matcher - So khớp nhiều nhóm từ khóa đã biên dịch sẵn
+Mỗi nhóm (vd. review / movie / excluded) được chuẩn bị một lần khi khởi tạo thay vì ở mỗi video
+"""
+
+import re
+
+
+class KeywordMatcher:
+    """Nhóm từ khóa với ngữ nghĩa 'keyword in text' như trước
+
+    - Từ khóa thường: tuple đã rút gọn (bỏ từ khóa chứa một từ khóa ngắn hơn cùng nhóm,
+      vd. 'review phim' đã được 'review' bao phủ), kiểm tra bằng phép 'in' (C, dừng ở kết quả đầu).
+    - Từ khóa dạng r'\\bword\\b': gộp thành một regex biên dịch sẵn cho mỗi nhóm.
+    Với CPython, cách này nhanh hơn một regex alternation quét toàn bộ text cho mọi nhóm.
+    """
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self._plain = {}
+        self._existence = {}
+        self._boundary = {}
+        for name, keywords in categories.items():
+            plain = [k for k in keywords if not (k.startswith(r'\b') and k.endswith(r'\b'))]
+            boundary = [k for k in keywords if k not in plain]
+            self._plain[name] = tuple(plain)
+            self._existence[name] = tuple(k for k in plain if not any(o != k and o in k for o in plain))
+            self._boundary[name] = re.compile('|'.join(boundary)) if boundary else None
+
+    def has(self, name, text):
+        """Nhóm name có từ khóa nào xuất hiện trong text không"""
+        for keyword in self._existence[name]:
+            if keyword in text:
+                return True
+        boundary = self._boundary[name]
+        return boundary is not None and boundary.search(text) is not None
+
+    def flags(self, text):
+        """Tuple bool theo thứ tự các nhóm"""
+        return tuple(self.has(name, text) for name in self.categories)
+
+    def matched(self, name, text):
+        """Các từ khóa của nhóm name xuất hiện trong text (dùng để ghi log lý do)"""
+        found = [keyword for keyword in self._plain[name] if keyword in text]
+        boundary = self._boundary[name]
+        if boundary is not None:
+            found.extend(dict.fromkeys(boundary.findall(text)))
+        return found
+
+    def match(self, text):
+        """Từ khóa đã khớp theo từng nhóm: {name: [keyword, ...]}"""
+        return {name: self.matched(name, text) for name in self.categories}
@@ -0,0 +1,207 @@
+"""
+Leases - Khóa có thời hạn trong SQLite để chỉ một process (trong mọi gunicorn worker) chạy một việc
+Holder phải gửi heartbeat trước khi lease hết hạn; holder chết -> lease hết hạn -> process khác tiếp quản
+Holder cũ (bị treo rồi chạy tiếp) biết mình mất lease qua Lease.lost / check(), và generation là fencing token:
+fence(conn) trong transaction ghi từ chối ghi nếu lease đã sang generation khác
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent import futures
+from contextlib import contextmanager
+
+import config
+from services import write_queue
+
+
+class LeaseBusy(Exception):
+    """Lease đang được process khác giữ"""
+
+    def __init__(self, name, holder):
+        super().__init__(f"Lease '{name}' is held by {holder}")
+        self.name = name
+        self.holder = holder
+
+
+class LeaseLost(Exception):
+    """Lease đã hết hạn / bị process khác tiếp quản trong lúc đang giữ: phải dừng, không ghi tiếp"""
+
+    def __init__(self, name, generation):
+        super().__init__(f"Lost lease '{name}' (generation {generation})")
+        self.name = name
+        self.generation = generation
+
+
+def process_holder_id():
+    """Định danh process: host:pid:ngẫu nhiên (pid có thể bị dùng lại sau khi restart)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def init_lease_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            generation INTEGER NOT NULL DEFAULT 1,
+            acquired_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+
+
+class Lease:
+    """Lease theo tên; acquire() vừa để giành lease vừa để gia hạn (heartbeat) nếu đang giữ"""
+
+    def __init__(self, name, ttl=None, holder=None, db_path=None):
+        self.name = name
+        self.ttl = ttl or config.SCHEDULER_LEASE_TTL
+        self.holder = holder or process_holder_id()
+        self.db_path = db_path or config.DATABASE_PATH
+        self.generation = None
+        self.lost = threading.Event()
+        self._renewed_at = None
+        conn = self._connect()
+        try:
+            init_lease_table(conn)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def acquire(self):
+        """Giành lease nếu còn trống / đã hết hạn, hoặc gia hạn nếu đang giữ; True nếu đang giữ lease
+
+        Ghi qua writer thread của process (services.write_queue), chờ tối đa ttl (quá thì TimeoutError).
+        """
+        claimed = write_queue.write(self._claim, db_path=self.db_path, timeout=self.ttl)
+        if claimed is None:
+            return False
+        generation, now = claimed
+        if self.generation is not None and generation != self.generation:
+            # Lease đã qua tay process khác rồi mới về lại đây: phần việc đang làm không còn hợp lệ
+            self.lost.set()
+        self.generation = generation
+        self._renewed_at = now
+        return True
+
+    def _claim(self, conn):
+        """(generation, thời điểm gia hạn) nếu giành / gia hạn được, None nếu holder khác đang giữ"""
+        now = time.time()
+        # Một câu lệnh: SQLite ghi tuần tự nên chỉ một process thắng khi tranh lease hết hạn
+        cursor = conn.execute('''
+            INSERT INTO scheduler_leases (name, holder, acquired_at, heartbeat_at, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                generation = CASE WHEN holder = excluded.holder THEN generation ELSE generation + 1 END,
+                acquired_at = CASE WHEN holder = excluded.holder THEN acquired_at ELSE excluded.acquired_at END,
+                holder = excluded.holder,
+                heartbeat_at = excluded.heartbeat_at,
+                expires_at = excluded.expires_at
+            WHERE holder = excluded.holder OR expires_at < excluded.heartbeat_at
+        ''', (self.name, self.holder, now, now, now + self.ttl))
+        if cursor.rowcount != 1:
+            return None
+        return conn.execute('SELECT generation FROM scheduler_leases WHERE name = ?', (self.name,)).fetchone()[0], now
+
+    def release(self):
+        """Trả lease (chỉ khi đang giữ) để process khác không phải chờ hết hạn
+
+        Giữ dòng (chỉ cho hết hạn) để generation tiếp tục tăng ở lần giành sau.
+        """
+        write_queue.get_write_queue(self.db_path).execute(
+            'UPDATE scheduler_leases SET expires_at = 0 WHERE name = ? AND holder = ?', (self.name, self.holder)
+        ).result()
+
+    def check(self):
+        """LeaseLost nếu đã mất lease (gọi giữa các trang / lô để dừng việc đang làm)"""
+        if not self.lost.is_set() and self._renewed_at is not None \
+                and time.time() - self._renewed_at > self.ttl:
+            self.lost.set()  # không gia hạn được trong cả ttl: process khác có thể đã tiếp quản
+        if self.lost.is_set():
+            raise LeaseLost(self.name, self.generation)
+
+    def fence(self, conn):
+        """Kiểm tra fencing token trong transaction ghi của conn: lease vẫn của holder này, đúng generation"""
+        row = conn.execute('''
+            SELECT 1 FROM scheduler_leases WHERE name = ? AND holder = ? AND generation = ? AND expires_at >= ?
+        ''', (self.name, self.holder, self.generation, time.time())).fetchone()
+        if row is None:
+            self.lost.set()
+            raise LeaseLost(self.name, self.generation)
+
+    def current(self):
+        """Thông tin holder hiện tại (None nếu chưa ai giữ / đã hết hạn)"""
+        conn = self._connect()
+        try:
+            return lease_info(conn, self.name)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def hold(self):
+        """Giữ lease trong suốt khối with (heartbeat trên thread nền); LeaseBusy nếu process khác đang giữ
+
+        Khối with nhận lại Lease: mất lease -> lost được set, check() / fence() raise LeaseLost.
+        """
+        self.lost.clear()
+        self.generation = None
+        if not self.acquire():
+            info = self.current()
+            raise LeaseBusy(self.name, info['holder'] if info else 'unknown')
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.ttl / 3):
+                try:
+                    held = self.acquire()
+                except (sqlite3.OperationalError, futures.TimeoutError) as e:
+                    # database / writer đang bận với transaction ghi dài: thử lại ở nhịp sau (ttl đủ cho vài nhịp)
+                    print(f"⚠️ Lease heartbeat '{self.name}' failed: {e or type(e).__name__}")
+                    held = time.time() - self._renewed_at <= self.ttl
+                if not held or self.lost.is_set():
+                    print(f"⚠️ Lost lease '{self.name}'")
+                    self.lost.set()
+                    return
+
+        thread = threading.Thread(target=heartbeat, name=f"lease-{self.name}", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+            self.release()
+
+
+def lease_info(conn, name):
+    row = conn.execute('''
+        SELECT holder, generation, acquired_at, heartbeat_at, expires_at FROM scheduler_leases WHERE name = ?
+    ''', (name,)).fetchone()
+    if not row or row[4] < time.time():
+        return None
+    holder, generation, acquired_at, heartbeat_at, expires_at = row
+    return {
+        'holder': holder,
+        'generation': generation,
+        'acquired_at': acquired_at,
+        'heartbeat_age': round(time.time() - heartbeat_at, 1),
+        'expires_in': round(expires_at - time.time(), 1),
+    }
+
+
+def lease_holders(db_path=None):
+    """{tên lease: thông tin holder} cho trang admin"""
+    conn = sqlite3.connect(db_path or config.DATABASE_PATH, timeout=30)
+    try:
+        init_lease_table(conn)
+        names = [row[0] for row in conn.execute('SELECT name FROM scheduler_leases ORDER BY name')]
+        return {name: lease_info(conn, name) for name in names}
+    finally:
+        conn.close()
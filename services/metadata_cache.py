@@ -0,0 +1,170 @@
+"""
+Metadata Cache - Cache thông tin video YouTube theo video_id (LRU trong process + bảng SQLite)
+Dùng chung cho URL parser (preview / thêm thủ công / import), crawler và bước enrich (videos.list)
+Có TTL, và cache cả kết quả "không tồn tại" (negative) để không gọi lại mạng cho video đã chết
+Ghi vào bảng qua writer thread của process (services.write_queue), cùng transaction gộp với lô video
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from services import write_queue
+
+# Loại dữ liệu cache cho mỗi video_id
+INFO = 'info'        # tiêu đề / kênh / mô tả (YouTubeURLParser.get_video_info)
+DETAILS = 'details'  # duration + statistics (videos.list)
+
+
+class VideoMetadataCache:
+    """get / put theo (source, video_id); giá trị None = video không tồn tại (negative cache)"""
+
+    MISS = object()
+
+    def __init__(self, db_path=None, capacity=None, ttl=None, negative_ttl=None):
+        self.db_path = db_path or config.DATABASE_PATH
+        self.capacity = capacity or config.METADATA_CACHE_SIZE
+        self.ttl = ttl or config.METADATA_CACHE_TTL
+        self.negative_ttl = negative_ttl or config.METADATA_CACHE_NEGATIVE_TTL
+        self._lru = OrderedDict()  # (source, video_id) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+        self.init_table()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_table(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS video_metadata_cache (
+                    source TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    payload TEXT,
+                    found INTEGER NOT NULL DEFAULT 1,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (source, video_id)
+                ) WITHOUT ROWID
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, key, expires_at, value):
+        with self._lock:
+            self._lru[key] = (expires_at, value)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+
+    def get_many(self, video_ids, source=INFO):
+        """{video_id: value} cho các id còn hạn trong cache (value None = negative)"""
+        now = time.time()
+        found, missing = {}, []
+        with self._lock:
+            for video_id in video_ids:
+                entry = self._lru.get((source, video_id))
+                if entry and entry[0] > now:
+                    self._lru.move_to_end((source, video_id))
+                    found[video_id] = entry[1]
+                    self.stats['memory_hits'] += 1
+                else:
+                    missing.append(video_id)
+        if not missing:
+            return found
+
+        conn = self._connect()
+        try:
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                placeholders = ','.join('?' for _ in chunk)
+                rows = conn.execute(f'''
+                    SELECT video_id, payload, found, expires_at FROM video_metadata_cache
+                    WHERE source = ? AND video_id IN ({placeholders}) AND expires_at > ?
+                ''', [source] + chunk + [now]).fetchall()
+                for video_id, payload, is_found, expires_at in rows:
+                    value = json.loads(payload) if is_found else None
+                    found[video_id] = value
+                    self._remember((source, video_id), expires_at, value)
+        finally:
+            conn.close()
+        with self._lock:
+            self.stats['db_hits'] += sum(1 for video_id in missing if video_id in found)
+            self.stats['misses'] += sum(1 for video_id in missing if video_id not in found)
+        return found
+
+    def get(self, video_id, source=INFO):
+        """Giá trị cache, None nếu video đã biết là không tồn tại, MISS nếu chưa có / hết hạn"""
+        return self.get_many([video_id], source).get(video_id, self.MISS)
+
+    def put_many(self, values, source=INFO):
+        """Lưu {video_id: value}; value None = negative cache (TTL ngắn hơn)"""
+        if not values:
+            return
+        now = time.time()
+        rows = []
+        for video_id, value in values.items():
+            expires_at = now + (self.ttl if value is not None else self.negative_ttl)
+            self._remember((source, video_id), expires_at, value)
+            rows.append((source, video_id, json.dumps(value, ensure_ascii=False) if value is not None else None,
+                         int(value is not None), now, expires_at))
+        write_queue.get_write_queue(self.db_path).executemany('''
+            INSERT OR REPLACE INTO video_metadata_cache
+            (source, video_id, payload, found, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows).result()
+
+    def put(self, video_id, value, source=INFO):
+        self.put_many({video_id: value}, source)
+
+    def invalidate(self, video_id, source=None):
+        """Xóa cache của một video (mọi source nếu source=None)"""
+        with self._lock:
+            for key in [k for k in self._lru if k[1] == video_id and (source is None or k[0] == source)]:
+                del self._lru[key]
+        writer = write_queue.get_write_queue(self.db_path)
+        if source is None:
+            writer.execute('DELETE FROM video_metadata_cache WHERE video_id = ?', (video_id,)).result()
+        else:
+            writer.execute('DELETE FROM video_metadata_cache WHERE source = ? AND video_id = ?',
+                           (source, video_id)).result()
+
+    def clear(self):
+        """Xóa toàn bộ cache (bộ nhớ + bảng)"""
+        with self._lock:
+            self._lru.clear()
+        write_queue.get_write_queue(self.db_path).execute('DELETE FROM video_metadata_cache').result()
+
+    def purge_expired(self):
+        """Xóa các dòng đã hết hạn, trả về số dòng đã xóa"""
+        return write_queue.get_write_queue(self.db_path).execute(
+            'DELETE FROM video_metadata_cache WHERE expires_at <= ?', (time.time(),)).result()
+
+
+def info_from_video(video):
+    """Thông tin dạng YouTubeURLParser.get_video_info từ một video của search.list"""
+    video_id = video['video_id']
+    return {
+        'title': video.get('title', ''),
+        'channel': video.get('channel') or video.get('channel_title', ''),
+        'description': video.get('description') or f"Video từ kênh {video.get('channel') or video.get('channel_title', '')}",
+        'video_id': video_id,
+        'video_url': f"https://www.youtube.com/watch?v={video_id}",
+        'thumbnail': video.get('thumbnail') or f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+    }
+
+
+_cache_instances = {}
+_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """Cache dùng chung trong process (một instance cho mỗi database)"""
+    with _cache_lock:
+        if config.DATABASE_PATH not in _cache_instances:
+            _cache_instances[config.DATABASE_PATH] = VideoMetadataCache(config.DATABASE_PATH)
+        return _cache_instances[config.DATABASE_PATH]
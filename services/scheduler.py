@@ -3,19 +3,31 @@ Auto-Update Scheduler Service
 Quản lý lịch trình auto-update video từ YouTube API
 """
 
+import json
 import threading
 import time
 import sqlite3
-from datetime import datetime
 import config
+from services import write_queue
+from services.leases import Lease
 
 
 class SchedulerService:
+    """Điều khiển job định kỳ (services.jobs); chỉ process giữ lease 'scheduler' (leader) mới chạy job
+
+    Mỗi gunicorn worker đều có thể start scheduler: APScheduler được start ở trạng thái paused, worker
+    giữ lease sẽ resume. Các worker còn lại chỉ gửi heartbeat thử giành lease và tự tiếp quản khi leader
+    chết (lease hết hạn). Lịch chạy nằm trong job store SQLite nên leader mới không chạy lại job vừa chạy.
+    """
+
     def __init__(self):
         self.running = False
         self.thread = None
         self.interval_hours = config.UPDATE_INTERVAL_HOURS
         self._lock = threading.Lock()
+        self.lease = Lease('scheduler', ttl=config.SCHEDULER_LEASE_TTL)
+        self.is_leader = False
+        self.job_manager = None
 
     def start_scheduler(self):
         """Start background scheduler"""
@@ -23,6 +35,13 @@ class SchedulerService:
             print("⏸️ Scheduler already running.")
             return
 
+        try:
+            from services.jobs import get_job_manager
+            self.job_manager = get_job_manager()
+        except ImportError as e:
+            print(f"❌ Cannot start scheduler, APScheduler is not installed: {e}")
+            return
+
         print("🚀 Starting auto-update scheduler...")
         self.running = True
         self.thread = threading.Thread(target=self.run_scheduler)
@@ -33,62 +52,94 @@ class SchedulerService:
         """Stop background scheduler"""
         print("🛑 Stopping scheduler...")
         self.running = False
+        if self.job_manager:
+            self.job_manager.deactivate()
+        if self.is_leader:
+            self.lease.release()
+            self.is_leader = False
 
     def run_scheduler(self):
-        """Main loop for auto-update"""
+        """Main loop: heartbeat / giành lease; APScheduler chỉ chạy job khi process là leader"""
         while self.running:
-            print(f"🕒 Running scheduled update at {datetime.now()}")
-            self.run_auto_update()
-            print(f"✅ Next run in {self.interval_hours} hours")
-            time.sleep(self.interval_hours * 3600)
+            self.tick()
+            time.sleep(config.SCHEDULER_TICK_SECONDS)
+
+    def tick(self):
+        """Một vòng của scheduler (tách riêng để gọi trực tiếp khi test)"""
+        try:
+            leader = self.lease.acquire()
+        except sqlite3.Error as e:
+            print(f"⚠️ Scheduler lease check failed: {e}")
+            leader = False
+        if leader != self.is_leader:
+            print(f"👑 {self.lease.holder} is now scheduler leader" if leader
+                  else f"👥 {self.lease.holder} lost scheduler leadership")
+            self.is_leader = leader
+        if not self.job_manager:
+            return
+        if leader:
+            self.job_manager.activate()
+            # Admin ở worker khác có thể đã tạm dừng / đổi lịch job trong job store
+            self.job_manager.wakeup()
+        else:
+            self.job_manager.deactivate()
+
+    def get_leader(self):
+        """Holder hiện tại của lease scheduler (None nếu chưa có leader)"""
+        return self.lease.current()
+
+    def run_stats_refresh(self, progress=None):
+        """Refresh view / like / comment count trong phần quota được cấp"""
+        try:
+            from services.stats_refresh import StatsRefresher
+            result = StatsRefresher().run()
+            if result['batches']:
+                self.log_update_activity("SUCCESS", f"Stats refresh: cập nhật {result['refreshed']} videos "
+                                         f"({result['batches']} lô, còn {result['quota_left']} unit quota hôm nay)",
+                                         result['refreshed'], 0)
+            return result
+        except Exception as e:
+            self.log_update_activity("ERROR", f"Lỗi stats refresh: {str(e)}")
+            print(f"❌ Stats refresh failed: {e}")
+            return {'error': str(e)}
 
-    def run_auto_update(self):
-        """Chạy auto-update với demo YouTube crawler"""
+    def run_auto_update(self, progress=None, force=False):
+        """Crawl các nguồn đến hạn (force=True: mọi nguồn); progress: xem SmartYouTubeService.run_smart_fetch"""
         try:
             with self._lock:
                 print("🔍 Bắt đầu tìm kiếm video mới với Smart YouTube Service...")
                 
                 # Sử dụng Smart YouTube Service thay vì demo
                 from services.smart_youtube_service import smart_youtube_service
-                videos_found, videos_added = smart_youtube_service.run_smart_fetch()
+                videos_found, videos_added = smart_youtube_service.run_smart_fetch(progress, force)
+                if smart_youtube_service.last_run_id is None:
+                    return {'run_id': None, 'videos_found': 0, 'videos_added': 0, 'skipped': 'no source due'}
                 
                 print(f"✅ Hoàn thành: Tìm thấy {videos_found}, thêm {videos_added} videos")
                 
-                self.log_update_activity("SUCCESS", f"Tìm thấy {videos_found} videos, thêm {videos_added} videos mới", videos_found, videos_added)
+                self.log_update_activity("SUCCESS", f"Crawl run #{smart_youtube_service.last_run_id}: tìm thấy {videos_found} videos, thêm {videos_added} videos mới", videos_found, videos_added,
+                                         smart_youtube_service.last_stage_metrics)
+                return {'run_id': smart_youtube_service.last_run_id, 'videos_found': videos_found,
+                        'videos_added': videos_added}
         except Exception as e:
             self.log_update_activity("ERROR", f"Lỗi auto-update: {str(e)}")
             print(f"❌ Auto-update failed: {e}")
+            return {'error': str(e)}
 
     def run_manual_update(self):
         """Run manual update triggered by admin"""
         print("🟢 Manual update triggered by admin...")
         self.run_auto_update()
 
-    def log_update_activity(self, status, message, videos_found=0, videos_added=0):
-        """Log update activity to database"""
+    def log_update_activity(self, status, message, videos_found=0, videos_added=0, stage_metrics=None):
+        """Log update activity to database (qua writer thread của process; schema có từ migrate_schema)"""
         try:
-            conn = sqlite3.connect(config.DATABASE_PATH)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS update_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT NOT NULL,
-                    message TEXT,
-                    videos_found INTEGER DEFAULT 0,
-                    videos_added INTEGER DEFAULT 0
-                )
-            ''')
-
-            cursor.execute(
-                '''INSERT INTO update_logs (status, message, videos_found, videos_added)
-                   VALUES (?, ?, ?, ?)''',
-                (status, message, videos_found, videos_added)
-            )
-
-            conn.commit()
-            conn.close()
+            write_queue.get_write_queue().execute(
+                '''INSERT INTO update_logs (status, message, videos_found, videos_added, stage_metrics)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (status, message, videos_found, videos_added,
+                 json.dumps(stage_metrics) if stage_metrics else None)
+            ).result()
             print(f"🗒️ Logged update: {status} — {message}")
 
         except Exception as e:
@@ -0,0 +1,24 @@
+"""
+Schema - Các migration ensure_* của catalog, chạy theo thứ tự
+Dùng khi khởi động (app.migrate_schema) và trên bản giải nén trước khi khôi phục backup
+(bản sao lưu cũ có thể thiếu cột / index / trigger của các migration sau này)
+"""
+
+from services import (catalog_counters, stats_refresh, text_normalizer, title_classifier, update_logs,
+                      video_grid, video_store)
+
+
+def ensure_schema(conn):
+    """Chạy mọi migration ensure_* trên conn (mỗi bước tự bỏ qua phần đã có)"""
+    text_normalizer.ensure_normalized_columns(conn)
+    video_store.ensure_video_store_schema(conn)
+    stats_refresh.ensure_stats_schema(conn)
+    video_grid.ensure_grid_indexes(conn)
+    catalog_counters.ensure_catalog_counters(conn)
+    update_logs.ensure_update_logs_schema(conn)
+    title_classifier.ensure_classifier_schema(conn)
+
+
+def reset_schema_caches():
+    """Quên các kiểm tra schema đã nhớ trong process này (sau khi database được thay, vd. khôi phục backup)"""
+    video_store._schema_checked.clear()
@@ -11,12 +11,17 @@ from datetime import datetime, timedelta
 import config
 import time
 import re
+from services import video_store
+from services.metadata_cache import DETAILS, get_metadata_cache, info_from_video
 
 class SmartYouTubeService:
     def __init__(self):
         self.api_keys = self.get_available_api_keys()
         self.current_key_index = 0
         self.fallback_mode = False
+        self.session = requests.Session()
+        self.last_stage_metrics = None
+        self.last_run_id = None
         
     def get_available_api_keys(self):
         """Tự động detect và sử dụng multiple API keys"""
@@ -46,56 +51,71 @@ class SmartYouTubeService:
         print(f"🔄 Rotating to API key #{self.current_key_index + 1}")
     
     def search_videos_smart(self, query, max_results=10):
+        return self.search_videos_page(query, max_results)[0]
+    
+    def search_videos_page(self, query, max_results=10, page_token=None, channel_id=None):
+        """Một trang kết quả: (videos, next_page_token); smart mode không có trang tiếp theo
+
+        channel_id: chỉ lấy video của kênh (mới nhất trước); query có thể là None.
+        """
+        query = query or channel_id
         try:
             if not self.fallback_mode:
-                videos = self.search_youtube_api(query, max_results)
+                videos, next_token = self.search_youtube_api_page(query if not channel_id else None, max_results,
+                                                                   page_token, channel_id=channel_id)
                 if videos:
-                    return videos
+                    return videos, next_token
                 else:
                     print(f"⚠️ YouTube API failed for '{query}', switching to smart mode")
                     self.fallback_mode = True
-            return self.generate_smart_vietnamese_reviews(query, max_results)
+            return self.generate_smart_vietnamese_reviews(query, max_results), None
         except Exception as e:
             print(f"❌ Error in smart search: {e}")
-            return self.generate_smart_vietnamese_reviews(query, max_results)
+            return self.generate_smart_vietnamese_reviews(query, max_results), None
     
     def search_youtube_api(self, query, max_results=10):
+        return self.search_youtube_api_page(query, max_results)[0]
+    
+    def search_youtube_api_page(self, query, max_results=10, page_token=None, channel_id=None):
         try:
-            from googleapiclient.discovery import build
-            api_key = self.get_current_api_key()
-            if not api_key or api_key == 'DEMO_KEY_SMART_MODE':
-                return None
-            
-            youtube = build('youtube', 'v3', developerKey=api_key)
-            request = youtube.search().list(
-                q=query,
-                part='snippet',
-                type='video',
-                maxResults=max_results,
-                order='relevance',
-                regionCode='VN',
-                relevanceLanguage='vi'
-            )
-            response = request.execute()
+            params = {
+                'part': 'snippet',
+                'type': 'video',
+                'maxResults': max_results,
+                'order': 'relevance',
+                'regionCode': 'VN',
+                'relevanceLanguage': 'vi'
+            }
+            if query:
+                params['q'] = query
+            if channel_id:
+                params['channelId'] = channel_id
+                params['order'] = 'date'
+            if page_token:
+                params['pageToken'] = page_token
+            data = self._api_get('search', params)
+            if data is None:
+                return None, None
             
             videos = []
-            for item in response.get('items', []):
+            for item in data.get('items', []):
                 video = {
                     'video_id': item['id']['videoId'],
                     'title': item['snippet']['title'],
                     'channel': item['snippet']['channelTitle'],
+                    'channel_title': item['snippet']['channelTitle'],
+                    'channel_id': item['snippet'].get('channelId', ''),
                     'description': item['snippet']['description'][:500],
                     'thumbnail': item['snippet']['thumbnails'].get('high', {}).get('url', ''),
                     'published_at': item['snippet']['publishedAt'],
                     'video_url': f"https://www.youtube.com/watch?v={item['id']['videoId']}"
                 }
                 videos.append(video)
-            return videos
+            self.cache_search_results(videos)
+            return videos, data.get('nextPageToken')
         except Exception as e:
             print(f"❌ YouTube API error: {e}")
-            if "quotaExceeded" in str(e):
-                self.rotate_api_key()
-            return None
+            return None, None
     
     def generate_smart_vietnamese_reviews(self, query, max_results=10):
         channel_mapping = {
@@ -123,6 +143,7 @@ class SmartYouTubeService:
                 'video_id': video_id,
                 'title': title_templates[i % len(title_templates)],
                 'channel': query,
+                'channel_title': query,
                 'description': f"Review chi tiết phim {movie}. {channel_info['style']}",
                 'thumbnail': f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
                 'published_at': (datetime.now() - timedelta(days=i+1)).isoformat() + 'Z',
@@ -136,97 +157,190 @@ class SmartYouTubeService:
             "Gladiator II", "Bad Boys: Ride or Die", "Avatar: Fire and Ash"
         ]
     
-    def run_smart_fetch(self):
+    def _api_get(self, resource, params):
+        """Gọi YouTube Data API v3 (REST) với API key hiện tại, thử lại khi lỗi 5xx / mạng"""
+        api_key = self.get_current_api_key()
+        if not api_key or api_key == 'DEMO_KEY_SMART_MODE':
+            return None
+        url = f"{config.YOUTUBE_API_BASE_URL.rstrip('/')}/youtube/v3/{resource}"
+        delay = config.YOUTUBE_API_RETRY_DELAY
+        for attempt in range(config.YOUTUBE_API_RETRIES + 1):
+            try:
+                response = self.session.get(url, params=dict(params, key=api_key), timeout=15)
+            except requests.RequestException as e:
+                if attempt == config.YOUTUBE_API_RETRIES:
+                    raise
+                print(f"⚠️ {resource} request failed ({e}), retrying...")
+            else:
+                if response.status_code == 403 and 'quotaExceeded' in response.text:
+                    self.rotate_api_key()
+                    raise requests.HTTPError(f"quotaExceeded ({resource})", response=response)
+                if response.status_code < 500 or attempt == config.YOUTUBE_API_RETRIES:
+                    response.raise_for_status()
+                    return response.json()
+                print(f"⚠️ {resource} returned {response.status_code}, retrying...")
+            time.sleep(delay)
+            delay *= 2
+
+    def parse_duration(self, value):
+        """ISO 8601 (PT1H2M3S) -> số giây"""
+        match = re.match(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$', value or '')
+        if not match:
+            return 0
+        days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+        return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+    def cache_search_results(self, videos):
+        """Kết quả search thật (không phải demo) = thông tin video cho URL parser, khỏi fetch lại"""
+        try:
+            get_metadata_cache().put_many({v['video_id']: info_from_video(v) for v in videos})
+        except Exception as e:
+            print(f"⚠️ Metadata cache error: {e}")
+    
+    def enrich_videos(self, videos):
+        """Bổ sung duration / stats cho một lô video (videos.list, tối đa 50 id mỗi lần)"""
+        for video in videos:
+            video.setdefault('channel_title', video.get('channel', ''))
+        ids = [v['video_id'] for v in videos if 'duration' not in v]
+        if not ids:
+            return videos
+        
+        # Đọc qua cache: chỉ gọi videos.list cho các id chưa có
+        cache = get_metadata_cache()
+        details = cache.get_many(ids, DETAILS)
+        missing = [video_id for video_id in ids if video_id not in details][:50]
+        if missing:
+            try:
+                data = self._api_get('videos', {'part': 'contentDetails,statistics', 'id': ','.join(missing)})
+            except Exception as e:
+                print(f"⚠️ videos.list failed: {e}")
+                data = None
+            if data is not None:
+                fetched = {item['id']: self.video_details(item) for item in data.get('items', [])}
+                # id không có trong kết quả = video đã bị xóa / riêng tư -> negative cache
+                fetched = {video_id: fetched.get(video_id) for video_id in missing}
+                cache.put_many(fetched, DETAILS)
+                details.update(fetched)
+        
+        for video in videos:
+            if details.get(video['video_id']):
+                video.update(details[video['video_id']])
+        return videos
+    
+    def video_details(self, item):
+        """duration + statistics từ một item của videos.list"""
+        stats = item.get('statistics', {})
+        return {
+            'duration': self.parse_duration(item.get('contentDetails', {}).get('duration')),
+            'view_count': int(stats.get('viewCount', 0)),
+            'like_count': int(stats.get('likeCount', 0)),
+            'comment_count': int(stats.get('commentCount', 0)),
+        }
+
+    def classify_video(self, video):
+        """Phân loại (AI) quốc gia / thể loại / phim bộ cho video mới"""
+        import sys
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from update_movie_classification import analyze_movie_info  # dùng script AI phân loại mới
+        analysis = analyze_movie_info(video['title'], video.get('description', ''))
+        # Dùng giá trị mặc định nếu AI trả về None
+        analysis = analysis if isinstance(analysis, dict) else {}
+        video.update({
+            'movie_title': self.extract_movie_title(video['title']),
+            'country': analysis.get('country', 'Unknown'),
+            'genre': analysis.get('genre', 'Unknown'),
+            'movie_type': analysis.get('movie_type', 'Unknown'),
+            'series_name': analysis.get('series_name', ''),
+            'episode_number': analysis.get('episode_number', 0),
+            'rating': 7,  # Default rating
+        })
+        return video
+
+    def run_smart_fetch(self, progress=None, force=False):
+        """Lấy video mới qua pipeline fetch -> enrich -> quality -> dedupe -> classify -> persist
+
+        Mỗi lần chạy là một crawl run có checkpoint trong SQLite; nếu lần trước bị gián đoạn
+        thì tiếp tục từ các query / video chưa xử lý xong.
+        Lease 'crawl' đảm bảo chỉ một process (scheduler hoặc admin) crawl tại một thời điểm.
+        progress: hàm progress(event, data) nhận tiến độ từng query / stage (xem build_ingest_pipeline).
+        Chỉ crawl các nguồn đã đến hạn theo lịch thích nghi (services.crawl_schedule); force=True crawl tất cả.
+        """
+        from services.leases import Lease
+        with Lease('crawl', ttl=config.CRAWL_LEASE_TTL).hold() as lease:
+            return self._run_smart_fetch(progress, force, lease)
+    
+    def _run_smart_fetch(self, progress=None, force=False, lease=None):
+        from services.crawl_runs import CrawlRunStore
+        from services.crawl_schedule import CrawlSchedule, CrawlYield, configured_sources
+        from services.ingest_pipeline import build_ingest_pipeline
         print("🎬 Starting Smart YouTube Fetch...")
-        all_videos, total_found = [], 0
-        for query in config.SEARCH_QUERIES:
-            print(f"🔍 Searching: '{query}'")
-            videos = self.search_videos_smart(query, max_results=8)
-            if videos:
-                print(f"📺 Found {len(videos)} videos for '{query}'")
-                all_videos.extend(videos)
-                total_found += len(videos)
-            time.sleep(0.5)
-        videos_added = self.save_videos_to_db(all_videos)
+        schedule = CrawlSchedule()
+        sources = configured_sources()
+        schedule.sync(sources)
+        store = CrawlRunStore()
+        due = sources if force else schedule.due_sources(sources)
+        if not due and not store.has_running_run():
+            print("⏭️ No crawl source is due yet")
+            self.last_stage_metrics = None
+            self.last_run_id = None
+            return 0, 0
+        run = store.start_or_resume(due)
+        checkpointed = run.pending_items()
+        if checkpointed:
+            print(f"📦 Re-processing {len(checkpointed)} fetched-but-unsaved videos")
+        queries = run.pending_queries()
+        if progress is not None:
+            progress('crawl', {'run_id': run.id, 'resumed': run.resumed, 'checkpointed_items': len(checkpointed),
+                               'queries': [query[0] for query in queries]})
+        crawl_yield = CrawlYield()
+        pipeline = build_ingest_pipeline(self, crawl_run=run, progress=progress, crawl_yield=crawl_yield,
+                                         lease=lease)
+        pipeline.run(checkpointed + queries)
+        pipeline.print_report()
+        if lease is not None:
+            # Mất lease giữa chừng: process khác đã tiếp quản crawl run, không đánh dấu hoàn tất
+            lease.check()
+
+        self.last_stage_metrics = dict(pipeline.report(), run_id=run.id, resumed=run.resumed,
+                                       checkpointed_items=len(checkpointed), sources=schedule.record(crawl_yield))
+        total_found, videos_added = run.complete(self.last_stage_metrics)
+        self.last_run_id = run.id
         print(f"✅ Smart fetch completed: {total_found} found, {videos_added} added")
         return total_found, videos_added
     
-    def fetch_and_add_videos(self):
+    def fetch_and_add_videos(self, progress=None, force=False):
         try:
-            total_found, videos_added = self.run_smart_fetch()
-            return {'found': total_found, 'added': videos_added, 'success': True}
+            total_found, videos_added = self.run_smart_fetch(progress, force)
+            return {'found': total_found, 'added': videos_added, 'success': True,
+                    'run_id': self.last_run_id, 'stage_metrics': self.last_stage_metrics}
         except Exception as e:
             print(f"❌ Error in fetch_and_add_videos: {e}")
             return {'found': 0, 'added': 0, 'success': False, 'error': str(e)}
 
     # ✅ ĐÃ FIX LỖI Ở ĐÂY
     def save_videos_to_db(self, videos):
-        """Save videos to database with duplicate checking and auto-classification"""
+        """Save videos to database (bulk upsert) with auto-classification for new videos"""
         if not videos:
             return 0
         try:
-            import sys
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            from update_movie_classification import analyze_movie_info  # dùng script AI phân loại mới
-            conn = sqlite3.connect('db.sqlite')
-            cursor = conn.cursor()
-            videos_added = 0
-
-            for video in videos:
-                if not isinstance(video, dict):
-                    print("⚠️ Skipping invalid video item:", video)
-                    continue
-
-                if not all(k in video for k in ['title', 'video_id', 'video_url', 'channel']):
-                    print("⚠️ Missing fields in video:", video)
-                    continue
-
-                # Check duplicate
-                cursor.execute('SELECT id FROM video_reviews WHERE video_url = ?', (video['video_url'],))
-                if cursor.fetchone() is None:
-                    movie_title = self.extract_movie_title(video['title'])
-                    analysis = analyze_movie_info(video['title'], video['description'])
-
-                    # Dùng giá trị mặc định nếu AI trả về None
-                    analysis = analysis if isinstance(analysis, dict) else {}
-                    country = analysis.get('country', 'Unknown')
-                    genre = analysis.get('genre', 'Unknown')
-                    movie_type = analysis.get('movie_type', 'Unknown')
-                    series_name = analysis.get('series_name', '')
-                    episode_number = analysis.get('episode_number', 0)
+            records = video_store.valid_records(videos)
+            if len(records) < len(videos):
+                print(f"⚠️ Skipping {len(videos) - len(records)} invalid/repeated video items")
+            conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+            try:
+                existing = video_store.existing_video_ids(conn, [v['video_id'] for v in records])
+            finally:
+                conn.close()
 
-                    try:
-                        cursor.execute('''
-                            INSERT INTO video_reviews 
-                            (title, movie_title, reviewer_name, video_url, video_type, video_id, 
-                             description, rating, movie_link, country, genre, movie_type, 
-                             series_name, episode_number, created_at)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            video['title'],
-                            movie_title,
-                            video['channel'],
-                            video['video_url'], 
-                            'youtube',
-                            video['video_id'],
-                            video['description'],
-                            7,  # Default rating
-                            '',  # movie_link
-                            country,
-                            genre,
-                            movie_type,
-                            series_name,
-                            episode_number,
-                            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        ))
-                        videos_added += 1
-                        print(f"✅ Added: {video['title'][:50]}... [{country}, {genre}]")
-                    except Exception as insert_error:
-                        print(f"❌ Error inserting video '{video['title']}': {insert_error}")
+            # Chỉ phân loại (AI) các video chưa có trong catalog; phân loại xong mới gửi lô cho writer thread
+            for video in records:
+                if video['video_id'] not in existing:
+                    self.classify_video(video)
 
-            conn.commit()
-            conn.close()
-            return videos_added
+            result = video_store.bulk_upsert_videos(records)
+            print(f"✅ Saved videos: {result['inserted']} added, {result['updated']} updated, "
+                  f"{result['skipped'] + len(videos) - len(records)} skipped")
+            return result['inserted']
 
         except Exception as e:
             print(f"❌ Error saving videos: {e}")
@@ -0,0 +1,181 @@
+"""
+Stats Refresh - Cập nhật định kỳ lượt xem / thích / bình luận cho video đã có trong catalog
+videos.list theo lô 50 id, ưu tiên video mới và video nhiều lượt xem, không vượt phần quota được cấp mỗi ngày
+Lịch sử lưu gọn (một dòng / video / ngày); điểm popularity có index để sắp xếp "top" trực tiếp
+
+CLI: python -m services.stats_refresh [--batches 10]
+"""
+
+import argparse
+import math
+import sqlite3
+import time
+from datetime import datetime
+
+import pytz
+
+import config
+from services import video_store, write_queue
+
+BATCH_SIZE = 50        # videos.list nhận tối đa 50 id
+QUOTA_COST = 1         # unit cho mỗi lần gọi videos.list
+QUOTA_CONSUMER = 'stats_refresh'
+# Quota YouTube Data API được reset lúc 0h giờ Thái Bình Dương
+QUOTA_TIMEZONE = pytz.timezone('America/Los_Angeles')
+
+
+def popularity_score(view_count, like_count, comment_count):
+    """Điểm phổ biến (thang log) để sắp xếp; tương tác được tính nặng hơn lượt xem"""
+    return round(math.log10(1 + (view_count or 0))
+                 + 0.5 * math.log10(1 + (like_count or 0) + 2 * (comment_count or 0)), 4)
+
+
+def ensure_stats_schema(conn):
+    """Cột popularity / stats_refreshed_at, index sắp xếp theo popularity và các bảng phụ"""
+    video_store.ensure_video_store_schema(conn)
+    for column, column_type in (('popularity', 'REAL'), ('stats_refreshed_at', 'TIMESTAMP')):
+        try:
+            conn.execute(f'ALTER TABLE video_reviews ADD COLUMN {column} {column_type}')
+        except sqlite3.OperationalError:
+            pass  # cột đã tồn tại
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_video_reviews_popularity
+        ON video_reviews(popularity DESC, rating DESC, created_at DESC)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS video_stats_history (
+            video_id TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            view_count INTEGER,
+            like_count INTEGER,
+            comment_count INTEGER,
+            PRIMARY KEY (video_id, day)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS api_quota_usage (
+            day TEXT NOT NULL,
+            consumer TEXT NOT NULL,
+            units INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, consumer)
+        )
+    ''')
+    conn.commit()
+
+
+def quota_day():
+    return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+
+class StatsRefresher:
+    """Một lần refresh: chọn video đến hạn, gọi videos.list theo lô, ghi stats + lịch sử"""
+
+    def __init__(self, youtube_service=None, db_path=None):
+        if youtube_service is None:
+            from services.smart_youtube_service import smart_youtube_service as youtube_service
+        self.youtube_service = youtube_service
+        self.db_path = db_path or config.DATABASE_PATH
+
+    def quota_used(self, conn):
+        row = conn.execute('SELECT units FROM api_quota_usage WHERE day = ? AND consumer = ?',
+                           (quota_day(), QUOTA_CONSUMER)).fetchone()
+        return row[0] if row else 0
+
+    def record_quota(self, conn, units):
+        conn.execute('''
+            INSERT INTO api_quota_usage (day, consumer, units) VALUES (?, ?, ?)
+            ON CONFLICT(day, consumer) DO UPDATE SET units = units + excluded.units
+        ''', (quota_day(), QUOTA_CONSUMER, units))
+
+    def due_video_ids(self, conn, limit):
+        """Video cần refresh: chưa từng refresh trước, rồi video mới, rồi video nhiều lượt xem
+
+        Hạn refresh theo loại video: STATS_REFRESH_MAX_AGE_HOURS['recent' | 'popular' | 'default'].
+        """
+        max_age = config.STATS_REFRESH_MAX_AGE_HOURS
+        return [row[0] for row in conn.execute('''
+            SELECT video_id FROM video_reviews
+            WHERE video_type = 'youtube' AND video_id IS NOT NULL AND video_id != ''
+              AND (stats_refreshed_at IS NULL OR stats_refreshed_at < CASE
+                    WHEN datetime(created_at) >= datetime('now', ?) THEN datetime('now', ?)
+                    WHEN COALESCE(view_count, 0) >= ? THEN datetime('now', ?)
+                    ELSE datetime('now', ?) END)
+            ORDER BY stats_refreshed_at IS NOT NULL, datetime(created_at) DESC, COALESCE(view_count, 0) DESC
+            LIMIT ?
+        ''', (f"-{config.STATS_REFRESH_RECENT_DAYS} days", f"-{max_age['recent']} hours",
+              config.STATS_REFRESH_POPULAR_VIEWS, f"-{max_age['popular']} hours",
+              f"-{max_age['default']} hours", limit))]
+
+    def save_batch(self, conn, video_ids, statistics):
+        """Ghi một lô (chạy trên writer của write_queue); id không có trong kết quả chỉ được đánh dấu đã refresh"""
+        day = int(time.time() // 86400)
+        rows, history = [], []
+        for video_id, stats in statistics.items():
+            views, likes, comments = (int(stats.get(key, 0)) for key in ('viewCount', 'likeCount', 'commentCount'))
+            rows.append((views, likes, comments, popularity_score(views, likes, comments), video_id))
+            history.append((video_id, day, views, likes, comments))
+        missing = [(video_id,) for video_id in video_ids if video_id not in statistics]
+        conn.executemany('''
+            UPDATE video_reviews
+            SET view_count = ?, like_count = ?, comment_count = ?, popularity = ?,
+                stats_refreshed_at = CURRENT_TIMESTAMP
+            WHERE video_id = ?
+        ''', rows)
+        conn.executemany('UPDATE video_reviews SET stats_refreshed_at = CURRENT_TIMESTAMP WHERE video_id = ?',
+                         missing)
+        # Một dòng mỗi video mỗi ngày: lần refresh sau trong ngày ghi đè số liệu
+        conn.executemany('''
+            INSERT INTO video_stats_history (video_id, day, view_count, like_count, comment_count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(video_id, day) DO UPDATE SET view_count = excluded.view_count,
+                like_count = excluded.like_count, comment_count = excluded.comment_count
+        ''', history)
+        self.record_quota(conn, QUOTA_COST)
+        return len(rows), len(missing)
+
+    def run(self, max_batches=None):
+        """Refresh tối đa max_batches lô (mặc định STATS_REFRESH_MAX_BATCHES), trả về số liệu"""
+        result = {'batches': 0, 'refreshed': 0, 'missing': 0, 'quota_used': 0, 'quota_left': 0}
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            ensure_stats_schema(conn)
+            quota_left = max(0, config.STATS_REFRESH_DAILY_QUOTA - self.quota_used(conn))
+            batches = min(max_batches or config.STATS_REFRESH_MAX_BATCHES, quota_left // QUOTA_COST)
+            video_ids = self.due_video_ids(conn, batches * BATCH_SIZE) if batches else []
+            if not batches:
+                print("⏸️ Stats refresh: daily quota slice used up")
+
+            for i in range(0, len(video_ids), BATCH_SIZE):
+                chunk = video_ids[i:i + BATCH_SIZE]
+                try:
+                    data = self.youtube_service._api_get('videos', {'part': 'statistics', 'id': ','.join(chunk)})
+                except Exception as e:
+                    print(f"⚠️ Stats refresh stopped: {e}")
+                    break
+                if data is None:
+                    print("⏸️ Stats refresh skipped: no YouTube API key (demo mode)")
+                    break
+                statistics = {item['id']: item.get('statistics', {}) for item in data.get('items', [])}
+                refreshed, missing = write_queue.write(self.save_batch, chunk, statistics, db_path=self.db_path)
+                result['batches'] += 1
+                result['refreshed'] += refreshed
+                result['missing'] += missing
+
+            result['quota_used'] = result['batches'] * QUOTA_COST
+            result['quota_left'] = max(0, config.STATS_REFRESH_DAILY_QUOTA - self.quota_used(conn))
+        finally:
+            conn.close()
+        print(f"📈 Stats refresh: {result['refreshed']} videos updated in {result['batches']} batches "
+              f"({result['missing']} unavailable, quota left today: {result['quota_left']})")
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cập nhật lượt xem / thích / bình luận cho video đã có')
+    parser.add_argument('--batches', type=int, default=None, help='số lô 50 video tối đa')
+    args = parser.parse_args()
+    StatsRefresher().run(max_batches=args.batches)
+
+
+if __name__ == '__main__':
+    main()
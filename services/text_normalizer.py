@@ -0,0 +1,129 @@
+"""
+Text Normalizer - Chuẩn hóa tiêu đề / mô tả video
+Dùng chung cho dedupe, tìm kiếm và các cột *_norm được lưu sẵn trong video_reviews
+"""
+
+import re
+import unicodedata
+
+from services import write_queue
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+MOVIE_PREFIXES = ['review', 'đánh giá', 'review phim', 'phim', 'critique', 'vus review', 'vus']
+
+# Các cột chuẩn hóa được duy trì khi ghi (thứ tự dùng cho câu INSERT)
+NORMALIZED_COLUMNS = ['title_norm', 'movie_norm', 'desc_norm', 'title_fold', 'movie_fold']
+
+
+def normalize_text(text):
+    """Chuẩn hóa text để so sánh"""
+    if not text:
+        return ""
+
+    # Convert to lowercase
+    text = text.lower()
+
+    # Remove extra spaces and special characters
+    text = _NON_WORD.sub(' ', text)
+    text = _SPACES.sub(' ', text).strip()
+
+    return text
+
+
+def extract_movie_name(title):
+    """Trích xuất tên phim từ tiêu đề review"""
+    title = (title or '').lower()
+
+    # Remove common prefixes
+    for prefix in MOVIE_PREFIXES:
+        if title.startswith(prefix):
+            title = title[len(prefix):].strip()
+
+    # Extract movie name (before dash or colon)
+    if ':' in title:
+        title = title.split(':')[0].strip()
+    elif '-' in title:
+        title = title.split('-')[0].strip()
+
+    # Clean up
+    title = _NON_WORD.sub(' ', title)
+    title = _SPACES.sub(' ', title).strip()
+
+    return title.title()
+
+
+def fold_diacritics(text):
+    """Bỏ dấu tiếng Việt: 'Đánh giá phim' -> 'Danh gia phim'"""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return text.replace('đ', 'd').replace('Đ', 'D')
+
+
+def normalized_columns(title, description):
+    """Giá trị các cột *_norm / *_fold cho một video"""
+    title_norm = normalize_text(title)
+    movie_norm = normalize_text(extract_movie_name(title))
+    return {
+        'title_norm': title_norm,
+        'movie_norm': movie_norm,
+        'desc_norm': normalize_text(description),
+        'title_fold': fold_diacritics(title_norm),
+        'movie_fold': fold_diacritics(movie_norm),
+    }
+
+
+def normalized_values(title, description):
+    """Tuple giá trị theo thứ tự NORMALIZED_COLUMNS (tiện cho câu INSERT)"""
+    columns = normalized_columns(title, description)
+    return tuple(columns[name] for name in NORMALIZED_COLUMNS)
+
+
+def ensure_normalized_columns(conn):
+    """Migration: thêm các cột chuẩn hóa và index nếu chưa có"""
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA table_info(video_reviews)')
+    existing = {row[1] for row in cursor.fetchall()}
+    for column in NORMALIZED_COLUMNS:
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE video_reviews ADD COLUMN {column} TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_reviews_title_norm ON video_reviews(title_norm)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_reviews_movie_norm ON video_reviews(movie_norm)')
+    conn.commit()
+
+
+def backfill_batch(conn, batch_size=500):
+    """Điền các cột chuẩn hóa cho tối đa batch_size dòng cũ (title_norm IS NULL), không commit; trả về số dòng"""
+    rows = conn.execute('''
+        SELECT id, title, description FROM video_reviews
+        WHERE title_norm IS NULL LIMIT ?
+    ''', (batch_size,)).fetchall()
+    if rows:
+        conn.executemany(f'''
+            UPDATE video_reviews SET {', '.join(f'{c} = ?' for c in NORMALIZED_COLUMNS)}
+            WHERE id = ?
+        ''', [normalized_values(title, description) + (row_id,) for row_id, title, description in rows])
+    return len(rows)
+
+
+def backfill_normalized_columns(conn=None, batch_size=500, db_path=None):
+    """Điền các cột chuẩn hóa cho các dòng cũ (title_norm IS NULL), theo từng lô
+
+    Không truyền conn: mỗi lô là một thao tác của writer thread (services.write_queue) cho db_path.
+    """
+    total = 0
+    while True:
+        if conn is None:
+            count = write_queue.write(backfill_batch, batch_size, db_path=db_path)
+        else:
+            count = backfill_batch(conn, batch_size)
+            conn.commit()
+        if not count:
+            break
+        total += count
+    if total:
+        print(f"🔤 Backfilled normalized text columns for {total} videos")
+    return total
@@ -0,0 +1,192 @@
+"""
+Title Classifier - Phân loại quốc gia / thể loại / phim bộ từ tiêu đề (theo từ khóa, không cần AI)
+- analyze_country_info(): dùng khi admin thêm video và cho việc phân loại lại nền
+- Phân loại lại video 'Unknown' chạy nền (job 'classify_backfill'), không chạy lúc khởi động:
+  theo lô, mỗi lô một transaction ngắn, nghỉ giữa các lô, giới hạn số dòng mỗi lần chạy
+- Cột classifier_version ghi phiên bản bộ phân loại đã thử trên mỗi dòng: dòng vẫn 'Unknown' sau khi thử
+  không bị thử lại cho tới khi CLASSIFIER_VERSION tăng (đổi từ khóa / luật); job bị ngắt thì lần sau
+  chạy tiếp từ các dòng chưa thử
+
+CLI: python -m services.title_classifier [status | run] [--limit N]
+"""
+
+import argparse
+import re
+import sqlite3
+import time
+
+import config
+from services import write_queue
+
+# Tăng khi đổi từ khóa / luật bên dưới để các dòng 'Unknown' được thử lại một lần với luật mới
+CLASSIFIER_VERSION = 1
+VERSION_COLUMN = 'classifier_version'
+# Một biểu thức duy nhất (không OR) để planner dùng index một phần bên dưới thay cho index (country, ...)
+UNCLASSIFIED = "IFNULL(country, 'Unknown') = 'Unknown'"
+
+
+def analyze_country_info(title, movie_title):
+    """Phân tích thông tin phim từ tiêu đề để tự động phân loại"""
+    title_lower = (title or '').lower()
+    movie_title = movie_title or ''
+    movie_title_lower = movie_title.lower()
+    combined_text = f"{title_lower} {movie_title_lower}"
+    # Phân tích quốc gia - Improved
+    country = "Unknown"
+    if any(keyword in combined_text for keyword in ['deadpool', 'avatar', 'spider-man', 'spiderman', 'marvel', 'dc', 'disney', 'hollywood', 'america', 'american']):
+        country = "Mỹ"
+    elif any(keyword in combined_text for keyword in ['trung quốc', 'china', 'hongkong', 'hong kong', 'chinese']):
+        country = "Trung Quốc"
+    elif any(keyword in combined_text for keyword in ['hàn quốc', 'korea', 'korean', 'k-drama', 'kdrama']):
+        country = "Hàn Quốc"
+    elif any(keyword in combined_text for keyword in ['nhật bản', 'japan', 'japanese', 'anime', 'manga']):
+        country = "Nhật Bản"
+    elif any(keyword in combined_text for keyword in ['việt nam', 'vietnam', 'vietnamese', 'việt']):
+        country = "Việt Nam"
+    elif any(keyword in combined_text for keyword in ['thái lan', 'thailand', 'thai']):
+        country = "Thái Lan"
+    # Phân tích thể loại - Improved with better priority
+    genre = "Unknown"
+    if any(keyword in combined_text for keyword in ['khoa học viễn tưởng', 'sci-fi', 'science fiction', 'siêu anh hùng', 'marvel', 'avengers', 'spider-man', 'spiderman', 'superman', 'batman']):
+        genre = "Khoa học viễn tưởng"
+    elif any(keyword in combined_text for keyword in ['anime', 'hoạt hình', 'animation', 'cartoon']):
+        genre = "Hoạt hình"
+    elif any(keyword in combined_text for keyword in ['hành động', 'action', 'fast', 'furious', 'fight', 'chiến đấu']):
+        genre = "Hành động"
+    elif any(keyword in combined_text for keyword in ['kinh dị', 'horror', 'ma', 'quỷ', 'zombie', 'sợ hãi']):
+        genre = "Kinh dị"
+    elif any(keyword in combined_text for keyword in ['tình cảm', 'romantic', 'romance', 'love', 'yêu', 'lãng mạn']):
+        genre = "Tình cảm"
+    elif any(keyword in combined_text for keyword in ['hài', 'comedy', 'funny', 'vui nhộn']):
+        genre = "Hài"
+    # Phân tích loại phim (single hay series)
+    movie_type = "single"
+    series_name = None
+    episode_number = None
+    # Tìm kiếm pattern cho phim bộ
+    episode_patterns = [
+        r'tập\s*(\d+)', r'episode\s*(\d+)', r'ep\s*(\d+)',
+        r'phần\s*(\d+)', r'season\s*(\d+)', r'part\s*(\d+)'
+    ]
+    for pattern in episode_patterns:
+        match = re.search(pattern, combined_text)
+        if match:
+            movie_type = "series"
+            episode_number = int(match.group(1))
+            # Lấy tên bộ phim (loại bỏ phần tập)
+            series_name = re.sub(pattern, '', movie_title, flags=re.IGNORECASE).strip()
+            break
+    # Các từ khóa cho phim bộ
+    series_keywords = ['phần', 'season', 'series', 'bộ', 'saga']
+    if any(keyword in combined_text for keyword in series_keywords) and movie_type == "single":
+        movie_type = "series"
+        series_name = movie_title
+    return {
+        'country': country,
+        'genre': genre,
+        'movie_type': movie_type,
+        'series_name': series_name,
+        'episode_number': episode_number
+    }
+
+
+def ensure_classifier_schema(conn):
+    """Migration: cột classifier_version + index một phần trên các dòng chưa phân loại (chỉ kiểm tra schema)"""
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(video_reviews)')}
+    if VERSION_COLUMN not in existing:
+        conn.execute(f'ALTER TABLE video_reviews ADD COLUMN {VERSION_COLUMN} INTEGER NOT NULL DEFAULT 0')
+    # Chỉ chứa dòng 'Unknown': tìm dòng chưa thử là một lần đọc index, không quét cả catalog
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_video_reviews_unclassified
+        ON video_reviews({VERSION_COLUMN}, id) WHERE {UNCLASSIFIED}
+    ''')
+    conn.commit()
+
+
+def pending_count(conn, version=CLASSIFIER_VERSION):
+    """Số video 'Unknown' chưa được phiên bản bộ phân loại này thử"""
+    return conn.execute(f'SELECT COUNT(*) FROM video_reviews WHERE {UNCLASSIFIED} AND {VERSION_COLUMN} < ?',
+                        (version,)).fetchone()[0]
+
+
+def status(conn):
+    """{'version', 'pending', 'attempted_unknown', 'unknown'} cho CLI / kết quả job"""
+    unknown, attempted = conn.execute(f'''
+        SELECT COUNT(*), COALESCE(SUM({VERSION_COLUMN} >= ?), 0) FROM video_reviews WHERE {UNCLASSIFIED}
+    ''', (CLASSIFIER_VERSION,)).fetchone()
+    return {'version': CLASSIFIER_VERSION, 'pending': unknown - attempted, 'attempted_unknown': attempted,
+            'unknown': unknown}
+
+
+def _report(progress, phase, done, total):
+    if progress is not None:
+        progress('progress', {'phase': phase, 'done': done, 'total': total})
+
+
+def backfill(conn, batch_size=None, pause=None, max_rows=None, progress=None):
+    """Phân loại lại các video 'Unknown' chưa được CLASSIFIER_VERSION thử; trả về {'checked', 'classified'}
+
+    Mỗi lô: đọc batch_size dòng chưa thử (qua conn), phân loại, rồi ghi kết quả và classifier_version trong một
+    thao tác ngắn của writer thread (phân loại chạy trước, ngoài writer). Dừng sau max_rows dòng; phần còn lại
+    chạy ở lần sau.
+    """
+    batch_size = batch_size or config.CLASSIFY_BACKFILL_BATCH_SIZE
+    pause = config.CLASSIFY_BACKFILL_PAUSE if pause is None else pause
+    max_rows = max_rows or config.CLASSIFY_BACKFILL_MAX_ROWS
+    if conn.in_transaction:
+        conn.commit()
+    db_path = write_queue.connection_path(conn)
+    total = min(pending_count(conn), max_rows)
+    checked = classified = 0
+    while checked < max_rows:
+        rows = conn.execute(f'''
+            SELECT id, title, movie_title, country FROM video_reviews
+            WHERE {UNCLASSIFIED} AND {VERSION_COLUMN} < ?
+            LIMIT ?
+        ''', (CLASSIFIER_VERSION, min(batch_size, max_rows - checked))).fetchall()
+        if not rows:
+            break
+        updates = []
+        for video_id, title, movie_title, country in rows:
+            analysis = analyze_country_info(title, movie_title)
+            if analysis['country'] != 'Unknown':
+                classified += 1
+            updates.append((analysis['country'], analysis['genre'], analysis['movie_type'], analysis['series_name'],
+                            analysis['episode_number'], CLASSIFIER_VERSION, video_id, country))
+        # country không đổi kể từ lúc đọc: admin sửa tay trong lúc phân loại thì giữ bản của admin
+        write_queue.get_write_queue(db_path).executemany(f'''
+            UPDATE video_reviews
+            SET country = ?, genre = ?, movie_type = ?, series_name = ?, episode_number = ?, {VERSION_COLUMN} = ?
+            WHERE id = ? AND country IS ?
+        ''', updates).result()
+        checked += len(rows)
+        _report(progress, 'classify', checked, max(total, checked))
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return {'checked': checked, 'classified': classified}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Phân loại lại video Unknown theo tiêu đề')
+    parser.add_argument('operation', nargs='?', choices=['status', 'run'], default='status')
+    parser.add_argument('--limit', type=int, help='số dòng tối đa (mặc định CLASSIFY_BACKFILL_MAX_ROWS)')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        ensure_classifier_schema(conn)
+        if args.operation == 'run':
+            result = backfill(conn, max_rows=args.limit)
+            print(f"🏷️ Checked {result['checked']} videos, classified {result['classified']} "
+                  f"(classifier v{CLASSIFIER_VERSION})")
+        info = status(conn)
+        print(f"   Unknown: {info['unknown']}, pending for v{info['version']}: {info['pending']}, "
+              f"already attempted: {info['attempted_unknown']}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
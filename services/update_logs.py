@@ -0,0 +1,168 @@
+"""
+Update Logs - Schema và truy vấn của bảng update_logs (nhật ký mỗi lần crawl)
+- Index (status, timestamp): lần cập nhật thành công gần nhất là một lần đọc index, không quét / sắp xếp cả bảng
+- Index (timestamp): nhật ký mới nhất (trang admin) và tìm dòng cũ để dọn
+- Giữ dòng chi tiết config.LOG_RETENTION_DAYS ngày; dòng cũ hơn được cộng dồn vào update_log_daily
+  (mỗi ngày theo giờ Việt Nam một dòng: số lần chạy, tìm thấy, đã thêm, lỗi, thời gian) rồi xóa,
+  theo lô nhỏ, mỗi lô một thao tác ngắn của writer thread (services.write_queue) để crawler không phải chờ lâu
+
+CLI: python -m services.update_logs [daily | prune]
+"""
+
+import argparse
+import sqlite3
+import time
+
+import config
+from services import write_queue
+
+DAILY_TABLE = 'update_log_daily'
+
+
+def ensure_update_logs_schema(conn):
+    """Migration: bảng update_logs, cột stage_metrics, index và bảng cộng dồn theo ngày"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS update_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT NOT NULL,
+            message TEXT,
+            videos_found INTEGER DEFAULT 0,
+            videos_added INTEGER DEFAULT 0,
+            stage_metrics TEXT
+        )
+    ''')
+    # Migration: số liệu từng stage của pipeline (JSON)
+    try:
+        conn.execute('ALTER TABLE update_logs ADD COLUMN stage_metrics TEXT')
+    except sqlite3.OperationalError:
+        pass
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_update_logs_status_timestamp ON update_logs(status, timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_update_logs_timestamp ON update_logs(timestamp)')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {DAILY_TABLE} (
+            day TEXT PRIMARY KEY,
+            runs INTEGER NOT NULL DEFAULT 0,
+            successes INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            videos_found INTEGER NOT NULL DEFAULT 0,
+            videos_added INTEGER NOT NULL DEFAULT 0,
+            duration_seconds REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.commit()
+
+
+def last_successful_update(conn):
+    """{'timestamp', 'videos_found', 'videos_added'} của lần crawl SUCCESS gần nhất, hoặc None"""
+    row = conn.execute('''
+        SELECT timestamp, videos_found, videos_added FROM update_logs
+        WHERE status = 'SUCCESS'
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ''').fetchone()
+    if row is None:
+        return None
+    return {'timestamp': row[0], 'videos_found': row[1], 'videos_added': row[2]}
+
+
+def _report(progress, phase, done, total):
+    if progress is not None:
+        progress('progress', {'phase': phase, 'done': done, 'total': total})
+
+
+def rollup_and_prune(conn, retention_days=None, batch_size=None, pause=None, progress=None):
+    """Cộng dồn các dòng update_logs cũ hơn retention_days vào update_log_daily rồi xóa chúng
+
+    conn chỉ dùng để đọc; mỗi lô (batch_size dòng cũ nhất) được cộng dồn và xóa trong cùng một thao tác của
+    writer (một transaction), nên chạy lại sau khi bị ngắt không đếm trùng. Nghỉ pause giây giữa các lô.
+    Trả về số dòng đã dọn.
+    """
+    retention_days = config.LOG_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or config.LOG_PRUNE_BATCH_SIZE
+    pause = config.LOG_PRUNE_PAUSE if pause is None else pause
+    if conn.in_transaction:
+        conn.commit()
+    db_path = write_queue.connection_path(conn)
+    cutoff = conn.execute("SELECT datetime('now', ?)", (f'-{retention_days} days',)).fetchone()[0]
+    total = conn.execute('SELECT COUNT(*) FROM update_logs WHERE timestamp < ?', (cutoff,)).fetchone()[0]
+    pruned = 0
+    while True:
+        count = write_queue.write(_rollup_batch, cutoff, batch_size, db_path=db_path)
+        if not count:
+            break
+        pruned += count
+        _report(progress, 'logs', pruned, max(total, pruned))
+        if count < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return pruned
+
+
+def _rollup_batch(conn, cutoff, batch_size):
+    ids = [row[0] for row in conn.execute(
+        'SELECT id FROM update_logs WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?', (cutoff, batch_size))]
+    if ids:
+        marks = ','.join('?' * len(ids))
+        conn.execute(f'''
+            INSERT INTO {DAILY_TABLE} (day, runs, successes, errors, videos_found, videos_added, duration_seconds)
+            SELECT date(timestamp, '+7 hours'), COUNT(*), SUM(status = 'SUCCESS'), SUM(status = 'ERROR'),
+                   COALESCE(SUM(videos_found), 0), COALESCE(SUM(videos_added), 0),
+                   COALESCE(SUM(json_extract(stage_metrics, '$.total_seconds')), 0)
+            FROM update_logs WHERE id IN ({marks})
+            GROUP BY 1
+            ON CONFLICT(day) DO UPDATE SET
+                runs = runs + excluded.runs,
+                successes = successes + excluded.successes,
+                errors = errors + excluded.errors,
+                videos_found = videos_found + excluded.videos_found,
+                videos_added = videos_added + excluded.videos_added,
+                duration_seconds = duration_seconds + excluded.duration_seconds
+        ''', ids)
+        conn.execute(f'DELETE FROM update_logs WHERE id IN ({marks})', ids)
+    return len(ids)
+
+
+def daily_rollup(conn, days=30):
+    """[{'day', 'runs', ...}] mới nhất trước: ngày đã cộng dồn + ngày còn dòng chi tiết (tính từ update_logs)"""
+    rows = conn.execute(f'''
+        SELECT day, SUM(runs), SUM(successes), SUM(errors), SUM(videos_found), SUM(videos_added),
+               ROUND(SUM(duration_seconds), 3)
+        FROM (
+            SELECT day, runs, successes, errors, videos_found, videos_added, duration_seconds FROM {DAILY_TABLE}
+            UNION ALL
+            SELECT date(timestamp, '+7 hours'), 1, status = 'SUCCESS', status = 'ERROR',
+                   COALESCE(videos_found, 0), COALESCE(videos_added, 0),
+                   COALESCE(json_extract(stage_metrics, '$.total_seconds'), 0)
+            FROM update_logs WHERE timestamp >= datetime('now', ?)
+        )
+        GROUP BY day ORDER BY day DESC LIMIT ?
+    ''', (f'-{days + 1} days', days)).fetchall()
+    keys = ('day', 'runs', 'successes', 'errors', 'videos_found', 'videos_added', 'duration_seconds')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Nhật ký cập nhật (update_logs)')
+    parser.add_argument('operation', nargs='?', choices=['daily', 'prune'], default='daily')
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        ensure_update_logs_schema(conn)
+        if args.operation == 'prune':
+            print(f"🧹 Rolled up and pruned {rollup_and_prune(conn)} update_logs rows "
+                  f"(older than {config.LOG_RETENTION_DAYS} days)")
+        else:
+            for row in daily_rollup(conn, args.days):
+                print(f"   {row['day']}  runs {row['runs']:>4}  ✅ {row['successes']:>4}  ❌ {row['errors']:>3}  "
+                      f"found {row['videos_found']:>6}  added {row['videos_added']:>5}  "
+                      f"{row['duration_seconds']:.0f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
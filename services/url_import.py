@@ -0,0 +1,155 @@
+"""
+URL Import - Thêm hàng loạt video từ danh sách URL YouTube
+Lấy thông tin các URL đồng thời qua session dùng chung (connection pool),
+rồi ghi tất cả vào video_reviews trong một transaction
+
+CLI: python -m services.url_import urls.txt|urls.csv [--workers 8] [--dry-run]
+"""
+
+import argparse
+import csv
+import io
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+from services import video_store
+from services.youtube_url_parser import YouTubeURLParser
+
+URL_COLUMNS = ('url', 'link', 'video_url', 'youtube_url')
+
+
+def parse_import_rows(text):
+    """Danh sách URL (mỗi dòng một hoặc nhiều URL) hoặc CSV có cột url[,title,description]
+
+    Trả về list dict {'url', 'title', 'description'}.
+    """
+    text = (text or '').lstrip('﻿')
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    header = [cell.strip().lower() for cell in next(csv.reader([lines[0]]))]
+    url_column = next((name for name in URL_COLUMNS if name in header), None)
+    if url_column:
+        rows = []
+        for record in csv.DictReader(io.StringIO('\n'.join(lines)), fieldnames=header):
+            if record is None or record.get(url_column, '').strip().lower() == url_column:
+                continue
+            rows.append({
+                'url': (record.get(url_column) or '').strip(),
+                'title': (record.get('title') or '').strip(),
+                'description': (record.get('description') or '').strip(),
+            })
+        return [row for row in rows if row['url']]
+
+    # Textarea: URL cách nhau bởi xuống dòng, dấu phẩy, chấm phẩy hoặc khoảng trắng
+    return [{'url': token, 'title': '', 'description': ''}
+            for token in re.split(r'[\s,;]+', text) if token]
+
+
+class BulkURLImporter:
+    """Lấy thông tin + thêm nhiều video; iter_import() trả về tiến độ từng URL"""
+
+    def __init__(self, parser=None, workers=None):
+        self.workers = workers or config.URL_IMPORT_WORKERS
+        self.parser = parser or YouTubeURLParser(pool_size=self.workers)
+
+    def iter_import(self, rows, dry_run=False):
+        """Generator sự kiện tiến độ: {'type': 'start'|'progress'|'done', ...}"""
+        start = time.perf_counter()
+        rows = rows[:config.URL_IMPORT_MAX_URLS]
+
+        # Bỏ URL không hợp lệ và URL trùng video_id ngay từ đầu (không tốn request)
+        jobs, invalid, repeated = {}, [], 0
+        for row in rows:
+            video_id = self.parser.extract_video_id(row['url'])
+            if not video_id:
+                invalid.append(row['url'])
+            elif video_id in jobs:
+                repeated += 1
+            else:
+                jobs[video_id] = row
+        yield {'type': 'start', 'total': len(rows), 'queued': len(jobs), 'invalid': len(invalid),
+               'repeated': repeated}
+
+        records, failed = [], []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.parser.get_video_info, row['url']): (video_id, row)
+                       for video_id, row in jobs.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                video_id, row = futures[future]
+                info = future.result()
+                if info:
+                    records.append(self.parser.video_record(info, row['title'] or None, row['description'] or None))
+                else:
+                    failed.append(row['url'])
+                yield {'type': 'progress', 'done': done, 'queued': len(jobs), 'video_id': video_id,
+                       'ok': bool(info), 'title': info['title'] if info else None}
+
+        # Giữ thứ tự như danh sách đầu vào
+        order = {video_id: position for position, video_id in enumerate(jobs)}
+        records.sort(key=lambda record: order[record['video_id']])
+        result = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        if records and not dry_run:
+            result = video_store.bulk_upsert_videos(records)
+
+        yield {
+            'type': 'done',
+            'total': len(rows),
+            'resolved': len(records),
+            'inserted': result['inserted'],
+            'existing': 0 if dry_run else len(records) - result['inserted'] - result['skipped'],
+            'failed': failed,
+            'invalid': invalid,
+            'repeated': repeated,
+            'dry_run': dry_run,
+            'seconds': round(time.perf_counter() - start, 2),
+        }
+
+    def import_urls(self, rows, progress=None, dry_run=False):
+        """Chạy hết iter_import, trả về sự kiện 'done' (progress: callback cho mỗi sự kiện)"""
+        summary = None
+        for event in self.iter_import(rows, dry_run=dry_run):
+            if progress:
+                progress(event)
+            summary = event
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Thêm hàng loạt video từ danh sách URL YouTube')
+    parser.add_argument('file', nargs='?', default='-', help='file .txt / .csv (mặc định: stdin)')
+    parser.add_argument('--workers', type=int, default=config.URL_IMPORT_WORKERS)
+    parser.add_argument('--dry-run', action='store_true', help='chỉ lấy thông tin, không ghi database')
+    args = parser.parse_args()
+
+    if args.file == '-':
+        text = sys.stdin.read()
+    else:
+        with open(args.file, encoding='utf-8-sig') as f:
+            text = f.read()
+    rows = parse_import_rows(text)
+    if not rows:
+        print("❌ Không tìm thấy URL nào")
+        return 1
+
+    def report(event):
+        if event['type'] == 'start':
+            print(f"📥 {event['queued']} URL cần lấy thông tin ({event['invalid']} không hợp lệ, "
+                  f"{event['repeated']} trùng lặp)")
+        elif event['type'] == 'progress':
+            mark = '✅' if event['ok'] else '❌'
+            print(f"[{event['done']}/{event['queued']}] {mark} {event['video_id']} {event['title'] or ''}")
+
+    summary = BulkURLImporter(workers=args.workers).import_urls(rows, progress=report, dry_run=args.dry_run)
+    print(f"\n🎉 {summary['resolved']}/{summary['total']} URL lấy được thông tin, "
+          f"{summary['inserted']} video mới, {summary['existing']} đã có, "
+          f"{len(summary['failed'])} lỗi trong {summary['seconds']}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Video Grid - Danh sách video phân trang phía server cho trang admin (thay cho việc gửi cả catalog xuống trình duyệt)
+- Chỉ sắp xếp theo các cột có index (SORTS / GRID_INDEXES), thứ tự phụ luôn là id
+- Phân trang bằng cursor (giá trị sort + id của dòng cuối, keyset) hoặc page (OFFSET, chỉ nên dùng cho vài trang đầu)
+- Lọc: kênh, thể loại, quốc gia, khoảng ngày tạo (giờ Việt Nam), trạng thái phân loại, từ khóa
+- Tổng số: không lọc / lọc một kênh / một thể loại / khoảng ngày đọc từ catalog_counters (chính xác);
+  bộ lọc khác đếm chính xác tới ADMIN_GRID_COUNT_CAP, lớn hơn thì chỉ ước lượng
+- where_clause() dùng lại cho thao tác hàng loạt theo bộ lọc (catalog_maintenance.delete_matching)
+
+CLI: python -m services.video_grid [--genre ...] [--sort popularity] [--cursor ...]
+"""
+
+import argparse
+import base64
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import config
+from services import catalog_counters, text_normalizer
+
+TABLE = 'video_reviews'
+VIETNAM_OFFSET = timedelta(hours=7)  # created_at lưu theo UTC, bộ lọc ngày nhập theo giờ Việt Nam
+
+# sort -> biểu thức ORDER BY; COALESCE để cột NULL vẫn phân trang được bằng so sánh (index trên đúng biểu thức này)
+SORTS = {
+    'created_at': "COALESCE(created_at, '')",
+    'published_at': "COALESCE(published_at, '')",
+    'popularity': 'COALESCE(popularity, -1)',
+    'view_count': 'COALESCE(view_count, -1)',
+    'id': 'id',
+}
+
+GRID_INDEXES = {
+    'idx_video_reviews_grid_created': f"{SORTS['created_at']}, id",
+    'idx_video_reviews_grid_published': f"{SORTS['published_at']}, id",
+    'idx_video_reviews_grid_popularity': f"{SORTS['popularity']}, id",
+    'idx_video_reviews_grid_views': f"{SORTS['view_count']}, id",
+    # Lọc theo kênh / thể loại / quốc gia + thứ tự mặc định (mới nhất)
+    'idx_video_reviews_grid_channel': f"reviewer_name, {SORTS['created_at']}, id",
+    'idx_video_reviews_grid_genre': f"genre, {SORTS['created_at']}, id",
+    'idx_video_reviews_grid_country': f"country, {SORTS['created_at']}, id",
+}
+
+GRID_COLUMNS = ['id', 'title', 'movie_title', 'reviewer_name', 'genre', 'country', 'movie_type', 'rating',
+                'view_count', 'popularity', 'published_at', 'created_at']
+
+FILTER_KEYS = ('channel', 'genre', 'country', 'date_from', 'date_to', 'status', 'q')
+STATUSES = {
+    # IFNULL thay cho OR: SQLite quét index của cột sort theo thứ tự và dừng sớm (không sắp xếp tạm)
+    'classified': "IFNULL(genre, 'Unknown') != 'Unknown'",
+    'unclassified': "IFNULL(genre, 'Unknown') = 'Unknown'",
+}
+
+
+def ensure_grid_indexes(conn):
+    """Migration: index cho các cột sắp xếp / lọc của grid admin"""
+    for name, columns in GRID_INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {TABLE}({columns})')
+    conn.commit()
+
+
+def _utc_bound(day, extra_days=0):
+    """'YYYY-MM-DD' (giờ Việt Nam) -> mốc 00:00 tương ứng theo UTC, định dạng như created_at"""
+    moment = datetime.strptime(day, '%Y-%m-%d') + timedelta(days=extra_days) - VIETNAM_OFFSET
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def parse_filters(args):
+    """Bộ lọc hợp lệ từ query string / JSON (bỏ giá trị rỗng và 'all'); ValueError nếu sai định dạng"""
+    filters = {}
+    for key in FILTER_KEYS:
+        value = str(args.get(key) or '').strip()
+        if not value or value == 'all':
+            continue
+        if key in ('date_from', 'date_to'):
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"{key} phải có dạng YYYY-MM-DD")
+        if key == 'status' and value not in STATUSES:
+            raise ValueError(f"status phải là một trong: {', '.join(STATUSES)}")
+        filters[key] = value
+    return filters
+
+
+def where_clause(filters):
+    """(điều kiện SQL, params) cho bộ lọc đã qua parse_filters"""
+    conditions, params = [], []
+    for key, column in (('channel', 'reviewer_name'), ('genre', 'genre'), ('country', 'country')):
+        if key in filters:
+            conditions.append(f'{column} = ?')
+            params.append(filters[key])
+    if 'date_from' in filters:
+        conditions.append(f"{SORTS['created_at']} >= ?")
+        params.append(_utc_bound(filters['date_from']))
+    if 'date_to' in filters:
+        conditions.append(f"{SORTS['created_at']} < ?")
+        params.append(_utc_bound(filters['date_to'], extra_days=1))
+    if 'status' in filters:
+        conditions.append(STATUSES[filters['status']])
+    if 'q' in filters:
+        query = filters['q']
+        folded = text_normalizer.fold_diacritics(text_normalizer.normalize_text(query)) or query
+        conditions.append('(title LIKE ? OR movie_title LIKE ? OR title_fold LIKE ? OR movie_fold LIKE ?)')
+        params.extend([f'%{query}%', f'%{query}%', f'%{folded}%', f'%{folded}%'])
+    return ' AND '.join(conditions) or '1=1', params
+
+
+def encode_cursor(value, row_id):
+    return base64.urlsafe_b64encode(json.dumps([value, row_id]).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(giá trị sort, id) của dòng cuối trang trước; ValueError nếu cursor hỏng"""
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Cursor không hợp lệ')
+
+
+def _keyset(expression, descending, value, row_id):
+    """Điều kiện 'sau dòng (value, id)': so sánh riêng cột sort để SQLite quét index theo khoảng"""
+    if expression == 'id':
+        return ('id < ?' if descending else 'id > ?'), [row_id]
+    op = '<' if descending else '>'
+    return f'{expression} {op}= ? AND ({expression} {op} ? OR id {op} ?)', [value, value, row_id]
+
+
+def count_matches(conn, where, params, cap=None):
+    """(số dòng khớp, chính xác?): dừng đếm ở cap + 1; quá ngưỡng thì ước lượng"""
+    cap = cap or config.ADMIN_GRID_COUNT_CAP
+    count = conn.execute(f'SELECT COUNT(*) FROM (SELECT 1 FROM {TABLE} WHERE {where} LIMIT ?)',
+                         params + [cap + 1]).fetchone()[0]
+    if count <= cap:
+        return count, True
+    if where == '1=1':
+        # Không lọc: số dòng từ thống kê của PRAGMA optimize / ANALYZE nếu có, không thì id lớn nhất
+        try:
+            row = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? AND stat IS NOT NULL LIMIT 1",
+                               (TABLE,)).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        estimate = int(row[0].split()[0]) if row else conn.execute(f'SELECT MAX(id) FROM {TABLE}').fetchone()[0]
+        return max(cap, estimate or 0), False
+    return cap, False
+
+
+def query_page(filters=None, sort='created_at', order='desc', cursor=None, page=None, per_page=None,
+               with_total=True, db_path=None):
+    """Một trang của grid: {'videos', 'next_cursor', 'total', 'total_exact', ...}; ValueError nếu tham số sai"""
+    filters = filters or {}
+    if sort not in SORTS:
+        raise ValueError(f"sort phải là một trong: {', '.join(SORTS)}")
+    if order not in ('asc', 'desc'):
+        raise ValueError("order phải là 'asc' hoặc 'desc'")
+    per_page = max(1, min(int(per_page or config.ADMIN_GRID_PAGE_SIZE), config.ADMIN_GRID_MAX_PAGE_SIZE))
+    page = max(1, int(page or 1))
+    expression = SORTS[sort]
+    descending = order == 'desc'
+
+    where, params = where_clause(filters)
+    page_where, page_params = where, list(params)
+    offset = 0
+    if cursor:
+        condition, cursor_params = _keyset(expression, descending, *decode_cursor(cursor))
+        page_where = f'{where} AND {condition}'
+        page_params += cursor_params
+    else:
+        offset = (page - 1) * per_page
+
+    direction = 'DESC' if descending else 'ASC'
+    conn = sqlite3.connect(db_path or config.DATABASE_PATH, timeout=30)
+    try:
+        rows = conn.execute(f'''
+            SELECT {', '.join(GRID_COLUMNS)}, {expression} FROM {TABLE}
+            WHERE {page_where}
+            ORDER BY {expression} {direction}, id {direction}
+            LIMIT ? OFFSET ?
+        ''', page_params + [per_page + 1, offset]).fetchall()
+        total, exact = None, False
+        if with_total:
+            total = catalog_counters.count_for_filters(conn, filters)
+            total, exact = (total, True) if total is not None else count_matches(conn, where, params)
+    finally:
+        conn.close()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1][-1], rows[-1][0]) if has_more else None
+    return {
+        'videos': [dict(zip(GRID_COLUMNS, row[:-1])) for row in rows],
+        'next_cursor': next_cursor,
+        'page': None if cursor else page,
+        'per_page': per_page,
+        'sort': sort,
+        'order': order,
+        'filters': filters,
+        'total': total,
+        'total_exact': exact,
+    }
+
+
+def facets(db_path=None):
+    """Giá trị cho dropdown lọc: thể loại (catalog_counters), quốc gia (quét index country)"""
+    conn = sqlite3.connect(db_path or config.DATABASE_PATH, timeout=30)
+    try:
+        try:
+            genres = sorted((key, count) for key, count in catalog_counters.counts(conn, 'genre') if key)
+        except sqlite3.OperationalError:
+            genres = conn.execute(f'SELECT genre, COUNT(*) FROM {TABLE} WHERE genre IS NOT NULL '
+                                  'GROUP BY genre').fetchall()
+        countries = conn.execute(f'SELECT country, COUNT(*) FROM {TABLE} WHERE country IS NOT NULL '
+                                 'GROUP BY country').fetchall()
+    finally:
+        conn.close()
+    return {
+        'genres': [{'value': value, 'count': count} for value, count in genres],
+        'countries': [{'value': value, 'count': count} for value, count in countries],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Xem một trang danh sách video như trang admin')
+    for key in FILTER_KEYS:
+        parser.add_argument(f'--{key.replace("_", "-")}', dest=key)
+    parser.add_argument('--sort', default='created_at', choices=list(SORTS))
+    parser.add_argument('--order', default='desc', choices=['asc', 'desc'])
+    parser.add_argument('--cursor')
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+
+    result = query_page(parse_filters(vars(args)), args.sort, args.order, args.cursor, per_page=args.per_page)
+    for video in result['videos']:
+        print(f"{video['id']:>7} {str(video['created_at'])[:16]:<16} {str(video['genre'])[:12]:<12} "
+              f"{video['title'][:60]}")
+    total = result['total'] if result['total_exact'] else f"~{result['total']}"
+    print(f"Tổng: {total}  next cursor: {result['next_cursor']}")
+
+
+if __name__ == '__main__':
+    main()
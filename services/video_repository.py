@@ -0,0 +1,239 @@
+"""
+Video Repository - Truy vấn đọc video_reviews theo projection, trả về row object (__slots__) truy cập theo tên
+- Mỗi projection chỉ chọn cột nó cần: CardRow (thẻ ở trang chủ / tìm kiếm / lọc / phim bộ, chỉ lấy
+  DESCRIPTION_PREVIEW ký tự đầu của mô tả), DetailRow (trang chi tiết / sửa), RelatedRow (video liên quan),
+  ApiRow (/api/reviews)
+- Route / template dùng review.title thay cho review[1]: thứ tự cột vật lý khác nhau giữa database tạo mới và
+  database đã migrate (ALTER TABLE thêm cột vào cuối), nên chỉ số vị trí không đáng tin
+- Câu SQL của mỗi truy vấn được dựng một lần (statement()) và connection đọc được dùng lại theo thread
+  (cached_statements), nên SQLite dùng lại statement đã prepare thay vì parse lại mỗi request
+Luôn fetchall(): không để statement dở dang giữ read transaction trên connection dùng lại.
+Ghi (thêm / sửa / xóa, crawler) vẫn đi qua video_store / catalog_maintenance / route admin.
+
+CLI: python -m services.video_repository [--id 12 | --series ...] [--limit 10]
+"""
+
+import argparse
+import sqlite3
+import threading
+
+import config
+from services import text_normalizer
+
+TABLE = 'video_reviews'
+DESCRIPTION_PREVIEW = 100   # số ký tự mô tả hiển thị trên thẻ video
+
+
+class VideoRow:
+    """Một dòng video_reviews của một projection: thuộc tính theo tên cột, không có __dict__"""
+    __slots__ = ()
+    COLUMNS = ()
+    SELECT = ''
+
+    def __init__(self, values):
+        for name, value in zip(self.COLUMNS, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def factory(cls, cursor, values):
+        """row_factory của sqlite3"""
+        return cls(values)
+
+    def __getitem__(self, name):
+        # Chỉ truy cập theo tên: review['title'] được, review[1] thì không
+        if not isinstance(name, str) or name not in self.COLUMNS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in self.COLUMNS else default
+
+    def keys(self):
+        return self.COLUMNS
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r}, title={getattr(self, 'title', None)!r})"
+
+
+def projection(name, columns):
+    """Lớp row cho một projection; columns: tên cột hoặc (tên, biểu thức SQL)"""
+    names = tuple(column if isinstance(column, str) else column[0] for column in columns)
+    select = ', '.join(column if isinstance(column, str) else f'{column[1]} AS {column[0]}' for column in columns)
+    return type(name, (VideoRow,), {'__slots__': names, 'COLUMNS': names, 'SELECT': select})
+
+
+CardRow = projection('CardRow', [
+    'id', 'title', 'movie_title', 'reviewer_name', 'video_type', 'video_id', 'rating', 'country', 'genre',
+    'series_name', 'episode_number', 'movie_type', 'created_at',
+    ('description', f'substr(description, 1, {DESCRIPTION_PREVIEW})'),
+])
+DetailRow = projection('DetailRow', [
+    'id', 'title', 'movie_title', 'reviewer_name', 'video_url', 'video_type', 'video_id', 'description', 'rating',
+    'movie_link', 'country', 'genre', 'series_name', 'episode_number', 'movie_type', 'created_at',
+])
+RelatedRow = projection('RelatedRow', [
+    'id', 'title', 'movie_title', 'reviewer_name', 'video_id', 'video_type', 'rating', 'country', 'genre',
+    'series_name', 'episode_number', 'movie_type', 'created_at',
+])
+ApiRow = projection('ApiRow', [
+    'id', 'title', 'movie_title', 'reviewer_name', 'video_url', 'video_type', 'video_id', 'description', 'rating',
+    'movie_link', 'created_at',
+])
+
+# Cột được phép dùng cho distinct_values (danh sách trong bộ lọc)
+FACET_COLUMNS = ('country', 'genre', 'movie_type')
+
+# (projection, where, order_by, có LIMIT) -> câu SQL
+_statements = {}
+_local = threading.local()
+
+
+def statement(row_class, where='1=1', order_by=None, limit=False):
+    """Câu SELECT của một projection; dựng một lần rồi dùng lại (cùng text -> SQLite dùng lại statement đã prepare)"""
+    key = (row_class, where, order_by, limit)
+    sql = _statements.get(key)
+    if sql is None:
+        sql = f'SELECT {row_class.SELECT} FROM {TABLE} WHERE {where}'
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        if limit:
+            sql += ' LIMIT ?'
+        _statements[key] = sql
+    return sql
+
+
+def read_connection(db_path=None):
+    """Connection đọc của thread hiện tại (mở một lần, giữ cache statement giữa các request)"""
+    path = db_path or config.DATABASE_PATH
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != path:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(path, timeout=30, cached_statements=config.REPOSITORY_STATEMENT_CACHE)
+        _local.conn, _local.path = conn, path
+    return conn
+
+
+def close_read_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+class VideoReviewRepository:
+    """Các truy vấn đọc video_reviews dùng bởi route public / admin"""
+
+    def __init__(self, conn=None, db_path=None):
+        self.conn = conn if conn is not None else read_connection(db_path)
+
+    def _all(self, row_class, where='1=1', params=(), order_by=None, limit=None):
+        cursor = self.conn.cursor()
+        cursor.row_factory = row_class.factory
+        params = tuple(params) + ((limit,) if limit is not None else ())
+        return cursor.execute(statement(row_class, where, order_by, limit is not None), params).fetchall()
+
+    def _one(self, row_class, where, params):
+        rows = self._all(row_class, where, params, limit=1)
+        return rows[0] if rows else None
+
+    def get(self, review_id, row_class=DetailRow):
+        """Một video theo id (mặc định projection chi tiết), None nếu không có"""
+        return self._one(row_class, 'id = ?', (review_id,))
+
+    def latest_cards(self, limit=None):
+        return self._all(CardRow, order_by='created_at DESC', limit=limit)
+
+    def search_cards(self, query='', country=None, genre=None):
+        """Thẻ video khớp từ khóa (có dấu hoặc không dấu) và quốc gia / thể loại, mới nhất trước"""
+        conditions, params = [], []
+        if query:
+            # title_fold / movie_fold: tìm không dấu ("dao hai tac" khớp "Đảo Hải Tặc")
+            folded = text_normalizer.fold_diacritics(text_normalizer.normalize_text(query)) or query
+            conditions.append('(title LIKE ? OR movie_title LIKE ? OR reviewer_name LIKE ? '
+                              'OR title_fold LIKE ? OR movie_fold LIKE ?)')
+            params += [f'%{query}%'] * 3 + [f'%{folded}%'] * 2
+        for column, value in (('country', country), ('genre', genre)):
+            if value and value != 'all':
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        return self._all(CardRow, ' AND '.join(conditions) or '1=1', params, order_by='created_at DESC')
+
+    def filter_cards(self, country=None, genre=None, movie_type=None):
+        conditions, params = [], []
+        for column, value in (('country', country), ('genre', genre), ('movie_type', movie_type)):
+            if value and value != 'all':
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        return self._all(CardRow, ' AND '.join(conditions) or '1=1', params,
+                         order_by='popularity DESC, rating DESC, created_at DESC')
+
+    def series_episodes(self, series_name):
+        return self._all(CardRow, 'series_name = ?', (series_name,), order_by='episode_number ASC, created_at ASC')
+
+    def distinct_values(self, column):
+        """Giá trị khác NULL của country / genre / movie_type (cho danh sách lọc)"""
+        if column not in FACET_COLUMNS:
+            raise ValueError(f"column phải là một trong: {', '.join(FACET_COLUMNS)}")
+        return [row[0] for row in self.conn.execute(
+            f'SELECT DISTINCT {column} FROM {TABLE} WHERE {column} IS NOT NULL ORDER BY {column}').fetchall()]
+
+    def related(self, review_id, limit=3):
+        """(video hiện tại, [video liên quan]) theo thứ tự ưu tiên: cùng bộ phim, cùng reviewer + thể loại,
+        cùng quốc gia + thể loại, cùng thể loại, phổ biến nhất; (None, []) nếu không có video"""
+        current = self.get(review_id, RelatedRow)
+        if current is None:
+            return None, []
+        popular = 'popularity DESC, rating DESC, created_at DESC'
+        not_series = '(series_name != ? OR series_name IS NULL)'
+        steps = []
+        if current.movie_type == 'series' and current.series_name:
+            steps.append(("id != ? AND series_name = ? AND movie_type = 'series'",
+                          (review_id, current.series_name), 'episode_number ASC, rating DESC'))
+        steps += [
+            (f'id != ? AND reviewer_name = ? AND genre = ? AND {not_series}',
+             (review_id, current.reviewer_name, current.genre, current.series_name), popular),
+            (f'id != ? AND country = ? AND genre = ? AND reviewer_name != ? AND {not_series}',
+             (review_id, current.country, current.genre, current.reviewer_name, current.series_name), popular),
+            (f'id != ? AND genre = ? AND reviewer_name != ? AND country != ? AND {not_series}',
+             (review_id, current.genre, current.reviewer_name, current.country, current.series_name), popular),
+            (f'id != ? AND {not_series}', (review_id, current.series_name), popular),
+        ]
+        videos, seen = [], set()
+        for where, params, order_by in steps:
+            if len(videos) >= limit:
+                break
+            for row in self._all(RelatedRow, where, params, order_by, limit - len(videos)):
+                if row.id not in seen and len(videos) < limit:
+                    seen.add(row.id)
+                    videos.append(row)
+        return current, videos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Truy vấn đọc video_reviews')
+    parser.add_argument('--id', type=int)
+    parser.add_argument('--series')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    repo = VideoReviewRepository()
+    if args.id:
+        print(repo.get(args.id))
+        current, videos = repo.related(args.id)
+        for video in videos:
+            print(f"   ↳ {video.id} {video.title}")
+    elif args.series:
+        for row in repo.series_episodes(args.series):
+            print(f"   Tập {row.episode_number}: {row.title}")
+    else:
+        for row in repo.latest_cards(args.limit):
+            print(f"   {row.id:>6} {row.created_at}  {row.title}")
+    close_read_connection()
+
+
+if __name__ == '__main__':
+    main()
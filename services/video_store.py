@@ -0,0 +1,286 @@
+"""
+Video Store - Ghi hàng loạt video vào video_reviews
+Một transaction, executemany + INSERT ... ON CONFLICT(video_id) DO UPDATE (cập nhật stats, thumbnail)
+Không truyền conn: lô được ghi qua writer thread của process (services.write_queue), gộp với các thao tác
+ghi khác đang chờ
+
+Catalog cũ có video_id trùng: migration không tự xóa, chạy một lần
+    python -m services.video_store duplicates | dedupe [--export file.jsonl]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+import config
+from services import text_normalizer, write_queue
+
+# Các cột thống kê được cập nhật khi video đã có trong catalog
+STATS_COLUMNS = ['view_count', 'like_count', 'comment_count']
+
+# Cột crawler ghi; database tạo bởi init_db() (không có sẵn các cột này) được bổ sung khi migrate
+CRAWLER_COLUMNS = {
+    'channel_name': 'TEXT',
+    'thumbnail_url': "TEXT DEFAULT ''",
+    'published_at': 'TIMESTAMP',
+    'updated_at': 'TIMESTAMP',
+}
+
+REQUIRED_FIELDS = ['title', 'video_id', 'video_url', 'channel']
+
+UNIQUE_INDEX = 'ux_video_reviews_video_id'
+
+INSERT_COLUMNS = [
+    'title', 'movie_title', 'reviewer_name', 'video_url', 'video_type', 'video_id',
+    'description', 'rating', 'movie_link', 'channel_name', 'thumbnail_url',
+    'published_at', 'updated_at', 'created_at', 'country', 'genre', 'movie_type',
+    'series_name', 'episode_number',
+] + STATS_COLUMNS + text_normalizer.NORMALIZED_COLUMNS
+
+# Chỉ ghi đè khi có giá trị mới và giá trị đó khác giá trị hiện tại
+_CHANGED = ' OR '.join(
+    f'(excluded.{c} IS NOT NULL AND excluded.{c} IS NOT video_reviews.{c})' for c in STATS_COLUMNS
+) + " OR (excluded.thumbnail_url != '' AND excluded.thumbnail_url IS NOT video_reviews.thumbnail_url)"
+
+UPSERT_SQL = f'''
+    INSERT INTO video_reviews ({', '.join(INSERT_COLUMNS)})
+    VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})
+    ON CONFLICT(video_id) DO UPDATE SET
+        {', '.join(f'{c} = COALESCE(excluded.{c}, video_reviews.{c})' for c in STATS_COLUMNS)},
+        thumbnail_url = CASE WHEN excluded.thumbnail_url != '' THEN excluded.thumbnail_url
+                             ELSE video_reviews.thumbnail_url END,
+        updated_at = excluded.updated_at
+    WHERE {_CHANGED}
+'''
+
+
+_schema_checked = set()
+
+
+def ensure_video_store_schema(conn):
+    """Migration: cột crawler + cột thống kê + UNIQUE index trên video_id (cần cho ON CONFLICT)
+
+    Trả về False khi catalog còn video_id trùng (chưa tạo được index, xem dedupe_video_ids).
+    """
+    text_normalizer.ensure_normalized_columns(conn)
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA table_info(video_reviews)')
+    existing = {row[1] for row in cursor.fetchall()}
+    for column, definition in CRAWLER_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE video_reviews ADD COLUMN {column} {definition}')
+    for column in STATS_COLUMNS:
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE video_reviews ADD COLUMN {column} INTEGER')
+
+    ready = has_unique_video_id(conn)
+    if not ready:
+        duplicates = duplicate_count(conn)
+        if duplicates:
+            # Dữ liệu cũ có thể có video_id trùng (trước đây chỉ kiểm tra theo video_url): không tự xóa
+            print(f"⚠️ {duplicates} rows share a video_id; bulk upserts are disabled until "
+                  f"'python -m services.video_store dedupe' is run")
+        else:
+            cursor.execute(f'CREATE UNIQUE INDEX {UNIQUE_INDEX} ON video_reviews(video_id)')
+            ready = True
+    if ready:
+        # Index thường trên video_id (bản cũ của dedupe_index) thừa khi đã có UNIQUE index
+        cursor.execute('DROP INDEX IF EXISTS idx_video_reviews_video_id')
+    conn.commit()
+    return ready
+
+
+def has_unique_video_id(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                        (UNIQUE_INDEX,)).fetchone() is not None
+
+
+# Dòng thừa: mọi dòng trừ bản cũ nhất (id nhỏ nhất) của mỗi video_id
+_DUPLICATE_ROWS = '''
+    SELECT * FROM video_reviews WHERE id NOT IN (SELECT MIN(id) FROM video_reviews GROUP BY video_id)
+'''
+
+
+def duplicate_count(conn):
+    return conn.execute(f'SELECT COUNT(*) FROM ({_DUPLICATE_ROWS})').fetchone()[0]
+
+
+def dedupe_video_ids(conn, export_path):
+    """Migration một lần: ghi các dòng video_id trùng ra export_path (JSONL), xóa chúng, tạo UNIQUE index
+
+    Giữ bản cũ nhất của mỗi video_id. Xuất file trước khi xóa; xóa + tạo index trong một transaction.
+    Trả về số dòng đã xóa.
+    """
+    if has_unique_video_id(conn):
+        return 0
+    cursor = conn.execute(f'{_DUPLICATE_ROWS} ORDER BY video_id, id')
+    columns = [d[0] for d in cursor.description]
+    ids = []
+    with open(export_path, 'w', encoding='utf-8') as out:
+        for row in cursor:
+            ids.append(row[0])
+            out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n')
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            conn.execute(f"DELETE FROM video_reviews WHERE id IN ({', '.join('?' for _ in chunk)})", chunk)
+        conn.execute(f'CREATE UNIQUE INDEX {UNIQUE_INDEX} ON video_reviews(video_id)')
+    _schema_checked.clear()
+    print(f"🧹 Removed {len(ids)} rows with duplicate video_id (exported to {export_path})")
+    return len(ids)
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value is not None and value != '' else None
+    except (TypeError, ValueError):
+        return None
+
+
+def video_row(video, now=None):
+    """Chuyển một record video (dict đã chuẩn hóa) thành tuple theo INSERT_COLUMNS"""
+    now = now or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    title = video['title']
+    description = video.get('description') or ''
+    channel = video['channel']
+    return (
+        title,
+        video.get('movie_title') or title,
+        channel,
+        video['video_url'],
+        video.get('video_type', 'youtube'),
+        video['video_id'],
+        description,
+        video.get('rating', config.DEFAULT_RATING),
+        video.get('movie_link', ''),
+        video.get('channel_name', channel),
+        video.get('thumbnail') or '',
+        video.get('published_at') or now,
+        now,
+        video.get('created_at') or now,
+        video.get('country', 'Unknown'),
+        video.get('genre', 'Unknown'),
+        video.get('movie_type', 'single'),
+        video.get('series_name', ''),
+        video.get('episode_number', 0),
+    ) + tuple(_int_or_none(video.get(c)) for c in STATS_COLUMNS) \
+      + text_normalizer.normalized_values(title, description)
+
+
+def existing_video_ids(conn, video_ids, chunk_size=500):
+    """Tập video_id đã có trong catalog (truy vấn theo lô IN (...))"""
+    video_ids = list(video_ids)
+    found = set()
+    for i in range(0, len(video_ids), chunk_size):
+        chunk = video_ids[i:i + chunk_size]
+        rows = conn.execute(
+            f"SELECT video_id FROM video_reviews WHERE video_id IN ({', '.join('?' for _ in chunk)})", chunk
+        ).fetchall()
+        found.update(row[0] for row in rows)
+    return found
+
+
+def valid_records(videos):
+    """Bỏ record không hợp lệ và video_id lặp lại trong cùng lô (giữ bản cuối)"""
+    records = {}
+    for video in videos:
+        if isinstance(video, dict) and all(video.get(k) for k in REQUIRED_FIELDS):
+            records[video['video_id']] = video
+    return list(records.values())
+
+
+def upsert_records(conn, videos):
+    """Ghi một lô video trên conn, không commit (trong transaction của người gọi hoặc của write queue)
+
+    Trả về {'inserted', 'updated', 'skipped', 'new_video_ids'}. Số dòng lấy từ rowcount của câu lệnh
+    (conn.total_changes còn đếm cả dòng do trigger catalog_counters ghi).
+    """
+    records = valid_records(videos)
+    existing = existing_video_ids(conn, [v['video_id'] for v in records])
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    changed = conn.executemany(UPSERT_SQL, [video_row(v, now) for v in records]).rowcount if records else 0
+
+    inserted = len(records) - len(existing)
+    updated = changed - inserted
+    return {'inserted': inserted, 'updated': updated, 'skipped': len(videos) - inserted - updated,
+            'new_video_ids': [v['video_id'] for v in records if v['video_id'] not in existing]}
+
+
+def _require_unique(ready):
+    if not ready:
+        raise sqlite3.OperationalError('video_reviews has duplicate video_id rows; '
+                                       'run python -m services.video_store dedupe')
+
+
+def bulk_upsert_videos(videos, conn=None, db_path=None, fence=None):
+    """Ghi một lô video trong một transaction
+
+    Trả về {'inserted', 'updated', 'skipped', 'new_video_ids'}: skipped gồm record không hợp lệ, lặp trong lô,
+    hoặc đã có trong catalog mà stats/thumbnail không đổi.
+    fence: hàm fence(conn) gọi trong cùng transaction trước khi ghi (vd. Lease.fence), raise để hủy lô.
+    """
+    def upsert(conn, videos):
+        if fence is not None:
+            fence(conn)
+        return upsert_records(conn, videos)
+
+    if conn is None:
+        queue = write_queue.get_write_queue(db_path)
+        if queue.db_path not in _schema_checked:
+            _require_unique(queue.write(ensure_video_store_schema, exclusive=True))
+            _schema_checked.add(queue.db_path)
+        return queue.write(upsert, videos)
+    _require_unique(ensure_video_store_schema(conn))
+    with conn:
+        return upsert(conn, videos)
+
+
+def _demo():
+    path = os.path.join(tempfile.mkdtemp(), 'store_test.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE video_reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, movie_title TEXT NOT NULL,
+        reviewer_name TEXT NOT NULL, video_url TEXT NOT NULL, video_type TEXT NOT NULL,
+        video_id TEXT NOT NULL, description TEXT, rating INTEGER, movie_link TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, channel_name TEXT, thumbnail_url TEXT DEFAULT "",
+        published_at TIMESTAMP, updated_at TIMESTAMP, country TEXT DEFAULT "Unknown",
+        genre TEXT DEFAULT "Unknown", series_name TEXT, episode_number INTEGER, movie_type TEXT DEFAULT "single")''')
+    video = {'video_id': 'abc123def45', 'title': 'Review phim Mai', 'channel': 'Test',
+             'video_url': 'https://www.youtube.com/watch?v=abc123def45', 'view_count': 10}
+    print(bulk_upsert_videos([video, {'title': 'missing fields'}], conn=conn))
+    print(bulk_upsert_videos([video], conn=conn))
+    print(bulk_upsert_videos([dict(video, view_count=25, thumbnail='https://img/x.jpg')], conn=conn))
+    print(conn.execute('SELECT video_id, view_count, thumbnail_url FROM video_reviews').fetchall())
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ghi hàng loạt video / migration video_id trùng')
+    parser.add_argument('operation', nargs='?', choices=['demo', 'duplicates', 'dedupe'], default='demo')
+    parser.add_argument('--export', help='file JSONL nhận các dòng bị xóa (mặc định cạnh database)')
+    args = parser.parse_args()
+    if args.operation == 'demo':
+        _demo()
+        return 0
+
+    conn = sqlite3.connect(config.DATABASE_PATH, timeout=30)
+    try:
+        if args.operation == 'duplicates':
+            count = 0 if has_unique_video_id(conn) else duplicate_count(conn)
+            print(f"{count} rows share a video_id with an older row")
+            return 1 if count else 0
+        export = args.export or f"{config.DATABASE_PATH}.duplicates-{datetime.now():%Y%m%d-%H%M%S}.jsonl"
+        dedupe_video_ids(conn, export)
+        ensure_video_store_schema(conn)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Write Queue - Một writer thread mỗi process giữ connection ghi duy nhất vào database
+- Mọi đường ghi (route admin, crawler, import, job nền và sự kiện tiến độ, cache, lease, script bảo trì)
+  gửi thao tác ghi vào hàng đợi (submit() / execute() / executemany() / write()) và nhận về Future
+- Group commit: writer lấy tới WRITE_QUEUE_MAX_BATCH thao tác đang chờ (đợi thêm tối đa WRITE_QUEUE_MAX_DELAY
+  giây sau thao tác đầu) rồi chạy chúng trong một transaction BEGIN IMMEDIATE; mỗi thao tác nằm trong
+  SAVEPOINT riêng nên thao tác lỗi (vd IntegrityError) chỉ hoàn tác phần của nó, Future nhận exception
+- Future chỉ có kết quả sau khi COMMIT xong: người gọi thấy thành công nghĩa là dữ liệu đã được ghi
+- Thao tác exclusive (đánh lại id, lô nhập catalog, ghi đè khi khôi phục backup: hàm tự quản lý transaction)
+  chạy riêng, ngoài transaction gộp
+- Việc dài chia lô: mỗi lô một thao tác, tiến độ báo giữa các lô (ngoài writer)
+- metrics(): độ sâu hàng đợi, số transaction / thao tác, kích thước lô, thời gian commit và thời gian chờ (p50/p95)
+Các process khác (worker gunicorn khác, script chạy riêng) vẫn có writer riêng: giữa các process SQLite
+khóa file, BEGIN IMMEDIATE chờ theo busy timeout thay vì lỗi khi nâng read lock lên write lock giữa chừng.
+
+CLI: python -m services.write_queue [--ops 2000] [--threads 8]  (đo nhanh trên database tạm)
+"""
+
+import argparse
+import atexit
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import config
+
+_STOP = object()
+LATENCY_SAMPLES = 1000      # số mẫu gần nhất dùng cho p50 / p95
+
+
+class _Op:
+    __slots__ = ('func', 'args', 'future', 'exclusive', 'queued_at')
+
+    def __init__(self, func, args, exclusive):
+        self.func = func
+        self.args = args
+        self.future = Future()
+        self.exclusive = exclusive
+        self.queued_at = time.perf_counter()
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class WriteQueue:
+    """Writer thread + hàng đợi cho một file database"""
+
+    def __init__(self, db_path=None, max_batch=None, max_delay=None):
+        self.db_path = db_path or config.DATABASE_PATH
+        self.max_batch = max_batch or config.WRITE_QUEUE_MAX_BATCH
+        self.max_delay = config.WRITE_QUEUE_MAX_DELAY if max_delay is None else max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.conn = None
+        self._closed = False
+        self._stats = {'ops': 0, 'failed_ops': 0, 'commits': 0, 'failed_commits': 0, 'max_depth': 0,
+                       'max_batch': 0}
+        self._commit_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self._wait_seconds = deque(maxlen=LATENCY_SAMPLES)
+
+    # ---- Phía người gọi ----
+
+    def submit(self, func, *args, exclusive=False):
+        """Đưa func(conn, *args) vào hàng đợi; Future nhận giá trị trả về sau khi commit
+
+        func chạy trên writer thread, trong transaction gộp: không được commit / rollback.
+        exclusive=True: chạy riêng ngoài transaction (connection autocommit), func tự quản lý transaction.
+        """
+        op = _Op(func, args, exclusive)
+        if threading.current_thread() is self._thread:
+            # Gọi từ trong một thao tác đang chạy trên writer: chạy luôn, đợi Future ở đây sẽ tự khóa
+            self._run_inline(op)
+            return op.future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('WriteQueue đã đóng')
+            self._ensure_thread()
+            self._queue.put(op)
+            self._stats['max_depth'] = max(self._stats['max_depth'], self._queue.qsize())
+        return op.future
+
+    def write(self, func, *args, exclusive=False, timeout=None):
+        """submit() rồi chờ kết quả (exception của thao tác được raise lại ở đây)"""
+        return self.submit(func, *args, exclusive=exclusive).result(timeout)
+
+    def execute(self, sql, params=()):
+        """Future của rowcount một câu lệnh ghi"""
+        return self.submit(_execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        """Future của tổng rowcount (params được đọc hết ngay, không giữ iterator của người gọi)"""
+        return self.submit(_executemany, sql, list(seq_of_params))
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        """Số liệu cho trang admin / benchmark (thời gian tính bằng ms)"""
+        with self._lock:
+            stats = dict(self._stats)
+            commits, waits = list(self._commit_seconds), list(self._wait_seconds)
+        stats.update(
+            queue_depth=self.depth(),
+            running=self._thread is not None and self._thread.is_alive(),
+            avg_batch=round(stats['ops'] / stats['commits'], 2) if stats['commits'] else 0,
+            commit_ms_p50=_ms(_percentile(commits, 0.5)),
+            commit_ms_p95=_ms(_percentile(commits, 0.95)),
+            commit_ms_max=_ms(max(commits) if commits else None),
+            wait_ms_p50=_ms(_percentile(waits, 0.5)),
+            wait_ms_p95=_ms(_percentile(waits, 0.95)),
+        )
+        return stats
+
+    def close(self, timeout=None):
+        """Ghi hết các thao tác đang chờ rồi dừng writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    # ---- Writer thread ----
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"db-writer-{os.path.basename(self.db_path)}",
+                                            daemon=True)
+            self._thread.start()
+
+    def _connect(self):
+        # isolation_level=None: writer tự BEGIN IMMEDIATE / COMMIT, sqlite3 không tự mở transaction
+        conn = sqlite3.connect(self.db_path, timeout=config.WRITE_QUEUE_BUSY_TIMEOUT, isolation_level=None,
+                               check_same_thread=False)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.OperationalError:
+            pass
+        return conn
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                # Người gọi đã cancel() Future khi thao tác còn trong hàng đợi: bỏ qua
+                batch = [op for op in batch if op.future.set_running_or_notify_cancel()]
+                if batch and self.conn is None:
+                    try:
+                        self.conn = self._connect()
+                    except Exception as e:
+                        for op in batch:
+                            op.future.set_exception(e)
+                        continue
+                group = []
+                for op in batch:
+                    if op.exclusive:
+                        self._commit_group(group)
+                        group = []
+                        self._run_exclusive(op)
+                    else:
+                        group.append(op)
+                self._commit_group(group)
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def _next_batch(self):
+        """(thao tác, có lệnh dừng): chờ thao tác đầu, gom thêm tới max_batch hoặc hết max_delay"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                op = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if op is _STOP:
+                return batch, True
+            batch.append(op)
+        return batch, False
+
+    def _commit_group(self, ops):
+        if not ops:
+            return
+        started = time.perf_counter()
+        results = []
+        try:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for op in ops:
+                    results.append(self._run_savepoint(op))
+                self.conn.execute('COMMIT')
+            except BaseException:
+                if self.conn.in_transaction:
+                    self.conn.execute('ROLLBACK')
+                raise
+        except Exception as e:
+            # BEGIN / COMMIT lỗi (vd process khác giữ write lock quá busy timeout): cả lô thất bại
+            with self._lock:
+                self._stats['failed_commits'] += 1
+                self._stats['failed_ops'] += len(ops)
+            for op in ops:
+                op.future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        with self._lock:
+            self._stats['commits'] += 1
+            self._stats['ops'] += len(ops)
+            self._stats['max_batch'] = max(self._stats['max_batch'], len(ops))
+            self._stats['failed_ops'] += sum(1 for ok, _ in results if not ok)
+            self._commit_seconds.append(finished - started)
+            self._wait_seconds.extend(finished - op.queued_at for op in ops)
+        for op, (ok, value) in zip(ops, results):
+            if ok:
+                op.future.set_result(value)
+            else:
+                op.future.set_exception(value)
+
+    def _run_savepoint(self, op):
+        """(True, kết quả) hoặc (False, exception); thao tác lỗi chỉ hoàn tác savepoint của nó"""
+        self.conn.execute('SAVEPOINT write_op')
+        try:
+            value = op.func(self.conn, *op.args)
+        except Exception as e:
+            self.conn.execute('ROLLBACK TO write_op')
+            self.conn.execute('RELEASE write_op')
+            return False, e
+        self.conn.execute('RELEASE write_op')
+        return True, value
+
+    def _run_exclusive(self, op):
+        started = time.perf_counter()
+        try:
+            value = op.func(self.conn, *op.args)
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            with self._lock:
+                self._stats['failed_ops'] += 1
+            op.future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        with self._lock:
+            self._stats['ops'] += 1
+            self._wait_seconds.append(finished - op.queued_at)
+        op.future.set_result(value)
+
+    def _run_inline(self, op):
+        op.future.set_running_or_notify_cancel()
+        try:
+            op.future.set_result(op.func(self.conn, *op.args))
+        except Exception as e:
+            op.future.set_exception(e)
+
+
+def _execute(conn, sql, params):
+    return conn.execute(sql, params).rowcount
+
+
+def _executemany(conn, sql, seq_of_params):
+    return conn.executemany(sql, seq_of_params).rowcount
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Process con (fork của gunicorn) không có writer thread / connection của process cha: tạo lại khi cần
+    global _queues_lock
+    _queues.clear()
+    _queues_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_write_queue(db_path=None):
+    """WriteQueue dùng chung trong process cho một file database"""
+    path = os.path.abspath(db_path or config.DATABASE_PATH)
+    with _queues_lock:
+        write_queue = _queues.get(path)
+        if write_queue is None or write_queue._closed:
+            write_queue = _queues[path] = WriteQueue(path)
+        return write_queue
+
+
+def write(func, *args, db_path=None, exclusive=False, timeout=None):
+    """Chạy func(conn, *args) trên writer của process và trả về kết quả (sau commit)"""
+    return get_write_queue(db_path).write(func, *args, exclusive=exclusive, timeout=timeout)
+
+
+def connection_path(conn):
+    """Đường dẫn file database chính của conn: hàm nhận conn để đọc gửi phần ghi vào writer của đúng file đó"""
+    return conn.execute('PRAGMA database_list').fetchone()[2]
+
+
+def queue_metrics():
+    """{đường dẫn database: metrics()} của các writer trong process"""
+    with _queues_lock:
+        queues = list(_queues.values())
+    return {write_queue.db_path: write_queue.metrics() for write_queue in queues}
+
+
+@atexit.register
+def close_all():
+    """Ghi nốt thao tác đang chờ khi process thoát"""
+    with _queues_lock:
+        queues = list(_queues.values())
+    for write_queue in queues:
+        write_queue.close(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Đo nhanh write queue trên database tạm')
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite', prefix='reviewphim_writes_')
+    os.close(fd)  # file rỗng: SQLite tạo database mới trong đó
+    write_queue = WriteQueue(path)
+    write_queue.write(lambda conn: conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)'),
+                      exclusive=True)
+    started = time.perf_counter()
+
+    def worker(n):
+        futures = [write_queue.execute('INSERT INTO t (value) VALUES (?)', (f'{n}-{i}',))
+                   for i in range(args.ops // args.threads)]
+        for future in futures:
+            future.result()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(f"✍️ {write_queue.metrics()['ops'] - 1} writes from {args.threads} threads in {elapsed:.2f}s")
+    for key, value in write_queue.metrics().items():
+        print(f"   {key}: {value}")
+    write_queue.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
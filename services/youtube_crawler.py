@@ -4,6 +4,7 @@ from googleapiclient.errors import HttpError
 from langdetect import detect, LangDetectException
 
 import config
+from services.metadata_cache import get_metadata_cache, info_from_video
 
 # Use API key from config file
 YOUTUBE_API_KEY = config.YOUTUBE_API_KEY
@@ -12,7 +13,9 @@ YOUTUBE_API_KEY = config.YOUTUBE_API_KEY
 SEARCH_QUERIES = config.SEARCH_QUERIES
 
 def get_youtube_service():
-    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    # api_endpoint: cho phép trỏ sang server giả lập (config.YOUTUBE_API_BASE_URL)
+    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY,
+                 client_options={"api_endpoint": config.YOUTUBE_API_BASE_URL})
 
 def extract_video_info(item):
     video_id = item["id"]["videoId"]
@@ -54,4 +57,10 @@ def crawl_videos():
             print(f"❌ API error: {e}")
             continue
 
+    # Thông tin từ search = metadata cho URL parser, không cần fetch lại embed / oEmbed
+    try:
+        get_metadata_cache().put_many({video["video_id"]: info_from_video(video) for video in all_videos})
+    except Exception as e:
+        print(f"⚠️ Metadata cache error: {e}")
+
     return all_videos
@@ -7,14 +7,23 @@ import re
 import requests
 import json
 from datetime import datetime
-import sqlite3
+from requests.adapters import HTTPAdapter
+import config
+from services import video_store, write_queue
+from services.metadata_cache import get_metadata_cache
 
 class YouTubeURLParser:
-    def __init__(self):
+    def __init__(self, pool_size=None, timeout=None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Giữ kết nối keep-alive; pool_block=True giới hạn số kết nối đồng thời tới mỗi host
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size or config.URL_IMPORT_POOL_SIZE,
+                              pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = timeout or config.URL_IMPORT_TIMEOUT
     
     def extract_video_id(self, url):
         """Extract video ID from YouTube URL"""
@@ -29,34 +38,51 @@ class YouTubeURLParser:
                 return match.group(1)
         return None
     
-    def get_video_info(self, url):
+    def get_video_info(self, url, use_cache=True):
         """Get video information from YouTube URL"""
         try:
             video_id = self.extract_video_id(url)
             if not video_id:
                 return None
             
+            # Preview rồi thêm cùng một URL: lần thứ hai đọc từ cache, không gọi mạng
+            cache = get_metadata_cache() if use_cache else None
+            if cache:
+                cached = cache.get(video_id)
+                if cached is not cache.MISS:
+                    return dict(cached) if cached else None
+            
             # Try multiple methods to get video info
-            video_info = self.get_info_from_embed(video_id)
+            statuses = []
+            video_info = self.get_info_from_embed(video_id, statuses)
             if not video_info:
-                video_info = self.get_info_from_oembed(video_id)
+                video_info = self.get_info_from_oembed(video_id, statuses)
             
             if video_info:
                 video_info['video_id'] = video_id
                 video_info['video_url'] = f"https://www.youtube.com/watch?v={video_id}"
                 video_info['thumbnail'] = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
+            
+            # Chỉ cache "không tồn tại" khi cả hai nguồn trả lời 4xx (không cache lỗi mạng / 5xx)
+            dead = len(statuses) == 2 and all(400 <= status < 500 for status in statuses)
+            if cache and (video_info or dead):
+                cache.put(video_id, video_info)
                 
-            return video_info
+            return dict(video_info) if video_info else None
             
         except Exception as e:
             print(f"Error getting video info: {e}")
             return None
     
-    def get_info_from_oembed(self, video_id):
+    def get_info_from_oembed(self, video_id, statuses=None):
         """Get info using YouTube oEmbed API (no key required)"""
         try:
-            url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-            response = self.session.get(url, timeout=10)
+            url = f"{config.YOUTUBE_WEB_BASE_URL}/oembed"
+            response = self.session.get(url, params={
+                'url': f"https://www.youtube.com/watch?v={video_id}", 'format': 'json'
+            }, timeout=self.timeout)
+            if statuses is not None:
+                statuses.append(response.status_code)
             
             if response.status_code == 200:
                 data = response.json()
@@ -71,11 +97,13 @@ class YouTubeURLParser:
             print(f"oEmbed error: {e}")
         return None
     
-    def get_info_from_embed(self, video_id):
+    def get_info_from_embed(self, video_id, statuses=None):
         """Get info from YouTube embed page"""
         try:
-            url = f"https://www.youtube.com/embed/{video_id}"
-            response = self.session.get(url, timeout=10)
+            url = f"{config.YOUTUBE_WEB_BASE_URL}/embed/{video_id}"
+            response = self.session.get(url, timeout=self.timeout)
+            if statuses is not None:
+                statuses.append(response.status_code)
             
             if response.status_code == 200:
                 html = response.text
@@ -96,59 +124,42 @@ class YouTubeURLParser:
             print(f"Embed error: {e}")
         return None
     
-    def add_video_to_database(self, video_info, custom_title=None, custom_description=None):
+    def video_record(self, video_info, custom_title=None, custom_description=None):
+        """Bản ghi cho video_store từ thông tin video (ưu tiên tiêu đề / mô tả tùy chỉnh)"""
+        record = dict(video_info)
+        record['title'] = custom_title if custom_title else video_info['title']
+        record['description'] = custom_description if custom_description else video_info['description']
+        record['published_at'] = datetime.now().isoformat()
+        record['created_at'] = datetime.now().isoformat()
+        return record
+    
+    def add_video_to_database(self, video_info, custom_title=None, custom_description=None, conn=None):
         """Add video to database"""
         try:
-            conn = sqlite3.connect('db.sqlite')
-            cursor = conn.cursor()
-            
-            # Check if video already exists
-            cursor.execute(
-                'SELECT id FROM video_reviews WHERE video_url = ?',
-                (video_info['video_url'],)
-            )
-            
-            if cursor.fetchone():
-                conn.close()
-                return {'success': False, 'error': 'Video đã tồn tại trong database'}
-            
             # Use custom title/description if provided
-            title = custom_title if custom_title else video_info['title']
-            description = custom_description if custom_description else video_info['description']
-            
-            # Insert video
-            cursor.execute('''
-                INSERT INTO video_reviews 
-                (title, movie_title, reviewer_name, video_url, video_type, video_id, 
-                 description, rating, movie_link, channel_name, thumbnail_url, 
-                 published_at, updated_at, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                title,
-                title,  # movie_title = title
-                video_info['channel'],  # reviewer_name
-                video_info['video_url'],
-                'youtube',  # video_type
-                video_info['video_id'],
-                description,
-                7,  # Default rating
-                '',  # movie_link
-                video_info['channel'],  # channel_name
-                video_info['thumbnail'],  # thumbnail_url
-                datetime.now().isoformat(),  # published_at
-                datetime.now().isoformat(),  # updated_at
-                datetime.now().isoformat()   # created_at
-            ))
-            
-            conn.commit()
-            video_id = cursor.lastrowid
-            conn.close()
-            
+            record = self.video_record(video_info, custom_title, custom_description)
+
+            def insert(conn):
+                result = video_store.upsert_records(conn, [record])
+                row = conn.execute('SELECT id FROM video_reviews WHERE video_id = ?',
+                                   (record['video_id'],)).fetchone()
+                return result, row
+
+            if conn is None:
+                # Writer thread của process: không tranh write lock với crawler / route admin
+                result, row = write_queue.write(insert)
+            else:
+                video_store.ensure_video_store_schema(conn)
+                with conn:
+                    result, row = insert(conn)
+            if not result['inserted']:
+                return {'success': False, 'error': 'Video đã tồn tại trong database'}
+
             return {
                 'success': True, 
                 'message': 'Video đã được thêm thành công!',
-                'video_id': video_id,
-                'title': title
+                'video_id': row[0],
+                'title': record['title']
             }
             
         except Exception as e:
@@ -3,8 +3,8 @@ Smart Update Videos - Cập nhật toàn bộ video trong DB với phân loại
 """
 
 import sqlite3
+from services import write_queue
 from sentence_transformers import SentenceTransformer, util
-from datetime import datetime
 
 # -------------------- Cấu hình mô hình AI --------------------
 model = SentenceTransformer('paraphrase-MiniLM-L3-v2')
@@ -56,33 +56,40 @@ def update_all_videos_in_db():
     # Lấy tất cả video
     cursor.execute("SELECT id, title, description FROM video_reviews")
     videos = cursor.fetchall()
+    conn.close()
     updated_count = 0
 
     print("🔄 Updating all videos in DB with AI classification...")
 
+    # Mỗi UPDATE là một thao tác của writer thread (được gộp commit theo lô); không giữ write lock
+    # trong lúc mô hình chạy, app / crawler vẫn ghi được
+    writer = write_queue.get_write_queue()
+    pending = []
     for video in videos:
         video_id, title, description = video
         analysis = analyze_movie_info(title, description)
+        future = writer.execute('''
+            UPDATE video_reviews
+            SET genre = ?, country = ?, movie_type = ?, series_name = ?, episode_number = ?
+            WHERE id = ?
+        ''', (
+            analysis['genre'],
+            analysis['country'],
+            analysis['movie_type'],
+            analysis['series_name'],
+            analysis['episode_number'],
+            video_id
+        ))
+        pending.append((future, video_id, title, analysis['genre']))
+
+    for future, video_id, title, genre in pending:
         try:
-            cursor.execute('''
-                UPDATE video_reviews
-                SET genre = ?, country = ?, movie_type = ?, series_name = ?, episode_number = ?
-                WHERE id = ?
-            ''', (
-                analysis['genre'],
-                analysis['country'],
-                analysis['movie_type'],
-                analysis['series_name'],
-                analysis['episode_number'],
-                video_id
-            ))
+            future.result()
             updated_count += 1
-            print(f"✅ Updated: {title[:50]}... -> {analysis['genre']}")
+            print(f"✅ Updated: {title[:50]}... -> {genre}")
         except Exception as e:
             print(f"❌ Error updating video {video_id}: {e}")
 
-    conn.commit()
-    conn.close()
     print(f"✅ Completed! Total videos updated: {updated_count}")
 
 # -------------------- Chạy script --------------------
@@ -1,4 +1,5 @@
 import sqlite3
+from services import write_queue
 from sentence_transformers import SentenceTransformer, util
 
 model = SentenceTransformer('paraphrase-MiniLM-L3-v2')
@@ -16,14 +17,11 @@ conn = sqlite3.connect('db.sqlite')
 c = conn.cursor()
 c.execute("SELECT id, title, description FROM video_reviews")
 videos = c.fetchall()
-
-for vid in videos:
-    vid_id, title, desc = vid
-    genre = analyze_genre(title, desc)
-    c.execute("UPDATE video_reviews SET genre = ? WHERE id = ?", (genre, vid_id))
-
-conn.commit()
 conn.close()
+
+# Phân loại xong mới ghi (một transaction qua writer thread), không giữ write lock trong lúc chạy mô hình
+updates = [(analyze_genre(title, desc), vid_id) for vid_id, title, desc in videos]
+write_queue.get_write_queue().executemany("UPDATE video_reviews SET genre = ? WHERE id = ?", updates).result()
 print("✅ Đã cập nhật toàn bộ video theo AI")
 
 # --- Compatibility shim ---